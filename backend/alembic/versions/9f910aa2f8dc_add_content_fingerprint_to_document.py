@@ -0,0 +1,28 @@
+"""add content_fingerprint to document
+
+Revision ID: 9f910aa2f8dc
+Revises: 2f95e36923e6
+Create Date: 2025-07-21 10:12:43.218391
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9f910aa2f8dc"
+down_revision = "2f95e36923e6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # null for documents indexed before this change, they are re-indexed once
+    op.add_column(
+        "document", sa.Column("content_fingerprint", sa.String(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("document", "content_fingerprint")
@@ -1,25 +1,36 @@
+from typing import cast
+from uuid import uuid4
+
+from redis import Redis
 from sqlalchemy.orm import Session
 
 from ee.onyx.db.external_perm import fetch_external_groups_for_user
 from ee.onyx.db.external_perm import fetch_public_external_group_ids
-from ee.onyx.db.user_group import fetch_user_groups_for_documents
+from ee.onyx.db.user_group import fetch_user_group_names_for_cc_pairs
 from ee.onyx.db.user_group import fetch_user_groups_for_user
 from ee.onyx.external_permissions.sync_params import get_source_perm_sync_config
-from onyx.access.access import (
-    _get_access_for_documents as get_access_for_documents_without_groups,
-)
 from onyx.access.access import _get_acl_for_user as get_acl_for_user_without_groups
 from onyx.access.models import DocumentAccess
 from onyx.access.utils import prefix_external_group
 from onyx.access.utils import prefix_user_group
-from onyx.db.document import get_document_sources
+from onyx.configs.constants import DocumentSource
+from onyx.db.document import get_cc_pair_access_info_for_documents
 from onyx.db.document import get_documents_by_ids
+from onyx.db.enums import AccessType
+from onyx.db.enums import ConnectorCredentialPairStatus
 from onyx.db.models import User
+from onyx.redis.redis_pool import get_redis_client
 from onyx.utils.logger import setup_logger
+from shared_configs.contextvars import get_current_tenant_id
 
 
 logger = setup_logger()
 
+_USER_GROUP_VERSION_KEY = "user_group_version"
+
+# tenant id -> (user group version, cc pair id -> names of the groups it's shared with)
+_cc_pair_user_group_cache: dict[str, tuple[str, dict[int, list[str]]]] = {}
+
 
 def _get_access_for_document(
     document_id: str,
@@ -38,42 +49,133 @@ def _get_access_for_document(
     return next(iter(id_to_access.values()))
 
 
+def _get_user_group_version(redis_client: Redis) -> str:
+    version = redis_client.get(_USER_GROUP_VERSION_KEY)
+    if version is None:
+        # never bumped or evicted, start a new version rather than assuming that
+        # nothing changed since the group names were cached
+        redis_client.set(_USER_GROUP_VERSION_KEY, uuid4().hex, nx=True)
+        version = redis_client.get(_USER_GROUP_VERSION_KEY)
+    return cast(bytes, version).decode()
+
+
+# NOTE: called via fetch_ee_implementation_or_noop before syncing a user group
+def bump_user_group_version(tenant_id: str | None = None) -> None:
+    """Invalidates the cached user group names of every cc pair of the tenant.
+    Must be called after committing any change to the user groups that cc pairs
+    are shared with."""
+    try:
+        get_redis_client(tenant_id=tenant_id).set(_USER_GROUP_VERSION_KEY, uuid4().hex)
+    except Exception:
+        logger.exception("Failed to bump the user group version")
+
+
+def _get_user_group_names_for_cc_pairs(
+    db_session: Session, cc_pair_ids: list[int]
+) -> dict[int, list[str]]:
+    """The user groups of the cc pairs change far less often than the documents of a
+    cc pair are synced, so they are cached in memory until the user group version is
+    bumped."""
+    tenant_id = get_current_tenant_id()
+    try:
+        version = _get_user_group_version(get_redis_client())
+    except Exception:
+        logger.exception("Failed to get the user group version, skipping the cache")
+        return fetch_user_group_names_for_cc_pairs(db_session, cc_pair_ids)
+
+    cached = _cc_pair_user_group_cache.get(tenant_id)
+    cc_pair_id_to_group_names = cached[1] if cached and cached[0] == version else {}
+
+    missing_cc_pair_ids = [
+        cc_pair_id
+        for cc_pair_id in cc_pair_ids
+        if cc_pair_id not in cc_pair_id_to_group_names
+    ]
+    if missing_cc_pair_ids:
+        # copy so that concurrent readers of the previous dict are not affected
+        cc_pair_id_to_group_names = {
+            **cc_pair_id_to_group_names,
+            **fetch_user_group_names_for_cc_pairs(db_session, missing_cc_pair_ids),
+        }
+        _cc_pair_user_group_cache[tenant_id] = (version, cc_pair_id_to_group_names)
+
+    return {
+        cc_pair_id: cc_pair_id_to_group_names[cc_pair_id] for cc_pair_id in cc_pair_ids
+    }
+
+
 def _get_access_for_documents(
     document_ids: list[str],
     db_session: Session,
 ) -> dict[str, DocumentAccess]:
-    non_ee_access_dict = get_access_for_documents_without_groups(
-        document_ids=document_ids,
+    """Assembles the access of each document from the access of its cc pairs, so the
+    number of queries doesn't depend on the number of documents."""
+    doc_id_to_cc_pair_access: dict[
+        str, list[tuple[int, AccessType, ConnectorCredentialPairStatus, str | None]]
+    ] = {}
+    doc_id_to_source: dict[str, DocumentSource] = {}
+    for (
+        document_id,
+        cc_pair_id,
+        access_type,
+        status,
+        user_email,
+        cc_pair_source,
+    ) in get_cc_pair_access_info_for_documents(
         db_session=db_session,
-    )
-    user_group_info: dict[str, list[str]] = {
-        document_id: group_names
-        for document_id, group_names in fetch_user_groups_for_documents(
-            db_session=db_session,
-            document_ids=document_ids,
+        document_ids=document_ids,
+    ):
+        doc_id_to_source.setdefault(document_id, cc_pair_source)
+        doc_id_to_cc_pair_access.setdefault(document_id, []).append(
+            (cc_pair_id, access_type, status, user_email)
         )
+
+    # don't include CC pairs that are being deleted and don't give user groups access
+    # to the documents of SYNC cc pairs
+    # NOTE: CC pairs can never go from DELETING to any other state -> it's safe to ignore them
+    cc_pair_ids_with_groups = {
+        cc_pair_id
+        for cc_pair_access in doc_id_to_cc_pair_access.values()
+        for cc_pair_id, access_type, status, _ in cc_pair_access
+        if status != ConnectorCredentialPairStatus.DELETING
+        and access_type != AccessType.SYNC
     }
-    documents = get_documents_by_ids(
-        db_session=db_session,
-        document_ids=document_ids,
+    cc_pair_id_to_group_names = (
+        _get_user_group_names_for_cc_pairs(db_session, sorted(cc_pair_ids_with_groups))
+        if cc_pair_ids_with_groups
+        else {}
     )
-    doc_id_map = {doc.id: doc for doc in documents}
 
-    # Get all sources in one batch
-    doc_id_to_source_map = get_document_sources(
+    documents = get_documents_by_ids(
         db_session=db_session,
-        document_ids=document_ids,
+        document_ids=list(doc_id_to_source),
     )
+    doc_id_map = {doc.id: doc for doc in documents}
 
-    all_public_ext_u_group_ids = set(fetch_public_external_group_ids(db_session))
+    all_public_ext_u_group_ids: set[str] = set()
+    if any(document.external_user_group_ids for document in documents):
+        all_public_ext_u_group_ids = set(fetch_public_external_group_ids(db_session))
 
     access_map = {}
-    for document_id, non_ee_access in non_ee_access_dict.items():
-        document = doc_id_map[document_id]
-        source = doc_id_to_source_map.get(document_id)
+    for document_id in document_ids:
+        source = doc_id_to_source.get(document_id)
         if source is None:
             logger.error(f"Document {document_id} has no source")
             continue
+        document = doc_id_map[document_id]
+
+        user_emails: set[str] = set()
+        user_groups: set[str] = set()
+        is_public = False
+        for cc_pair_id, access_type, status, user_email in doc_id_to_cc_pair_access[
+            document_id
+        ]:
+            if status == ConnectorCredentialPairStatus.DELETING:
+                continue
+            if user_email:
+                user_emails.add(user_email)
+            is_public = is_public or access_type == AccessType.PUBLIC
+            user_groups.update(cc_pair_id_to_group_names.get(cc_pair_id, []))
 
         perm_sync_config = get_source_perm_sync_config(source)
         is_only_censored = (
@@ -100,16 +202,16 @@ def _get_access_for_documents(
         # applied after the search
         is_public_anywhere = (
             document.is_public
-            or non_ee_access.is_public
+            or is_public
             or is_only_censored
             or any(u_group in all_public_ext_u_group_ids for u_group in ext_u_groups)
         )
 
         # To avoid collisions of group namings between connectors, they need to be prefixed
         access_map[document_id] = DocumentAccess.build(
-            user_emails=list(non_ee_access.user_emails),
-            user_groups=user_group_info.get(document_id, []),
-            is_public=is_public_anywhere,
+            user_emails=list(user_emails),
+            user_groups=list(user_groups),
+            is_public=bool(is_public_anywhere),
             external_user_emails=list(ext_u_emails),
             external_user_group_ids=list(ext_u_groups),
         )
@@ -33,6 +33,26 @@ DEFAULT_PERMISSION_DOC_SYNC_FREQUENCY = int(
 )
 
 
+#####
+# Post Query Censoring
+#####
+# Max seconds spent censoring the results of a search, the sources are censored in
+# parallel and the chunks of a source that takes longer than this are thrown out
+POST_QUERY_CENSORING_TIMEOUT = float(
+    os.environ.get("POST_QUERY_CENSORING_TIMEOUT") or 5
+)
+# Seconds that the allow / deny decision for a (user, chunk) is reused for, so that
+# repeated searches in a chat session don't hit the external source again. 0 disables
+POST_QUERY_CENSORING_DECISION_TTL = int(
+    os.environ.get("POST_QUERY_CENSORING_DECISION_TTL") or 60
+)
+# Seconds that the set of sources with censoring enabled is cached for. The cache is
+# also cleared whenever a cc pair is added or removed
+CENSORING_ENABLED_SOURCES_CACHE_TTL = int(
+    os.environ.get("CENSORING_ENABLED_SOURCES_CACHE_TTL") or 10 * 60
+)
+
+
 #####
 # Confluence
 #####
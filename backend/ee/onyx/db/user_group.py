@@ -14,7 +14,6 @@ from ee.onyx.server.user_group.models import SetCuratorRequest
 from ee.onyx.server.user_group.models import UserGroupCreate
 from ee.onyx.server.user_group.models import UserGroupUpdate
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
-from onyx.db.enums import AccessType
 from onyx.db.enums import ConnectorCredentialPairStatus
 from onyx.db.models import ConnectorCredentialPair
 from onyx.db.models import Credential__UserGroup
@@ -308,48 +307,34 @@ def fetch_documents_for_user_group_paginated(
     return documents, documents[-1].id if documents else None
 
 
-def fetch_user_groups_for_documents(
+def fetch_user_group_names_for_cc_pairs(
     db_session: Session,
-    document_ids: list[str],
-) -> Sequence[tuple[str, list[str]]]:
+    cc_pair_ids: list[int],
+) -> dict[int, list[str]]:
     """
-    Fetches all user groups that have access to the given documents.
+    Fetches the names of the user groups that each of the given cc pairs is
+    currently shared with. CC pairs that are not shared with any group are mapped
+    to an empty list.
 
-    NOTE: this doesn't include groups if the cc_pair is access type SYNC
+    NOTE: this doesn't look at the access type of the cc pairs, groups should not
+    be given access to the documents of SYNC cc pairs
     """
     stmt = (
-        select(Document.id, func.array_agg(UserGroup.name))
+        select(UserGroup__ConnectorCredentialPair.cc_pair_id, UserGroup.name)
         .join(
-            UserGroup__ConnectorCredentialPair,
+            UserGroup,
             UserGroup.id == UserGroup__ConnectorCredentialPair.user_group_id,
         )
-        .join(
-            ConnectorCredentialPair,
-            and_(
-                ConnectorCredentialPair.id
-                == UserGroup__ConnectorCredentialPair.cc_pair_id,
-                ConnectorCredentialPair.access_type != AccessType.SYNC,
-            ),
-        )
-        .join(
-            DocumentByConnectorCredentialPair,
-            and_(
-                DocumentByConnectorCredentialPair.connector_id
-                == ConnectorCredentialPair.connector_id,
-                DocumentByConnectorCredentialPair.credential_id
-                == ConnectorCredentialPair.credential_id,
-            ),
-        )
-        .join(Document, Document.id == DocumentByConnectorCredentialPair.id)
-        .where(Document.id.in_(document_ids))
+        .where(UserGroup__ConnectorCredentialPair.cc_pair_id.in_(cc_pair_ids))
         .where(UserGroup__ConnectorCredentialPair.is_current == True)  # noqa: E712
-        # don't include CC pairs that are being deleted
-        # NOTE: CC pairs can never go from DELETING to any other state -> it's safe to ignore them
-        .where(ConnectorCredentialPair.status != ConnectorCredentialPairStatus.DELETING)
-        .group_by(Document.id)
     )
 
-    return db_session.execute(stmt).all()  # type: ignore
+    cc_pair_id_to_group_names: dict[int, list[str]] = {
+        cc_pair_id: [] for cc_pair_id in cc_pair_ids
+    }
+    for cc_pair_id, group_name in db_session.execute(stmt):
+        cc_pair_id_to_group_names[cc_pair_id].append(group_name)
+    return cc_pair_id_to_group_names
 
 
 def _check_user_group_is_modifiable(user_group: UserGroup) -> None:
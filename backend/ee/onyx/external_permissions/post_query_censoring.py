@@ -1,14 +1,41 @@
+import json
+import time
+from typing import cast
+
+from redis import Redis
+
+from ee.onyx.configs.app_configs import CENSORING_ENABLED_SOURCES_CACHE_TTL
+from ee.onyx.configs.app_configs import POST_QUERY_CENSORING_DECISION_TTL
+from ee.onyx.configs.app_configs import POST_QUERY_CENSORING_TIMEOUT
 from ee.onyx.db.connector_credential_pair import get_all_auto_sync_cc_pairs
+from ee.onyx.external_permissions.sync_params import CensoringFuncType
 from ee.onyx.external_permissions.sync_params import get_all_censoring_enabled_sources
 from ee.onyx.external_permissions.sync_params import get_source_perm_sync_config
 from onyx.configs.constants import DocumentSource
 from onyx.context.search.pipeline import InferenceChunk
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.models import User
+from onyx.redis.redis_pool import get_redis_client
 from onyx.utils.logger import setup_logger
+from onyx.utils.threadpool_concurrency import run_in_background
+from onyx.utils.threadpool_concurrency import TimeoutThread
 
 logger = setup_logger()
 
+_CENSORING_ENABLED_SOURCES_KEY = "censoring_enabled_sources"
+_CENSORING_DECISION_KEY_PREFIX = "censoring_decision"
+
+
+def _fetch_censoring_enabled_sources() -> set[DocumentSource]:
+    all_censoring_enabled_sources = get_all_censoring_enabled_sources()
+    with get_session_with_current_tenant() as db_session:
+        enabled_sync_connectors = get_all_auto_sync_cc_pairs(db_session)
+        return {
+            cc_pair.connector.source
+            for cc_pair in enabled_sync_connectors
+            if cc_pair.connector.source in all_censoring_enabled_sources
+        }
+
 
 def _get_all_censoring_enabled_sources() -> set[DocumentSource]:
     """
@@ -20,15 +47,110 @@ def _get_all_censoring_enabled_sources() -> set[DocumentSource]:
     all chunks for that source will be censored, even if the connector that
     indexed that chunk is not sync. This was done to avoid getting the cc_pair
     for every single chunk.
+
+    The result is cached in redis since it is needed for every search, see
+    invalidate_censoring_enabled_sources_cache.
     """
-    all_censoring_enabled_sources = get_all_censoring_enabled_sources()
-    with get_session_with_current_tenant() as db_session:
-        enabled_sync_connectors = get_all_auto_sync_cc_pairs(db_session)
-        return {
-            cc_pair.connector.source
-            for cc_pair in enabled_sync_connectors
-            if cc_pair.connector.source in all_censoring_enabled_sources
-        }
+    redis_client = get_redis_client()
+    try:
+        cached_sources = redis_client.get(_CENSORING_ENABLED_SOURCES_KEY)
+        if cached_sources is not None:
+            return {
+                DocumentSource(source)
+                for source in json.loads(cast(bytes, cached_sources))
+            }
+    except Exception:
+        logger.exception("Failed to read the censoring enabled sources from redis")
+
+    censoring_enabled_sources = _fetch_censoring_enabled_sources()
+    try:
+        redis_client.set(
+            _CENSORING_ENABLED_SOURCES_KEY,
+            json.dumps(sorted(source.value for source in censoring_enabled_sources)),
+            ex=CENSORING_ENABLED_SOURCES_CACHE_TTL,
+        )
+    except Exception:
+        logger.exception("Failed to cache the censoring enabled sources in redis")
+    return censoring_enabled_sources
+
+
+# NOTE: called via fetch_ee_implementation_or_noop whenever a cc pair is added or removed
+def invalidate_censoring_enabled_sources_cache(tenant_id: str | None = None) -> None:
+    try:
+        get_redis_client(tenant_id=tenant_id).delete(_CENSORING_ENABLED_SOURCES_KEY)
+    except Exception:
+        logger.exception("Failed to invalidate the censoring enabled sources cache")
+
+
+def _censoring_decision_key(user: User, chunk: InferenceChunk) -> str:
+    # decisions are per chunk rather than per document since different chunks of a
+    # document may reference different objects in the source (e.g. Salesforce)
+    return (
+        f"{_CENSORING_DECISION_KEY_PREFIX}:{user.id}:"
+        f"{chunk.document_id}:{chunk.chunk_id}"
+    )
+
+
+def _get_cached_censoring_decisions(
+    redis_client: Redis, user: User, chunks: list[InferenceChunk]
+) -> dict[str, bool]:
+    """Returns unique_id -> whether the user may see the (uncensored) chunk, for the
+    chunks that have a cached decision."""
+    if POST_QUERY_CENSORING_DECISION_TTL <= 0 or not chunks:
+        return {}
+
+    try:
+        cached_decisions = cast(
+            list[bytes | None],
+            redis_client.mget(
+                [_censoring_decision_key(user, chunk) for chunk in chunks]
+            ),
+        )
+    except Exception:
+        logger.exception("Failed to read the censoring decisions from redis")
+        return {}
+
+    return {
+        chunk.unique_id: decision == b"1"
+        for chunk, decision in zip(chunks, cached_decisions)
+        if decision is not None
+    }
+
+
+def _cache_censoring_decisions(
+    redis_client: Redis,
+    user: User,
+    chunks: list[InferenceChunk],
+    censored_chunks: list[InferenceChunk],
+) -> None:
+    """Chunks that came back unchanged are allowed, chunks that didn't come back are
+    denied. Chunks that were partially censored aren't cached."""
+    if POST_QUERY_CENSORING_DECISION_TTL <= 0:
+        return
+
+    censored_chunks_by_id = {chunk.unique_id: chunk for chunk in censored_chunks}
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for chunk in chunks:
+            censored_chunk = censored_chunks_by_id.get(chunk.unique_id)
+            if censored_chunk is None:
+                decision = "0"
+            elif (
+                censored_chunk.content == chunk.content
+                and censored_chunk.source_links == chunk.source_links
+            ):
+                decision = "1"
+            else:
+                continue
+
+            pipe.set(
+                _censoring_decision_key(user, chunk),
+                decision,
+                ex=POST_QUERY_CENSORING_DECISION_TTL,
+            )
+        pipe.execute()
+    except Exception:
+        logger.exception("Failed to cache the censoring decisions in redis")
 
 
 # NOTE: This is only called if ee is enabled.
@@ -56,27 +178,71 @@ def _post_query_chunk_censoring(
         else:
             final_chunk_dict[chunk.unique_id] = chunk
 
+    if not chunks_to_process:
+        return chunks
+
+    redis_client = get_redis_client()
+    cached_decisions = _get_cached_censoring_decisions(
+        redis_client,
+        user,
+        [
+            chunk
+            for source_chunks in chunks_to_process.values()
+            for chunk in source_chunks
+        ],
+    )
+
     # For each source, filter out the chunks using the permission
-    # check function for that source
-    # TODO: Use a threadpool/multiprocessing to process the sources in parallel
+    # check function for that source. The sources are processed in parallel.
+    censoring_tasks: dict[
+        DocumentSource, tuple[list[InferenceChunk], TimeoutThread[list[InferenceChunk]]]
+    ] = {}
     for source, chunks_for_source in chunks_to_process.items():
+        uncached_chunks: list[InferenceChunk] = []
+        for chunk in chunks_for_source:
+            if chunk.unique_id not in cached_decisions:
+                uncached_chunks.append(chunk)
+            elif cached_decisions[chunk.unique_id]:
+                final_chunk_dict[chunk.unique_id] = chunk
+
+        if not uncached_chunks:
+            continue
+
         sync_config = get_source_perm_sync_config(source)
         if sync_config is None or sync_config.censoring_config is None:
             raise ValueError(f"No sync config found for {source}")
 
-        censor_chunks_for_source = sync_config.censoring_config.chunk_censoring_func
-        try:
-            censored_chunks = censor_chunks_for_source(chunks_for_source, user.email)
-        except Exception as e:
-            logger.exception(
+        censor_chunks_for_source: CensoringFuncType = (
+            sync_config.censoring_config.chunk_censoring_func
+        )
+        censoring_tasks[source] = (
+            uncached_chunks,
+            run_in_background(censor_chunks_for_source, uncached_chunks, user.email),
+        )
+
+    deadline = time.monotonic() + POST_QUERY_CENSORING_TIMEOUT
+    for source, (uncached_chunks, censoring_task) in censoring_tasks.items():
+        censoring_task.join(max(deadline - time.monotonic(), 0))
+        if censoring_task.is_alive():
+            logger.error(
+                f"Censoring chunks for source {source} took longer than "
+                f"{POST_QUERY_CENSORING_TIMEOUT}s so throwing out all chunks for this "
+                "source and continuing"
+            )
+            continue
+        if censoring_task.exception is not None:
+            logger.error(
                 f"Failed to censor chunks for source {source} so throwing out all"
-                f" chunks for this source and continuing: {e}"
+                f" chunks for this source and continuing: {censoring_task.exception}"
             )
             continue
 
+        censored_chunks = censoring_task.result
         for censored_chunk in censored_chunks:
             final_chunk_dict[censored_chunk.unique_id] = censored_chunk
 
+        _cache_censoring_decisions(redis_client, user, uncached_chunks, censored_chunks)
+
     # IMPORTANT: make sure to retain the same ordering as the original `chunks` passed in
     final_chunk_list: list[InferenceChunk] = []
     for chunk in chunks:
@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from ee.onyx.access.access import bump_user_group_version
 from ee.onyx.db.user_group import fetch_user_groups
 from ee.onyx.db.user_group import fetch_user_groups_for_user
 from ee.onyx.db.user_group import insert_user_group
@@ -56,6 +57,7 @@ def create_user_group(
             f"User group with name '{user_group.name}' already exists. Please "
             + "choose a different name.",
         )
+    bump_user_group_version()
     return UserGroup.from_model(db_user_group)
 
 
@@ -67,16 +69,16 @@ def patch_user_group(
     db_session: Session = Depends(get_session),
 ) -> UserGroup:
     try:
-        return UserGroup.from_model(
-            update_user_group(
-                db_session=db_session,
-                user=user,
-                user_group_id=user_group_id,
-                user_group_update=user_group_update,
-            )
+        db_user_group = update_user_group(
+            db_session=db_session,
+            user=user,
+            user_group_id=user_group_id,
+            user_group_update=user_group_update,
         )
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    bump_user_group_version()
+    return UserGroup.from_model(db_user_group)
 
 
 @router.post("/admin/user-group/{user_group_id}/set-curator")
@@ -108,3 +110,4 @@ def delete_user_group(
         prepare_user_group_for_deletion(db_session, user_group_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    bump_user_group_version()
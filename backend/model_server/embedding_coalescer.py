@@ -0,0 +1,122 @@
+import asyncio
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Hashable
+from dataclasses import dataclass
+from dataclasses import field
+
+from onyx.utils.logger import setup_logger
+from shared_configs.model_server_models import Embedding
+
+logger = setup_logger()
+
+
+EmbedFunction = Callable[[list[str]], Awaitable[list[Embedding]]]
+
+
+@dataclass
+class _PendingRequest:
+    texts: list[str]
+    future: "asyncio.Future[list[Embedding]]"
+
+
+@dataclass
+class _PendingGroup:
+    embed_func: EmbedFunction
+    max_batch_size: int
+    requests: list[_PendingRequest] = field(default_factory=list)
+    num_texts: int = 0
+    flush_handle: asyncio.TimerHandle | None = None
+
+
+class EmbeddingRequestCoalescer:
+    """Merges concurrent embedding requests with the same key (same provider, model,
+    text type, ...) into batches of up to `max_batch_size` texts, so that many small
+    requests result in a few provider calls. Each request waits at most `max_wait`
+    seconds for others to join it.
+
+    Requests are never split across batches, requests which are already at least
+    `max_batch_size` texts long are sent as is. A failed provider call only fails the
+    requests that were part of that batch."""
+
+    def __init__(self, max_wait: float) -> None:
+        self.max_wait = max_wait
+        self._groups: dict[Hashable, _PendingGroup] = {}
+        # keeps the batch tasks from being garbage collected while they run
+        self._tasks: set[asyncio.Task] = set()
+
+    async def embed(
+        self,
+        key: Hashable,
+        texts: list[str],
+        embed_func: EmbedFunction,
+        max_batch_size: int,
+    ) -> list[Embedding]:
+        if len(texts) >= max_batch_size:
+            return await embed_func(texts)
+
+        group = self._groups.get(key)
+        if group is not None and group.num_texts + len(texts) > max_batch_size:
+            # doesn't fit in the pending batch, send that one off and start a new one
+            self._flush(key)
+            group = None
+
+        if group is None:
+            group = _PendingGroup(embed_func=embed_func, max_batch_size=max_batch_size)
+            self._groups[key] = group
+            group.flush_handle = asyncio.get_running_loop().call_later(
+                self.max_wait, self._flush, key
+            )
+
+        request = _PendingRequest(
+            texts=texts, future=asyncio.get_running_loop().create_future()
+        )
+        group.requests.append(request)
+        group.num_texts += len(texts)
+
+        if group.num_texts >= max_batch_size:
+            self._flush(key)
+
+        return await request.future
+
+    def _flush(self, key: Hashable) -> None:
+        group = self._groups.pop(key, None)
+        if group is None:
+            return
+
+        if group.flush_handle is not None:
+            group.flush_handle.cancel()
+
+        task = asyncio.get_running_loop().create_task(self._run_batch(group))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _run_batch(group: _PendingGroup) -> None:
+        texts = [text for request in group.requests for text in request.texts]
+        if len(group.requests) > 1:
+            logger.debug(
+                f"Coalesced {len(group.requests)} embedding requests "
+                f"into a batch of {len(texts)} texts"
+            )
+
+        try:
+            embeddings = await group.embed_func(texts)
+            if len(embeddings) != len(texts):
+                raise ValueError(
+                    f"Expected {len(texts)} embeddings, got {len(embeddings)}"
+                )
+        except BaseException as e:
+            for request in group.requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        offset = 0
+        for request in group.requests:
+            num_texts = len(request.texts)
+            if not request.future.done():
+                request.future.set_result(embeddings[offset : offset + num_texts])
+            offset += num_texts
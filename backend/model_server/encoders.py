@@ -1,6 +1,10 @@
 import asyncio
+import hashlib
 import json
 import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from types import TracebackType
 from typing import cast
 from typing import Optional
@@ -29,11 +33,20 @@ from model_server.constants import DEFAULT_VERTEX_MODEL
 from model_server.constants import DEFAULT_VOYAGE_MODEL
 from model_server.constants import EmbeddingModelTextType
 from model_server.constants import EmbeddingProvider
+from model_server.embedding_coalescer import EmbeddingRequestCoalescer
+from model_server.inference_scheduler import LocalInferenceScheduler
+from model_server.inference_scheduler import parse_cpu_affinity
 from model_server.utils import pass_aws_key
 from model_server.utils import simple_log_function_time
 from onyx.utils.logger import setup_logger
 from shared_configs.configs import API_BASED_EMBEDDING_TIMEOUT
+from shared_configs.configs import CLOUD_EMBEDDING_CLIENT_IDLE_TIMEOUT
+from shared_configs.configs import CLOUD_EMBEDDING_COALESCE_WAIT_MS
 from shared_configs.configs import INDEXING_ONLY
+from shared_configs.configs import LOCAL_MODEL_BATCH_WAIT_MS
+from shared_configs.configs import LOCAL_MODEL_INFERENCE_CPU_AFFINITY
+from shared_configs.configs import LOCAL_MODEL_INFERENCE_THREADS
+from shared_configs.configs import LOCAL_MODEL_MAX_BATCH_SIZE
 from shared_configs.configs import OPENAI_EMBEDDING_TIMEOUT
 from shared_configs.configs import VERTEXAI_EMBEDDING_LOCAL_BATCH_SIZE
 from shared_configs.enums import EmbedTextType
@@ -53,6 +66,12 @@ router = APIRouter(prefix="/encoder")
 _GLOBAL_MODELS_DICT: dict[str, "SentenceTransformer"] = {}
 _RERANK_MODEL: Optional["CrossEncoder"] = None
 
+# Only used if LOCAL_MODEL_BATCH_WAIT_MS is set, one per local model
+_EMBEDDING_SCHEDULERS: dict[
+    tuple[str, int, bool], LocalInferenceScheduler[str, Embedding]
+] = {}
+_RERANK_SCHEDULERS: dict[str, LocalInferenceScheduler[tuple[str, str], float]] = {}
+
 # If we are not only indexing, dont want retry very long
 _RETRY_DELAY = 10 if INDEXING_ONLY else 0.1
 _RETRY_TRIES = 10 if INDEXING_ONLY else 2
@@ -61,6 +80,19 @@ _RETRY_TRIES = 10 if INDEXING_ONLY else 2
 _OPENAI_MAX_INPUT_LEN = 2048
 # Cohere allows up to 96 embeddings in a single embedding calling
 _COHERE_MAX_INPUT_LEN = 96
+# Voyage allows up to 128 texts in a single embedding call
+_VOYAGE_MAX_INPUT_LEN = 128
+
+# Upper bound on the number of texts that concurrent requests are merged into when
+# coalescing. The LiteLLM proxy may route to any provider so the smallest limit is used.
+_COALESCE_MAX_BATCH_SIZE: dict[EmbeddingProvider, int] = {
+    EmbeddingProvider.OPENAI: _OPENAI_MAX_INPUT_LEN,
+    EmbeddingProvider.AZURE: _OPENAI_MAX_INPUT_LEN,
+    EmbeddingProvider.COHERE: _COHERE_MAX_INPUT_LEN,
+    EmbeddingProvider.VOYAGE: _VOYAGE_MAX_INPUT_LEN,
+    EmbeddingProvider.GOOGLE: VERTEXAI_EMBEDDING_LOCAL_BATCH_SIZE,
+    EmbeddingProvider.LITELLM: _COHERE_MAX_INPUT_LEN,
+}
 
 # Authentication error string constants
 _AUTH_ERROR_401 = "401"
@@ -134,6 +166,10 @@ class CloudEmbedding:
         self.api_version = api_version
         self.timeout = timeout
         self.http_client = httpx.AsyncClient(timeout=timeout)
+        # provider SDK clients are created on first use and reused afterwards
+        self._openai_client: openai.AsyncOpenAI | None = None
+        self._cohere_client: CohereAsyncClient | None = None
+        self._voyage_client: voyageai.AsyncClient | None = None
         self._closed = False
         self.sanitized_api_key = api_key[:4] + "********" + api_key[-4:]
 
@@ -143,10 +179,12 @@ class CloudEmbedding:
         if not model:
             model = DEFAULT_OPENAI_MODEL
 
-        # Use the OpenAI specific timeout for this one
-        client = openai.AsyncOpenAI(
-            api_key=self.api_key, timeout=OPENAI_EMBEDDING_TIMEOUT
-        )
+        if self._openai_client is None:
+            # Use the OpenAI specific timeout for this one
+            self._openai_client = openai.AsyncOpenAI(
+                api_key=self.api_key, timeout=OPENAI_EMBEDDING_TIMEOUT
+            )
+        client = self._openai_client
 
         final_embeddings: list[Embedding] = []
 
@@ -167,7 +205,11 @@ class CloudEmbedding:
         if not model:
             model = DEFAULT_COHERE_MODEL
 
-        client = CohereAsyncClient(api_key=self.api_key)
+        if self._cohere_client is None:
+            self._cohere_client = CohereAsyncClient(
+                api_key=self.api_key, httpx_client=self.http_client
+            )
+        client = self._cohere_client
 
         final_embeddings: list[Embedding] = []
         for text_batch in batch_list(texts, _COHERE_MAX_INPUT_LEN):
@@ -188,9 +230,11 @@ class CloudEmbedding:
         if not model:
             model = DEFAULT_VOYAGE_MODEL
 
-        client = voyageai.AsyncClient(
-            api_key=self.api_key, timeout=API_BASED_EMBEDDING_TIMEOUT
-        )
+        if self._voyage_client is None:
+            self._voyage_client = voyageai.AsyncClient(
+                api_key=self.api_key, timeout=API_BASED_EMBEDDING_TIMEOUT
+            )
+        client = self._voyage_client
 
         response = await client.embed(
             texts=texts,
@@ -346,6 +390,8 @@ class CloudEmbedding:
         """Explicitly close the client."""
         if not self._closed:
             await self.http_client.aclose()
+            if self._openai_client is not None:
+                await self._openai_client.close()
             self._closed = True
 
     async def __aenter__(self) -> "CloudEmbedding":
@@ -367,6 +413,86 @@ class CloudEmbedding:
             )
 
 
+@dataclass
+class _CloudEmbeddingClientEntry:
+    client: CloudEmbedding
+    last_used: float
+    in_use: int = 0
+
+
+# Provider clients are reused across requests so that connections (and the TLS
+# handshakes) to the provider are pooled instead of being set up for every request
+_CLOUD_EMBEDDING_CLIENTS: dict[
+    tuple[str, str, str | None, str | None], _CloudEmbeddingClientEntry
+] = {}
+
+
+def _get_cloud_embedding_client_key(
+    api_key: str,
+    provider: EmbeddingProvider,
+    api_url: str | None,
+    api_version: str | None,
+) -> tuple[str, str, str | None, str | None]:
+    # don't keep the raw API key around in the cache keys
+    api_key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+    return (provider.value, api_key_hash, api_url, api_version)
+
+
+async def _evict_idle_cloud_embedding_clients() -> None:
+    now = time.monotonic()
+    idle_keys = [
+        key
+        for key, entry in _CLOUD_EMBEDDING_CLIENTS.items()
+        if entry.in_use == 0
+        and now - entry.last_used > CLOUD_EMBEDDING_CLIENT_IDLE_TIMEOUT
+    ]
+    for key in idle_keys:
+        entry = _CLOUD_EMBEDDING_CLIENTS.pop(key)
+        logger.debug(f"Closing idle embedding client for provider: {key[0]}")
+        await entry.client.aclose()
+
+
+@asynccontextmanager
+async def get_cloud_embedding(
+    api_key: str,
+    provider: EmbeddingProvider,
+    api_url: str | None = None,
+    api_version: str | None = None,
+) -> AsyncIterator[CloudEmbedding]:
+    """Yields the shared client for the given provider / API key / API URL, creating
+    it if needed. Clients are never closed while in use."""
+    await _evict_idle_cloud_embedding_clients()
+
+    key = _get_cloud_embedding_client_key(api_key, provider, api_url, api_version)
+    entry = _CLOUD_EMBEDDING_CLIENTS.get(key)
+    if entry is None:
+        entry = _CloudEmbeddingClientEntry(
+            client=CloudEmbedding.create(api_key, provider, api_url, api_version),
+            last_used=time.monotonic(),
+        )
+        _CLOUD_EMBEDDING_CLIENTS[key] = entry
+
+    entry.in_use += 1
+    try:
+        yield entry.client
+    finally:
+        entry.in_use -= 1
+        entry.last_used = time.monotonic()
+
+
+async def close_cloud_embedding_clients() -> None:
+    while _CLOUD_EMBEDDING_CLIENTS:
+        _, entry = _CLOUD_EMBEDDING_CLIENTS.popitem()
+        await entry.client.aclose()
+
+
+_CLOUD_EMBEDDING_COALESCER = (
+    EmbeddingRequestCoalescer(max_wait=CLOUD_EMBEDDING_COALESCE_WAIT_MS / 1000)
+    if CLOUD_EMBEDDING_COALESCE_WAIT_MS > 0
+    else None
+)
+
+
 def get_embedding_model(
     model_name: str,
     max_context_length: int,
@@ -404,6 +530,70 @@ def get_local_reranking_model(
     return _RERANK_MODEL
 
 
+def get_local_embedding_scheduler(
+    model_name: str,
+    max_context_length: int,
+    normalize_embeddings: bool,
+) -> LocalInferenceScheduler[str, Embedding]:
+    key = (model_name, max_context_length, normalize_embeddings)
+    if key not in _EMBEDDING_SCHEDULERS:
+        local_model = get_embedding_model(
+            model_name=model_name, max_context_length=max_context_length
+        )
+
+        def _encode(texts: list[str]) -> list[Embedding]:
+            embeddings_vectors = local_model.encode(
+                texts,
+                normalize_embeddings=normalize_embeddings,
+                batch_size=len(texts),
+            )
+            return [
+                embedding if isinstance(embedding, list) else embedding.tolist()
+                for embedding in embeddings_vectors
+            ]
+
+        _EMBEDDING_SCHEDULERS[key] = LocalInferenceScheduler(
+            name=model_name,
+            infer_func=_encode,
+            length_func=len,
+            max_batch_size=LOCAL_MODEL_MAX_BATCH_SIZE,
+            max_wait=LOCAL_MODEL_BATCH_WAIT_MS / 1000,
+            num_threads=LOCAL_MODEL_INFERENCE_THREADS,
+            cpu_affinity=parse_cpu_affinity(LOCAL_MODEL_INFERENCE_CPU_AFFINITY),
+        )
+    return _EMBEDDING_SCHEDULERS[key]
+
+
+def get_local_rerank_scheduler(
+    model_name: str,
+) -> LocalInferenceScheduler[tuple[str, str], float]:
+    if model_name not in _RERANK_SCHEDULERS:
+        cross_encoder = get_local_reranking_model(model_name)
+
+        def _predict(pairs: list[tuple[str, str]]) -> list[float]:
+            return cross_encoder.predict(pairs, batch_size=len(pairs)).tolist()  # type: ignore
+
+        _RERANK_SCHEDULERS[model_name] = LocalInferenceScheduler(
+            name=model_name,
+            infer_func=_predict,
+            length_func=lambda pair: len(pair[0]) + len(pair[1]),
+            max_batch_size=LOCAL_MODEL_MAX_BATCH_SIZE,
+            max_wait=LOCAL_MODEL_BATCH_WAIT_MS / 1000,
+            num_threads=LOCAL_MODEL_INFERENCE_THREADS,
+            cpu_affinity=parse_cpu_affinity(LOCAL_MODEL_INFERENCE_CPU_AFFINITY),
+        )
+    return _RERANK_SCHEDULERS[model_name]
+
+
+def shutdown_local_inference_schedulers() -> None:
+    for embedding_scheduler in _EMBEDDING_SCHEDULERS.values():
+        embedding_scheduler.shutdown()
+    _EMBEDDING_SCHEDULERS.clear()
+    for rerank_scheduler in _RERANK_SCHEDULERS.values():
+        rerank_scheduler.shutdown()
+    _RERANK_SCHEDULERS.clear()
+
+
 @simple_log_function_time()
 async def embed_text(
     texts: list[str],
@@ -450,19 +640,39 @@ async def embed_text(
                 "Cloud models take an explicit text type instead."
             )
 
-        async with CloudEmbedding(
+        async with get_cloud_embedding(
             api_key=api_key,
             provider=provider_type,
             api_url=api_url,
             api_version=api_version,
         ) as cloud_model:
-            embeddings = await cloud_model.embed(
-                texts=texts,
-                model_name=model_name,
-                deployment_name=deployment_name,
-                text_type=text_type,
-                reduced_dimension=reduced_dimension,
-            )
+
+            async def _embed(texts_to_embed: list[str]) -> list[Embedding]:
+                return await cloud_model.embed(
+                    texts=texts_to_embed,
+                    model_name=model_name,
+                    deployment_name=deployment_name,
+                    text_type=text_type,
+                    reduced_dimension=reduced_dimension,
+                )
+
+            if _CLOUD_EMBEDDING_COALESCER is None:
+                embeddings = await _embed(texts)
+            else:
+                embeddings = await _CLOUD_EMBEDDING_COALESCER.embed(
+                    key=(
+                        _get_cloud_embedding_client_key(
+                            api_key, provider_type, api_url, api_version
+                        ),
+                        model_name,
+                        deployment_name,
+                        text_type,
+                        reduced_dimension,
+                    ),
+                    texts=texts,
+                    embed_func=_embed,
+                    max_batch_size=_COALESCE_MAX_BATCH_SIZE[provider_type],
+                )
 
         if any(embedding is None for embedding in embeddings):
             error_message = "Embeddings contain None values\n"
@@ -486,20 +696,28 @@ async def embed_text(
 
         prefixed_texts = [f"{prefix}{text}" for text in texts] if prefix else texts
 
-        local_model = get_embedding_model(
-            model_name=model_name, max_context_length=max_context_length
-        )
-        # Run CPU-bound embedding in a thread pool
-        embeddings_vectors = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: local_model.encode(
-                prefixed_texts, normalize_embeddings=normalize_embeddings
-            ),
-        )
-        embeddings = [
-            embedding if isinstance(embedding, list) else embedding.tolist()
-            for embedding in embeddings_vectors
-        ]
+        if LOCAL_MODEL_BATCH_WAIT_MS > 0:
+            # batched together with the texts of concurrent requests
+            embeddings = await get_local_embedding_scheduler(
+                model_name=model_name,
+                max_context_length=max_context_length,
+                normalize_embeddings=normalize_embeddings,
+            ).submit(prefixed_texts)
+        else:
+            local_model = get_embedding_model(
+                model_name=model_name, max_context_length=max_context_length
+            )
+            # Run CPU-bound embedding in a thread pool
+            embeddings_vectors = await asyncio.get_event_loop().run_in_executor(
+                None,
+                lambda: local_model.encode(
+                    prefixed_texts, normalize_embeddings=normalize_embeddings
+                ),
+            )
+            embeddings = [
+                embedding if isinstance(embedding, list) else embedding.tolist()
+                for embedding in embeddings_vectors
+            ]
 
         elapsed = time.monotonic() - start
         logger.info(
@@ -525,6 +743,12 @@ async def embed_text(
 
 @simple_log_function_time()
 async def local_rerank(query: str, docs: list[str], model_name: str) -> list[float]:
+    if LOCAL_MODEL_BATCH_WAIT_MS > 0:
+        # batched together with the documents of concurrent requests
+        return await get_local_rerank_scheduler(model_name).submit(
+            [(query, doc) for doc in docs]
+        )
+
     cross_encoder = get_local_reranking_model(model_name)
     # Run CPU-bound reranking in a thread pool
     return await asyncio.get_event_loop().run_in_executor(
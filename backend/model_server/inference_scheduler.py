@@ -0,0 +1,229 @@
+import asyncio
+import os
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+from typing import Generic
+from typing import TypeVar
+
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def parse_cpu_affinity(cpu_affinity: str) -> set[int]:
+    """Parses a CPU list like "0-3,8" into {0, 1, 2, 3, 8}."""
+    cpus: set[int] = set()
+    for part in cpu_affinity.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-", 1)
+            cpus.update(range(int(start), int(end) + 1))
+        else:
+            cpus.add(int(part))
+    return cpus
+
+
+def _pin_thread_to_cpus(cpus: set[int]) -> None:
+    # on Linux, pid 0 means the calling thread
+    try:
+        os.sched_setaffinity(0, cpus)
+    except (AttributeError, OSError) as e:
+        logger.warning(f"Could not pin inference thread to CPUs {sorted(cpus)}: {e}")
+
+
+def _length_bucket(length: int) -> int:
+    # buckets double in size, texts in the same bucket are at most 2x apart in length
+    return length.bit_length()
+
+
+@dataclass
+class _QueuedItem(Generic[T, R]):
+    item: T
+    bucket: int
+    enqueued_at: float
+    future: "asyncio.Future[R]"
+
+
+class LocalInferenceScheduler(Generic[T, R]):
+    """Queues the inputs of concurrent requests to a local model and runs them in
+    batches, so that many small requests (e.g. query embeddings) share one forward
+    pass instead of each running a tiny batch.
+
+    Inputs are grouped in buckets by length (which approximates the token length) to
+    limit padding. A batch is formed from the bucket of the oldest queued input, topped
+    up with inputs from the closest buckets, once `max_batch_size` inputs are queued or
+    the oldest one has waited `max_wait` seconds. Batches run on a dedicated pool of
+    `num_threads` threads, optionally pinned to a set of CPUs."""
+
+    def __init__(
+        self,
+        name: str,
+        infer_func: Callable[[list[T]], list[R]],
+        length_func: Callable[[T], int],
+        max_batch_size: int,
+        max_wait: float,
+        num_threads: int = 1,
+        cpu_affinity: set[int] | None = None,
+    ) -> None:
+        self.name = name
+        self.infer_func = infer_func
+        self.length_func = length_func
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.num_threads = num_threads
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=num_threads,
+            thread_name_prefix=f"inference_{name}",
+            initializer=(
+                partial(_pin_thread_to_cpus, cpu_affinity) if cpu_affinity else None
+            ),
+        )
+        self._buckets: dict[int, deque[_QueuedItem[T, R]]] = {}
+        self._num_queued = 0
+        self._items_queued = asyncio.Event()
+        self._batch_full = asyncio.Event()
+        self._loop_task: asyncio.Task | None = None
+        self._batch_tasks: set[asyncio.Task] = set()
+
+    async def submit(self, items: list[T]) -> list[R]:
+        if not items:
+            return []
+
+        self._ensure_running()
+
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        futures: list[asyncio.Future[R]] = []
+        for item in items:
+            queued_item = _QueuedItem[T, R](
+                item=item,
+                bucket=_length_bucket(self.length_func(item)),
+                enqueued_at=now,
+                future=loop.create_future(),
+            )
+            self._buckets.setdefault(queued_item.bucket, deque()).append(queued_item)
+            futures.append(queued_item.future)
+
+        self._num_queued += len(items)
+        self._items_queued.set()
+        if self._num_queued >= self.max_batch_size:
+            self._batch_full.set()
+
+        return list(await asyncio.gather(*futures))
+
+    def _ensure_running(self) -> None:
+        # (re)starts the scheduling loop, including after it failed
+        if self._loop_task is not None and not self._loop_task.done():
+            return
+        self._loop_task = asyncio.get_running_loop().create_task(self._run())
+        self._loop_task.add_done_callback(self._on_loop_done)
+
+    def _on_loop_done(self, task: asyncio.Task) -> None:
+        # a newer loop already took over the queued inputs
+        if task is not self._loop_task or task.cancelled():
+            return
+        e = task.exception()
+        if e is None:
+            return
+
+        logger.error(f"Scheduling loop failed for {self.name}", exc_info=e)
+        # nothing is going to pick up the queued inputs, the next submit restarts
+        # the loop
+        for queue in self._buckets.values():
+            for item in queue:
+                if not item.future.done():
+                    item.future.set_exception(e)
+        self._buckets = {}
+        self._num_queued = 0
+        self._items_queued.clear()
+        self._batch_full.clear()
+
+    def _oldest_bucket(self) -> int:
+        return min(
+            (bucket for bucket, queue in self._buckets.items() if queue),
+            key=lambda bucket: self._buckets[bucket][0].enqueued_at,
+        )
+
+    def _take_batch(self) -> list[_QueuedItem[T, R]]:
+        oldest_bucket = self._oldest_bucket()
+        batch: list[_QueuedItem[T, R]] = []
+        for bucket in sorted(
+            self._buckets, key=lambda bucket: abs(bucket - oldest_bucket)
+        ):
+            queue = self._buckets[bucket]
+            while queue and len(batch) < self.max_batch_size:
+                batch.append(queue.popleft())
+            if len(batch) >= self.max_batch_size:
+                break
+
+        self._buckets = {
+            bucket: queue for bucket, queue in self._buckets.items() if queue
+        }
+        self._num_queued -= len(batch)
+        if self._num_queued < self.max_batch_size:
+            self._batch_full.clear()
+        if not self._num_queued:
+            self._items_queued.clear()
+        return batch
+
+    async def _run(self) -> None:
+        workers = asyncio.Semaphore(self.num_threads)
+        while True:
+            await self._items_queued.wait()
+
+            oldest_bucket = self._buckets[self._oldest_bucket()]
+            remaining_wait = self.max_wait - (
+                time.monotonic() - oldest_bucket[0].enqueued_at
+            )
+            if remaining_wait > 0:
+                try:
+                    await asyncio.wait_for(self._batch_full.wait(), remaining_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            # queued inputs keep accumulating while all threads are busy
+            await workers.acquire()
+            batch = self._take_batch()
+            task = asyncio.get_running_loop().create_task(
+                self._run_batch(batch, workers)
+            )
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _run_batch(
+        self, batch: list[_QueuedItem[T, R]], workers: asyncio.Semaphore
+    ) -> None:
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.infer_func, [item.item for item in batch]
+            )
+            if len(results) != len(batch):
+                raise ValueError(f"Expected {len(batch)} results, got {len(results)}")
+        except Exception as e:
+            logger.exception(f"Batch of {len(batch)} failed for {self.name}")
+            for item in batch:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+        finally:
+            workers.release()
+
+        for item, result in zip(batch, results):
+            if not item.future.done():
+                item.future.set_result(result)
+
+    def shutdown(self) -> None:
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            self._loop_task = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
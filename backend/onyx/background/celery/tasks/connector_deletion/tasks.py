@@ -326,12 +326,12 @@ def try_generate_document_cc_pair_cleanup_tasks(
         task_logger.info(
             f"RedisConnectorDeletion.generate_tasks starting. cc_pair={cc_pair_id}"
         )
-        tasks_generated = redis_connector.delete.generate_tasks(
-            app, db_session, lock_beat
-        )
-        if tasks_generated is None:
+        result = redis_connector.delete.generate_tasks(app, db_session, lock_beat)
+        if result is None:
             raise ValueError("RedisConnectorDeletion.generate_tasks returned None")
 
+        tasks_generated, docs_to_delete = result
+
         try:
             insert_sync_record(
                 db_session=db_session,
@@ -357,7 +357,8 @@ def try_generate_document_cc_pair_cleanup_tasks(
 
         task_logger.info(
             "RedisConnectorDeletion.generate_tasks finished. "
-            f"cc_pair={cc_pair_id} tasks_generated={tasks_generated}"
+            f"cc_pair={cc_pair_id} tasks_generated={tasks_generated} "
+            f"docs_to_delete={docs_to_delete}"
         )
 
         # set this only after all tasks have been added
@@ -513,6 +514,15 @@ def monitor_connector_deletion_taskset(
                 db_session.delete(connector)
             db_session.commit()
 
+            invalidate_censoring_enabled_sources_cache = (
+                fetch_versioned_implementation_with_fallback(
+                    "onyx.external_permissions.post_query_censoring",
+                    "invalidate_censoring_enabled_sources_cache",
+                    noop_fallback,
+                )
+            )
+            invalidate_censoring_enabled_sources_cache(tenant_id=tenant_id)
+
             update_sync_record_status(
                 db_session=db_session,
                 entity_id=cc_pair_id,
@@ -23,8 +23,7 @@ from onyx.background.celery.tasks.beat_schedule import CLOUD_BEAT_MULTIPLIER_DEF
 from onyx.background.celery.tasks.docprocessing.heartbeat import start_heartbeat
 from onyx.background.celery.tasks.docprocessing.heartbeat import stop_heartbeat
 from onyx.background.celery.tasks.docprocessing.utils import IndexingCallback
-from onyx.background.celery.tasks.docprocessing.utils import is_in_repeated_error_state
-from onyx.background.celery.tasks.docprocessing.utils import should_index
+from onyx.background.celery.tasks.docprocessing.utils import plan_indexing
 from onyx.background.celery.tasks.docprocessing.utils import (
     try_creating_docfetching_task,
 )
@@ -55,7 +54,7 @@ from onyx.db.connector_credential_pair import (
     fetch_indexable_connector_credential_pair_ids,
 )
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
-from onyx.db.connector_credential_pair import set_cc_pair_repeated_error_state
+from onyx.db.connector_credential_pair import set_cc_pairs_repeated_error_state
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.engine.time_utils import get_db_current_time
 from onyx.db.enums import ConnectorCredentialPairStatus
@@ -593,147 +592,99 @@ def check_for_indexing(self: Task, *, tenant_id: str) -> int | None:
             # kicking off some "invalid" indexing tasks which will just fail
             search_settings_list = get_active_search_settings_list(db_session)
 
-        current_search_settings = next(
-            search_settings_instance
-            for search_settings_instance in search_settings_list
-            if search_settings_instance.status.is_current()
-        )
-
-        # mark CC Pairs that are repeatedly failing as in repeated error state
+        # figure out what to do with a few set based queries instead of going
+        # through every cc pair one by one
+        lock_beat.reacquire()
         with get_session_with_current_tenant() as db_session:
-            for cc_pair_id in cc_pair_ids:
-                lock_beat.reacquire()
+            plan = plan_indexing(
+                cc_pair_ids=cc_pair_ids,
+                search_settings_list=search_settings_list,
+                db_session=db_session,
+            )
 
-                if is_in_repeated_error_state(
-                    cc_pair_id=cc_pair_id,
-                    search_settings_id=current_search_settings.id,
+            # mark CC Pairs that are repeatedly failing as in repeated error state
+            if plan.repeated_error_cc_pair_ids:
+                set_cc_pairs_repeated_error_state(
                     db_session=db_session,
-                ):
-                    set_cc_pair_repeated_error_state(
-                        db_session=db_session,
-                        cc_pair_id=cc_pair_id,
-                        in_repeated_error_state=True,
-                    )
+                    cc_pair_ids=plan.repeated_error_cc_pair_ids,
+                    in_repeated_error_state=True,
+                )
+
+        task_logger.info(
+            f"check_for_indexing - Planned: "
+            f"cc_pairs={len(cc_pair_ids)} "
+            f"to_index={len(plan.to_index)} "
+            f"new_repeated_errors={len(plan.repeated_error_cc_pair_ids)}"
+        )
 
         # kick off index attempts
-        for cc_pair_id in cc_pair_ids:
+        id_to_search_settings = {
+            search_settings_instance.id: search_settings_instance
+            for search_settings_instance in search_settings_list
+        }
+        for cc_pair_id, search_settings_id in plan.to_index:
             lock_beat.reacquire()
+            search_settings_instance = id_to_search_settings[search_settings_id]
 
             with get_session_with_current_tenant() as db_session:
-                for search_settings_instance in search_settings_list:
-                    # skip non-live search settings that don't have background reindex enabled
-                    # those should just auto-change to live shortly after creation without
-                    # requiring any indexing till that point
-                    if (
-                        not search_settings_instance.status.is_current()
-                        and not search_settings_instance.background_reindex_enabled
-                    ):
-                        task_logger.warning("SKIPPING DUE TO NON-LIVE SEARCH SETTINGS")
-
-                        continue
-
-                    # Check if there's already an active indexing attempt for this CC pair + search settings
-                    # This prevents race conditions where multiple indexing attempts could be created
-                    # We check for any non-terminal status (NOT_STARTED, IN_PROGRESS)
-                    existing_attempts = (
-                        db_session.execute(
-                            select(IndexAttempt).where(
-                                IndexAttempt.connector_credential_pair_id == cc_pair_id,
-                                IndexAttempt.search_settings_id
-                                == search_settings_instance.id,
-                                IndexAttempt.status.in_(
-                                    [
-                                        IndexingStatus.NOT_STARTED,
-                                        IndexingStatus.IN_PROGRESS,
-                                    ]
-                                ),
-                            )
-                        )
-                        .scalars()
-                        .all()
+                cc_pair = get_connector_credential_pair_from_id(
+                    db_session=db_session,
+                    cc_pair_id=cc_pair_id,
+                )
+                if not cc_pair:
+                    task_logger.warning(
+                        f"check_for_indexing - CC pair not found: cc_pair={cc_pair_id}"
                     )
+                    continue
 
-                    if existing_attempts:
-                        task_logger.debug(
-                            f"check_for_indexing - Skipping due to active indexing attempt: "
-                            f"cc_pair={cc_pair_id} search_settings={search_settings_instance.id} "
-                            f"active_attempts={[a.id for a in existing_attempts]}"
-                        )
-                        continue
-
-                    cc_pair = get_connector_credential_pair_from_id(
-                        db_session=db_session,
-                        cc_pair_id=cc_pair_id,
-                    )
-                    if not cc_pair:
-                        task_logger.warning(
-                            f"check_for_indexing - CC pair not found: cc_pair={cc_pair_id}"
-                        )
-                        continue
-
-                    if not should_index(
-                        cc_pair=cc_pair,
-                        search_settings_instance=search_settings_instance,
-                        secondary_index_building=len(search_settings_list) > 1,
-                        db_session=db_session,
-                    ):
-                        task_logger.debug(
-                            f"check_for_indexing - Not indexing cc_pair_id: {cc_pair_id} "
-                            f"search_settings={search_settings_instance.id}, "
-                            f"secondary_index_building={len(search_settings_list) > 1}"
-                        )
-                        continue
+                task_logger.debug(
+                    f"check_for_indexing - Will index cc_pair_id: {cc_pair_id} "
+                    f"search_settings={search_settings_instance.id}, "
+                    f"secondary_index_building={len(search_settings_list) > 1}"
+                )
 
-                    task_logger.debug(
-                        f"check_for_indexing - Will index cc_pair_id: {cc_pair_id} "
-                        f"search_settings={search_settings_instance.id}, "
-                        f"secondary_index_building={len(search_settings_list) > 1}"
-                    )
+                reindex = False
+                if search_settings_instance.status.is_current():
+                    # the indexing trigger is only checked and cleared with the current search settings
+                    if cc_pair.indexing_trigger is not None:
+                        if cc_pair.indexing_trigger == IndexingMode.REINDEX:
+                            reindex = True
 
-                    reindex = False
-                    if search_settings_instance.status.is_current():
-                        # the indexing trigger is only checked and cleared with the current search settings
-                        if cc_pair.indexing_trigger is not None:
-                            if cc_pair.indexing_trigger == IndexingMode.REINDEX:
-                                reindex = True
-
-                            task_logger.info(
-                                f"Connector indexing manual trigger detected: "
-                                f"cc_pair={cc_pair.id} "
-                                f"search_settings={search_settings_instance.id} "
-                                f"indexing_mode={cc_pair.indexing_trigger}"
-                            )
-
-                            mark_ccpair_with_indexing_trigger(
-                                cc_pair.id, None, db_session
-                            )
-
-                    # using a task queue and only allowing one task per cc_pair/search_setting
-                    # prevents us from starving out certain attempts
-                    attempt_id = try_creating_docfetching_task(
-                        self.app,
-                        cc_pair,
-                        search_settings_instance,
-                        reindex,
-                        db_session,
-                        redis_client,
-                        tenant_id,
-                    )
-                    if attempt_id:
                         task_logger.info(
-                            f"Connector indexing queued: "
-                            f"index_attempt={attempt_id} "
+                            f"Connector indexing manual trigger detected: "
                             f"cc_pair={cc_pair.id} "
-                            f"search_settings={search_settings_instance.id}"
-                        )
-                        tasks_created += 1
-                    else:
-                        task_logger.info(
-                            f"Failed to create indexing task: "
-                            f"cc_pair={cc_pair.id} "
-                            f"search_settings={search_settings_instance.id}"
+                            f"search_settings={search_settings_instance.id} "
+                            f"indexing_mode={cc_pair.indexing_trigger}"
                         )
 
+                        mark_ccpair_with_indexing_trigger(cc_pair.id, None, db_session)
+
+                # using a task queue and only allowing one task per cc_pair/search_setting
+                # prevents us from starving out certain attempts
+                attempt_id = try_creating_docfetching_task(
+                    self.app,
+                    cc_pair,
+                    search_settings_instance,
+                    reindex,
+                    db_session,
+                    redis_client,
+                    tenant_id,
+                )
+                if attempt_id:
+                    task_logger.info(
+                        f"Connector indexing queued: "
+                        f"index_attempt={attempt_id} "
+                        f"cc_pair={cc_pair.id} "
+                        f"search_settings={search_settings_instance.id}"
+                    )
+                    tasks_created += 1
+                else:
+                    task_logger.info(
+                        f"Failed to create indexing task: "
+                        f"cc_pair={cc_pair.id} "
+                        f"search_settings={search_settings_instance.id}"
+                    )
+
         lock_beat.reacquire()
 
         # 2/3: VALIDATE
@@ -1178,6 +1129,7 @@ def _docprocessing_task(
                 information_content_classification_model=information_content_classification_model,
                 document_index=document_index,
                 ignore_time_skip=True,  # Documents are already filtered during extraction
+                ignore_content_fingerprint=index_attempt.from_beginning,
                 db_session=db_session,
                 tenant_id=tenant_id,
                 document_batch=documents,
@@ -1,4 +1,5 @@
 import time
+from collections.abc import Sequence
 from datetime import datetime
 from datetime import timezone
 from uuid import uuid4
@@ -10,6 +11,7 @@ from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
 from onyx.background.celery.apps.app_base import task_logger
+from onyx.background.celery.tasks.models import IndexingPlan
 from onyx.configs.app_configs import DISABLE_INDEX_UPDATE_ON_SWAP
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import DANSWER_REDIS_FUNCTION_LOCK_PREFIX
@@ -17,13 +19,13 @@ from onyx.configs.constants import DocumentSource
 from onyx.configs.constants import OnyxCeleryPriority
 from onyx.configs.constants import OnyxCeleryQueues
 from onyx.configs.constants import OnyxCeleryTask
-from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
+from onyx.db.connector_credential_pair import get_connector_credential_pairs
 from onyx.db.engine.time_utils import get_db_current_time
 from onyx.db.enums import ConnectorCredentialPairStatus
 from onyx.db.enums import IndexingStatus
 from onyx.db.enums import IndexModelStatus
-from onyx.db.index_attempt import get_last_attempt_for_cc_pair
-from onyx.db.index_attempt import get_recent_attempts_for_cc_pair
+from onyx.db.index_attempt import get_cc_pair_ids_with_active_attempts
+from onyx.db.index_attempt import get_recent_attempt_statuses_for_cc_pairs
 from onyx.db.index_attempt import mark_attempt_failed
 from onyx.db.indexing_coordination import IndexingCoordination
 from onyx.db.models import ConnectorCredentialPair
@@ -130,18 +132,14 @@ class IndexingCallback(IndexingCallbackBase):
 
 
 def is_in_repeated_error_state(
-    cc_pair_id: int, search_settings_id: int, db_session: Session
+    cc_pair: ConnectorCredentialPair,
+    recent_attempts: Sequence[tuple[IndexingStatus, datetime]],
 ) -> bool:
-    """Checks if the cc pair / search setting combination is in a repeated error state."""
-    cc_pair = get_connector_credential_pair_from_id(
-        db_session=db_session,
-        cc_pair_id=cc_pair_id,
-    )
-    if not cc_pair:
-        raise RuntimeError(
-            f"is_in_repeated_error_state - could not find cc_pair with id={cc_pair_id}"
-        )
+    """Checks if the cc pair / search setting combination is in a repeated error state.
 
+    recent_attempts are the (status, time_updated) of the most recent index attempts
+    of the combination, most recent first (see get_recent_attempt_statuses_for_cc_pairs).
+    """
     # if the connector doesn't have a refresh_freq, a single failed attempt is enough
     number_of_failed_attempts_in_a_row_needed = (
         NUM_REPEAT_ERRORS_BEFORE_REPEATED_ERROR_STATE
@@ -149,17 +147,13 @@ def is_in_repeated_error_state(
         else 1
     )
 
-    most_recent_index_attempts = get_recent_attempts_for_cc_pair(
-        cc_pair_id=cc_pair_id,
-        search_settings_id=search_settings_id,
-        limit=number_of_failed_attempts_in_a_row_needed,
-        db_session=db_session,
-    )
+    most_recent_index_attempts = recent_attempts[
+        :number_of_failed_attempts_in_a_row_needed
+    ]
     return len(
         most_recent_index_attempts
     ) >= number_of_failed_attempts_in_a_row_needed and all(
-        attempt.status == IndexingStatus.FAILED
-        for attempt in most_recent_index_attempts
+        status == IndexingStatus.FAILED for status, _ in most_recent_index_attempts
     )
 
 
@@ -167,7 +161,8 @@ def should_index(
     cc_pair: ConnectorCredentialPair,
     search_settings_instance: SearchSettings,
     secondary_index_building: bool,
-    db_session: Session,
+    recent_attempts: Sequence[tuple[IndexingStatus, datetime]],
+    current_db_time: datetime,
 ) -> bool:
     """Checks various global settings and past indexing attempts to determine if
     we should try to start indexing the cc pair / search setting combination.
@@ -175,22 +170,17 @@ def should_index(
     Note that tactical checks such as preventing overlap with a currently running task
     are not handled here.
 
+    recent_attempts are the (status, time_updated) of the most recent index attempts
+    of the combination, most recent first.
+
     Return True if we should try to index, False if not.
     """
     connector = cc_pair.connector
-    last_index_attempt = get_last_attempt_for_cc_pair(
-        cc_pair_id=cc_pair.id,
-        search_settings_id=search_settings_instance.id,
-        db_session=db_session,
-    )
-    all_recent_errored = is_in_repeated_error_state(
-        cc_pair_id=cc_pair.id,
-        search_settings_id=search_settings_instance.id,
-        db_session=db_session,
-    )
+    last_index_attempt = recent_attempts[0] if recent_attempts else None
+    all_recent_errored = is_in_repeated_error_state(cc_pair, recent_attempts)
 
     # uncomment for debugging
-    task_logger.info(
+    task_logger.debug(
         f"_should_index: "
         f"cc_pair={cc_pair.id} "
         f"connector={cc_pair.connector_id} "
@@ -217,23 +207,25 @@ def should_index(
     # When switching over models, always index at least once
     if search_settings_instance.status == IndexModelStatus.FUTURE:
         if last_index_attempt:
+            last_index_attempt_status = last_index_attempt[0]
+
             # No new index if the last index attempt succeeded
             # Once is enough. The model will never be able to swap otherwise.
-            if last_index_attempt.status == IndexingStatus.SUCCESS:
+            if last_index_attempt_status == IndexingStatus.SUCCESS:
                 # print(
                 #     f"Not indexing cc_pair={cc_pair.id}: FUTURE model with successful last index attempt={last_index.id}"
                 # )
                 return False
 
             # No new index if the last index attempt is waiting to start
-            if last_index_attempt.status == IndexingStatus.NOT_STARTED:
+            if last_index_attempt_status == IndexingStatus.NOT_STARTED:
                 # print(
                 #     f"Not indexing cc_pair={cc_pair.id}: FUTURE model with NOT_STARTED last index attempt={last_index.id}"
                 # )
                 return False
 
             # No new index if the last index attempt is running
-            if last_index_attempt.status == IndexingStatus.IN_PROGRESS:
+            if last_index_attempt_status == IndexingStatus.IN_PROGRESS:
                 # print(
                 #     f"Not indexing cc_pair={cc_pair.id}: FUTURE model with IN_PROGRESS last index attempt={last_index.id}"
                 # )
@@ -283,8 +275,7 @@ def should_index(
     ):
         return True
 
-    current_db_time = get_db_current_time(db_session)
-    time_since_index = current_db_time - last_index_attempt.time_updated
+    time_since_index = current_db_time - last_index_attempt[1]
     if time_since_index.total_seconds() < connector.refresh_freq:
         # print(
         #     f"Not indexing cc_pair={cc_pair.id}: Last index attempt={last_index_attempt.id} "
@@ -295,6 +286,92 @@ def should_index(
     return True
 
 
+def plan_indexing(
+    cc_pair_ids: list[int],
+    search_settings_list: list[SearchSettings],
+    db_session: Session,
+) -> IndexingPlan:
+    """Decides which cc pair / search settings combinations are due for indexing and
+    which cc pairs are in a repeated error state.
+
+    The cc pairs and their recent attempts are fetched with a few set based queries
+    per search settings, rather than a handful of queries per cc pair.
+    """
+    plan = IndexingPlan()
+    cc_pairs = (
+        get_connector_credential_pairs(
+            db_session,
+            ids=cc_pair_ids,
+            include_user_files=True,
+            eager_load_connector=True,
+        )
+        if cc_pair_ids
+        else []
+    )
+    if len(cc_pairs) != len(cc_pair_ids):
+        missing_cc_pair_ids = set(cc_pair_ids) - {cc_pair.id for cc_pair in cc_pairs}
+        task_logger.warning(
+            f"plan_indexing - CC pairs not found: cc_pairs={missing_cc_pair_ids}"
+        )
+
+    current_db_time = get_db_current_time(db_session)
+    secondary_index_building = len(search_settings_list) > 1
+    for search_settings_instance in search_settings_list:
+        # skip non-live search settings that don't have background reindex enabled
+        # those should just auto-change to live shortly after creation without
+        # requiring any indexing till that point
+        if (
+            not search_settings_instance.status.is_current()
+            and not search_settings_instance.background_reindex_enabled
+        ):
+            task_logger.warning("SKIPPING DUE TO NON-LIVE SEARCH SETTINGS")
+            continue
+
+        cc_pair_id_to_recent_attempts = get_recent_attempt_statuses_for_cc_pairs(
+            cc_pair_ids=cc_pair_ids,
+            search_settings_id=search_settings_instance.id,
+            limit=NUM_REPEAT_ERRORS_BEFORE_REPEATED_ERROR_STATE,
+            db_session=db_session,
+        )
+        # there should only be one active attempt per cc pair / search settings
+        # at a time, the attempts are also checked again when creating them
+        cc_pair_ids_with_active_attempts = get_cc_pair_ids_with_active_attempts(
+            cc_pair_ids=cc_pair_ids,
+            search_settings_id=search_settings_instance.id,
+            db_session=db_session,
+        )
+
+        for cc_pair in cc_pairs:
+            recent_attempts = cc_pair_id_to_recent_attempts.get(cc_pair.id, [])
+
+            if (
+                search_settings_instance.status.is_current()
+                and not cc_pair.in_repeated_error_state
+                and is_in_repeated_error_state(cc_pair, recent_attempts)
+            ):
+                plan.repeated_error_cc_pair_ids.append(cc_pair.id)
+
+            if cc_pair.id in cc_pair_ids_with_active_attempts:
+                task_logger.debug(
+                    f"plan_indexing - Skipping due to active indexing attempt: "
+                    f"cc_pair={cc_pair.id} search_settings={search_settings_instance.id}"
+                )
+                continue
+
+            if not should_index(
+                cc_pair=cc_pair,
+                search_settings_instance=search_settings_instance,
+                secondary_index_building=secondary_index_building,
+                recent_attempts=recent_attempts,
+                current_db_time=current_db_time,
+            ):
+                continue
+
+            plan.to_index.append((cc_pair.id, search_settings_instance.id))
+
+    return plan
+
+
 def try_creating_docfetching_task(
     celery_app: Celery,
     cc_pair: ConnectorCredentialPair,
@@ -10,6 +10,15 @@ class DocProcessingContext(BaseModel):
     index_attempt_id: int
 
 
+class IndexingPlan(BaseModel):
+    """What a check_for_indexing pass should do, see plan_indexing."""
+
+    # cc pairs that entered the repeated error state with the current search settings
+    repeated_error_cc_pair_ids: list[int] = []
+    # (cc pair id, search settings id) combinations to create docfetching tasks for
+    to_index: list[tuple[int, int]] = []
+
+
 class IndexingWatchdogTerminalStatus(str, Enum):
     """The different statuses the watchdog can finish with.
 
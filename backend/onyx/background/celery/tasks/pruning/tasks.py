@@ -20,11 +20,15 @@ from onyx.background.celery.celery_redis import celery_find_task
 from onyx.background.celery.celery_redis import celery_get_queue_length
 from onyx.background.celery.celery_redis import celery_get_queued_task_ids
 from onyx.background.celery.celery_redis import celery_get_unacked_task_ids
-from onyx.background.celery.celery_utils import extract_ids_from_runnable_connector
+from onyx.background.celery.celery_utils import iterate_ids_from_runnable_connector
 from onyx.background.celery.tasks.beat_schedule import CLOUD_BEAT_MULTIPLIER_DEFAULT
 from onyx.background.celery.tasks.docprocessing.utils import IndexingCallbackBase
+from onyx.background.celery.tasks.pruning.utils import iter_ids_to_prune
+from onyx.background.celery.tasks.pruning.utils import SortedIdSpill
 from onyx.configs.app_configs import ALLOW_SIMULTANEOUS_PRUNING
 from onyx.configs.app_configs import JOB_TIMEOUT
+from onyx.configs.app_configs import PRUNING_DB_YIELD_PER
+from onyx.configs.app_configs import PRUNING_SPILL_RUN_SIZE
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import CELERY_PRUNING_LOCK_TIMEOUT
 from onyx.configs.constants import CELERY_TASK_WAIT_FOR_FENCE_TIMEOUT
@@ -41,7 +45,9 @@ from onyx.db.connector import mark_ccpair_as_pruned
 from onyx.db.connector_credential_pair import get_connector_credential_pair
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
 from onyx.db.connector_credential_pair import get_connector_credential_pairs
-from onyx.db.document import get_documents_for_connector_credential_pair
+from onyx.db.document import (
+    construct_sorted_document_id_select_for_connector_credential_pair,
+)
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.enums import ConnectorCredentialPairStatus
 from onyx.db.enums import SyncStatus
@@ -526,43 +532,48 @@ def connector_pruning_generator_task(
                 r,
             )
 
-            # a list of docs in the source
-            all_connector_doc_ids: set[str] = extract_ids_from_runnable_connector(
-                runnable_connector, callback
-            )
-
-            # a list of docs in our local index
-            all_indexed_document_ids = {
-                doc.id
-                for doc in get_documents_for_connector_credential_pair(
-                    db_session=db_session,
-                    connector_id=connector_id,
-                    credential_id=credential_id,
+            # To keep memory flat regardless of the size of the connector, the docs in
+            # the source are spilled to disk as sorted runs and compared to the docs in
+            # our local index (streamed from postgres in the same order) with a merge
+            with SortedIdSpill(run_size=PRUNING_SPILL_RUN_SIZE) as connector_doc_ids:
+                for doc_id_batch in iterate_ids_from_runnable_connector(
+                    runnable_connector, callback
+                ):
+                    connector_doc_ids.add(doc_id_batch)
+
+                task_logger.info(
+                    "Pruning source IDs collected: "
+                    f"cc_pair={cc_pair_id} "
+                    f"connector_source={cc_pair.connector.source} "
+                    f"spilled_runs={connector_doc_ids.num_runs}"
                 )
-            }
 
-            # generate list of docs to remove (no longer in the source)
-            doc_ids_to_remove = list(all_indexed_document_ids - all_connector_doc_ids)
+                indexed_doc_ids = db_session.scalars(
+                    construct_sorted_document_id_select_for_connector_credential_pair(
+                        connector_id=connector_id, credential_id=credential_id
+                    )
+                ).yield_per(PRUNING_DB_YIELD_PER)
 
-            task_logger.info(
-                "Pruning set collected: "
-                f"cc_pair={cc_pair_id} "
-                f"connector_source={cc_pair.connector.source} "
-                f"docs_to_remove={len(doc_ids_to_remove)}"
-            )
+                # docs to remove (no longer in the source)
+                doc_ids_to_remove = iter_ids_to_prune(
+                    indexed_doc_ids, connector_doc_ids.iter_sorted()
+                )
 
-            task_logger.info(
-                f"RedisConnector.prune.generate_tasks starting. cc_pair={cc_pair_id}"
-            )
-            tasks_generated = redis_connector.prune.generate_tasks(
-                set(doc_ids_to_remove), self.app, db_session, None
-            )
-            if tasks_generated is None:
-                return None
+                task_logger.info(
+                    f"RedisConnector.prune.generate_tasks starting. cc_pair={cc_pair_id}"
+                )
+                result = redis_connector.prune.generate_tasks(
+                    doc_ids_to_remove, self.app, db_session, lock
+                )
+                if result is None:
+                    return None
+
+                tasks_generated, docs_to_prune = result
 
             task_logger.info(
                 "RedisConnector.prune.generate_tasks finished. "
-                f"cc_pair={cc_pair_id} tasks_generated={tasks_generated}"
+                f"cc_pair={cc_pair_id} tasks_generated={tasks_generated} "
+                f"docs_to_prune={docs_to_prune}"
             )
 
             redis_connector.prune.generator_complete = tasks_generated
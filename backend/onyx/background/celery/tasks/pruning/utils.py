@@ -0,0 +1,92 @@
+import heapq
+import json
+import tempfile
+from collections.abc import Iterable
+from collections.abc import Iterator
+from types import TracebackType
+from typing import IO
+
+
+class SortedIdSpill:
+    """Collects document IDs and iterates over them sorted and deduplicated, holding at
+    most `run_size` of them in memory. Once that many are buffered, they are sorted and
+    written to a temporary file (a "run"); iterating merges the runs.
+
+    IDs are stored JSON encoded, one per line, so IDs containing newlines are fine."""
+
+    def __init__(self, run_size: int) -> None:
+        self.run_size = run_size
+        self._buffer: set[str] = set()
+        self._runs: list[IO[str]] = []
+
+    def add(self, ids: Iterable[str]) -> None:
+        self._buffer.update(ids)
+        if len(self._buffer) >= self.run_size:
+            self._spill()
+
+    @property
+    def num_runs(self) -> int:
+        return len(self._runs)
+
+    def _spill(self) -> None:
+        run = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+        for doc_id in sorted(self._buffer):
+            run.write(json.dumps(doc_id))
+            run.write("\n")
+        run.seek(0)
+        self._runs.append(run)
+        self._buffer = set()
+
+    @staticmethod
+    def _read_run(run: IO[str]) -> Iterator[str]:
+        for line in run:
+            yield json.loads(line)
+
+    def iter_sorted(self) -> Iterator[str]:
+        """Can only be iterated once."""
+        if not self._runs:
+            yield from sorted(self._buffer)
+            return
+
+        if self._buffer:
+            self._spill()
+
+        previous_id: str | None = None
+        for doc_id in heapq.merge(*(self._read_run(run) for run in self._runs)):
+            # the same id may be in multiple runs
+            if doc_id != previous_id:
+                yield doc_id
+                previous_id = doc_id
+
+    def close(self) -> None:
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = set()
+
+    def __enter__(self) -> "SortedIdSpill":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_val: BaseException | None,
+        exc_tb: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+def iter_ids_to_prune(
+    sorted_indexed_ids: Iterable[str],
+    sorted_source_ids: Iterable[str],
+) -> Iterator[str]:
+    """Merges two sorted streams of IDs and yields the indexed IDs that are no longer
+    in the source. Both streams must be sorted by python string ordering."""
+    source_ids = iter(sorted_source_ids)
+    source_id = next(source_ids, None)
+    for indexed_id in sorted_indexed_ids:
+        while source_id is not None and source_id < indexed_id:
+            source_id = next(source_ids, None)
+
+        if source_id != indexed_id:
+            yield indexed_id
@@ -10,18 +10,26 @@ from redis import Redis
 from tenacity import RetryError
 
 from onyx.access.access import get_access_for_document
+from onyx.access.access import get_access_for_documents
 from onyx.background.celery.apps.app_base import task_logger
 from onyx.background.celery.tasks.shared.RetryDocumentIndex import RetryDocumentIndex
+from onyx.configs.app_configs import DOCUMENT_CLEANUP_VESPA_CONCURRENCY
 from onyx.configs.constants import ONYX_CELERY_BEAT_HEARTBEAT_KEY
 from onyx.configs.constants import OnyxCeleryTask
 from onyx.db.document import delete_document_by_connector_credential_pair__no_commit
+from onyx.db.document import delete_documents_by_connector_credential_pair__no_commit
 from onyx.db.document import delete_documents_complete__no_commit
 from onyx.db.document import fetch_chunk_count_for_document
 from onyx.db.document import get_document
 from onyx.db.document import get_document_connector_count
+from onyx.db.document import get_document_connector_counts
+from onyx.db.document import get_documents_by_ids
 from onyx.db.document import mark_document_as_modified
 from onyx.db.document import mark_document_as_synced
+from onyx.db.document import mark_documents_as_modified
+from onyx.db.document import mark_documents_as_synced
 from onyx.db.document_set import fetch_document_sets_for_document
+from onyx.db.document_set import fetch_document_sets_for_documents
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.relationships import delete_document_references_from_kg
 from onyx.db.search_settings import get_active_search_settings
@@ -30,6 +38,7 @@ from onyx.document_index.interfaces import VespaDocumentFields
 from onyx.httpx.httpx_pool import HttpxPool
 from onyx.redis.redis_pool import get_redis_client
 from onyx.server.documents.models import ConnectorCredentialPairIdentifier
+from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 
 DOCUMENT_BY_CC_PAIR_CLEANUP_MAX_RETRIES = 3
 
@@ -38,6 +47,11 @@ DOCUMENT_BY_CC_PAIR_CLEANUP_MAX_RETRIES = 3
 LIGHT_SOFT_TIME_LIMIT = 105
 LIGHT_TIME_LIMIT = LIGHT_SOFT_TIME_LIMIT + 15
 
+DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_SOFT_TIME_LIMIT = 300
+DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_TIME_LIMIT = (
+    DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_SOFT_TIME_LIMIT + 15
+)
+
 
 class OnyxCeleryTaskCompletionStatus(str, Enum):
     """The different statuses the watchdog can finish with.
@@ -268,6 +282,280 @@ def document_by_cc_pair_cleanup_task(
     return True
 
 
+def _cleanup_document_in_index(
+    retry_index: RetryDocumentIndex,
+    document_id: str,
+    tenant_id: str,
+    chunk_count: int | None,
+    fields: VespaDocumentFields | None,
+) -> int | Exception:
+    """Deletes the document from the index if fields is None, otherwise updates it.
+    Returns the number of chunks affected, or the exception the document failed with."""
+    try:
+        if fields is None:
+            return retry_index.delete_single(
+                document_id, tenant_id=tenant_id, chunk_count=chunk_count
+            )
+
+        return retry_index.update_single(
+            document_id,
+            tenant_id=tenant_id,
+            chunk_count=chunk_count,
+            fields=fields,
+            user_fields=None,
+        )
+    except Exception as e:
+        return e
+
+
+def _is_non_retryable_cleanup_error(ex: Exception) -> bool:
+    """Same as document_by_cc_pair_cleanup_task, Vespa rejecting the request as
+    a bad request is not retried."""
+    e: BaseException | None = ex
+    if isinstance(ex, RetryError):
+        e = ex.last_attempt.exception()
+    return (
+        isinstance(e, httpx.HTTPStatusError)
+        and e.response.status_code == HTTPStatus.BAD_REQUEST
+    )
+
+
+@shared_task(
+    name=OnyxCeleryTask.DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_TASK,
+    soft_time_limit=DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_SOFT_TIME_LIMIT,
+    time_limit=DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_TIME_LIMIT,
+    max_retries=DOCUMENT_BY_CC_PAIR_CLEANUP_MAX_RETRIES,
+    bind=True,
+)
+def document_by_cc_pair_cleanup_batch_task(
+    self: Task,
+    document_ids: list[str],
+    connector_id: int,
+    credential_id: int,
+    tenant_id: str,
+) -> bool:
+    """Same as document_by_cc_pair_cleanup_task, but for a batch of documents.
+    Created by connection deletion and connector pruning parent tasks.
+
+    The connector counts, document sets and access of the batch are loaded in bulk,
+    the documents are deleted from / updated in Vespa concurrently and the db rows
+    are removed with one statement per table for the whole batch. Documents that
+    fail in Vespa are retried on their own without redoing the rest of the batch,
+    except for the ones Vespa rejected with a 400, which are not retried."""
+    start = time.monotonic()
+
+    completion_status = OnyxCeleryTaskCompletionStatus.UNDEFINED
+    failed_doc_ids: set[str] = set()
+    non_retryable_doc_ids: set[str] = set()
+    committed_doc_ids: set[str] = set()
+    out_of_retries = (
+        self.max_retries is not None and self.request.retries >= self.max_retries
+    )
+    cc_pair_identifier = ConnectorCredentialPairIdentifier(
+        connector_id=connector_id,
+        credential_id=credential_id,
+    )
+
+    try:
+        with get_session_with_current_tenant() as db_session:
+            active_search_settings = get_active_search_settings(db_session)
+            doc_index = get_default_document_index(
+                active_search_settings.primary,
+                active_search_settings.secondary,
+                httpx_client=HttpxPool.get("vespa"),
+            )
+
+            retry_index = RetryDocumentIndex(doc_index)
+
+            doc_id_to_count = dict(
+                get_document_connector_counts(db_session, document_ids)
+            )
+            docs = {
+                doc.id: doc
+                for doc in get_documents_by_ids(db_session, list(doc_id_to_count))
+            }
+
+            # count == 1 means this is the only remaining cc_pair reference to the doc
+            # delete it from vespa and the db
+            delete_doc_ids = [
+                doc_id for doc_id, count in doc_id_to_count.items() if count == 1
+            ]
+
+            # count > 1 means the document still has cc_pair references, so just
+            # resync it to Vespa
+            update_doc_ids = [
+                doc_id
+                for doc_id, count in doc_id_to_count.items()
+                if count > 1 and doc_id in docs
+            ]
+
+            # the below functions do not include cc_pairs being deleted.
+            # i.e. they will correctly omit access for the current cc_pair
+            doc_id_to_doc_sets: dict[str, list[str]] = dict(
+                fetch_document_sets_for_documents(update_doc_ids, db_session)
+            )
+            doc_id_to_access = get_access_for_documents(
+                document_ids=update_doc_ids, db_session=db_session
+            )
+
+            index_doc_ids: list[str] = []
+            functions_with_args: list[tuple] = []
+            for doc_id in delete_doc_ids:
+                doc = docs.get(doc_id)
+                index_doc_ids.append(doc_id)
+                functions_with_args.append(
+                    (
+                        _cleanup_document_in_index,
+                        (
+                            retry_index,
+                            doc_id,
+                            tenant_id,
+                            doc.chunk_count if doc else None,
+                            None,
+                        ),
+                    )
+                )
+
+            for doc_id in update_doc_ids:
+                doc = docs[doc_id]
+                fields = VespaDocumentFields(
+                    document_sets=set(doc_id_to_doc_sets.get(doc_id, [])),
+                    access=doc_id_to_access[doc_id],
+                    boost=doc.boost,
+                    hidden=doc.hidden,
+                )
+                index_doc_ids.append(doc_id)
+                functions_with_args.append(
+                    (
+                        _cleanup_document_in_index,
+                        (retry_index, doc_id, tenant_id, doc.chunk_count, fields),
+                    )
+                )
+
+            # failed documents come back as their exception
+            results = run_functions_tuples_in_parallel(
+                functions_with_args,
+                max_workers=DOCUMENT_CLEANUP_VESPA_CONCURRENCY,
+            )
+            chunks_affected = 0
+            for doc_id, result in zip(index_doc_ids, results):
+                if not isinstance(result, Exception):
+                    chunks_affected += result
+                    continue
+
+                failed_doc_ids.add(doc_id)
+                if _is_non_retryable_cleanup_error(result):
+                    non_retryable_doc_ids.add(doc_id)
+                    task_logger.error(
+                        f"Non-retryable exception: doc={doc_id} exception={result!r}"
+                    )
+                else:
+                    task_logger.warning(
+                        f"Failed to clean up doc in Vespa: doc={doc_id} "
+                        f"exception={result!r}"
+                    )
+
+            # update db last, only for the documents that were cleaned up in Vespa
+            deleted_doc_ids = [
+                doc_id for doc_id in delete_doc_ids if doc_id not in failed_doc_ids
+            ]
+            updated_doc_ids = [
+                doc_id for doc_id in update_doc_ids if doc_id not in failed_doc_ids
+            ]
+            delete_documents_complete__no_commit(
+                db_session=db_session,
+                document_ids=deleted_doc_ids,
+            )
+            delete_documents_by_connector_credential_pair__no_commit(
+                db_session=db_session,
+                document_ids=updated_doc_ids,
+                connector_credential_pair_identifier=cc_pair_identifier,
+            )
+            db_session.commit()
+            committed_doc_ids.update(deleted_doc_ids + updated_doc_ids)
+            mark_documents_as_synced(updated_doc_ids, db_session)
+
+            elapsed = time.monotonic() - start
+            task_logger.info(
+                f"docs={len(document_ids)} "
+                f"deleted={len(deleted_doc_ids)} "
+                f"updated={len(updated_doc_ids)} "
+                f"skipped={len(document_ids) - len(index_doc_ids)} "
+                f"failed={len(failed_doc_ids)} "
+                f"chunks={chunks_affected} "
+                f"elapsed={elapsed:.2f}"
+            )
+
+            if not failed_doc_ids:
+                completion_status = OnyxCeleryTaskCompletionStatus.SUCCEEDED
+                return True
+
+            completion_status = (
+                OnyxCeleryTaskCompletionStatus.NON_RETRYABLE_EXCEPTION
+                if out_of_retries or failed_doc_ids == non_retryable_doc_ids
+                else OnyxCeleryTaskCompletionStatus.RETRYABLE_EXCEPTION
+            )
+    except SoftTimeLimitExceeded:
+        task_logger.info(f"SoftTimeLimitExceeded exception. docs={len(document_ids)}")
+        completion_status = OnyxCeleryTaskCompletionStatus.SOFT_TIME_LIMIT
+        return False
+    except Exception:
+        task_logger.exception(
+            f"document_by_cc_pair_cleanup_batch_task exceptioned: "
+            f"docs={len(document_ids)}"
+        )
+        # the documents cleaned up in the db before the failure are done, the rest
+        # of the batch is retried
+        failed_doc_ids = set(document_ids) - committed_doc_ids
+        non_retryable_doc_ids.clear()
+        completion_status = (
+            OnyxCeleryTaskCompletionStatus.NON_RETRYABLE_EXCEPTION
+            if out_of_retries
+            else OnyxCeleryTaskCompletionStatus.RETRYABLE_EXCEPTION
+        )
+    finally:
+        task_logger.info(
+            f"document_by_cc_pair_cleanup_batch_task completed: "
+            f"status={completion_status.value} docs={len(document_ids)}"
+        )
+
+    retry_doc_ids = failed_doc_ids - non_retryable_doc_ids
+    if not retry_doc_ids:
+        return False
+
+    if out_of_retries:
+        # This is the last attempt! mark the documents as dirty in the db so that they
+        # eventually get fixed out of band via stale document reconciliation
+        task_logger.warning(
+            f"Max celery task retries reached. Marking docs as dirty for reconciliation: "
+            f"failed_docs={len(retry_doc_ids)}"
+        )
+        with get_session_with_current_tenant() as db_session:
+            # delete the cc pair relationship now and let reconciliation clean it up
+            # in vespa
+            delete_documents_by_connector_credential_pair__no_commit(
+                db_session=db_session,
+                document_ids=list(retry_doc_ids),
+                connector_credential_pair_identifier=cc_pair_identifier,
+            )
+            mark_documents_as_modified(list(retry_doc_ids), db_session)
+        return False
+
+    # only the documents that failed are retried
+    # Exponential backoff from 2^4 to 2^6 ... i.e. 16, 32, 64
+    countdown = 2 ** (self.request.retries + 4)
+    self.retry(
+        kwargs=dict(
+            document_ids=list(retry_doc_ids),
+            connector_id=connector_id,
+            credential_id=credential_id,
+            tenant_id=tenant_id,
+        ),
+        countdown=countdown,
+    )  # this will raise a celery exception
+    return False  # we won't hit this, but it looks weird not to have it
+
+
 @shared_task(name=OnyxCeleryTask.CELERY_BEAT_HEARTBEAT, ignore_result=True, bind=True)
 def celery_beat_heartbeat(self: Task, *, tenant_id: str) -> None:
     """When this task runs, it writes a key to Redis with a TTL.
@@ -15,6 +15,7 @@ from sqlalchemy.orm import Session
 from tenacity import RetryError
 
 from onyx.access.access import get_access_for_document
+from onyx.access.access import get_access_for_documents
 from onyx.background.celery.apps.app_base import task_logger
 from onyx.background.celery.tasks.shared.RetryDocumentIndex import RetryDocumentIndex
 from onyx.background.celery.tasks.shared.tasks import LIGHT_SOFT_TIME_LIMIT
@@ -34,10 +35,13 @@ from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.configs.constants import OnyxRedisLocks
 from onyx.db.document import get_document
+from onyx.db.document import get_documents_by_ids
 from onyx.db.document import mark_document_as_synced
+from onyx.db.document import mark_documents_as_synced
 from onyx.db.document_set import delete_document_set
 from onyx.db.document_set import fetch_document_sets
 from onyx.db.document_set import fetch_document_sets_for_document
+from onyx.db.document_set import fetch_document_sets_for_documents
 from onyx.db.document_set import get_document_set_by_id
 from onyx.db.document_set import mark_document_set_as_synced
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
@@ -50,6 +54,8 @@ from onyx.db.sync_record import cleanup_sync_records
 from onyx.db.sync_record import insert_sync_record
 from onyx.db.sync_record import update_sync_record_status
 from onyx.document_index.factory import get_default_document_index
+from onyx.document_index.interfaces import MinimalDocumentIndexingInfo
+from onyx.document_index.interfaces import UpdateRequest
 from onyx.document_index.interfaces import VespaDocumentFields
 from onyx.httpx.httpx_pool import HttpxPool
 from onyx.redis.redis_document_set import RedisDocumentSet
@@ -58,6 +64,7 @@ from onyx.redis.redis_pool import get_redis_replica_client
 from onyx.redis.redis_pool import redis_lock_dump
 from onyx.redis.redis_usergroup import RedisUserGroup
 from onyx.utils.logger import setup_logger
+from onyx.utils.variable_functionality import fetch_ee_implementation_or_noop
 from onyx.utils.variable_functionality import fetch_versioned_implementation
 from onyx.utils.variable_functionality import (
     fetch_versioned_implementation_with_fallback,
@@ -67,6 +74,11 @@ from onyx.utils.variable_functionality import noop_fallback
 
 logger = setup_logger()
 
+# a batch does up to VESPA_SYNC_BATCH_SIZE documents worth of work, so it gets
+# more time than a single document sync
+VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT = 300
+VESPA_METADATA_SYNC_BATCH_TIME_LIMIT = VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT + 15
+
 
 # celery auto associates tasks created inside another task,
 # which bloats the result metadata considerably. trail=False prevents this.
@@ -319,6 +331,13 @@ def try_generate_user_group_sync_tasks(
         )
         return None
 
+    # the documents are about to be synced with the new groups of the cc pairs, make
+    # sure that they don't get the cached ones
+    fetch_ee_implementation_or_noop(
+        "onyx.access.access",
+        "bump_user_group_version",
+    )(tenant_id=tenant_id)
+
     # add tasks to celery and build up the task set to monitor in redis
     r.delete(rug.taskset_key)
 
@@ -568,3 +587,174 @@ def vespa_metadata_sync_task(self: Task, document_id: str, *, tenant_id: str) ->
         )
 
     return completion_status == OnyxCeleryTaskCompletionStatus.SUCCEEDED
+
+
+@shared_task(
+    name=OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+    bind=True,
+    soft_time_limit=VESPA_METADATA_SYNC_BATCH_SOFT_TIME_LIMIT,
+    time_limit=VESPA_METADATA_SYNC_BATCH_TIME_LIMIT,
+    max_retries=3,
+)
+def vespa_metadata_sync_batch_task(
+    self: Task, document_ids: list[str], *, tenant_id: str
+) -> bool:
+    """Syncs the document sets and access of a batch of documents to Vespa.
+
+    Document sets and access are loaded in bulk, all chunk updates are applied
+    through a single DocumentIndex.update call, and the successful documents are
+    marked as synced in one statement. Documents that fail to update are retried
+    on their own without redoing the rest of the batch."""
+    start = time.monotonic()
+
+    completion_status = OnyxCeleryTaskCompletionStatus.UNDEFINED
+    failed_doc_ids: set[str] = set()
+    out_of_retries = (
+        self.max_retries is not None and self.request.retries >= self.max_retries
+    )
+
+    try:
+        with get_session_with_current_tenant() as db_session:
+            active_search_settings = get_active_search_settings(db_session)
+            doc_index = get_default_document_index(
+                search_settings=active_search_settings.primary,
+                secondary_search_settings=active_search_settings.secondary,
+                httpx_client=HttpxPool.get("vespa"),
+            )
+
+            retry_index = RetryDocumentIndex(doc_index)
+
+            docs = get_documents_by_ids(db_session, document_ids)
+            if not docs:
+                elapsed = time.monotonic() - start
+                task_logger.info(
+                    f"docs={len(document_ids)} "
+                    f"action=no_operation "
+                    f"elapsed={elapsed:.2f}"
+                )
+                completion_status = OnyxCeleryTaskCompletionStatus.SKIPPED
+                return False
+
+            found_doc_ids = [doc.id for doc in docs]
+
+            # document set sync
+            doc_id_to_doc_sets: dict[str, list[str]] = dict(
+                fetch_document_sets_for_documents(found_doc_ids, db_session)
+            )
+
+            # User group sync
+            doc_id_to_access = get_access_for_documents(
+                document_ids=found_doc_ids, db_session=db_session
+            )
+
+            update_requests: list[UpdateRequest] = []
+            for doc in docs:
+                doc_sets = set(doc_id_to_doc_sets.get(doc.id, []))
+                doc_access = doc_id_to_access[doc.id]
+
+                if doc.chunk_count is None:
+                    # documents indexed before chunk counts were tracked need their
+                    # chunk range probed in Vespa, which only update_single handles
+                    try:
+                        retry_index.update_single(
+                            doc.id,
+                            tenant_id=tenant_id,
+                            chunk_count=None,
+                            fields=VespaDocumentFields(
+                                document_sets=doc_sets,
+                                access=doc_access,
+                                boost=doc.boost,
+                                hidden=doc.hidden,
+                            ),
+                            user_fields=None,
+                        )
+                    except Exception:
+                        task_logger.exception(
+                            f"update_single exceptioned: doc={doc.id}"
+                        )
+                        failed_doc_ids.add(doc.id)
+                    continue
+
+                update_requests.append(
+                    UpdateRequest(
+                        minimal_document_indexing_info=[
+                            MinimalDocumentIndexingInfo(
+                                doc_id=doc.id, chunk_start_index=doc.chunk_count
+                            )
+                        ],
+                        document_sets=doc_sets,
+                        access=doc_access,
+                        boost=doc.boost,
+                        hidden=doc.hidden,
+                    )
+                )
+
+            # update Vespa. OK if docs don't exist. Failed docs are returned.
+            if update_requests:
+                failed_doc_ids |= retry_index.update(
+                    update_requests, tenant_id=tenant_id
+                )
+
+            # update db last. Worst case = we crash right before this and
+            # the sync might repeat again later
+            synced_doc_ids = [
+                doc_id for doc_id in found_doc_ids if doc_id not in failed_doc_ids
+            ]
+            mark_documents_as_synced(synced_doc_ids, db_session)
+
+            elapsed = time.monotonic() - start
+            task_logger.info(
+                f"docs={len(document_ids)} "
+                f"action=sync "
+                f"synced={len(synced_doc_ids)} "
+                f"failed={len(failed_doc_ids)} "
+                f"elapsed={elapsed:.2f}"
+            )
+
+            if not failed_doc_ids:
+                completion_status = OnyxCeleryTaskCompletionStatus.SUCCEEDED
+                return True
+
+            completion_status = (
+                OnyxCeleryTaskCompletionStatus.NON_RETRYABLE_EXCEPTION
+                if out_of_retries
+                else OnyxCeleryTaskCompletionStatus.RETRYABLE_EXCEPTION
+            )
+    except SoftTimeLimitExceeded:
+        task_logger.info(f"SoftTimeLimitExceeded exception. docs={len(document_ids)}")
+        completion_status = OnyxCeleryTaskCompletionStatus.SOFT_TIME_LIMIT
+        return False
+    except Exception:
+        task_logger.exception(
+            f"vespa_metadata_sync_batch_task exceptioned: docs={len(document_ids)}"
+        )
+        # nothing was marked as synced, so the whole batch is retried
+        failed_doc_ids = set(document_ids)
+        completion_status = (
+            OnyxCeleryTaskCompletionStatus.NON_RETRYABLE_EXCEPTION
+            if out_of_retries
+            else OnyxCeleryTaskCompletionStatus.RETRYABLE_EXCEPTION
+        )
+    finally:
+        task_logger.info(
+            f"vespa_metadata_sync_batch_task completed: "
+            f"status={completion_status.value} docs={len(document_ids)}"
+        )
+
+    # only the documents that failed are retried
+    if out_of_retries:
+        # the documents are still marked as needing sync and will be
+        # picked up again by a later pass of check_for_vespa_sync_task
+        task_logger.error(
+            f"vespa_metadata_sync_batch_task out of retries: "
+            f"failed_docs={len(failed_doc_ids)}"
+        )
+        return False
+
+    # Exponential backoff from 2^4 to 2^6 ... i.e. 16, 32, 64
+    countdown = 2 ** (self.request.retries + 4)
+    self.retry(
+        kwargs=dict(document_ids=list(failed_doc_ids), tenant_id=tenant_id),
+        countdown=countdown,
+    )  # this will raise a celery exception
+    return False  # we won't hit this, but it looks weird not to have it
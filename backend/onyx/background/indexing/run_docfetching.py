@@ -110,6 +110,11 @@ def _get_connector_runner(
             connector_specific_config=attempt.connector_credential_pair.connector.connector_specific_config,
             credential=attempt.connector_credential_pair.credential,
         )
+        runnable_connector.set_index_attempt_scope(
+            cc_pair_id=attempt.connector_credential_pair.id,
+            search_settings_id=attempt.search_settings_id,
+            from_beginning=attempt.from_beginning,
+        )
 
         # validate the connector settings
         if not INTEGRATION_TESTS_MODE:
@@ -571,6 +576,7 @@ def _run_indexing(
                         ctx.from_beginning
                         or (ctx.search_settings_status == IndexModelStatus.FUTURE)
                     ),
+                    ignore_content_fingerprint=ctx.from_beginning,
                     db_session=db_session,
                     tenant_id=tenant_id,
                     document_batch=doc_batch_cleaned,
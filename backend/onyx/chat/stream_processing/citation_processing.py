@@ -31,16 +31,25 @@ class CitationProcessor:
         self.max_citation_num = len(context_docs)
         self.stop_stream = stop_stream
 
-        self.llm_out = ""  # entire output so far
         self.curr_segment = ""  # tokens held for citation processing
         self.hold = ""  # tokens held for stop token processing
 
+        # code fence state of the entire output so far, tracked incrementally so
+        # that each token is only scanned once (instead of recounting the answer)
+        self.fence_count = 0  # number of ``` in completed runs of backticks
+        self.backtick_run = 0  # length of the run of backticks ending the output
+
+        # index of the last '[' in curr_segment, -1 if there is none
+        self.last_bracket_idx = -1
+
         self.recent_cited_documents: set[str] = set()  # docs recently cited
         self.cited_documents: set[str] = set()  # docs cited in the entire stream
         self.non_citation_count = 0
 
-        # '[', '[[', '[1', '[[1', '[1,', '[1, ', '[1,2', '[1, 2,', etc.
-        self.possible_citation_pattern = re.compile(r"(\[+(?:\d+,? ?)*$)")
+        # possible citations: '[', '[[', '[1', '[[1', '[1,', '[1, ', '[1,2', '[1, 2,', etc.
+        # this matches what may follow the last '[', see _possible_citation_found.
+        # The optional newline mirrors '$', which also matches before a final newline
+        self.possible_citation_suffix_pattern = re.compile(r"(?:\d+,? ?)*\n?")
 
         # group 1: '[[1]]', [[2]], etc.
         # group 2: '[1]', '[1, 2]', '[1,2,16]', etc.
@@ -64,8 +73,12 @@ class CitationProcessor:
             token = next_hold
             self.hold = ""
 
+        bracket_idx = token.rfind("[")
+        if bracket_idx != -1:
+            self.last_bracket_idx = len(self.curr_segment) + bracket_idx
         self.curr_segment += token
-        self.llm_out += token
+        self._update_code_block_state(token)
+        code_block = self._in_code_block()
 
         # Handle code blocks without language tags
         if "`" in self.curr_segment:
@@ -73,16 +86,20 @@ class CitationProcessor:
                 pass
             elif "```" in self.curr_segment:
                 piece_that_comes_after = self.curr_segment.split("```")[1][0]
-                if piece_that_comes_after == "\n" and in_code_block(self.llm_out):
+                if piece_that_comes_after == "\n" and code_block:
                     self.curr_segment = self.curr_segment.replace("```", "```plaintext")
+                    self.last_bracket_idx = self.curr_segment.rfind("[")
 
-        citation_matches = list(self.citation_pattern.finditer(self.curr_segment))
-        possible_citation_found = bool(
-            re.search(self.possible_citation_pattern, self.curr_segment)
+        # a citation always ends with ']', no need to run the regex otherwise
+        citation_matches = (
+            list(self.citation_pattern.finditer(self.curr_segment))
+            if "]" in self.curr_segment
+            else []
         )
+        possible_citation_found = self._possible_citation_found()
 
         result = ""
-        if citation_matches and not in_code_block(self.llm_out):
+        if citation_matches and not code_block:
             match_idx = 0
             for match in citation_matches:
                 match_span = match.span()
@@ -106,6 +123,7 @@ class CitationProcessor:
 
             # leftover could be part of next citation
             self.curr_segment = self.curr_segment[match_idx:]
+            self.last_bracket_idx = max(self.last_bracket_idx - match_idx, -1)
             self.non_citation_count = len(self.curr_segment)
 
         # hold onto the current segment if potential citations found, otherwise stream
@@ -113,10 +131,54 @@ class CitationProcessor:
             result += self.curr_segment
             self.non_citation_count += len(self.curr_segment)
             self.curr_segment = ""
+            self.last_bracket_idx = -1
 
         if result:
             yield OnyxAnswerPiece(answer_piece=result)
 
+    def _update_code_block_state(self, token: str) -> None:
+        """
+        Same as counting the ``` in the entire output (non-overlapping, left to right)
+        but only looks at the new token: each maximal run of n backticks contributes
+        n // 3 fences, and only the run at the very end can still grow.
+        """
+        if "`" not in token:
+            if token:
+                self.fence_count += self.backtick_run // 3
+                self.backtick_run = 0
+            return
+
+        without_leading = token.lstrip("`")
+        leading_run = len(token) - len(without_leading)
+        if not without_leading:
+            # token is only backticks, the trailing run keeps growing
+            self.backtick_run += leading_run
+            return
+
+        self.fence_count += (self.backtick_run + leading_run) // 3
+        # every run in the middle is bounded by other characters on both sides
+        middle = without_leading.rstrip("`")
+        self.fence_count += middle.count(TRIPLE_BACKTICK)
+        self.backtick_run = len(without_leading) - len(middle)
+
+    def _in_code_block(self) -> bool:
+        return (self.fence_count + self.backtick_run // 3) % 2 != 0
+
+    def _possible_citation_found(self) -> bool:
+        r"""
+        Whether curr_segment ends with a possible citation, i.e. matches
+        r"\[+(?:\d+,? ?)*$". That is the case iff everything after its last '[' is made
+        of citation numbers, so only that (short) suffix needs to be looked at.
+        """
+        if self.last_bracket_idx == -1:
+            return False
+        return (
+            self.possible_citation_suffix_pattern.fullmatch(
+                self.curr_segment, self.last_bracket_idx + 1
+            )
+            is not None
+        )
+
     def process_citation(self, match: re.Match) -> tuple[str, list[CitationInfo]]:
         """
         Process a single citation match and return the citation string and the
@@ -276,6 +276,15 @@ REDIS_POOL_MAX_CONNECTIONS = int(os.environ.get("REDIS_POOL_MAX_CONNECTIONS", 12
 REDIS_SSL_CERT_REQS = os.getenv("REDIS_SSL_CERT_REQS", "none")
 REDIS_SSL_CA_CERTS = os.getenv("REDIS_SSL_CA_CERTS", None)
 
+# Seconds that each process keeps the values of the key value store (settings, search
+# settings, etc.) in memory for. Stores and deletes are broadcast to the other processes
+# over Redis pub/sub so this only bounds the staleness if a broadcast is missed. 0 disables
+KV_STORE_LOCAL_CACHE_TTL = float(os.environ.get("KV_STORE_LOCAL_CACHE_TTL") or 5)
+# Max number of keys kept in memory per process, least recently used ones are evicted first
+KV_STORE_LOCAL_CACHE_MAX_ENTRIES = int(
+    os.environ.get("KV_STORE_LOCAL_CACHE_MAX_ENTRIES") or 1000
+)
+
 CELERY_RESULT_EXPIRES = int(os.environ.get("CELERY_RESULT_EXPIRES", 86400))  # seconds
 
 # https://docs.celeryq.dev/en/stable/userguide/configuration.html#broker-pool-limit
@@ -346,6 +355,17 @@ CELERY_WORKER_KG_PROCESSING_CONCURRENCY = int(
 # The maximum number of tasks that can be queued up to sync to Vespa in a single pass
 VESPA_SYNC_MAX_TASKS = 8192
 
+# The number of documents handled by a single vespa metadata sync task
+VESPA_SYNC_BATCH_SIZE = int(os.environ.get("VESPA_SYNC_BATCH_SIZE") or 128)
+
+# The number of documents removed by a single connector deletion / pruning cleanup task
+DOCUMENT_CLEANUP_BATCH_SIZE = int(os.environ.get("DOCUMENT_CLEANUP_BATCH_SIZE") or 128)
+# The number of documents of a cleanup batch that are deleted from / updated in Vespa
+# at the same time
+DOCUMENT_CLEANUP_VESPA_CONCURRENCY = int(
+    os.environ.get("DOCUMENT_CLEANUP_VESPA_CONCURRENCY") or 16
+)
+
 DB_YIELD_PER_DEFAULT = 64
 
 #####
@@ -376,6 +396,24 @@ WEB_CONNECTOR_OAUTH_CLIENT_ID = os.environ.get("WEB_CONNECTOR_OAUTH_CLIENT_ID")
 WEB_CONNECTOR_OAUTH_CLIENT_SECRET = os.environ.get("WEB_CONNECTOR_OAUTH_CLIENT_SECRET")
 WEB_CONNECTOR_OAUTH_TOKEN_URL = os.environ.get("WEB_CONNECTOR_OAUTH_TOKEN_URL")
 WEB_CONNECTOR_VALIDATE_URLS = os.environ.get("WEB_CONNECTOR_VALIDATE_URLS")
+# Number of pages the web connector fetches at the same time
+WEB_CONNECTOR_CONCURRENT_FETCHES = int(
+    os.environ.get("WEB_CONNECTOR_CONCURRENT_FETCHES") or 8
+)
+# Politeness limits, applied to each host separately
+WEB_CONNECTOR_MAX_CONCURRENT_FETCHES_PER_HOST = int(
+    os.environ.get("WEB_CONNECTOR_MAX_CONCURRENT_FETCHES_PER_HOST") or 4
+)
+# Min seconds between the start of two requests to the same host
+WEB_CONNECTOR_HOST_REQUEST_INTERVAL = float(
+    os.environ.get("WEB_CONNECTOR_HOST_REQUEST_INTERVAL") or 0.1
+)
+# Seconds that the URL frontier of an interrupted crawl is kept around to be resumed
+# and that the ETag / Last-Modified headers of crawled pages are kept for conditional
+# re-fetches
+WEB_CONNECTOR_CRAWL_STATE_TTL = int(
+    os.environ.get("WEB_CONNECTOR_CRAWL_STATE_TTL") or 7 * 24 * 60 * 60
+)
 
 HTML_BASED_CONNECTOR_TRANSFORM_LINKS_STRATEGY = os.environ.get(
     "HTML_BASED_CONNECTOR_TRANSFORM_LINKS_STRATEGY",
@@ -435,6 +473,12 @@ CONFLUENCE_CONNECTOR_USER_PROFILES_OVERRIDE = cast(
     ),
 )
 
+# Seconds that the display names / emails of Confluence users are cached in Redis for, so
+# that they are shared across workers and indexing attempts. 0 disables
+CONFLUENCE_USER_CACHE_TTL = int(
+    os.environ.get("CONFLUENCE_USER_CACHE_TTL") or 60 * 60 * 24
+)
+
 # Due to breakages in the confluence API, the timezone offset must be specified client side
 # to match the user's specified timezone.
 
@@ -525,6 +569,12 @@ MAX_PRUNING_DOCUMENT_RETRIEVAL_PER_MINUTE = int(
     os.environ.get("MAX_PRUNING_DOCUMENT_RETRIEVAL_PER_MINUTE", 0)
 )
 
+# Max number of source document IDs that pruning holds in memory, beyond that they are
+# sorted and spilled to temporary files on disk, which are merged at the end
+PRUNING_SPILL_RUN_SIZE = int(os.environ.get("PRUNING_SPILL_RUN_SIZE") or 500_000)
+# Number of indexed document IDs fetched from postgres at a time when pruning
+PRUNING_DB_YIELD_PER = int(os.environ.get("PRUNING_DB_YIELD_PER") or 10_000)
+
 # comma delimited list of zendesk article labels to skip indexing for
 ZENDESK_CONNECTOR_SKIP_ARTICLE_LABELS = os.environ.get(
     "ZENDESK_CONNECTOR_SKIP_ARTICLE_LABELS", ""
@@ -585,6 +635,23 @@ INDEXING_EMBEDDING_MODEL_NUM_THREADS = int(
     os.environ.get("INDEXING_EMBEDDING_MODEL_NUM_THREADS") or 8
 )
 
+# Cache embeddings so that unchanged chunks / repeated queries are not sent to the
+# embedding model again. "redis" or "disk" (a local SQLite file), empty to disable.
+EMBEDDING_CACHE_BACKEND = (os.environ.get("EMBEDDING_CACHE_BACKEND") or "").lower()
+# Max number of embeddings kept per cache (per tenant and embedding model for the
+# redis backend), least recently used ones are evicted first. A 768 dimension
+# embedding takes ~3KB
+EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES") or 50_000
+)
+# Only applies to the redis backend
+EMBEDDING_CACHE_TTL = int(
+    os.environ.get("EMBEDDING_CACHE_TTL") or 60 * 60 * 24 * 7
+)  # 1 week
+EMBEDDING_CACHE_DISK_PATH = (
+    os.environ.get("EMBEDDING_CACHE_DISK_PATH") or "/tmp/onyx_embedding_cache.db"
+)
+
 # During an indexing attempt, specifies the number of batches which are allowed to
 # exception without aborting the attempt.
 INDEXING_EXCEPTION_LIMIT = int(os.environ.get("INDEXING_EXCEPTION_LIMIT") or 0)
@@ -651,6 +718,32 @@ CUSTOM_ANSWER_VALIDITY_CONDITIONS = json.loads(
 
 VESPA_REQUEST_TIMEOUT = int(os.environ.get("VESPA_REQUEST_TIMEOUT") or "15")
 
+# Connection limits for the process-wide pooled client used by the Vespa query path
+# (search, visit and id based retrieval). Keeping connections alive avoids paying a new
+# TLS / HTTP2 handshake on every search.
+VESPA_QUERY_MAX_CONNECTIONS = int(
+    os.environ.get("VESPA_QUERY_MAX_CONNECTIONS") or "100"
+)
+VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS = int(
+    os.environ.get("VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS") or "20"
+)
+# seconds an idle connection is kept around before being closed
+VESPA_QUERY_KEEPALIVE_EXPIRY = float(
+    os.environ.get("VESPA_QUERY_KEEPALIVE_EXPIRY") or "60"
+)
+
+# Feed chunks to Vespa from a single event loop instead of one request per thread.
+# Experimental, the threaded feed is the default: in the feed benchmark
+# (scripts/benchmarks/vespa_feed_benchmark.py) the async feed only about matches it
+# with 16-32 requests in flight, and gets slower with more
+VESPA_ASYNC_FEED_ENABLED = (
+    os.environ.get("VESPA_ASYNC_FEED_ENABLED", "").lower() == "true"
+)
+# max number of concurrent feed requests when the async feed is enabled
+VESPA_ASYNC_FEED_MAX_IN_FLIGHT = int(
+    os.environ.get("VESPA_ASYNC_FEED_MAX_IN_FLIGHT") or "32"
+)
+
 SYSTEM_RECURSION_LIMIT = int(os.environ.get("SYSTEM_RECURSION_LIMIT") or "1000")
 
 PARSE_WITH_TRAFILATURA = os.environ.get("PARSE_WITH_TRAFILATURA", "").lower() == "true"
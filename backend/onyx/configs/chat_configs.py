@@ -31,6 +31,12 @@ FAVOR_RECENT_DECAY_MULTIPLIER = 2.0
 # Currently only applies to search flow not chat
 CONTEXT_CHUNKS_ABOVE = int(os.environ.get("CONTEXT_CHUNKS_ABOVE") or 1)
 CONTEXT_CHUNKS_BELOW = int(os.environ.get("CONTEXT_CHUNKS_BELOW") or 1)
+# Fetch the chunks above and below the retrieved chunks together with the chunks referenced
+# by retrieved large chunks, saving a round trip to the document index when expanding the
+# retrieved chunks into sections
+SEARCH_PREFETCH_SURROUNDING_CHUNKS = (
+    os.environ.get("SEARCH_PREFETCH_SURROUNDING_CHUNKS", "true").lower() == "true"
+)
 # Whether the LLM should be used to decide if a search would help given the chat history
 DISABLE_LLM_CHOOSE_SEARCH = (
     os.environ.get("DISABLE_LLM_CHOOSE_SEARCH", "").lower() == "true"
@@ -126,6 +126,35 @@ KG_NORMALIZATION_RERANK_THRESHOLD: float = float(
 )
 
 
+# Normalize entities against an in-memory trigram index of the kg entities instead of
+# querying postgres for every entity. The index is refreshed incrementally after every
+# clustering run and rebuilt from scratch once it's older than the max age (seconds)
+KG_NORMALIZATION_INDEX_ENABLED: bool = (
+    os.environ.get("KG_NORMALIZATION_INDEX_ENABLED", "true").lower() == "true"
+)
+
+KG_NORMALIZATION_INDEX_MAX_AGE: int = int(
+    os.environ.get("KG_NORMALIZATION_INDEX_MAX_AGE", str(60 * 60))
+)
+
+
+# KG extraction runs the vespa fetches and llm calls of up to this many documents at
+# once, while the previous batches are written to the staging tables
+KG_EXTRACTION_MAX_PARALLEL_DOCUMENTS: int = int(
+    os.environ.get("KG_EXTRACTION_MAX_PARALLEL_DOCUMENTS", "16")
+)
+
+# Budget shared by all the kg extraction llm calls of a process. A tokens per minute
+# limit of 0 disables the rate limiting, only the number of concurrent calls is capped
+KG_EXTRACTION_MAX_PARALLEL_LLM_CALLS: int = int(
+    os.environ.get("KG_EXTRACTION_MAX_PARALLEL_LLM_CALLS", "8")
+)
+
+KG_EXTRACTION_LLM_TOKENS_PER_MINUTE: int = int(
+    os.environ.get("KG_EXTRACTION_LLM_TOKENS_PER_MINUTE", "0")
+)
+
+
 KG_CLUSTERING_RETRIEVE_THRESHOLD: float = float(
     os.environ.get("KG_CLUSTERING_RETRIEVE_THRESHOLD", "0.6")
 )
@@ -135,6 +164,9 @@ KG_CLUSTERING_THRESHOLD: float = float(
     os.environ.get("KG_CLUSTERING_THRESHOLD", "0.96")
 )
 
+# Number of staged entities / relationships clustered and transferred at once
+KG_CLUSTERING_BATCH_SIZE: int = int(os.environ.get("KG_CLUSTERING_BATCH_SIZE", "1000"))
+
 KG_MAX_SEARCH_DOCUMENTS: int = int(os.environ.get("KG_MAX_SEARCH_DOCUMENTS", "15"))
 
 KG_MAX_DECOMPOSITION_SEGMENTS: int = int(
@@ -46,9 +46,24 @@ EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE") or 0) or None
 BATCH_SIZE_ENCODE_CHUNKS = EMBEDDING_BATCH_SIZE or 8
 # don't send over too many chunks at once, as sending too many could cause timeouts
 BATCH_SIZE_ENCODE_CHUNKS_FOR_API_EMBEDDING_SERVICES = EMBEDDING_BATCH_SIZE or 512
+# Number of token counts memoized per tokenizer, mostly sentences seen by the chunker
+TOKEN_COUNT_CACHE_SIZE = int(os.environ.get("TOKEN_COUNT_CACHE_SIZE") or 100_000)
 # For score display purposes, only way is to know the expected ranges
 CROSS_ENCODER_RANGE_MAX = 1
 CROSS_ENCODER_RANGE_MIN = 0
+# Seconds to cache the rerank score of a (rerank model, query, chunk), agent sub-questions
+# and refined searches often rerank the same chunks again. 0 to disable
+RERANK_SCORE_CACHE_TTL = int(os.environ.get("RERANK_SCORE_CACHE_TTL") or 600)
+# If set (and lower than num_rerank), only this many chunks are reranked at first. The
+# number of reranked chunks is doubled, up to num_rerank, for as long as the scores are
+# too flat to tell the relevant chunks apart. 0 to always rerank num_rerank chunks
+RERANK_ADAPTIVE_INITIAL_COUNT = int(
+    os.environ.get("RERANK_ADAPTIVE_INITIAL_COUNT") or 0
+)
+# Standard deviation of the (0 to 1) rerank scores below which they count as flat
+RERANK_ADAPTIVE_MIN_SCORE_SPREAD = float(
+    os.environ.get("RERANK_ADAPTIVE_MIN_SCORE_SPREAD") or 0.1
+)
 
 
 #####
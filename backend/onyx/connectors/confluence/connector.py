@@ -17,6 +17,7 @@ from onyx.configs.constants import DocumentSource
 from onyx.connectors.confluence.access import get_all_space_permissions
 from onyx.connectors.confluence.access import get_page_restrictions
 from onyx.connectors.confluence.onyx_confluence import extract_text_from_confluence_html
+from onyx.connectors.confluence.onyx_confluence import get_user_mentions
 from onyx.connectors.confluence.onyx_confluence import OnyxConfluence
 from onyx.connectors.confluence.utils import build_confluence_document_id
 from onyx.connectors.confluence.utils import convert_attachment_to_content
@@ -254,10 +255,14 @@ class ConfluenceConnector(
         comment_cql += self.cql_label_filter
         expand = ",".join(_COMMENT_EXPANSION_FIELDS)
 
-        for comment in self.confluence_client.paginated_cql_retrieval(
-            cql=comment_cql,
-            expand=expand,
-        ):
+        comments = list(
+            self.confluence_client.paginated_cql_retrieval(
+                cql=comment_cql,
+                expand=expand,
+            )
+        )
+        self.confluence_client.prefetch_users(get_user_mentions(comments))
+        for comment in comments:
             comment_string += "\nComment:\n"
             comment_string += extract_text_from_confluence_html(
                 confluence_client=self.confluence_client,
@@ -489,10 +494,15 @@ class ConfluenceConnector(
         def store_next_page_url(next_page_url: str) -> None:
             checkpoint.next_page_url = next_page_url
 
+        # look up the users mentioned in a full page of results together
+        def prefetch_mentioned_users(pages: list[dict[str, Any]]) -> None:
+            self.confluence_client.prefetch_users(get_user_mentions(pages))
+
         for page in self.confluence_client.paginated_page_retrieval(
             cql_url=page_query_url,
             limit=self.batch_size,
             next_page_callback=store_next_page_url,
+            results_callback=prefetch_mentioned_users,
         ):
             # Build doc from page
             doc_or_failure = self._convert_page_to_document(page)
@@ -508,11 +518,19 @@ class ConfluenceConnector(
 
             # Create checkpoint once a full page of results is returned
             if checkpoint.next_page_url and checkpoint.next_page_url != page_query_url:
+                self._log_user_cache_stats()
                 return checkpoint
 
+        self._log_user_cache_stats()
         checkpoint.has_more = False
         return checkpoint
 
+    def _log_user_cache_stats(self) -> None:
+        user_cache = self.confluence_client.user_cache
+        logger.info(
+            f"Confluence user cache: {user_cache.hits} hits, {user_cache.misses} misses"
+        )
+
     def _build_page_retrieval_url(
         self,
         start: SecondsSinceUnixEpoch | None,
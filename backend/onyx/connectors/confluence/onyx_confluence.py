@@ -13,6 +13,7 @@ We haven't explored all of the cloud APIs' pagination strategies. @raunakab take
 """
 
 import json
+import re
 import time
 from collections.abc import Callable
 from collections.abc import Generator
@@ -34,6 +35,7 @@ from onyx.configs.app_configs import CONFLUENCE_CONNECTOR_USER_PROFILES_OVERRIDE
 from onyx.configs.app_configs import OAUTH_CONFLUENCE_CLOUD_CLIENT_ID
 from onyx.configs.app_configs import OAUTH_CONFLUENCE_CLOUD_CLIENT_SECRET
 from onyx.connectors.confluence.models import ConfluenceUser
+from onyx.connectors.confluence.user_cache import ConfluenceUserCache
 from onyx.connectors.confluence.user_profile_override import (
     process_confluence_user_profiles_override,
 )
@@ -44,6 +46,7 @@ from onyx.connectors.confluence.utils import update_param_in_path
 from onyx.connectors.interfaces import CredentialsProviderInterface
 from onyx.file_processing.html_utils import format_document_soup
 from onyx.redis.redis_pool import get_redis_client
+from onyx.utils.batching import batch_generator
 from onyx.utils.logger import setup_logger
 from onyx.utils.threadpool_concurrency import run_with_timeout
 
@@ -58,8 +61,14 @@ _PROBLEMATIC_EXPANSIONS = "body.storage.value"
 _REPLACEMENT_EXPANSIONS = "body.view.value"
 
 _USER_NOT_FOUND = "Unknown Confluence User"
-_USER_ID_TO_DISPLAY_NAME_CACHE: dict[str, str | None] = {}
-_USER_EMAIL_CACHE: dict[str, str | None] = {}
+_USER_DISPLAY_NAME = "display_name"
+_USER_EMAIL = "email"
+# max number of account ids accepted by the user/bulk endpoint
+_USER_BULK_LOOKUP_SIZE = 100
+# user mentions in the storage format, e.g. <ri:user ri:account-id="..." />
+_USER_MENTION_PATTERN = re.compile(
+    r'<ri:user\b[^>]*?\bri:(?:account-id|userkey)="([^"]+)"'
+)
 _DEFAULT_PAGINATION_LIMIT = 1000
 
 
@@ -128,6 +137,10 @@ class OnyxConfluence:
             else None
         )
 
+        self.user_cache = ConfluenceUserCache(
+            self._url, self._credentials_provider.get_tenant_id()
+        )
+
     def _renew_credentials(self) -> tuple[dict[str, Any], bool]:
         """credential_json - the current json credentials
         Returns a tuple
@@ -476,6 +489,8 @@ class OnyxConfluence:
         # Called with the next url to use to get the next page
         next_page_callback: Callable[[str], None] | None = None,
         force_offset_pagination: bool = False,
+        # Called with all the results of a page before they are yielded
+        results_callback: Callable[[list[dict[str, Any]]], None] | None = None,
     ) -> Iterator[dict[str, Any]]:
         """
         This will paginate through the top level query.
@@ -590,6 +605,8 @@ class OnyxConfluence:
             old_url_suffix = url_suffix
             updated_start = get_start_param_from_url(old_url_suffix)
             url_suffix = cast(str, next_response.get("_links", {}).get("next", ""))
+            if results_callback and results:
+                results_callback(results)
             for i, result in enumerate(results):
                 updated_start += 1
                 if url_suffix and next_page_callback and i == len(results) - 1:
@@ -620,6 +637,38 @@ class OnyxConfluence:
                 )
                 break
 
+    def prefetch_users(self, user_ids: list[str]) -> None:
+        """Resolves the display names of the given users with as few calls as possible,
+        so that they are cached by the time the pages mentioning them are parsed."""
+        cached_display_names = self.user_cache.get_many(_USER_DISPLAY_NAME, user_ids)
+        uncached_user_ids = [
+            user_id
+            for user_id in dict.fromkeys(user_ids)
+            if user_id not in cached_display_names
+        ]
+        if not uncached_user_ids or not self._is_cloud:
+            # Confluence Server has no endpoint to look up several users at once, they
+            # are looked up one by one when the pages are parsed
+            return
+
+        for account_ids in batch_generator(uncached_user_ids, _USER_BULK_LOOKUP_SIZE):
+            try:
+                response = self.get(
+                    "rest/api/user/bulk", params={"accountId": account_ids}
+                )
+            except Exception:
+                logger.warning(f"Failed to look up {len(account_ids)} users in bulk")
+                continue
+
+            self.user_cache.set_many(
+                _USER_DISPLAY_NAME,
+                {
+                    user["accountId"]: user["displayName"]
+                    for user in response.get("results", [])
+                    if user.get("accountId") and user.get("displayName")
+                },
+            )
+
     def build_cql_url(self, cql: str, expand: str | None = None) -> str:
         expand_string = f"&expand={expand}" if expand else ""
         return f"rest/api/content/search?cql={cql}{expand_string}"
@@ -642,6 +691,8 @@ class OnyxConfluence:
         limit: int,
         # Called with the next url to use to get the next page
         next_page_callback: Callable[[str], None] | None = None,
+        # Called with all the pages of a response before they are yielded
+        results_callback: Callable[[list[dict[str, Any]]], None] | None = None,
     ) -> Iterator[dict[str, Any]]:
         """
         Error handling (and testing) wrapper for _paginate_url,
@@ -650,7 +701,10 @@ class OnyxConfluence:
         """
         try:
             yield from self._paginate_url(
-                cql_url, limit=limit, next_page_callback=next_page_callback
+                cql_url,
+                limit=limit,
+                next_page_callback=next_page_callback,
+                results_callback=results_callback,
             )
         except Exception as e:
             logger.exception(f"Error in paginated_page_retrieval: {e}")
@@ -883,8 +937,8 @@ class OnyxConfluence:
 def get_user_email_from_username__server(
     confluence_client: OnyxConfluence, user_name: str
 ) -> str | None:
-    global _USER_EMAIL_CACHE
-    if _USER_EMAIL_CACHE.get(user_name) is None:
+    email = confluence_client.user_cache.get(_USER_EMAIL, user_name)
+    if email is None:
         try:
             response = confluence_client.get_mobile_parameters(user_name)
             email = response.get("email")
@@ -896,8 +950,9 @@ def get_user_email_from_username__server(
             # We may want to just return a string that indicates failure so we dont
             # keep retrying
             # email = f"FAILED TO GET CONFLUENCE EMAIL FOR {user_name}"
-        _USER_EMAIL_CACHE[user_name] = email
-    return _USER_EMAIL_CACHE[user_name]
+        if email:
+            confluence_client.user_cache.set(_USER_EMAIL, user_name, email)
+    return email or None
 
 
 def _get_user(confluence_client: OnyxConfluence, user_id: str) -> str:
@@ -910,8 +965,8 @@ def _get_user(confluence_client: OnyxConfluence, user_id: str) -> str:
     Returns:
         str: The User Display Name. 'Unknown User' if the user is deactivated or not found
     """
-    global _USER_ID_TO_DISPLAY_NAME_CACHE
-    if _USER_ID_TO_DISPLAY_NAME_CACHE.get(user_id) is None:
+    found_display_name = confluence_client.user_cache.get(_USER_DISPLAY_NAME, user_id)
+    if found_display_name is None:
         try:
             result = confluence_client.get_user_details_by_userkey(user_id)
             found_display_name = result.get("displayName")
@@ -925,9 +980,21 @@ def _get_user(confluence_client: OnyxConfluence, user_id: str) -> str:
             except Exception:
                 found_display_name = None
 
-        _USER_ID_TO_DISPLAY_NAME_CACHE[user_id] = found_display_name
+        confluence_client.user_cache.set(
+            _USER_DISPLAY_NAME, user_id, found_display_name or ""
+        )
+
+    return found_display_name or _USER_NOT_FOUND
+
 
-    return _USER_ID_TO_DISPLAY_NAME_CACHE.get(user_id) or _USER_NOT_FOUND
+def get_user_mentions(confluence_objects: list[dict[str, Any]]) -> list[str]:
+    """Ids of the users mentioned in the bodies of the given Confluence objects"""
+    user_ids: list[str] = []
+    for confluence_object in confluence_objects:
+        body = confluence_object.get("body", {})
+        object_html = body.get("storage", body.get("view", {})).get("value") or ""
+        user_ids.extend(_USER_MENTION_PATTERN.findall(object_html))
+    return list(dict.fromkeys(user_ids))
 
 
 def extract_text_from_confluence_html(
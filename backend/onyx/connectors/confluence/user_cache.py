@@ -0,0 +1,130 @@
+import hashlib
+from typing import cast
+
+from redis import Redis
+
+from onyx.configs.app_configs import CONFLUENCE_USER_CACHE_TTL
+from onyx.redis.redis_pool import get_redis_client
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+_USER_CACHE_KEY_PREFIX = "confluence_user"
+
+# users that could not be found are looked up again sooner, they may have been
+# deactivated or the lookup may have failed
+_USER_NOT_FOUND_CACHE_TTL = 60 * 60
+
+
+class ConfluenceUserCache:
+    """Caches user attributes (display name, email) of a Confluence instance.
+
+    Values are kept in memory for the lifetime of the client and in Redis for
+    CONFLUENCE_USER_CACHE_TTL so that they are shared across the workers of a tenant.
+    An empty string is cached for users that could not be found."""
+
+    def __init__(
+        self,
+        confluence_url: str,
+        tenant_id: str | None,
+        ttl: int = CONFLUENCE_USER_CACHE_TTL,
+    ) -> None:
+        self.ttl = ttl
+        # single user lookups, the misses are looked up through the Confluence API
+        self.hits = 0
+        self.misses = 0
+
+        self._tenant_id = tenant_id
+        # user ids / user names are only unique within a Confluence instance
+        self._url_hash = hashlib.sha256(confluence_url.encode()).hexdigest()[:16]
+        self._local: dict[tuple[str, str], str] = {}
+        self._redis_client: Redis | None = None
+        self._redis_disabled = ttl <= 0
+
+    def _get_redis_client(self) -> Redis | None:
+        if self._redis_disabled:
+            return None
+        if self._redis_client is None:
+            try:
+                self._redis_client = get_redis_client(tenant_id=self._tenant_id)
+            except Exception:
+                logger.exception("Failed to get a redis client for the user cache")
+                self._redis_disabled = True
+        return self._redis_client
+
+    def _disable_redis(self) -> None:
+        # don't wait on an unreachable redis for every user lookup
+        logger.exception("Confluence user cache failed, only caching in memory")
+        self._redis_disabled = True
+
+    def _key(self, attribute: str, user_id: str) -> str:
+        # mget and pipelines don't automatically add the tenant_id prefix
+        return (
+            f"{self._tenant_id}:{_USER_CACHE_KEY_PREFIX}:{self._url_hash}:"
+            f"{attribute}:{user_id}"
+        )
+
+    def get_many(self, attribute: str, user_ids: list[str]) -> dict[str, str]:
+        """Returns the cached values of the given users, users missing from the
+        cache are left out."""
+        values: dict[str, str] = {}
+        uncached_user_ids: list[str] = []
+        for user_id in dict.fromkeys(user_ids):
+            value = self._local.get((attribute, user_id))
+            if value is None:
+                uncached_user_ids.append(user_id)
+            else:
+                values[user_id] = value
+
+        redis_client = self._get_redis_client()
+        if uncached_user_ids and redis_client is not None:
+            try:
+                redis_values = cast(
+                    list[bytes | None],
+                    redis_client.mget(
+                        [self._key(attribute, user_id) for user_id in uncached_user_ids]
+                    ),
+                )
+                for user_id, redis_value in zip(uncached_user_ids, redis_values):
+                    if redis_value is not None:
+                        value = redis_value.decode("utf-8")
+                        self._local[(attribute, user_id)] = value
+                        values[user_id] = value
+            except Exception:
+                self._disable_redis()
+
+        return values
+
+    def get(self, attribute: str, user_id: str) -> str | None:
+        value = self.get_many(attribute, [user_id]).get(user_id)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set_many(self, attribute: str, values: dict[str, str]) -> None:
+        for user_id, value in values.items():
+            self._local[(attribute, user_id)] = value
+
+        redis_client = self._get_redis_client()
+        if not values or redis_client is None:
+            return
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            for user_id, value in values.items():
+                pipe.set(
+                    self._key(attribute, user_id),
+                    value,
+                    ex=(
+                        min(self.ttl, _USER_NOT_FOUND_CACHE_TTL)
+                        if not value
+                        else self.ttl
+                    ),
+                )
+            pipe.execute()
+        except Exception:
+            self._disable_redis()
+
+    def set(self, attribute: str, user_id: str, value: str) -> None:
+        self.set_many(attribute, {user_id: value})
@@ -76,6 +76,14 @@ class BaseConnector(abc.ABC, Generic[CT]):
         """Implement if the underlying connector wants to skip/allow image downloading
         based on the application level image analysis setting."""
 
+    def set_index_attempt_scope(
+        self, cc_pair_id: int, search_settings_id: int, from_beginning: bool
+    ) -> None:
+        """Implement if the underlying connector persists state across index attempts
+        (e.g. to resume an interrupted crawl), which has to be kept apart per cc pair
+        and search settings. A from_beginning attempt re-indexes everything, so it
+        must not skip anything based on that state."""
+
     def build_dummy_checkpoint(self) -> CT:
         # TODO: find a way to make this work without type: ignore
         return ConnectorCheckpoint(has_more=True)  # type: ignore
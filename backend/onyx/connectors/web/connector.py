@@ -1,8 +1,13 @@
+import hashlib
 import io
 import ipaddress
 import random
 import socket
 import time
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from datetime import datetime
 from datetime import timezone
 from enum import Enum
@@ -12,6 +17,7 @@ from typing import Tuple
 from urllib.parse import urljoin
 from urllib.parse import urlparse
 
+import httpx
 import requests
 from bs4 import BeautifulSoup
 from oauthlib.oauth2 import BackendApplicationClient
@@ -22,6 +28,11 @@ from requests_oauthlib import OAuth2Session  # type:ignore
 from urllib3.exceptions import MaxRetryError
 
 from onyx.configs.app_configs import INDEX_BATCH_SIZE
+from onyx.configs.app_configs import POLL_CONNECTOR_OFFSET
+from onyx.configs.app_configs import WEB_CONNECTOR_CONCURRENT_FETCHES
+from onyx.configs.app_configs import WEB_CONNECTOR_CRAWL_STATE_TTL
+from onyx.configs.app_configs import WEB_CONNECTOR_HOST_REQUEST_INTERVAL
+from onyx.configs.app_configs import WEB_CONNECTOR_MAX_CONCURRENT_FETCHES_PER_HOST
 from onyx.configs.app_configs import WEB_CONNECTOR_OAUTH_CLIENT_ID
 from onyx.configs.app_configs import WEB_CONNECTOR_OAUTH_CLIENT_SECRET
 from onyx.configs.app_configs import WEB_CONNECTOR_OAUTH_TOKEN_URL
@@ -33,10 +44,17 @@ from onyx.connectors.exceptions import InsufficientPermissionsError
 from onyx.connectors.exceptions import UnexpectedValidationError
 from onyx.connectors.interfaces import GenerateDocumentsOutput
 from onyx.connectors.interfaces import LoadConnector
+from onyx.connectors.interfaces import PollConnector
+from onyx.connectors.interfaces import SecondsSinceUnixEpoch
 from onyx.connectors.models import Document
 from onyx.connectors.models import TextSection
+from onyx.connectors.web.crawler import CrawlFrontier
+from onyx.connectors.web.crawler import CrawlState
+from onyx.connectors.web.crawler import HostRateLimiter
+from onyx.connectors.web.crawler import PageValidators
 from onyx.file_processing.extract_file_text import read_pdf_file
 from onyx.file_processing.html_utils import web_html_cleanup
+from onyx.redis.redis_pool import get_redis_client
 from onyx.utils.logger import setup_logger
 from onyx.utils.sitemap import list_pages_for_site
 from shared_configs.configs import MULTI_TENANT
@@ -47,15 +65,24 @@ logger = setup_logger()
 class ScrapeSessionContext:
     """Session level context for scraping"""
 
-    def __init__(self, base_url: str, to_visit: list[str]):
+    def __init__(self, base_url: str, frontier: CrawlFrontier):
         self.base_url = base_url
-        self.to_visit = to_visit
+        self.frontier = frontier
         self.visited_links: set[str] = set()
         self.content_hashes: set[int] = set()
 
         self.doc_batch: list[Document] = []
+        # URLs that were handled since the last batch was handed off
+        self.completed_urls: list[str] = []
+
+        # validators of the previous crawls that can be used for conditional
+        # re-fetches, and the validators to store for the pages crawled since the
+        # last batch was handed off
+        self.validators: dict[str, PageValidators] = {}
+        self.new_validators: dict[str, PageValidators] = {}
 
         self.at_least_one_doc: bool = False
+        self.num_not_modified: int = 0
         self.last_error: str | None = None
         self.needs_retry: bool = False
 
@@ -77,8 +104,35 @@ class ScrapeSessionContext:
 
 
 class ScrapeResult:
-    doc: Document | None = None
-    retry: bool = False
+    def __init__(self) -> None:
+        self.doc: Document | None = None
+        self.retry: bool = False
+        self.links: set[str] = set()
+
+
+class FetchStatus(str, Enum):
+    # the page was fetched and parsed over plain HTTP
+    FETCHED = "fetched"
+    # the page didn't change since the previous crawl
+    NOT_MODIFIED = "not_modified"
+    # the page has to be rendered by a browser
+    NEEDS_BROWSER = "needs_browser"
+    FAILED = "failed"
+
+
+class FetchResult:
+    def __init__(self, url: str, status: FetchStatus) -> None:
+        self.url = url
+        self.final_url = url
+        self.status = status
+
+        self.doc: Document | None = None
+        self.content_hash: int | None = None
+        self.links: set[str] = set()
+
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.error: str | None = None
 
 
 WEB_CONNECTOR_MAX_SCROLL_ATTEMPTS = 20
@@ -111,6 +165,12 @@ DEFAULT_HEADERS = {
     "Sec-CH-UA-Platform": '"macOS"',
 }
 
+# Pages fetched over plain HTTP with less text than this are rendered by a browser
+# if they have scripts, as the content is likely loaded by javascript
+MIN_STATIC_PAGE_TEXT_LENGTH = 200
+# Responses that are retried with a browser, as they are usually caused by bot detection
+BROWSER_RETRY_STATUS_CODES = {403}
+
 # Common PDF MIME types
 PDF_MIME_TYPES = [
     "application/pdf",
@@ -244,7 +304,7 @@ def get_internal_links(
     return internal_links
 
 
-def is_pdf_content(response: requests.Response) -> bool:
+def is_pdf_content(response: requests.Response | httpx.Response) -> bool:
     """Check if the response contains PDF content based on content-type header"""
     content_type = response.headers.get("content-type", "").lower()
     return any(pdf_type in content_type for pdf_type in PDF_MIME_TYPES)
@@ -310,23 +370,57 @@ def start_playwright() -> Tuple[Playwright, BrowserContext]:
     """
     )
 
-    if (
+    oauth_headers = get_oauth_headers()
+    if oauth_headers:
+        context.set_extra_http_headers(oauth_headers)
+
+    return playwright, context
+
+
+def get_oauth_headers() -> dict[str, str]:
+    if not (
         WEB_CONNECTOR_OAUTH_CLIENT_ID
         and WEB_CONNECTOR_OAUTH_CLIENT_SECRET
         and WEB_CONNECTOR_OAUTH_TOKEN_URL
     ):
-        client = BackendApplicationClient(client_id=WEB_CONNECTOR_OAUTH_CLIENT_ID)
-        oauth = OAuth2Session(client=client)
-        token = oauth.fetch_token(
-            token_url=WEB_CONNECTOR_OAUTH_TOKEN_URL,
-            client_id=WEB_CONNECTOR_OAUTH_CLIENT_ID,
-            client_secret=WEB_CONNECTOR_OAUTH_CLIENT_SECRET,
-        )
-        context.set_extra_http_headers(
-            {"Authorization": "Bearer {}".format(token["access_token"])}
-        )
+        return {}
+
+    client = BackendApplicationClient(client_id=WEB_CONNECTOR_OAUTH_CLIENT_ID)
+    oauth = OAuth2Session(client=client)
+    token = oauth.fetch_token(
+        token_url=WEB_CONNECTOR_OAUTH_TOKEN_URL,
+        client_id=WEB_CONNECTOR_OAUTH_CLIENT_ID,
+        client_secret=WEB_CONNECTOR_OAUTH_CLIENT_SECRET,
+    )
+    return {"Authorization": "Bearer {}".format(token["access_token"])}
+
+
+def build_http_client() -> httpx.Client:
+    """The client used to fetch pages without a browser, shared by the fetcher
+    threads."""
+    headers = {
+        **DEFAULT_HEADERS,
+        **get_oauth_headers(),
+    }
+    # let httpx advertise the encodings it can actually decode
+    headers.pop("Accept-Encoding")
+    return httpx.Client(
+        headers=headers,
+        follow_redirects=True,
+        timeout=30,
+        limits=httpx.Limits(max_connections=WEB_CONNECTOR_CONCURRENT_FETCHES),
+    )
 
-    return playwright, context
+
+def page_needs_javascript(
+    has_scripts: bool, cleaned_text: str, min_text_length: int
+) -> bool:
+    """Whether a page fetched without a browser has to be rendered by one to get its
+    content."""
+    if JAVASCRIPT_DISABLED_MESSAGE in cleaned_text:
+        return True
+
+    return has_scripts and len(cleaned_text.strip()) < min_text_length
 
 
 def extract_urls_from_sitemap(sitemap_url: str) -> list[str]:
@@ -428,7 +522,16 @@ def _handle_cookies(context: BrowserContext, url: str) -> None:
         )
 
 
-class WebConnector(LoadConnector):
+class WebConnector(LoadConnector, PollConnector):
+    """Crawls with WEB_CONNECTOR_CONCURRENT_FETCHES concurrent fetchers. Pages are
+    fetched over plain HTTP and only rendered with Playwright if they need it.
+
+    load_from_state crawls every page. poll_source is used for indexing, it persists
+    the URL frontier so an interrupted crawl resumes, and re-fetches the pages of the
+    previous crawls conditionally (ETag / Last-Modified) to skip unchanged ones. That
+    state is kept per cc pair and search settings, so it's only persisted once
+    set_index_attempt_scope has been called."""
+
     MAX_RETRIES = 3
 
     def __init__(
@@ -440,11 +543,14 @@ class WebConnector(LoadConnector):
         scroll_before_scraping: bool = False,
         **kwargs: Any,
     ) -> None:
+        self.base_url = base_url
         self.mintlify_cleanup = mintlify_cleanup
         self.batch_size = batch_size
         self.recursive = False
         self.scroll_before_scraping = scroll_before_scraping
         self.web_connector_type = web_connector_type
+        self.crawl_state_scope: str | None = None
+        self.from_beginning = False
         if web_connector_type == WEB_CONNECTOR_VALID_SETTINGS.RECURSIVE.value:
             self.recursive = True
             self.to_visit_list = [_ensure_valid_url(base_url)]
@@ -485,7 +591,8 @@ class WebConnector(LoadConnector):
         initial_url: str,
         session_ctx: ScrapeSessionContext,
     ) -> ScrapeResult:
-        """Returns a ScrapeResult object with a doc and retry flag."""
+        """Renders the page with Playwright. Returns a ScrapeResult object with a
+        doc, the links found and a retry flag."""
 
         if session_ctx.playwright is None:
             raise RuntimeError("scrape_context.playwright is None")
@@ -498,35 +605,6 @@ class WebConnector(LoadConnector):
         # Handle cookies for the URL
         _handle_cookies(session_ctx.playwright_context, initial_url)
 
-        # First do a HEAD request to check content type without downloading the entire content
-        head_response = requests.head(
-            initial_url, headers=DEFAULT_HEADERS, allow_redirects=True
-        )
-        is_pdf = is_pdf_content(head_response)
-
-        if is_pdf or initial_url.lower().endswith(".pdf"):
-            # PDF files are not checked for links
-            response = requests.get(initial_url, headers=DEFAULT_HEADERS)
-            page_text, metadata, images = read_pdf_file(
-                file=io.BytesIO(response.content)
-            )
-            last_modified = response.headers.get("Last-Modified")
-
-            result.doc = Document(
-                id=initial_url,
-                sections=[TextSection(link=initial_url, text=page_text)],
-                source=DocumentSource.WEB,
-                semantic_identifier=initial_url.split("/")[-1],
-                metadata=metadata,
-                doc_updated_at=(
-                    _get_datetime_from_last_modified_header(last_modified)
-                    if last_modified
-                    else None
-                ),
-            )
-
-            return result
-
         page = session_ctx.playwright_context.new_page()
         try:
             # Can't use wait_until="networkidle" because it interferes with the scrolling behavior
@@ -552,6 +630,7 @@ class WebConnector(LoadConnector):
 
                 logger.info(f"{index}: {initial_url} redirected to {final_url}")
                 session_ctx.visited_links.add(initial_url)
+                session_ctx.frontier.mark_seen(initial_url)
 
             # If we got here, the request was successful
             if self.scroll_before_scraping:
@@ -573,12 +652,9 @@ class WebConnector(LoadConnector):
             soup = BeautifulSoup(content, "html.parser")
 
             if self.recursive:
-                internal_links = get_internal_links(
+                result.links = get_internal_links(
                     session_ctx.base_url, initial_url, soup
                 )
-                for link in internal_links:
-                    if link not in session_ctx.visited_links:
-                        session_ctx.to_visit.append(link)
 
             if page_response and str(page_response.status)[0] in ("4", "5"):
                 session_ctx.last_error = f"Skipped indexing {initial_url} due to HTTP {page_response.status} response"
@@ -637,81 +713,394 @@ class WebConnector(LoadConnector):
 
         return result
 
-    def load_from_state(self) -> GenerateDocumentsOutput:
-        """Traverses through all pages found on the website
-        and converts them into documents"""
+    def _fetch_page(
+        self,
+        client: httpx.Client,
+        rate_limiter: HostRateLimiter,
+        base_url: str,
+        url: str,
+        validators: PageValidators | None,
+    ) -> FetchResult:
+        """Fetches the page over plain HTTP, runs on the fetcher threads. Pages that
+        need a browser come back as NEEDS_BROWSER and are rendered by the caller."""
+        try:
+            protected_url_check(url)
+        except Exception as e:
+            result = FetchResult(url, FetchStatus.FAILED)
+            result.error = f"Invalid URL {url} due to {e}"
+            return result
 
-        if not self.to_visit_list:
-            raise ValueError("No URLs to visit")
+        error = ""
+        for retry_count in range(self.MAX_RETRIES):
+            if retry_count > 0:
+                # Add a random delay between retries (exponential backoff)
+                delay = min(2**retry_count + random.uniform(0, 1), 10)
+                logger.info(
+                    f"Retry {retry_count}/{self.MAX_RETRIES} for {url} after {delay:.2f}s delay"
+                )
+                time.sleep(delay)
 
-        base_url = self.to_visit_list[0]  # For the recursive case
-        check_internet_connection(base_url)  # make sure we can connect to the base url
+            try:
+                return self._fetch_page_once(
+                    client, rate_limiter, base_url, url, validators
+                )
+            except Exception as e:
+                error = f"Failed to fetch '{url}': {e}"
+                logger.warning(error)
 
-        session_ctx = ScrapeSessionContext(base_url, self.to_visit_list)
-        session_ctx.initialize()
+        result = FetchResult(url, FetchStatus.FAILED)
+        result.error = error
+        return result
 
-        while session_ctx.to_visit:
-            initial_url = session_ctx.to_visit.pop()
-            if initial_url in session_ctx.visited_links:
-                continue
-            session_ctx.visited_links.add(initial_url)
+    def _fetch_page_once(
+        self,
+        client: httpx.Client,
+        rate_limiter: HostRateLimiter,
+        base_url: str,
+        url: str,
+        validators: PageValidators | None,
+    ) -> FetchResult:
+        with rate_limiter.limit(url):
+            response = client.get(
+                url, headers=validators.request_headers() if validators else None
+            )
 
+        final_url = str(response.url)
+        if final_url != url:
             try:
-                protected_url_check(initial_url)
+                protected_url_check(final_url)
             except Exception as e:
-                session_ctx.last_error = f"Invalid URL {initial_url} due to {e}"
-                logger.warning(session_ctx.last_error)
-                continue
+                result = FetchResult(url, FetchStatus.FAILED)
+                result.error = f"Invalid URL {final_url} due to {e}"
+                return result
+
+        if response.status_code == 304:
+            result = FetchResult(url, FetchStatus.NOT_MODIFIED)
+        elif response.status_code in BROWSER_RETRY_STATUS_CODES:
+            result = FetchResult(url, FetchStatus.NEEDS_BROWSER)
+        elif response.status_code == 429 or response.status_code >= 500:
+            # retried
+            response.raise_for_status()
+            raise RuntimeError(f"Unexpected HTTP {response.status_code} response")
+        elif response.status_code >= 400:
+            result = FetchResult(url, FetchStatus.FAILED)
+            result.error = (
+                f"Skipped indexing {url} due to HTTP {response.status_code} response"
+            )
+            return result
+        else:
+            result = FetchResult(url, FetchStatus.FETCHED)
 
-            index = len(session_ctx.visited_links)
-            logger.info(f"{index}: Visiting {initial_url}")
+        result.final_url = final_url
+        result.etag = response.headers.get("ETag")
+        result.last_modified = response.headers.get("Last-Modified")
+        if result.status != FetchStatus.FETCHED:
+            return result
 
-            # Add retry mechanism with exponential backoff
-            retry_count = 0
+        doc_updated_at = (
+            _get_datetime_from_last_modified_header(result.last_modified)
+            if result.last_modified
+            else None
+        )
 
-            while retry_count < self.MAX_RETRIES:
-                if retry_count > 0:
-                    # Add a random delay between retries (exponential backoff)
-                    delay = min(2**retry_count + random.uniform(0, 1), 10)
+        if is_pdf_content(response) or url.lower().endswith(".pdf"):
+            # PDF files are not checked for links
+            page_text, metadata, _ = read_pdf_file(file=io.BytesIO(response.content))
+            result.doc = Document(
+                id=url,
+                sections=[TextSection(link=url, text=page_text)],
+                source=DocumentSource.WEB,
+                semantic_identifier=url.split("/")[-1],
+                metadata=metadata,
+                doc_updated_at=doc_updated_at,
+            )
+            return result
+
+        content_type = response.headers.get("content-type", "").lower()
+        if self.scroll_before_scraping or "html" not in content_type:
+            result.status = FetchStatus.NEEDS_BROWSER
+            return result
+
+        soup = BeautifulSoup(response.text, "html.parser")
+        # the cleanup below drops the scripts
+        has_scripts = soup.find("script") is not None
+        if self.recursive:
+            result.links = get_internal_links(base_url, final_url, soup)
+
+        parsed_html = web_html_cleanup(soup, self.mintlify_cleanup)
+        if page_needs_javascript(
+            has_scripts, parsed_html.cleaned_text, MIN_STATIC_PAGE_TEXT_LENGTH
+        ):
+            result.status = FetchStatus.NEEDS_BROWSER
+            return result
+
+        result.content_hash = hash((parsed_html.title, parsed_html.cleaned_text))
+        result.doc = Document(
+            id=url,
+            sections=[TextSection(link=url, text=parsed_html.cleaned_text)],
+            source=DocumentSource.WEB,
+            semantic_identifier=parsed_html.title or url,
+            metadata={},
+            doc_updated_at=doc_updated_at,
+        )
+        return result
+
+    def _scrape_with_browser(
+        self, index: int, url: str, session_ctx: ScrapeSessionContext
+    ) -> ScrapeResult | None:
+        """Returns None if the page couldn't be scraped."""
+        # Add retry mechanism with exponential backoff
+        for retry_count in range(self.MAX_RETRIES):
+            if retry_count > 0:
+                # Add a random delay between retries (exponential backoff)
+                delay = min(2**retry_count + random.uniform(0, 1), 10)
+                logger.info(
+                    f"Retry {retry_count}/{self.MAX_RETRIES} for {url} after {delay:.2f}s delay"
+                )
+                time.sleep(delay)
+
+            try:
+                # the browser is only started once a page needs it
+                if session_ctx.playwright is None:
+                    session_ctx.initialize()
+
+                result = self._do_scrape(index, url, session_ctx)
+                if result.retry:
+                    continue
+
+                return result
+            except Exception as e:
+                session_ctx.last_error = f"Failed to fetch '{url}': {e}"
+                logger.exception(session_ctx.last_error)
+                session_ctx.initialize()
+
+        return None
+
+    def _handle_fetch_result(
+        self,
+        index: int,
+        result: FetchResult,
+        session_ctx: ScrapeSessionContext,
+        window_end: float | None,
+    ) -> None:
+        url = result.url
+        session_ctx.completed_urls.append(url)
+
+        if result.status == FetchStatus.FAILED:
+            session_ctx.last_error = result.error
+            logger.warning(session_ctx.last_error)
+            return
+
+        if result.status == FetchStatus.NOT_MODIFIED:
+            previous_validators = session_ctx.validators.get(url)
+            if previous_validators is None:
+                session_ctx.last_error = f"Unexpected HTTP 304 response for {url}"
+                logger.warning(session_ctx.last_error)
+                return
+
+            logger.info(f"{index}: Skipping unchanged {url}")
+            session_ctx.num_not_modified += 1
+            # carry on crawling from the links of the previous crawl
+            session_ctx.frontier.add(previous_validators.links)
+            if window_end is not None:
+                session_ctx.new_validators[url] = PageValidators(
+                    etag=result.etag or previous_validators.etag,
+                    last_modified=(
+                        result.last_modified or previous_validators.last_modified
+                    ),
+                    links=previous_validators.links,
+                    window_end=window_end,
+                )
+            return
+
+        doc: Document | None = None
+        links: set[str] = set()
+        if result.status == FetchStatus.NEEDS_BROWSER:
+            # redirects are handled by _do_scrape
+            scrape_result = self._scrape_with_browser(index, url, session_ctx)
+            if scrape_result is None:
+                return
+            doc = scrape_result.doc
+            links = scrape_result.links
+        else:
+            if result.final_url != url:
+                if result.final_url in session_ctx.visited_links:
                     logger.info(
-                        f"Retry {retry_count}/{self.MAX_RETRIES} for {initial_url} after {delay:.2f}s delay"
+                        f"{index}: {url} redirected to {result.final_url} - already indexed"
                     )
-                    time.sleep(delay)
+                    return
+
+                logger.info(f"{index}: {url} redirected to {result.final_url}")
+                session_ctx.visited_links.add(result.final_url)
+                session_ctx.frontier.mark_seen(result.final_url)
+
+            # Sometimes pages with #! will serve duplicate content
+            # There are also just other ways this can happen
+            if (
+                result.content_hash is not None
+                and result.content_hash in session_ctx.content_hashes
+            ):
+                logger.info(f"{index}: Skipping duplicate title + content for {url}")
+            else:
+                if result.content_hash is not None:
+                    session_ctx.content_hashes.add(result.content_hash)
+                doc = result.doc
+            links = result.links
+
+        new_links = session_ctx.frontier.add(links)
+        if window_end is not None and (result.etag or result.last_modified):
+            session_ctx.new_validators[url] = PageValidators(
+                etag=result.etag,
+                last_modified=result.last_modified,
+                links=new_links,
+                window_end=window_end,
+            )
+
+        if doc:
+            session_ctx.doc_batch.append(doc)
+
+    def set_index_attempt_scope(
+        self, cc_pair_id: int, search_settings_id: int, from_beginning: bool
+    ) -> None:
+        self.crawl_state_scope = f"{cc_pair_id}:{search_settings_id}"
+        self.from_beginning = from_beginning
+
+    def _crawl_key(self) -> str:
+        return hashlib.sha256(
+            f"{self.crawl_state_scope}:{self.web_connector_type}:{self.base_url}".encode()
+        ).hexdigest()
+
+    def _crawl(
+        self, poll_window: tuple[float, float] | None
+    ) -> GenerateDocumentsOutput:
+        """Traverses through all pages found on the website
+        and converts them into documents"""
+
+        if not self.to_visit_list:
+            raise ValueError("No URLs to visit")
+
+        base_url = self.to_visit_list[0]  # For the recursive case
+        check_internet_connection(base_url)  # make sure we can connect to the base url
 
-                try:
-                    result = self._do_scrape(index, initial_url, session_ctx)
-                    if result.retry:
+        # Only crawls for indexing are resumed and skip unchanged pages. Other crawls
+        # (e.g. for pruning) have to come across every page.
+        crawl_state = CrawlState(
+            get_redis_client() if poll_window and self.crawl_state_scope else None,
+            self._crawl_key(),
+            WEB_CONNECTOR_CRAWL_STATE_TTL,
+        )
+        frontier = CrawlFrontier(crawl_state)
+        if frontier.resume():
+            logger.info(f"Resuming the crawl of {base_url}: {len(frontier)} URLs left")
+        else:
+            frontier.add(self.to_visit_list)
+
+        session_ctx = ScrapeSessionContext(base_url, frontier)
+
+        window_end: float | None = None
+        if poll_window:
+            window_start, window_end = poll_window
+            # Indexing from the beginning re-fetches every page, its window starts
+            # at 0 or at the connector's indexing start. Otherwise the window starts
+            # POLL_CONNECTOR_OFFSET before the end of the window of the last
+            # successful index attempt, whose validators are valid, i.e. its pages
+            # are indexed with that content.
+            last_window_end = (
+                window_start + POLL_CONNECTOR_OFFSET * 60
+                if window_start > 0 and not self.from_beginning
+                else None
+            )
+            crawl_state.promote_pending_validators(last_window_end, window_end)
+            if last_window_end is not None:
+                session_ctx.validators = {
+                    url: validators
+                    for url, validators in crawl_state.load_validators().items()
+                    if validators.window_end >= window_start
+                }
+
+        client = build_http_client()
+        rate_limiter = HostRateLimiter(
+            WEB_CONNECTOR_MAX_CONCURRENT_FETCHES_PER_HOST,
+            WEB_CONNECTOR_HOST_REQUEST_INTERVAL,
+        )
+        executor = ThreadPoolExecutor(max_workers=WEB_CONNECTOR_CONCURRENT_FETCHES)
+        fetches: dict[Future[FetchResult], int] = {}
+        try:
+            while True:
+                while len(fetches) < WEB_CONNECTOR_CONCURRENT_FETCHES:
+                    initial_url = frontier.pop()
+                    if initial_url is None:
+                        break
+
+                    if initial_url in session_ctx.visited_links:
+                        session_ctx.completed_urls.append(initial_url)
                         continue
+                    session_ctx.visited_links.add(initial_url)
+
+                    index = len(session_ctx.visited_links)
+                    logger.info(f"{index}: Visiting {initial_url}")
+                    future = executor.submit(
+                        self._fetch_page,
+                        client,
+                        rate_limiter,
+                        base_url,
+                        initial_url,
+                        session_ctx.validators.get(initial_url),
+                    )
+                    fetches[future] = index
 
-                    if result.doc:
-                        session_ctx.doc_batch.append(result.doc)
-                except Exception as e:
-                    session_ctx.last_error = f"Failed to fetch '{initial_url}': {e}"
-                    logger.exception(session_ctx.last_error)
-                    session_ctx.initialize()
-                    continue
-                finally:
-                    retry_count += 1
+                if not fetches:
+                    break
 
-                break  # success / don't retry
+                done, _ = wait(fetches, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = fetches.pop(future)
+                    self._handle_fetch_result(
+                        index, future.result(), session_ctx, window_end
+                    )
 
-            if len(session_ctx.doc_batch) >= self.batch_size:
-                session_ctx.initialize()
+                if len(session_ctx.doc_batch) >= self.batch_size:
+                    # restart the browser between batches
+                    session_ctx.stop()
+                    session_ctx.at_least_one_doc = True
+                    yield session_ctx.doc_batch
+                    session_ctx.doc_batch = []
+                    self._complete_handed_off_pages(session_ctx, crawl_state)
+
+            if session_ctx.doc_batch:
+                session_ctx.stop()
                 session_ctx.at_least_one_doc = True
                 yield session_ctx.doc_batch
                 session_ctx.doc_batch = []
+            self._complete_handed_off_pages(session_ctx, crawl_state)
+
+            frontier.clear()
 
-        if session_ctx.doc_batch:
+            if not session_ctx.at_least_one_doc and not session_ctx.num_not_modified:
+                if session_ctx.last_error:
+                    raise RuntimeError(session_ctx.last_error)
+                raise RuntimeError("No valid pages found.")
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            client.close()
             session_ctx.stop()
-            session_ctx.at_least_one_doc = True
-            yield session_ctx.doc_batch
 
-        if not session_ctx.at_least_one_doc:
-            if session_ctx.last_error:
-                raise RuntimeError(session_ctx.last_error)
-            raise RuntimeError("No valid pages found.")
+    @staticmethod
+    def _complete_handed_off_pages(
+        session_ctx: ScrapeSessionContext, crawl_state: CrawlState
+    ) -> None:
+        session_ctx.frontier.complete(session_ctx.completed_urls)
+        session_ctx.completed_urls = []
+        crawl_state.save_pending_validators(session_ctx.new_validators)
+        session_ctx.new_validators = {}
+
+    def load_from_state(self) -> GenerateDocumentsOutput:
+        return self._crawl(poll_window=None)
 
-        session_ctx.stop()
+    def poll_source(
+        self, start: SecondsSinceUnixEpoch, end: SecondsSinceUnixEpoch
+    ) -> GenerateDocumentsOutput:
+        return self._crawl(poll_window=(start, end))
 
     def validate_connector_settings(self) -> None:
         # Make sure we have at least one valid URL to check
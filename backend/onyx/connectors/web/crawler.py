@@ -0,0 +1,280 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Iterable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import cast
+from urllib.parse import urlparse
+
+from pydantic import BaseModel
+from redis import Redis
+from redis.exceptions import RedisError
+
+from onyx.redis.redis_pool import TenantRedis
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+_CRAWL_STATE_PREFIX = "webcrawl"
+
+
+class HostRateLimiter:
+    """Limits the number of concurrent requests to each host and spaces out the
+    requests to the same host by at least min_interval seconds. Thread safe."""
+
+    def __init__(self, max_concurrent_per_host: int, min_interval: float) -> None:
+        self.max_concurrent_per_host = max_concurrent_per_host
+        self.min_interval = min_interval
+
+        self._lock = threading.Lock()
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._next_request_times: dict[str, float] = {}
+
+    @contextmanager
+    def limit(self, url: str) -> Iterator[None]:
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(
+                host, threading.BoundedSemaphore(self.max_concurrent_per_host)
+            )
+
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                request_time = max(now, self._next_request_times.get(host, 0.0))
+                self._next_request_times[host] = request_time + self.min_interval
+
+            if request_time > now:
+                time.sleep(request_time - now)
+
+            yield
+
+
+class PageValidators(BaseModel):
+    """What is needed to conditionally re-fetch a page and to carry on crawling
+    when the page turns out to be unchanged."""
+
+    etag: str | None = None
+    last_modified: str | None = None
+    # links that were first discovered on this page. Only these are stored (rather
+    # than all the links on the page) so the total size stays linear in the number of
+    # pages, every other link of the page is owned by the page it was found on first
+    links: list[str] = []
+    # end of the poll window of the crawl that fetched the page
+    window_end: float
+
+    def request_headers(self) -> dict[str, str]:
+        headers: dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class CrawlState:
+    """Crawl state that outlives a single crawl, stored in redis under crawl_key:
+    - the URL frontier, so an interrupted crawl resumes where it left off
+    - the validators of the pages, for conditional re-fetches. The validators of a
+      crawl stay pending until its index attempt succeeded, otherwise the pages it
+      handed off but that never got indexed would be skipped as unchanged
+
+    Redis is only used to persist the state, failures to read or write it are logged
+    and the crawl carries on without it."""
+
+    def __init__(self, redis_client: Redis | None, crawl_key: str, ttl: int) -> None:
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+        key_prefix = f"{_CRAWL_STATE_PREFIX}:{crawl_key}"
+        # pipelines, hscan_iter and all but the first key of a command don't
+        # automatically get the tenant_id prefix
+        if isinstance(redis_client, TenantRedis):
+            key_prefix = f"{redis_client.tenant_id}:{key_prefix}"
+        self.seen_key = f"{key_prefix}:seen"
+        self.pending_key = f"{key_prefix}:pending"
+        self.validators_key = f"{key_prefix}:validators"
+        self.pending_validators_key = f"{key_prefix}:pending_validators"
+
+    def _handle_error(self, action: str) -> None:
+        logger.exception(
+            f"Failed to {action} the web crawl state, continuing without persisting it"
+        )
+        self.redis_client = None
+
+    def load_frontier(self) -> tuple[set[str], set[str]]:
+        """Returns the URLs seen and the URLs not yet completed by the previous
+        crawl, both empty if there is nothing to resume."""
+        if self.redis_client is None:
+            return set(), set()
+
+        try:
+            pending = cast(set[bytes], self.redis_client.smembers(self.pending_key))
+            if not pending:
+                return set(), set()
+            seen = cast(set[bytes], self.redis_client.smembers(self.seen_key))
+        except RedisError:
+            self._handle_error("load")
+            return set(), set()
+
+        return {url.decode() for url in seen}, {url.decode() for url in pending}
+
+    def add_to_frontier(self, urls: list[str]) -> None:
+        if self.redis_client is None or not urls:
+            return
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.sadd(self.seen_key, *urls)
+            pipe.sadd(self.pending_key, *urls)
+            pipe.expire(self.seen_key, self.ttl)
+            pipe.expire(self.pending_key, self.ttl)
+            pipe.execute()
+        except RedisError:
+            self._handle_error("update")
+
+    def complete_in_frontier(self, urls: list[str]) -> None:
+        if self.redis_client is None or not urls:
+            return
+
+        try:
+            self.redis_client.srem(self.pending_key, *urls)
+        except RedisError:
+            self._handle_error("update")
+
+    def clear_frontier(self) -> None:
+        if self.redis_client is None:
+            return
+
+        try:
+            self.redis_client.delete(self.seen_key, self.pending_key)
+        except RedisError:
+            self._handle_error("clear")
+
+    def load_validators(self) -> dict[str, PageValidators]:
+        if self.redis_client is None:
+            return {}
+
+        validators: dict[str, PageValidators] = {}
+        try:
+            for url, raw in self.redis_client.hscan_iter(self.validators_key):
+                validators[url.decode()] = PageValidators.model_validate_json(raw)
+        except RedisError:
+            self._handle_error("load")
+            return {}
+
+        return validators
+
+    def save_pending_validators(self, validators: dict[str, PageValidators]) -> None:
+        if self.redis_client is None or not validators:
+            return
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(
+                self.pending_validators_key,
+                mapping={
+                    url: page_validators.model_dump_json()
+                    for url, page_validators in validators.items()
+                },
+            )
+            pipe.expire(self.pending_validators_key, self.ttl)
+            pipe.execute()
+        except RedisError:
+            self._handle_error("update")
+
+    def promote_pending_validators(
+        self, last_window_end: float | None, window_end: float
+    ) -> None:
+        """Promotes the pending validators of the crawl that ended at last_window_end,
+        i.e. of the last successful index attempt, and keeps the ones of the crawl
+        being resumed (same window_end). The rest are from failed attempts and are
+        dropped."""
+        if self.redis_client is None:
+            return
+
+        promoted: dict[str, bytes] = {}
+        dropped: list[str] = []
+        try:
+            for url, raw in self.redis_client.hscan_iter(self.pending_validators_key):
+                validators = PageValidators.model_validate_json(raw)
+                if last_window_end is not None and _same_window_end(
+                    validators.window_end, last_window_end
+                ):
+                    promoted[url.decode()] = raw
+                elif not _same_window_end(validators.window_end, window_end):
+                    dropped.append(url.decode())
+
+            if not promoted and not dropped:
+                return
+
+            pipe = self.redis_client.pipeline(transaction=False)
+            if promoted:
+                pipe.hset(self.validators_key, mapping=promoted)
+                pipe.expire(self.validators_key, self.ttl)
+            pipe.hdel(self.pending_validators_key, *promoted, *dropped)
+            pipe.execute()
+        except RedisError:
+            self._handle_error("update")
+
+
+def _same_window_end(window_end: float, other_window_end: float) -> bool:
+    # the window ends go through datetimes and back, allow for rounding
+    return abs(window_end - other_window_end) < 1
+
+
+class CrawlFrontier:
+    """The deduplicated set of URLs left to crawl.
+
+    A URL stays pending in the crawl state until complete() is called for it, i.e.
+    until the document batch it ended up in has been handed off, so resuming an
+    interrupted crawl may fetch a few pages twice but never skips one."""
+
+    def __init__(self, state: CrawlState) -> None:
+        self.state = state
+        self._seen: set[str] = set()
+        self._queue: deque[str] = deque()
+
+    def resume(self) -> bool:
+        """Loads the frontier of an interrupted crawl. Returns False if there was
+        nothing to resume."""
+        seen, pending = self.state.load_frontier()
+        if not pending:
+            return False
+
+        self._seen = seen | pending
+        self._queue = deque(pending)
+        return True
+
+    def add(self, urls: Iterable[str]) -> list[str]:
+        """Returns the URLs that weren't seen before."""
+        new_urls: list[str] = []
+        for url in urls:
+            if url in self._seen:
+                continue
+            self._seen.add(url)
+            new_urls.append(url)
+
+        self._queue.extend(new_urls)
+        self.state.add_to_frontier(new_urls)
+        return new_urls
+
+    def mark_seen(self, url: str) -> None:
+        """For URLs reached in other ways, e.g. redirects, that shouldn't be crawled
+        again."""
+        self._seen.add(url)
+
+    def pop(self) -> str | None:
+        if not self._queue:
+            return None
+        return self._queue.pop()
+
+    def complete(self, urls: list[str]) -> None:
+        self.state.complete_in_frontier(urls)
+
+    def clear(self) -> None:
+        self.state.clear_frontier()
+
+    def __len__(self) -> int:
+        return len(self._queue)
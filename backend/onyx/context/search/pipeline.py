@@ -13,6 +13,7 @@ from onyx.chat.prune_and_merge import ChunkRange
 from onyx.chat.prune_and_merge import merge_chunk_intervals
 from onyx.chat.prune_and_merge import prune_and_merge_sections
 from onyx.configs.chat_configs import DISABLE_LLM_DOC_RELEVANCE
+from onyx.configs.chat_configs import SEARCH_PREFETCH_SURROUNDING_CHUNKS
 from onyx.context.search.enums import LLMEvaluationType
 from onyx.context.search.enums import QueryFlow
 from onyx.context.search.enums import SearchType
@@ -29,6 +30,7 @@ from onyx.context.search.preprocessing.preprocessing import retrieval_preprocess
 from onyx.context.search.retrieval.search_runner import (
     retrieve_chunks,
 )
+from onyx.context.search.retrieval.search_runner import SurroundingChunks
 from onyx.context.search.utils import inference_section_from_chunks
 from onyx.context.search.utils import relevant_sections_to_indices
 from onyx.db.models import User
@@ -91,6 +93,11 @@ class SearchPipeline:
 
         # Initial document index retrieval chunks
         self._retrieved_chunks: list[InferenceChunk] | None = None
+        # Chunks around the retrieved chunks, fetched during retrieval if it had to make
+        # a second call to the document index anyway
+        self._surrounding_chunks: SurroundingChunks | None = (
+            SurroundingChunks() if SEARCH_PREFETCH_SURROUNDING_CHUNKS else None
+        )
         # Another call made to the document index to get surrounding sections
         self._retrieved_sections: list[InferenceSection] | None = None
 
@@ -162,6 +169,7 @@ class SearchPipeline:
             document_index=self.document_index,
             db_session=self.db_session,
             retrieval_metrics_callback=self.retrieval_metrics_callback,
+            surrounding_chunks=self._surrounding_chunks,
         )
 
         return cast(list[InferenceChunk], self._retrieved_chunks)
@@ -282,6 +290,17 @@ class SearchPipeline:
             if above == below == 0:
                 inference_chunks.extend(chunk_range.chunks)
 
+            elif (
+                self._surrounding_chunks is not None
+                and self._surrounding_chunks.covers(
+                    chunk_range.chunks[0].document_id,
+                    chunk_range.start,
+                    chunk_range.end,
+                )
+            ):
+                # already fetched during retrieval
+                continue
+
             else:
                 chunk_requests.append(
                     VespaChunkRequest(
@@ -302,9 +321,14 @@ class SearchPipeline:
                 )
             )
 
-        doc_chunk_ind_to_chunk = {
-            (chunk.document_id, chunk.chunk_id): chunk for chunk in inference_chunks
-        }
+        doc_chunk_ind_to_chunk = (
+            dict(self._surrounding_chunks.chunks)
+            if self._surrounding_chunks is not None
+            else {}
+        )
+        doc_chunk_ind_to_chunk.update(
+            {(chunk.document_id, chunk.chunk_id): chunk for chunk in inference_chunks}
+        )
 
         # In case of failed parallel calls to Vespa, at least we should have the initial retrieved chunks
         doc_chunk_ind_to_chunk.update(
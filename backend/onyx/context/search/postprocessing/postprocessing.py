@@ -1,4 +1,5 @@
 import base64
+import hashlib
 from collections.abc import Callable
 from collections.abc import Iterator
 from typing import cast
@@ -7,6 +8,7 @@ import numpy
 from langchain_core.messages import BaseMessage
 from langchain_core.messages import HumanMessage
 from langchain_core.messages import SystemMessage
+from redis import Redis
 
 from onyx.chat.models import SectionRelevancePiece
 from onyx.configs.app_configs import BLURB_SIZE
@@ -16,6 +18,9 @@ from onyx.configs.constants import RETURN_SEPARATOR
 from onyx.configs.llm_configs import get_search_time_image_analysis_enabled
 from onyx.configs.model_configs import CROSS_ENCODER_RANGE_MAX
 from onyx.configs.model_configs import CROSS_ENCODER_RANGE_MIN
+from onyx.configs.model_configs import RERANK_ADAPTIVE_INITIAL_COUNT
+from onyx.configs.model_configs import RERANK_ADAPTIVE_MIN_SCORE_SPREAD
+from onyx.configs.model_configs import RERANK_SCORE_CACHE_TTL
 from onyx.context.search.enums import LLMEvaluationType
 from onyx.context.search.models import ChunkMetric
 from onyx.context.search.models import InferenceChunk
@@ -32,6 +37,7 @@ from onyx.file_store.file_store import get_default_file_store
 from onyx.llm.interfaces import LLM
 from onyx.llm.utils import message_to_string
 from onyx.natural_language_processing.search_nlp_models import RerankingModel
+from onyx.redis.redis_pool import get_redis_client
 from onyx.secondary_llm_flows.chunk_usefulness import llm_batch_eval_sections
 from onyx.utils.logger import setup_logger
 from onyx.utils.threadpool_concurrency import FunctionCall
@@ -157,6 +163,8 @@ def update_image_sections_with_query(
 
 logger = setup_logger()
 
+_RERANK_SCORE_KEY_PREFIX = "rerank_score"
+
 
 def _log_top_section_links(search_flow: str, sections: list[InferenceSection]) -> None:
     top_links = [
@@ -215,6 +223,97 @@ def cleanup_chunks(chunks: list[InferenceChunkUncleaned]) -> list[InferenceChunk
     return [chunk.to_inference_chunk() for chunk in chunks]
 
 
+def _rerank_score_keys(
+    query_str: str,
+    rerank_settings: RerankingDetails,
+    chunks: list[InferenceChunk],
+    passages: list[str],
+) -> list[str]:
+    # the passage is part of the key so that a chunk that was reindexed with different
+    # content isn't given the score of its old content
+    scope = hashlib.sha256(
+        f"{rerank_settings.rerank_provider_type}:{rerank_settings.rerank_api_url}:"
+        f"{rerank_settings.rerank_model_name}:{query_str}".encode()
+    ).hexdigest()[:32]
+    return [
+        f"{_RERANK_SCORE_KEY_PREFIX}:{scope}:{chunk.unique_id}:"
+        f"{hashlib.sha256(passage.encode()).hexdigest()[:16]}"
+        for chunk, passage in zip(chunks, passages)
+    ]
+
+
+def _get_cached_rerank_scores(
+    redis_client: Redis, keys: list[str]
+) -> list[float | None]:
+    if RERANK_SCORE_CACHE_TTL <= 0 or not keys:
+        return [None] * len(keys)
+
+    try:
+        cached_scores = cast(list[bytes | None], redis_client.mget(keys))
+    except Exception:
+        logger.exception("Failed to read the cached rerank scores from redis")
+        return [None] * len(keys)
+
+    return [float(score) if score is not None else None for score in cached_scores]
+
+
+def _cache_rerank_scores(redis_client: Redis, scores_by_key: dict[str, float]) -> None:
+    if RERANK_SCORE_CACHE_TTL <= 0 or not scores_by_key:
+        return
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key, score in scores_by_key.items():
+            pipe.set(key, str(score), ex=RERANK_SCORE_CACHE_TTL)
+        pipe.execute()
+    except Exception:
+        logger.exception("Failed to cache the rerank scores in redis")
+
+
+def _predict_rerank_scores(
+    query_str: str,
+    rerank_settings: RerankingDetails,
+    cross_encoder: RerankingModel,
+    redis_client: Redis,
+    chunks: list[InferenceChunk],
+) -> list[float]:
+    """Cross encoder scores of the chunks, only the chunks without a cached score for
+    this query are sent to the model."""
+    passages = [
+        f"{chunk.semantic_identifier or chunk.title or ''}\n{chunk.content}"
+        for chunk in chunks
+    ]
+    keys = _rerank_score_keys(query_str, rerank_settings, chunks, passages)
+    scores = _get_cached_rerank_scores(redis_client, keys)
+
+    uncached_inds = [ind for ind, score in enumerate(scores) if score is None]
+    if uncached_inds:
+        new_scores = cross_encoder.predict(
+            query=query_str, passages=[passages[ind] for ind in uncached_inds]
+        )
+        for ind, score in zip(uncached_inds, new_scores):
+            scores[ind] = score
+        _cache_rerank_scores(
+            redis_client,
+            {keys[ind]: score for ind, score in zip(uncached_inds, new_scores)},
+        )
+
+    logger.debug(
+        f"Rerank scores: cached={len(chunks) - len(uncached_inds)} "
+        f"predicted={len(uncached_inds)}"
+    )
+    return cast(list[float], scores)
+
+
+def _rerank_scores_are_flat(
+    scores: list[float], model_min: int, model_max: int
+) -> bool:
+    """Flat scores don't tell the relevant chunks apart from the rest, more chunks need
+    to be reranked to find them."""
+    normalized_scores = (numpy.array(scores) - model_min) / (model_max - model_min)
+    return bool(numpy.std(normalized_scores) < RERANK_ADAPTIVE_MIN_SCORE_SPREAD)
+
+
 @log_function_time(print_only=True)
 def semantic_reranking(
     query_str: str,
@@ -227,6 +326,9 @@ def semantic_reranking(
     """Reranks chunks based on cross-encoder models. Additionally provides the original indices
     of the chunks in their new sorted order.
 
+    With RERANK_ADAPTIVE_INITIAL_COUNT set, fewer than num_rerank chunks may be reranked,
+    the reranked chunks are always the first ones of the given chunks.
+
     Note: this updates the chunks in place, it updates the chunk scores which came from retrieval
     """
     assert (
@@ -241,12 +343,30 @@ def semantic_reranking(
         api_key=rerank_settings.rerank_api_key,
         api_url=rerank_settings.rerank_api_url,
     )
+    redis_client = get_redis_client()
+
+    num_to_rerank = len(chunks_to_rerank)
+    if 0 < RERANK_ADAPTIVE_INITIAL_COUNT < num_to_rerank:
+        num_to_rerank = RERANK_ADAPTIVE_INITIAL_COUNT
+
+    sim_scores_floats: list[float] = []
+    while True:
+        sim_scores_floats.extend(
+            _predict_rerank_scores(
+                query_str,
+                rerank_settings,
+                cross_encoder,
+                redis_client,
+                chunks_to_rerank[len(sim_scores_floats) : num_to_rerank],
+            )
+        )
+        if num_to_rerank >= len(chunks_to_rerank) or not _rerank_scores_are_flat(
+            sim_scores_floats, model_min, model_max
+        ):
+            break
+        num_to_rerank = min(2 * num_to_rerank, len(chunks_to_rerank))
 
-    passages = [
-        f"{chunk.semantic_identifier or chunk.title or ''}\n{chunk.content}"
-        for chunk in chunks_to_rerank
-    ]
-    sim_scores_floats = cross_encoder.predict(query=query_str, passages=passages)
+    chunks_to_rerank = chunks_to_rerank[:num_to_rerank]
 
     # Old logic to handle multiple cross-encoders preserved but not used
     sim_scores = [numpy.array(sim_scores_floats)]
@@ -338,7 +458,7 @@ def rerank_sections(
         chunks=chunks_to_rerank,
         rerank_metrics_callback=rerank_metrics_callback,
     )
-    lower_chunks = chunks_to_rerank[rerank_settings.num_rerank :]
+    lower_chunks = chunks_to_rerank[len(ranked_chunks) :]
 
     # Scores from rerank cannot be meaningfully combined with scores without rerank
     # However the ordering is still important
@@ -1,4 +1,6 @@
 import string
+import threading
+from collections import defaultdict
 from collections.abc import Callable
 from uuid import UUID
 
@@ -42,6 +44,74 @@ from shared_configs.model_server_models import Embedding
 logger = setup_logger()
 
 
+class SurroundingChunks:
+    """Chunks around the retrieved chunks that were fetched along with the chunks
+    referenced by the retrieved large chunks, so that expanding the retrieved chunks
+    into sections doesn't need another round trip to the document index for them.
+
+    Thread safe, the retrievals for the different query rephrasings run in parallel."""
+
+    def __init__(self) -> None:
+        self.chunks: dict[tuple[str, int], InferenceChunk] = {}
+        # document id -> fetched (start, end) chunk index ranges, both inclusive
+        self._ranges: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(
+        self,
+        ranges: dict[str, list[tuple[int, int]]],
+        chunks: list[InferenceChunk],
+    ) -> None:
+        with self._lock:
+            for document_id, document_ranges in ranges.items():
+                self._ranges[document_id].extend(document_ranges)
+            for chunk in chunks:
+                self.chunks[(chunk.document_id, chunk.chunk_id)] = chunk
+
+    def covers(self, document_id: str, start: int, end: int) -> bool:
+        """Whether all the chunks of the document from start to end (inclusive) that
+        exist were fetched."""
+        with self._lock:
+            return any(
+                fetched_start <= start and end <= fetched_end
+                for fetched_start, fetched_end in self._ranges.get(document_id, [])
+            )
+
+
+def _merge_ranges(ranges: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged_ranges: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged_ranges and merged_ranges[-1][1] >= start - 1:
+            merged_ranges[-1] = (merged_ranges[-1][0], max(merged_ranges[-1][1], end))
+        else:
+            merged_ranges.append((start, end))
+    return merged_ranges
+
+
+def _surrounding_chunk_ranges(
+    chunks: list[InferenceChunkUncleaned], chunks_above: int, chunks_below: int
+) -> dict[str, list[tuple[int, int]]]:
+    """The merged ranges of chunk indices, per document, that cover the retrieved
+    chunks, the chunks referenced by the retrieved large chunks and the chunks_above /
+    chunks_below around each of them."""
+    ranges: dict[str, list[tuple[int, int]]] = defaultdict(list)
+    for chunk in chunks:
+        if chunk.large_chunk_reference_ids:
+            start = chunk.large_chunk_reference_ids[0]
+            end = chunk.large_chunk_reference_ids[-1]
+        else:
+            start = end = chunk.chunk_id
+        # No max known ahead of time, filter will handle this anyway
+        ranges[chunk.document_id].append(
+            (max(0, start - chunks_above), end + chunks_below)
+        )
+
+    return {
+        document_id: _merge_ranges(document_ranges)
+        for document_id, document_ranges in ranges.items()
+    }
+
+
 def _dedupe_chunks(
     chunks: list[InferenceChunkUncleaned],
 ) -> list[InferenceChunkUncleaned]:
@@ -121,12 +191,17 @@ def doc_index_retrieval(
     query: SearchQuery,
     document_index: DocumentIndex,
     db_session: Session,
+    surrounding_chunks: SurroundingChunks | None = None,
 ) -> list[InferenceChunk]:
     """
     This function performs the search to retrieve the chunks,
     extracts chunks from the large chunks, persists the scores
     from the large chunks to the referenced chunks,
     dedupes the chunks, and cleans the chunks.
+
+    If surrounding_chunks is given and the chunks referenced by large chunks need to be
+    fetched, the chunks above and below the retrieved chunks are fetched in the same
+    call and added to it.
     """
     query_embedding = query.precomputed_query_embedding or get_query_embedding(
         query.query, db_session
@@ -274,6 +349,27 @@ def doc_index_retrieval(
     if not retrieval_requests:
         return cleanup_chunks(normal_chunks)
 
+    fetch_surrounding_chunks = (
+        surrounding_chunks is not None
+        and not query.full_doc
+        and (query.chunks_above > 0 or query.chunks_below > 0)
+    )
+    surrounding_chunk_ranges: dict[str, list[tuple[int, int]]] = {}
+    if fetch_surrounding_chunks:
+        surrounding_chunk_ranges = _surrounding_chunk_ranges(
+            top_chunks, query.chunks_above, query.chunks_below
+        )
+        # these ranges cover the referenced chunks as well
+        retrieval_requests = [
+            VespaChunkRequest(
+                document_id=replace_invalid_doc_id_characters(document_id),
+                min_chunk_ind=start,
+                max_chunk_ind=end,
+            )
+            for document_id, document_ranges in surrounding_chunk_ranges.items()
+            for start, end in document_ranges
+        ]
+
     # Retrieve and return the referenced normal chunks from the large chunks
     retrieved_inference_chunks = document_index.id_based_retrieval(
         chunk_requests=retrieval_requests,
@@ -281,16 +377,30 @@ def doc_index_retrieval(
         batch_retrieval=True,
     )
 
+    if surrounding_chunks is not None and fetch_surrounding_chunks:
+        # cleaned copies, cleaning the chunks modifies them
+        surrounding_chunks.add(
+            surrounding_chunk_ranges,
+            cleanup_chunks(
+                [chunk.model_copy() for chunk in retrieved_inference_chunks]
+            ),
+        )
+
     # Apply the scores from the large chunks to the chunks referenced
     # by each large chunk
+    referenced_chunks: list[InferenceChunkUncleaned] = []
     for chunk in retrieved_inference_chunks:
         if (chunk.document_id, chunk.chunk_id) in referenced_chunk_scores:
             chunk.score = referenced_chunk_scores[(chunk.document_id, chunk.chunk_id)]
             referenced_chunk_scores.pop((chunk.document_id, chunk.chunk_id))
+        elif fetch_surrounding_chunks:
+            # only fetched as the surroundings of a retrieved chunk
+            continue
         else:
             logger.error(
                 f"Chunk {chunk.document_id} {chunk.chunk_id} not found in referenced chunk scores"
             )
+        referenced_chunks.append(chunk)
 
     # Log any chunks that were not found in the retrieved chunks
     for reference in referenced_chunk_scores.keys():
@@ -301,7 +411,7 @@ def doc_index_retrieval(
     }
 
     # persist the highest score of each deduped chunk
-    for chunk in retrieved_inference_chunks:
+    for chunk in referenced_chunks:
         key = (chunk.document_id, chunk.chunk_id)
         # For duplicates, keep the highest score
         if key not in unique_chunks or (chunk.score or 0) > (
@@ -329,8 +439,11 @@ def retrieve_chunks(
     retrieval_metrics_callback: (
         Callable[[RetrievalMetricsContainer], None] | None
     ) = None,
+    surrounding_chunks: SurroundingChunks | None = None,
 ) -> list[InferenceChunk]:
-    """Returns a list of the best chunks from an initial keyword/semantic/ hybrid search."""
+    """Returns a list of the best chunks from an initial keyword/semantic/ hybrid search.
+
+    See doc_index_retrieval for surrounding_chunks."""
 
     multilingual_expansion = get_multilingual_expansion(db_session)
     run_queries: list[tuple[Callable, tuple]] = []
@@ -358,7 +471,12 @@ def retrieve_chunks(
         not multilingual_expansion or "\n" in query.query or "\r" in query.query
     ):
         # Don't do query expansion on complex queries, rephrasings likely would not work well
-        run_queries.append((doc_index_retrieval, (query, document_index, db_session)))
+        run_queries.append(
+            (
+                doc_index_retrieval,
+                (query, document_index, db_session, surrounding_chunks),
+            )
+        )
     elif normal_search_enabled:
         simplified_queries = set()
 
@@ -387,7 +505,10 @@ def retrieve_chunks(
                 deep=True,
             )
             run_queries.append(
-                (doc_index_retrieval, (q_copy, document_index, db_session))
+                (
+                    doc_index_retrieval,
+                    (q_copy, document_index, db_session, surrounding_chunks),
+                )
             )
 
     parallel_search_results = run_functions_tuples_in_parallel(run_queries)
@@ -167,7 +167,10 @@ def get_connector_credential_pairs_for_user_parallel(
 
 
 def get_connector_credential_pairs(
-    db_session: Session, ids: list[int] | None = None, include_user_files: bool = False
+    db_session: Session,
+    ids: list[int] | None = None,
+    include_user_files: bool = False,
+    eager_load_connector: bool = False,
 ) -> list[ConnectorCredentialPair]:
     stmt = select(ConnectorCredentialPair).distinct()
 
@@ -177,6 +180,9 @@ def get_connector_credential_pairs(
     if not include_user_files:
         stmt = stmt.where(ConnectorCredentialPair.is_user_file != True)  # noqa: E712
 
+    if eager_load_connector:
+        stmt = stmt.options(joinedload(ConnectorCredentialPair.connector))
+
     return list(db_session.scalars(stmt).all())
 
 
@@ -421,6 +427,20 @@ def set_cc_pair_repeated_error_state(
     db_session.commit()
 
 
+def set_cc_pairs_repeated_error_state(
+    db_session: Session,
+    cc_pair_ids: list[int],
+    in_repeated_error_state: bool,
+) -> None:
+    stmt = (
+        update(ConnectorCredentialPair)
+        .where(ConnectorCredentialPair.id.in_(cc_pair_ids))
+        .values(in_repeated_error_state=in_repeated_error_state)
+    )
+    db_session.execute(stmt)
+    db_session.commit()
+
+
 def delete_connector_credential_pair__no_commit(
     db_session: Session,
     connector_id: int,
@@ -567,6 +587,12 @@ def add_credential_to_connector(
 
     db_session.commit()
 
+    if access_type == AccessType.SYNC:
+        fetch_ee_implementation_or_noop(
+            "onyx.external_permissions.post_query_censoring",
+            "invalidate_censoring_enabled_sources_cache",
+        )()
+
     return StatusResponse(
         success=True,
         message=f"Creating new association between Connector {connector_id} and Credential {credential_id}",
@@ -613,8 +639,15 @@ def remove_credential_from_connector(
             db_session=db_session,
             cc_pair_id=association.id,
         )
+        is_sync = association.access_type == AccessType.SYNC
         db_session.delete(association)
         db_session.commit()
+
+        if is_sync:
+            fetch_ee_implementation_or_noop(
+                "onyx.external_permissions.post_query_censoring",
+                "invalidate_censoring_enabled_sources_cache",
+            )()
         return StatusResponse(
             success=True,
             message=f"Credential {credential_id} removed from Connector",
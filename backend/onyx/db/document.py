@@ -22,6 +22,7 @@ from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import Session
 from sqlalchemy.sql.expression import null
 
+import onyx.db.relationships as dbrelationships
 from onyx.agents.agent_search.kb_search.models import KGEntityDocInfo
 from onyx.configs.constants import DEFAULT_BOOST
 from onyx.configs.constants import DocumentSource
@@ -43,10 +44,6 @@ from onyx.db.models import DocumentByConnectorCredentialPair
 from onyx.db.models import KGEntity
 from onyx.db.models import KGRelationship
 from onyx.db.models import User
-from onyx.db.relationships import delete_from_kg_relationships__no_commit
-from onyx.db.relationships import (
-    delete_from_kg_relationships_extraction_staging__no_commit,
-)
 from onyx.db.tag import delete_document_tags_for_documents__no_commit
 from onyx.db.utils import model_to_dict
 from onyx.document_index.interfaces import DocumentMetadata
@@ -120,6 +117,25 @@ def construct_document_id_select_for_connector_credential_pair(
     return stmt
 
 
+def construct_sorted_document_id_select_for_connector_credential_pair(
+    connector_id: int, credential_id: int
+) -> Select:
+    """Document IDs of the cc pair ordered by their bytes (the "C" collation), which
+    is the same order as sorting them in python. Only touches the
+    document_by_connector_credential_pair table. Meant to be executed with .yield_per()
+    """
+    return (
+        select(DocumentByConnectorCredentialPair.id)
+        .where(
+            and_(
+                DocumentByConnectorCredentialPair.connector_id == connector_id,
+                DocumentByConnectorCredentialPair.credential_id == credential_id,
+            )
+        )
+        .order_by(DocumentByConnectorCredentialPair.id.collate("C"))
+    )
+
+
 def construct_document_select_for_connector_credential_pair(
     connector_id: int, credential_id: int | None = None
 ) -> Select:
@@ -324,6 +340,66 @@ def get_access_info_for_documents(
     return db_session.execute(stmt).all()  # type: ignore
 
 
+def get_cc_pair_access_info_for_documents(
+    db_session: Session,
+    document_ids: list[str],
+) -> Sequence[
+    tuple[
+        str,
+        int,
+        AccessType,
+        ConnectorCredentialPairStatus,
+        str | None,
+        DocumentSource,
+    ]
+]:
+    """Same information as get_access_info_for_documents, but not aggregated so that
+    the access of a document can be assembled from the access of each of its cc pairs.
+    Returns one row per (document, cc pair) containing:
+    - Document ID
+    - CC pair ID
+    - access type of the cc pair
+    - status of the cc pair, CC pairs that are being deleted are included so that the
+      source of their documents is known, they should not grant any access
+    - email of the Onyx user who created the credential (None if the cc pair is SYNC
+      or if the connector was set up by an admin when auth was off)
+    - source of the connector
+    """
+    stmt = (
+        select(
+            DocumentByConnectorCredentialPair.id,
+            ConnectorCredentialPair.id,
+            ConnectorCredentialPair.access_type,
+            ConnectorCredentialPair.status,
+            User.email,  # type: ignore
+            Connector.source,
+        )
+        .join(
+            Credential,
+            DocumentByConnectorCredentialPair.credential_id == Credential.id,
+        )
+        .join(
+            ConnectorCredentialPair,
+            and_(
+                DocumentByConnectorCredentialPair.connector_id
+                == ConnectorCredentialPair.connector_id,
+                DocumentByConnectorCredentialPair.credential_id
+                == ConnectorCredentialPair.credential_id,
+            ),
+        )
+        .join(Connector, ConnectorCredentialPair.connector_id == Connector.id)
+        .outerjoin(
+            User,
+            and_(
+                Credential.user_id == User.id,
+                ConnectorCredentialPair.access_type != AccessType.SYNC,
+            ),
+        )
+        .where(DocumentByConnectorCredentialPair.id.in_(document_ids))
+    )
+    return db_session.execute(stmt).all()  # type: ignore
+
+
 def upsert_documents(
     db_session: Session,
     document_metadata_batch: list[DocumentMetadata],
@@ -482,6 +558,19 @@ def update_docs_chunk_count__no_commit(
         doc.chunk_count = doc_id_to_chunk_count[doc.id]
 
 
+def update_docs_content_fingerprint__no_commit(
+    doc_id_to_content_fingerprint: dict[str, str | None],
+    db_session: Session,
+) -> None:
+    documents_to_update = (
+        db_session.query(DbDocument)
+        .filter(DbDocument.id.in_(doc_id_to_content_fingerprint.keys()))
+        .all()
+    )
+    for doc in documents_to_update:
+        doc.content_fingerprint = doc_id_to_content_fingerprint[doc.id]
+
+
 def mark_document_as_modified(
     document_id: str,
     db_session: Session,
@@ -496,6 +585,20 @@ def mark_document_as_modified(
     db_session.commit()
 
 
+def mark_documents_as_modified(document_ids: list[str], db_session: Session) -> None:
+    """Updates last_modified for all of the given documents in a single statement."""
+    if not document_ids:
+        return
+
+    stmt = (
+        update(DbDocument)
+        .where(DbDocument.id.in_(document_ids))
+        .values(last_modified=datetime.now(timezone.utc))
+    )
+    db_session.execute(stmt)
+    db_session.commit()
+
+
 def mark_document_as_synced(document_id: str, db_session: Session) -> None:
     stmt = select(DbDocument).where(DbDocument.id == document_id)
     doc = db_session.scalar(stmt)
@@ -507,6 +610,20 @@ def mark_document_as_synced(document_id: str, db_session: Session) -> None:
     db_session.commit()
 
 
+def mark_documents_as_synced(document_ids: list[str], db_session: Session) -> None:
+    """Updates last_synced for all of the given documents in a single statement."""
+    if not document_ids:
+        return
+
+    stmt = (
+        update(DbDocument)
+        .where(DbDocument.id.in_(document_ids))
+        .values(last_synced=datetime.now(timezone.utc))
+    )
+    db_session.execute(stmt)
+    db_session.commit()
+
+
 def delete_document_by_connector_credential_pair__no_commit(
     db_session: Session,
     document_id: str,
@@ -586,7 +703,7 @@ def delete_documents_complete__no_commit(
 
     # Start with the kg references
 
-    delete_from_kg_relationships__no_commit(
+    dbrelationships.delete_from_kg_relationships__no_commit(
         db_session=db_session,
         document_ids=document_ids,
     )
@@ -596,7 +713,7 @@ def delete_documents_complete__no_commit(
         document_ids=document_ids,
     )
 
-    delete_from_kg_relationships_extraction_staging__no_commit(
+    dbrelationships.delete_from_kg_relationships_extraction_staging__no_commit(
         db_session=db_session,
         document_ids=document_ids,
     )
@@ -798,40 +915,6 @@ def get_cc_pairs_for_document(
     return list(db_session.execute(stmt).scalars().all())
 
 
-def get_document_sources(
-    db_session: Session,
-    document_ids: list[str],
-) -> dict[str, DocumentSource]:
-    """Gets the sources for a list of document IDs.
-    Returns a dictionary mapping document ID to its source.
-    If a document has multiple sources (multiple CC pairs), returns the first one found.
-    """
-    stmt = (
-        select(
-            DocumentByConnectorCredentialPair.id,
-            Connector.source,
-        )
-        .join(
-            ConnectorCredentialPair,
-            and_(
-                DocumentByConnectorCredentialPair.connector_id
-                == ConnectorCredentialPair.connector_id,
-                DocumentByConnectorCredentialPair.credential_id
-                == ConnectorCredentialPair.credential_id,
-            ),
-        )
-        .join(
-            Connector,
-            ConnectorCredentialPair.connector_id == Connector.id,
-        )
-        .where(DocumentByConnectorCredentialPair.id.in_(document_ids))
-        .distinct()
-    )
-
-    results = db_session.execute(stmt).all()
-    return {doc_id: source for doc_id, source in results}
-
-
 def fetch_chunk_counts_for_documents(
     document_ids: list[str],
     db_session: Session,
@@ -946,6 +1029,23 @@ def update_document_kg_info(
     db_session.execute(stmt)
 
 
+def update_documents_kg_info(
+    db_session: Session, document_ids: list[str], kg_stage: KGStage
+) -> None:
+    """Bulk version of update_document_kg_info."""
+    if not document_ids:
+        return
+    stmt = (
+        update(DbDocument)
+        .where(DbDocument.id.in_(document_ids))
+        .values(
+            kg_stage=kg_stage,
+            kg_processing_time=datetime.now(timezone.utc),
+        )
+    )
+    db_session.execute(stmt)
+
+
 def update_document_kg_stage(
     db_session: Session,
     document_id: str,
@@ -3,10 +3,17 @@ from datetime import datetime
 from datetime import timezone
 from typing import List
 
+from sqlalchemy import and_
+from sqlalchemy import Boolean
+from sqlalchemy import column
 from sqlalchemy import func
 from sqlalchemy import literal
+from sqlalchemy import or_
 from sqlalchemy import select
+from sqlalchemy import String
+from sqlalchemy import text
 from sqlalchemy import update
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import Session
@@ -16,9 +23,15 @@ from onyx.db.models import Document
 from onyx.db.models import KGEntity
 from onyx.db.models import KGEntityExtractionStaging
 from onyx.db.models import KGEntityType
+from onyx.kg.models import KGClusteredEntity
 from onyx.kg.models import KGGroundingType
 from onyx.kg.models import KGStage
+from onyx.kg.models import KGStagingEntity
 from onyx.kg.utils.formatting_utils import make_entity_id
+from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA
+
+# rows per INSERT statement, well below postgres' limit of 65535 bind parameters
+_UPSERT_BATCH_SIZE = 1000
 
 
 def upsert_staging_entity(
@@ -100,6 +113,72 @@ def upsert_staging_entity(
     return result
 
 
+def upsert_staging_entities(
+    db_session: Session,
+    entities: list[KGStagingEntity],
+) -> list[KGEntityExtractionStaging]:
+    """Bulk version of upsert_staging_entity.
+
+    Entities with the same id are merged first (a single INSERT ... ON CONFLICT can't
+    update a row twice): the occurrences add up and the values of the first one are
+    kept, like when upserting them one after the other.
+
+    Returns:
+        list[KGEntityExtractionStaging]: The created or updated entities
+    """
+    rows: dict[str, dict] = {}
+    for entity in entities:
+        entity_type = entity.entity_type.upper()
+        name = entity.name.title()
+        id_name = make_entity_id(entity_type, name)
+
+        row = rows.get(id_name)
+        if row is not None:
+            row["occurrences"] += entity.occurrences
+            continue
+
+        rows[id_name] = dict(
+            id_name=id_name,
+            name=name,
+            entity_type_id_name=entity_type,
+            entity_key=entity.attributes.get("key"),
+            parent_key=entity.attributes.get("parent"),
+            document_id=entity.document_id,
+            occurrences=entity.occurrences,
+            attributes={
+                attr_key: attr_val
+                for attr_key, attr_val in entity.attributes.items()
+                if attr_key not in ("key", "parent")
+            },
+            event_time=entity.event_time,
+        )
+
+    # sorted to always lock the rows in the same order
+    sorted_rows = [rows[id_name] for id_name in sorted(rows)]
+    upserted_entities: list[KGEntityExtractionStaging] = []
+    for i in range(0, len(sorted_rows), _UPSERT_BATCH_SIZE):
+        stmt = pg_insert(KGEntityExtractionStaging).values(
+            sorted_rows[i : i + _UPSERT_BATCH_SIZE]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id_name"],
+            set_=dict(
+                occurrences=KGEntityExtractionStaging.occurrences
+                + stmt.excluded.occurrences,
+            ),
+        ).returning(KGEntityExtractionStaging)
+        upserted_entities.extend(db_session.scalars(stmt).all())
+
+    dbdocument.update_documents_kg_info(
+        db_session,
+        sorted({row["document_id"] for row in sorted_rows if row["document_id"]}),
+        KGStage.EXTRACTED,
+    )
+    db_session.flush()
+
+    return upserted_entities
+
+
 def transfer_entity(
     db_session: Session,
     entity: KGEntityExtractionStaging,
@@ -164,6 +243,174 @@ def transfer_entity(
     return new_entity
 
 
+def transfer_entities(
+    db_session: Session,
+    entities: list[KGClusteredEntity],
+) -> dict[str, str]:
+    """Bulk version of transfer_entity, for the new entities of a clustering batch.
+
+    An entity of a document that already has an entity of the same type is merged
+    into it, like with transfer_entity.
+
+    Returns:
+        dict[str, str]: The id_names of the entities merged into an existing one,
+            mapped to the id_name of the existing entity
+    """
+    new_id_names = {entity.id_name for entity in entities}
+    document_entity_id_names = {
+        (entity.entity_type_id_name, entity.document_id): entity.id_name
+        for entity in entities
+        if entity.document_id is not None
+    }
+
+    merged_id_names: dict[str, str] = {}
+    for i in range(0, len(entities), _UPSERT_BATCH_SIZE):
+        stmt = pg_insert(KGEntity).values(
+            [
+                dict(
+                    id_name=entity.id_name,
+                    name=entity.name,
+                    entity_key=entity.entity_key,
+                    parent_key=entity.parent_key,
+                    alternative_names=entity.alternative_names,
+                    entity_type_id_name=entity.entity_type_id_name,
+                    document_id=entity.document_id,
+                    occurrences=entity.occurrences,
+                    attributes=entity.attributes,
+                    event_time=entity.event_time,
+                )
+                for entity in entities[i : i + _UPSERT_BATCH_SIZE]
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["name", "entity_type_id_name", "document_id"],
+            set_=dict(
+                occurrences=KGEntity.occurrences + stmt.excluded.occurrences,
+                attributes=KGEntity.attributes.op("||")(stmt.excluded.attributes),
+                entity_key=func.coalesce(KGEntity.entity_key, stmt.excluded.entity_key),
+                parent_key=func.coalesce(KGEntity.parent_key, stmt.excluded.parent_key),
+                event_time=stmt.excluded.event_time,
+                time_updated=datetime.now(),
+            ),
+        ).returning(
+            KGEntity.id_name, KGEntity.entity_type_id_name, KGEntity.document_id
+        )
+        for id_name, entity_type_id_name, document_id in db_session.execute(stmt):
+            if id_name in new_id_names:
+                continue
+            new_id_name = document_entity_id_names.get(
+                (entity_type_id_name, document_id)
+            )
+            if new_id_name is not None:
+                merged_id_names[new_id_name] = id_name
+
+    db_session.flush()
+    return merged_id_names
+
+
+def update_clustered_entities(
+    db_session: Session,
+    entities: list[KGClusteredEntity],
+) -> None:
+    """Bulk version of merge_entities, for the existing entities that staging entities
+    were merged into while clustering."""
+    if not entities:
+        return
+
+    db_session.execute(
+        update(KGEntity),
+        [
+            dict(
+                id_name=entity.id_name,
+                document_id=entity.document_id,
+                alternative_names=entity.alternative_names,
+                occurrences=entity.occurrences,
+                attributes=entity.attributes,
+                entity_key=entity.entity_key,
+                parent_key=entity.parent_key,
+            )
+            for entity in entities
+        ],
+    )
+    db_session.flush()
+
+
+def set_staging_entities_transferred(
+    db_session: Session,
+    transferred_id_names: dict[str, str],
+) -> None:
+    """Sets the transferred_id_name of the staging entities (staging id_name ->
+    transferred id_name)."""
+    if not transferred_id_names:
+        return
+
+    db_session.execute(
+        update(KGEntityExtractionStaging),
+        [
+            dict(id_name=id_name, transferred_id_name=transferred_id_name)
+            for id_name, transferred_id_name in transferred_id_names.items()
+        ],
+    )
+    db_session.flush()
+
+
+def get_entity_clustering_candidates(
+    db_session: Session,
+    queries: list[tuple[str, str, bool]],
+    similarity_threshold: float,
+) -> list[tuple[int, KGEntity]]:
+    """Finds the entities similar to each of the queried (name, entity type, whether
+    the entity must be without a document) at once, using the GIN trigram index.
+
+    Returns:
+        list[tuple[int, KGEntity]]: (index of the query, similar entity) pairs
+    """
+    if not queries:
+        return []
+
+    names, entity_type_id_names, without_document = zip(*queries)
+    query_table = (
+        func.unnest(
+            literal(list(names), ARRAY(String)),
+            literal(list(entity_type_id_names), ARRAY(String)),
+            literal(list(without_document), ARRAY(Boolean)),
+        )
+        .table_valued(
+            column("name", String),
+            column("entity_type_id_name", String),
+            column("without_document", Boolean),
+            with_ordinality="query_position",
+        )
+        .render_derived()
+    )
+
+    db_session.execute(
+        text("SET pg_trgm.similarity_threshold = " + str(similarity_threshold))
+    )
+    stmt = (
+        select(query_table.c.query_position, KGEntity)
+        .select_from(query_table)
+        .join(
+            KGEntity,
+            and_(
+                KGEntity.entity_type_id_name == query_table.c.entity_type_id_name,
+                getattr(func, POSTGRES_DEFAULT_SCHEMA).similarity_op(
+                    KGEntity.name, query_table.c.name
+                ),
+                or_(
+                    query_table.c.without_document.is_(False),
+                    KGEntity.document_id.is_(None),
+                ),
+            ),
+        )
+    )
+    # ordinality starts at 1
+    return [
+        (query_position - 1, entity)
+        for query_position, entity in db_session.execute(stmt)
+    ]
+
+
 def merge_entities(
     db_session: Session, parent: KGEntity, child: KGEntityExtractionStaging
 ) -> KGEntity:
@@ -1,3 +1,4 @@
+from collections import defaultdict
 from collections.abc import Sequence
 from datetime import datetime
 from datetime import timedelta
@@ -10,6 +11,7 @@ from sqlalchemy import desc
 from sqlalchemy import func
 from sqlalchemy import Select
 from sqlalchemy import select
+from sqlalchemy import true
 from sqlalchemy import update
 from sqlalchemy.orm import contains_eager
 from sqlalchemy.orm import joinedload
@@ -96,6 +98,71 @@ def get_recent_attempts_for_cc_pair(
     )
 
 
+def get_recent_attempt_statuses_for_cc_pairs(
+    cc_pair_ids: list[int],
+    search_settings_id: int,
+    limit: int,
+    db_session: Session,
+) -> dict[int, list[tuple[IndexingStatus, datetime]]]:
+    """The (status, time_updated) of the most recent attempts of many cc pairs, in
+    one query. Most recent to least recent, cc pairs without attempts are left out."""
+    if not cc_pair_ids:
+        return {}
+
+    # LATERAL so that only the most recent attempts of every cc pair are read from
+    # the (cc pair, search settings, time_updated) index
+    recent_attempts = (
+        select(IndexAttempt.status, IndexAttempt.time_updated)
+        .where(
+            IndexAttempt.connector_credential_pair_id == ConnectorCredentialPair.id,
+            IndexAttempt.search_settings_id == search_settings_id,
+        )
+        .order_by(IndexAttempt.time_updated.desc())
+        .limit(limit)
+        .lateral()
+    )
+    stmt = (
+        select(
+            ConnectorCredentialPair.id,
+            recent_attempts.c.status,
+            recent_attempts.c.time_updated,
+        )
+        .join(recent_attempts, true())
+        .where(ConnectorCredentialPair.id.in_(cc_pair_ids))
+        .order_by(ConnectorCredentialPair.id, recent_attempts.c.time_updated.desc())
+    )
+
+    cc_pair_id_to_attempts: dict[int, list[tuple[IndexingStatus, datetime]]] = (
+        defaultdict(list)
+    )
+    for cc_pair_id, status, time_updated in db_session.execute(stmt):
+        cc_pair_id_to_attempts[cc_pair_id].append((status, time_updated))
+    return dict(cc_pair_id_to_attempts)
+
+
+def get_cc_pair_ids_with_active_attempts(
+    cc_pair_ids: list[int],
+    search_settings_id: int,
+    db_session: Session,
+) -> set[int]:
+    """The cc pairs with a NOT_STARTED or IN_PROGRESS attempt for the search settings."""
+    if not cc_pair_ids:
+        return set()
+
+    stmt = (
+        select(IndexAttempt.connector_credential_pair_id)
+        .where(
+            IndexAttempt.connector_credential_pair_id.in_(cc_pair_ids),
+            IndexAttempt.search_settings_id == search_settings_id,
+            IndexAttempt.status.in_(
+                [IndexingStatus.NOT_STARTED, IndexingStatus.IN_PROGRESS]
+            ),
+        )
+        .distinct()
+    )
+    return set(db_session.scalars(stmt))
+
+
 def get_index_attempt(
     db_session: Session,
     index_attempt_id: int,
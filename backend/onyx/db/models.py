@@ -562,6 +562,10 @@ class Document(Base):
     # Only null for documents indexed prior to this change
     chunk_count: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
+    # Hash of the content + chunking / embedding config the document was last
+    # indexed with. Used to skip re-chunking and re-embedding unchanged documents
+    content_fingerprint: Mapped[str | None] = mapped_column(String, nullable=True)
+
     # last time any vespa relevant row metadata or the doc changed.
     # does not include last_synced
     last_modified: Mapped[datetime.datetime | None] = mapped_column(
@@ -1,6 +1,8 @@
 from typing import List
 
 from sqlalchemy import or_
+from sqlalchemy import tuple_
+from sqlalchemy import update
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import Session
@@ -21,6 +23,9 @@ from onyx.kg.utils.formatting_utils import make_relationship_type_id
 from onyx.kg.utils.formatting_utils import split_relationship_id
 from onyx.utils.logger import setup_logger
 
+# rows per INSERT statement, well below postgres' limit of 65535 bind parameters
+_UPSERT_BATCH_SIZE = 1000
+
 logger = setup_logger()
 
 
@@ -99,6 +104,107 @@ def upsert_staging_relationship(
     return result
 
 
+def _upsert_relationships(
+    db_session: Session,
+    table: type[KGRelationship] | type[KGRelationshipExtractionStaging],
+    relationships: list[tuple[str, str | None, int]],
+) -> None:
+    """
+    Upserts (relationship id name, source document id, occurrences) in bulk.
+
+    A relationship between two entities can only be stored once (whatever the source
+    document), so the occurrences of the same relationship are added up and the first
+    source document is kept.
+    """
+    rows: dict[str, dict] = {}
+    for relationship_id_name, source_document_id, occurrences in relationships:
+        relationship_id_name = format_relationship_id(relationship_id_name)
+
+        row = rows.get(relationship_id_name)
+        if row is not None:
+            row["occurrences"] += occurrences
+            continue
+
+        (
+            source_entity_id_name,
+            relationship_string,
+            target_entity_id_name,
+        ) = split_relationship_id(relationship_id_name)
+        rows[relationship_id_name] = {
+            "id_name": relationship_id_name,
+            "source_node": source_entity_id_name,
+            "target_node": target_entity_id_name,
+            "source_node_type": get_entity_type(source_entity_id_name),
+            "target_node_type": get_entity_type(target_entity_id_name),
+            "type": relationship_string.lower(),
+            "relationship_type_id_name": extract_relationship_type_id(
+                relationship_id_name
+            ),
+            "source_document": source_document_id,
+            "occurrences": occurrences,
+        }
+
+    # sorted to always lock the rows in the same order
+    sorted_rows = [rows[id_name] for id_name in sorted(rows)]
+    for i in range(0, len(sorted_rows), _UPSERT_BATCH_SIZE):
+        stmt = postgresql.insert(table).values(sorted_rows[i : i + _UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["source_node", "target_node", "type"],
+            set_=dict(occurrences=table.occurrences + stmt.excluded.occurrences),
+        )
+        db_session.execute(stmt)
+
+
+def upsert_staging_relationships(
+    db_session: Session,
+    relationships: list[tuple[str, str | None]],
+) -> None:
+    """
+    Bulk version of upsert_staging_relationship.
+
+    Args:
+        db_session: SQLAlchemy database session
+        relationships: (relationship id name, source document id) of every
+            occurrence of a relationship, repeated relationships are counted
+    """
+    _upsert_relationships(
+        db_session,
+        KGRelationshipExtractionStaging,
+        [
+            (relationship_id_name, source_document_id, 1)
+            for relationship_id_name, source_document_id in relationships
+        ],
+    )
+
+    dbdocument.update_documents_kg_info(
+        db_session,
+        sorted(
+            {
+                source_document_id
+                for _, source_document_id in relationships
+                if source_document_id
+            }
+        ),
+        KGStage.EXTRACTED,
+    )
+    db_session.flush()
+
+
+def upsert_relationships(
+    db_session: Session,
+    relationships: list[tuple[str, str | None, int]],
+) -> None:
+    """
+    Bulk version of upsert_relationship.
+
+    Args:
+        db_session: SQLAlchemy database session
+        relationships: (relationship id name, source document id, occurrences)
+    """
+    _upsert_relationships(db_session, KGRelationship, relationships)
+    db_session.flush()
+
+
 def upsert_relationship(
     db_session: Session,
     relationship_id_name: str,
@@ -219,6 +325,48 @@ def transfer_relationship(
     return new_relationship
 
 
+def transfer_relationships(
+    db_session: Session,
+    relationships: list[KGRelationshipExtractionStaging],
+    entity_translations: dict[str, str],
+) -> None:
+    """
+    Bulk version of transfer_relationship. The relationships with a source or target
+    node missing from the translations are left untransferred.
+    """
+    translated_relationships: list[tuple[str, str | None, int]] = []
+    transferred_keys: list[tuple[str, str | None]] = []
+    for relationship in relationships:
+        source_node = entity_translations.get(relationship.source_node)
+        target_node = entity_translations.get(relationship.target_node)
+        if source_node is None or target_node is None:
+            continue
+        translated_relationships.append(
+            (
+                make_relationship_id(source_node, relationship.type, target_node),
+                relationship.source_document,
+                relationship.occurrences,
+            )
+        )
+        transferred_keys.append((relationship.id_name, relationship.source_document))
+
+    if not transferred_keys:
+        return
+
+    _upsert_relationships(db_session, KGRelationship, translated_relationships)
+    db_session.execute(
+        update(KGRelationshipExtractionStaging)
+        .where(
+            tuple_(
+                KGRelationshipExtractionStaging.id_name,
+                KGRelationshipExtractionStaging.source_document,
+            ).in_(transferred_keys)
+        )
+        .values(transferred=True)
+    )
+    db_session.flush()
+
+
 def upsert_staging_relationship_type(
     db_session: Session,
     source_entity_type: str,
@@ -280,6 +428,77 @@ def upsert_staging_relationship_type(
     return result
 
 
+def _upsert_relationship_types(
+    db_session: Session,
+    table: type[KGRelationshipType] | type[KGRelationshipTypeExtractionStaging],
+    relationship_types: list[tuple[str, str, str]],
+) -> None:
+    rows: dict[str, dict] = {}
+    for source_entity_type, relationship_type, target_entity_type in relationship_types:
+        id_name = make_relationship_type_id(
+            source_entity_type, relationship_type, target_entity_type
+        )
+
+        row = rows.get(id_name)
+        if row is not None:
+            row["occurrences"] += 1
+            continue
+
+        rows[id_name] = {
+            "id_name": id_name,
+            "name": relationship_type,
+            "source_entity_type_id_name": source_entity_type.upper(),
+            "target_entity_type_id_name": target_entity_type.upper(),
+            "definition": False,
+            "occurrences": 1,
+            "type": relationship_type,
+            "active": True,
+        }
+
+    # sorted to always lock the rows in the same order
+    sorted_rows = [rows[id_name] for id_name in sorted(rows)]
+    for i in range(0, len(sorted_rows), _UPSERT_BATCH_SIZE):
+        stmt = postgresql.insert(table).values(sorted_rows[i : i + _UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id_name"],
+            set_=dict(occurrences=table.occurrences + stmt.excluded.occurrences),
+        )
+        db_session.execute(stmt)
+    db_session.flush()
+
+
+def upsert_staging_relationship_types(
+    db_session: Session,
+    relationship_types: list[tuple[str, str, str]],
+) -> None:
+    """
+    Bulk version of upsert_staging_relationship_type.
+
+    Args:
+        db_session: SQLAlchemy session
+        relationship_types: (source entity type, relationship type, target entity type)
+            of every extracted relationship, repeated relationship types are counted
+    """
+    _upsert_relationship_types(
+        db_session, KGRelationshipTypeExtractionStaging, relationship_types
+    )
+
+
+def upsert_relationship_types(
+    db_session: Session,
+    relationship_types: list[tuple[str, str, str]],
+) -> None:
+    """
+    Bulk version of upsert_relationship_type.
+
+    Args:
+        db_session: SQLAlchemy session
+        relationship_types: (source entity type, relationship type, target entity type)
+            of every relationship, repeated relationship types are counted
+    """
+    _upsert_relationship_types(db_session, KGRelationshipType, relationship_types)
+
+
 def upsert_relationship_type(
     db_session: Session,
     source_entity_type: str,
@@ -383,6 +602,52 @@ def transfer_relationship_type(
     return new_relationship_type
 
 
+def transfer_relationship_types(
+    db_session: Session,
+    relationship_types: list[KGRelationshipTypeExtractionStaging],
+) -> None:
+    """
+    Bulk version of transfer_relationship_type.
+    """
+    if not relationship_types:
+        return
+
+    for i in range(0, len(relationship_types), _UPSERT_BATCH_SIZE):
+        stmt = pg_insert(KGRelationshipType).values(
+            [
+                dict(
+                    id_name=relationship_type.id_name,
+                    name=relationship_type.name,
+                    source_entity_type_id_name=relationship_type.source_entity_type_id_name,
+                    target_entity_type_id_name=relationship_type.target_entity_type_id_name,
+                    definition=relationship_type.definition,
+                    occurrences=relationship_type.occurrences,
+                    type=relationship_type.type,
+                    active=relationship_type.active,
+                )
+                for relationship_type in relationship_types[i : i + _UPSERT_BATCH_SIZE]
+            ]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["id_name"],
+            set_=dict(
+                occurrences=KGRelationshipType.occurrences + stmt.excluded.occurrences,
+            ),
+        )
+        db_session.execute(stmt)
+
+    db_session.execute(
+        update(KGRelationshipTypeExtractionStaging)
+        .where(
+            KGRelationshipTypeExtractionStaging.id_name.in_(
+                [relationship_type.id_name for relationship_type in relationship_types]
+            )
+        )
+        .values(transferred=True)
+    )
+    db_session.flush()
+
+
 def delete_relationships_by_id_names(
     db_session: Session, id_names: list[str], kg_stage: KGStage
 ) -> int:
@@ -127,11 +127,12 @@ class UpdateRequest:
     """
 
     minimal_document_indexing_info: list[MinimalDocumentIndexingInfo]
-    # all other fields except these 4 will always be left alone by the update request
+    # all other fields except these 5 will always be left alone by the update request
     access: DocumentAccess | None = None
     document_sets: set[str] | None = None
     boost: float | None = None
     hidden: bool | None = None
+    doc_updated_at: datetime | None = None
 
 
 class Verifiable(abc.ABC):
@@ -293,16 +294,23 @@ class Updatable(abc.ABC):
         raise NotImplementedError
 
     @abc.abstractmethod
-    def update(self, update_requests: list[UpdateRequest], *, tenant_id: str) -> None:
+    def update(
+        self, update_requests: list[UpdateRequest], *, tenant_id: str
+    ) -> set[str]:
         """
         Updates some set of chunks. The document and fields to update are specified in the update
         requests. Each update request in the list applies its changes to a list of document ids.
         None values mean that the field does not need an update.
 
+        A failure to update one document does not prevent the other documents from being updated.
+
         Parameters:
         - update_requests: for a list of document ids in the update request, apply the same updates
                 to all of the documents with those ids. This is for bulk handling efficiency. Many
                 updates are done at the connector level which have many documents for the connector
+
+        Return:
+            The ids of the documents that failed to update
         """
         raise NotImplementedError
 
@@ -15,7 +15,9 @@ from onyx.configs.app_configs import VESPA_LANGUAGE_OVERRIDE
 from onyx.context.search.models import IndexFilters
 from onyx.context.search.models import InferenceChunkUncleaned
 from onyx.document_index.interfaces import VespaChunkRequest
-from onyx.document_index.vespa.shared_utils.utils import get_vespa_http_client
+from onyx.document_index.vespa.shared_utils.utils import (
+    get_vespa_query_http_client,
+)
 from onyx.document_index.vespa.shared_utils.vespa_request_builders import (
     build_vespa_filters,
 )
@@ -220,9 +222,8 @@ def get_chunks_via_visit_api(
     while True:
         try:
             filtered_params = {k: v for k, v in params.items() if v is not None}
-            with get_vespa_http_client() as http_client:
-                response = http_client.get(url, params=filtered_params)
-                response.raise_for_status()
+            response = get_vespa_query_http_client().get(url, params=filtered_params)
+            response.raise_for_status()
         except httpx.HTTPError as e:
             error_base = "Failed to query Vespa"
             logger.error(
@@ -343,9 +344,8 @@ def query_vespa(
         params["language"] = VESPA_LANGUAGE_OVERRIDE
 
     try:
-        with get_vespa_http_client() as http_client:
-            response = http_client.post(SEARCH_ENDPOINT, json=params)
-            response.raise_for_status()
+        response = get_vespa_query_http_client().post(SEARCH_ENDPOINT, json=params)
+        response.raise_for_status()
     except httpx.HTTPError as e:
         error_base = "Failed to query Vespa"
         logger.error(
@@ -10,6 +10,7 @@ import zipfile
 from dataclasses import dataclass
 from datetime import datetime
 from datetime import timedelta
+from http import HTTPStatus
 from typing import BinaryIO
 from typing import cast
 from typing import List
@@ -22,6 +23,7 @@ from pydantic import BaseModel
 from retry import retry
 
 from onyx.agents.agent_search.shared_graph_utils.models import QueryExpansionType
+from onyx.configs.app_configs import VESPA_ASYNC_FEED_ENABLED
 from onyx.configs.chat_configs import DOC_TIME_DECAY
 from onyx.configs.chat_configs import NUM_RETURNED_HITS
 from onyx.configs.chat_configs import TITLE_CONTENT_RATIO
@@ -47,8 +49,13 @@ from onyx.document_index.vespa.chunk_retrieval import (
 )
 from onyx.document_index.vespa.chunk_retrieval import query_vespa
 from onyx.document_index.vespa.deletion import delete_vespa_chunks
+from onyx.document_index.vespa.indexing_utils import _vespa_get_updated_at_attribute
+from onyx.document_index.vespa.indexing_utils import async_batch_index_vespa_chunks
 from onyx.document_index.vespa.indexing_utils import BaseHTTPXClientContext
 from onyx.document_index.vespa.indexing_utils import batch_index_vespa_chunks
+from onyx.document_index.vespa.indexing_utils import (
+    build_vespa_document_fields_by_id,
+)
 from onyx.document_index.vespa.indexing_utils import check_for_final_chunk_existence
 from onyx.document_index.vespa.indexing_utils import clean_chunk_id_copy
 from onyx.document_index.vespa.indexing_utils import GlobalHTTPXClientContext
@@ -64,6 +71,7 @@ from onyx.document_index.vespa_constants import ACCESS_CONTROL_LIST
 from onyx.document_index.vespa_constants import BATCH_SIZE
 from onyx.document_index.vespa_constants import BOOST
 from onyx.document_index.vespa_constants import CONTENT_SUMMARY
+from onyx.document_index.vespa_constants import DOC_UPDATED_AT
 from onyx.document_index.vespa_constants import DOCUMENT_ID_ENDPOINT
 from onyx.document_index.vespa_constants import DOCUMENT_SETS
 from onyx.document_index.vespa_constants import HIDDEN
@@ -494,14 +502,29 @@ class VespaIndex(DocumentIndex):
                     executor=executor,
                 )
 
-            for chunk_batch in batch_generator(cleaned_chunks, BATCH_SIZE):
-                batch_index_vespa_chunks(
-                    chunks=chunk_batch,
+            # title, semantic identifier, metadata etc. are sanitized once per
+            # document rather than once per chunk
+            document_fields_by_id = build_vespa_document_fields_by_id(cleaned_chunks)
+
+            if VESPA_ASYNC_FEED_ENABLED:
+                # the async feed bounds its own in flight requests, so it doesn't
+                # need to be split into batches
+                async_batch_index_vespa_chunks(
+                    chunks=cleaned_chunks,
                     index_name=self.index_name,
-                    http_client=http_client,
                     multitenant=self.multitenant,
-                    executor=executor,
+                    document_fields_by_id=document_fields_by_id,
                 )
+            else:
+                for chunk_batch in batch_generator(cleaned_chunks, BATCH_SIZE):
+                    batch_index_vespa_chunks(
+                        chunks=chunk_batch,
+                        index_name=self.index_name,
+                        http_client=http_client,
+                        multitenant=self.multitenant,
+                        executor=executor,
+                        document_fields_by_id=document_fields_by_id,
+                    )
 
         all_cleaned_doc_ids = {chunk.source_document.id for chunk in cleaned_chunks}
 
@@ -519,44 +542,69 @@ class VespaIndex(DocumentIndex):
         updates: list[_VespaUpdateRequest],
         httpx_client: httpx.Client,
         batch_size: int = BATCH_SIZE,
-    ) -> None:
-        """Runs a batch of updates in parallel via the ThreadPoolExecutor."""
+    ) -> set[str]:
+        """Runs a batch of updates in parallel via the ThreadPoolExecutor.
+
+        A failed chunk update does not stop the remaining updates from being applied.
+        Returns the ids of the documents that had at least one failed chunk update."""
 
+        @retry(
+            tries=3,
+            delay=1,
+            backoff=2,
+            exceptions=(httpx.TransportError, httpx.HTTPStatusError),
+        )
         def _update_chunk(
             update: _VespaUpdateRequest, http_client: httpx.Client
         ) -> httpx.Response:
             logger.debug(
                 f"Updating with request to {update.url} with body {update.update_request}"
             )
-            return http_client.put(
+            res = http_client.put(
                 update.url,
                 headers={"Content-Type": "application/json"},
                 json=update.update_request,
             )
+            # only throttling and server errors are retried, any other 4xx means
+            # the request itself is bad and is raised by the caller
+            if res.status_code == HTTPStatus.TOO_MANY_REQUESTS or res.is_server_error:
+                res.raise_for_status()
+            return res
+
+        failed_document_ids: set[str] = set()
 
         # NOTE: using `httpx` here since `requests` doesn't support HTTP2. This is beneficient for
         # indexing / updates / deletes since we have to make a large volume of requests.
-
-        with (
-            concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor,
-            httpx_client as http_client,
-        ):
+        # The client is owned by the caller, so it is not closed here.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
             for update_batch in batch_generator(updates, batch_size):
                 future_to_document_id = {
                     executor.submit(
                         _update_chunk,
                         update,
-                        http_client,
+                        httpx_client,
                     ): update.document_id
                     for update in update_batch
                 }
                 for future in concurrent.futures.as_completed(future_to_document_id):
-                    res = future.result()
+                    document_id = future_to_document_id[future]
                     try:
-                        res.raise_for_status()
-                    except requests.HTTPError as e:
-                        failure_msg = f"Failed to update document: {future_to_document_id[future]}"
-                        raise requests.HTTPError(failure_msg) from e
+                        future.result().raise_for_status()
+                    except Exception as e:
+                        if isinstance(e, httpx.HTTPStatusError):
+                            logger.error(
+                                f"Failed to update document: {document_id} "
+                                f"status={e.response.status_code} "
+                                f"response={e.response.text}"
+                            )
+                        else:
+                            logger.exception(
+                                f"Failed to update document: {document_id}"
+                            )
+
+                        failed_document_ids.add(document_id)
+
+        return failed_document_ids
 
     @classmethod
     def _apply_kg_chunk_updates_batched(
@@ -601,30 +649,63 @@ class VespaIndex(DocumentIndex):
                         )
                         raise requests.HTTPError(failure_msg) from e
 
-    def update(self, update_requests: list[UpdateRequest], *, tenant_id: str) -> None:
+    def update(
+        self, update_requests: list[UpdateRequest], *, tenant_id: str
+    ) -> set[str]:
         logger.debug(f"Updating {len(update_requests)} documents in Vespa")
 
         # Handle Vespa character limitations
         # Mutating update_requests but it's not used later anyway
+        # needed so the failed document IDs returned are the original document IDs
+        cleaned_doc_id_to_original_doc_id: dict[str, str] = {}
         for update_request in update_requests:
             for doc_info in update_request.minimal_document_indexing_info:
-                doc_info.doc_id = replace_invalid_doc_id_characters(doc_info.doc_id)
+                cleaned_doc_id = replace_invalid_doc_id_characters(doc_info.doc_id)
+                cleaned_doc_id_to_original_doc_id[cleaned_doc_id] = doc_info.doc_id
+                doc_info.doc_id = cleaned_doc_id
 
         update_start = time.monotonic()
 
         processed_updates_requests: list[_VespaUpdateRequest] = []
-        all_doc_chunk_ids: dict[str, list[UUID]] = {}
 
-        # Fetch all chunks for each document ahead of time
-        index_names = [self.index_name]
-        if self.secondary_index_name:
-            index_names.append(self.secondary_index_name)
-
-        chunk_id_start_time = time.monotonic()
         with self.httpx_client_context as http_client:
             for update_request in update_requests:
+                update_dict: dict[str, dict] = {"fields": {}}
+                if update_request.boost is not None:
+                    update_dict["fields"][BOOST] = {"assign": update_request.boost}
+                if update_request.document_sets is not None:
+                    update_dict["fields"][DOCUMENT_SETS] = {
+                        "assign": {
+                            document_set: 1
+                            for document_set in update_request.document_sets
+                        }
+                    }
+                if update_request.access is not None:
+                    update_dict["fields"][ACCESS_CONTROL_LIST] = {
+                        "assign": {
+                            acl_entry: 1 for acl_entry in update_request.access.to_acl()
+                        }
+                    }
+                if update_request.hidden is not None:
+                    update_dict["fields"][HIDDEN] = {"assign": update_request.hidden}
+                if update_request.doc_updated_at is not None:
+                    update_dict["fields"][DOC_UPDATED_AT] = {
+                        "assign": _vespa_get_updated_at_attribute(
+                            update_request.doc_updated_at
+                        )
+                    }
+
+                if not update_dict["fields"]:
+                    logger.error("Update request received but nothing to update")
+                    continue
+
+                # Fetch all chunk IDs for each document ahead of time. This only hits
+                # Vespa for old documents that don't have a known chunk count.
                 for doc_info in update_request.minimal_document_indexing_info:
-                    for index_name in index_names:
+                    for (
+                        index_name,
+                        large_chunks_enabled,
+                    ) in self.index_to_large_chunks_enabled.items():
                         doc_chunk_info = VespaIndex.enrich_basic_chunk_info(
                             index_name=index_name,
                             http_client=http_client,
@@ -635,54 +716,30 @@ class VespaIndex(DocumentIndex):
                         doc_chunk_ids = get_document_chunk_ids(
                             enriched_document_info_list=[doc_chunk_info],
                             tenant_id=tenant_id,
-                            large_chunks_enabled=False,
+                            large_chunks_enabled=large_chunks_enabled,
                         )
-                        all_doc_chunk_ids[doc_info.doc_id] = doc_chunk_ids
-
-        logger.debug(
-            f"Took {time.monotonic() - chunk_id_start_time:.2f} seconds to fetch all Vespa chunk IDs"
-        )
-
-        # Build the _VespaUpdateRequest objects
-        for update_request in update_requests:
-            update_dict: dict[str, dict] = {"fields": {}}
-            if update_request.boost is not None:
-                update_dict["fields"][BOOST] = {"assign": update_request.boost}
-            if update_request.document_sets is not None:
-                update_dict["fields"][DOCUMENT_SETS] = {
-                    "assign": {
-                        document_set: 1 for document_set in update_request.document_sets
-                    }
-                }
-            if update_request.access is not None:
-                update_dict["fields"][ACCESS_CONTROL_LIST] = {
-                    "assign": {
-                        acl_entry: 1 for acl_entry in update_request.access.to_acl()
-                    }
-                }
-            if update_request.hidden is not None:
-                update_dict["fields"][HIDDEN] = {"assign": update_request.hidden}
-
-            if not update_dict["fields"]:
-                logger.error("Update request received but nothing to update")
-                continue
-
-            for doc_info in update_request.minimal_document_indexing_info:
-                for doc_chunk_id in all_doc_chunk_ids[doc_info.doc_id]:
-                    processed_updates_requests.append(
-                        _VespaUpdateRequest(
-                            document_id=doc_info.doc_id,
-                            url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=self.index_name)}/{doc_chunk_id}",
-                            update_request=update_dict,
-                        )
-                    )
+                        for doc_chunk_id in doc_chunk_ids:
+                            processed_updates_requests.append(
+                                _VespaUpdateRequest(
+                                    document_id=doc_info.doc_id,
+                                    url=f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{doc_chunk_id}",
+                                    update_request=update_dict,
+                                )
+                            )
+
+            failed_doc_ids = self._apply_updates_batched(
+                processed_updates_requests, http_client
+            )
 
-        with self.httpx_client_context as httpx_client:
-            self._apply_updates_batched(processed_updates_requests, httpx_client)
         logger.debug(
-            "Finished updating Vespa documents in %.2f seconds",
+            "Finished updating %d Vespa chunks in %.2f seconds",
+            len(processed_updates_requests),
             time.monotonic() - update_start,
         )
+        return {
+            cleaned_doc_id_to_original_doc_id[failed_doc_id]
+            for failed_doc_id in failed_doc_ids
+        }
 
     def kg_chunk_updates(
         self, kg_update_requests: list[KGUChunkUpdateRequest], tenant_id: str
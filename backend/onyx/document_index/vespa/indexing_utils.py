@@ -1,5 +1,8 @@
+import asyncio
 import concurrent.futures
+import contextlib
 import json
+import math
 import uuid
 from abc import ABC
 from abc import abstractmethod
@@ -7,16 +10,20 @@ from collections.abc import Callable
 from datetime import datetime
 from datetime import timezone
 from http import HTTPStatus
+from typing import Any
 
 import httpx
 from retry import retry
 
+from onyx.configs.app_configs import VESPA_ASYNC_FEED_MAX_IN_FLIGHT
 from onyx.connectors.cross_connector_utils.miscellaneous_utils import (
     get_experts_stores_representations,
 )
+from onyx.connectors.models import Document
 from onyx.document_index.document_index_utils import get_uuid_from_chunk
 from onyx.document_index.document_index_utils import get_uuid_from_chunk_info_old
 from onyx.document_index.interfaces import MinimalDocumentIndexingInfo
+from onyx.document_index.vespa.shared_utils.utils import get_vespa_async_http_client
 from onyx.document_index.vespa.shared_utils.utils import remove_invalid_unicode_chars
 from onyx.document_index.vespa.shared_utils.utils import (
     replace_invalid_doc_id_characters,
@@ -126,30 +133,9 @@ def get_existing_documents_from_chunks(
     return document_ids
 
 
-@retry(tries=5, delay=1, backoff=2)
-def _index_vespa_chunk(
-    chunk: DocMetadataAwareIndexChunk,
-    index_name: str,
-    http_client: httpx.Client,
-    multitenant: bool,
-) -> None:
-    json_header = {
-        "Content-Type": "application/json",
-    }
-    document = chunk.source_document
-
-    # No minichunk documents in vespa, minichunk vectors are stored in the chunk itself
-
-    vespa_chunk_id = str(get_uuid_from_chunk(chunk))
-
-    embeddings = chunk.embeddings
-
-    embeddings_name_vector_map = {"full_chunk": embeddings.full_embedding}
-
-    if embeddings.mini_chunk_embeddings:
-        for ind, m_c_embed in enumerate(embeddings.mini_chunk_embeddings):
-            embeddings_name_vector_map[f"mini_chunk_{ind}"] = m_c_embed
-
+def build_vespa_document_fields(document: Document) -> dict[str, Any]:
+    """Builds the Vespa fields that are identical for every chunk of a document.
+    These are sanitized once per document instead of once per chunk."""
     title = document.get_title_for_document_index()
 
     metadata_json = document.metadata
@@ -169,37 +155,87 @@ def _index_vespa_chunk(
             remove_invalid_unicode_chars(metadata) for metadata in metadata_list
         ]
 
-    vespa_document_fields = {
+    return {
         DOCUMENT_ID: document.id,
-        CHUNK_ID: chunk.chunk_id,
-        BLURB: remove_invalid_unicode_chars(chunk.blurb),
         TITLE: remove_invalid_unicode_chars(title) if title else None,
         SKIP_TITLE_EMBEDDING: not title,
+        SOURCE_TYPE: str(document.source.value),
+        SEMANTIC_IDENTIFIER: remove_invalid_unicode_chars(document.semantic_identifier),
+        METADATA: json.dumps(cleaned_metadata_json),
+        # Save as a list for efficient extraction as an Attribute
+        METADATA_LIST: metadata_list,
+        DOC_UPDATED_AT: _vespa_get_updated_at_attribute(document.doc_updated_at),
+        PRIMARY_OWNERS: get_experts_stores_representations(document.primary_owners),
+        SECONDARY_OWNERS: get_experts_stores_representations(document.secondary_owners),
+    }
+
+
+def build_vespa_document_fields_by_id(
+    chunks: list[DocMetadataAwareIndexChunk],
+) -> dict[str, dict[str, Any]]:
+    """Builds the document level Vespa fields once for each document in chunks."""
+    document_fields_by_id: dict[str, dict[str, Any]] = {}
+    for chunk in chunks:
+        document = chunk.source_document
+        if document.id not in document_fields_by_id:
+            document_fields_by_id[document.id] = build_vespa_document_fields(document)
+    return document_fields_by_id
+
+
+def _build_vespa_chunk_url_and_fields(
+    chunk: DocMetadataAwareIndexChunk,
+    index_name: str,
+    multitenant: bool,
+    document_fields: dict[str, Any] | None = None,
+) -> tuple[str, dict[str, Any]]:
+    """Returns the document API url and the Vespa fields to feed for a chunk.
+    document_fields are the prebuilt fields of the chunk's document, if available."""
+    if document_fields is None:
+        document_fields = build_vespa_document_fields(chunk.source_document)
+
+    # No minichunk documents in vespa, minichunk vectors are stored in the chunk itself
+
+    vespa_chunk_id = str(get_uuid_from_chunk(chunk))
+
+    embeddings = chunk.embeddings
+
+    embeddings_name_vector_map = {"full_chunk": embeddings.full_embedding}
+
+    if embeddings.mini_chunk_embeddings:
+        for ind, m_c_embed in enumerate(embeddings.mini_chunk_embeddings):
+            embeddings_name_vector_map[f"mini_chunk_{ind}"] = m_c_embed
+
+    # each piece is sanitized once and reused, removing single characters from the
+    # pieces gives the same result as removing them from the concatenation
+    cleaned_content = remove_invalid_unicode_chars(chunk.content)
+    cleaned_metadata_suffix = remove_invalid_unicode_chars(
+        chunk.metadata_suffix_keyword
+    )
+
+    vespa_document_fields = {
+        **document_fields,
+        CHUNK_ID: chunk.chunk_id,
+        BLURB: remove_invalid_unicode_chars(chunk.blurb),
         # For the BM25 index, the keyword suffix is used, the vector is already generated with the more
         # natural language representation of the metadata section
-        CONTENT: remove_invalid_unicode_chars(
-            f"{chunk.title_prefix}{chunk.doc_summary}{chunk.content}{chunk.chunk_context}{chunk.metadata_suffix_keyword}"
+        CONTENT: (
+            remove_invalid_unicode_chars(f"{chunk.title_prefix}{chunk.doc_summary}")
+            + cleaned_content
+            + remove_invalid_unicode_chars(chunk.chunk_context)
+            + cleaned_metadata_suffix
         ),
         # This duplication of `content` is needed for keyword highlighting
         # Note that it's not exactly the same as the actual content
         # which contains the title prefix and metadata suffix
-        CONTENT_SUMMARY: remove_invalid_unicode_chars(chunk.content),
-        SOURCE_TYPE: str(document.source.value),
+        CONTENT_SUMMARY: cleaned_content,
         SOURCE_LINKS: json.dumps(chunk.source_links),
-        SEMANTIC_IDENTIFIER: remove_invalid_unicode_chars(document.semantic_identifier),
         SECTION_CONTINUATION: chunk.section_continuation,
         LARGE_CHUNK_REFERENCE_IDS: chunk.large_chunk_reference_ids,
-        METADATA: json.dumps(cleaned_metadata_json),
-        # Save as a list for efficient extraction as an Attribute
-        METADATA_LIST: metadata_list,
-        METADATA_SUFFIX: remove_invalid_unicode_chars(chunk.metadata_suffix_keyword),
+        METADATA_SUFFIX: cleaned_metadata_suffix,
         CHUNK_CONTEXT: chunk.chunk_context,
         DOC_SUMMARY: chunk.doc_summary,
         EMBEDDINGS: embeddings_name_vector_map,
         TITLE_EMBEDDING: chunk.title_embedding,
-        DOC_UPDATED_AT: _vespa_get_updated_at_attribute(document.doc_updated_at),
-        PRIMARY_OWNERS: get_experts_stores_representations(document.primary_owners),
-        SECONDARY_OWNERS: get_experts_stores_representations(document.secondary_owners),
         # the only `set` vespa has is `weightedset`, so we have to give each
         # element an arbitrary weight
         # rkuo: acl, docset and boost metadata are also updated through the metadata sync queue
@@ -218,6 +254,36 @@ def _index_vespa_chunk(
         if chunk.tenant_id:
             vespa_document_fields[TENANT_ID] = chunk.tenant_id
     vespa_url = f"{DOCUMENT_ID_ENDPOINT.format(index_name=index_name)}/{vespa_chunk_id}"
+    return vespa_url, vespa_document_fields
+
+
+def _log_vespa_feed_failure(document_id: str, e: Exception, response_text: str) -> None:
+    logger.exception(
+        f"Failed to index document: '{document_id}'. Got response: '{response_text}'"
+    )
+    if isinstance(e, httpx.HTTPStatusError):
+        if e.response.status_code == HTTPStatus.INSUFFICIENT_STORAGE:
+            logger.error(
+                "NOTE: HTTP Status 507 Insufficient Storage usually means "
+                "you need to allocate more memory or disk space to the "
+                "Vespa/index container."
+            )
+
+
+@retry(tries=5, delay=1, backoff=2)
+def _index_vespa_chunk(
+    chunk: DocMetadataAwareIndexChunk,
+    index_name: str,
+    http_client: httpx.Client,
+    multitenant: bool,
+    document_fields: dict[str, Any] | None = None,
+) -> None:
+    json_header = {
+        "Content-Type": "application/json",
+    }
+    vespa_url, vespa_document_fields = _build_vespa_chunk_url_and_fields(
+        chunk, index_name, multitenant, document_fields
+    )
     logger.debug(f'Indexing to URL "{vespa_url}"')
     res = http_client.post(
         vespa_url, headers=json_header, json={"fields": vespa_document_fields}
@@ -225,17 +291,7 @@ def _index_vespa_chunk(
     try:
         res.raise_for_status()
     except Exception as e:
-        logger.exception(
-            f"Failed to index document: '{document.id}'. Got response: '{res.text}'"
-        )
-        if isinstance(e, httpx.HTTPStatusError):
-            if e.response.status_code == HTTPStatus.INSUFFICIENT_STORAGE:
-                logger.error(
-                    "NOTE: HTTP Status 507 Insufficient Storage usually means "
-                    "you need to allocate more memory or disk space to the "
-                    "Vespa/index container."
-                )
-
+        _log_vespa_feed_failure(chunk.source_document.id, e, res.text)
         raise e
 
 
@@ -245,9 +301,15 @@ def batch_index_vespa_chunks(
     http_client: httpx.Client,
     multitenant: bool,
     executor: concurrent.futures.ThreadPoolExecutor | None = None,
+    document_fields_by_id: dict[str, dict[str, Any]] | None = None,
 ) -> None:
+    """document_fields_by_id can be passed in when the chunks of a document are
+    split across several calls, so the document level fields are only built once."""
     external_executor = True
 
+    if document_fields_by_id is None:
+        document_fields_by_id = build_vespa_document_fields_by_id(chunks)
+
     if not executor:
         external_executor = False
         executor = concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS)
@@ -255,7 +317,12 @@ def batch_index_vespa_chunks(
     try:
         chunk_index_future = {
             executor.submit(
-                _index_vespa_chunk, chunk, index_name, http_client, multitenant
+                _index_vespa_chunk,
+                chunk,
+                index_name,
+                http_client,
+                multitenant,
+                document_fields_by_id[chunk.source_document.id],
             ): chunk
             for chunk in chunks
         }
@@ -268,6 +335,151 @@ def batch_index_vespa_chunks(
             executor.shutdown(wait=True)
 
 
+# statuses that signal Vespa is throttling or temporarily unavailable
+_ASYNC_FEED_RETRYABLE_STATUSES = {
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+}
+_ASYNC_FEED_MAX_TRIES = 5
+_ASYNC_FEED_INITIAL_DELAY = 1.0
+_ASYNC_FEED_CONNECTIONS_PER_CLIENT = 8
+
+
+async def _async_index_vespa_chunk(
+    chunk: DocMetadataAwareIndexChunk,
+    index_name: str,
+    http_client: httpx.AsyncClient,
+    multitenant: bool,
+    document_fields: dict[str, Any],
+) -> None:
+    json_header = {
+        "Content-Type": "application/json",
+    }
+    vespa_url, vespa_document_fields = _build_vespa_chunk_url_and_fields(
+        chunk, index_name, multitenant, document_fields
+    )
+
+    delay = _ASYNC_FEED_INITIAL_DELAY
+    for attempt in range(1, _ASYNC_FEED_MAX_TRIES + 1):
+        logger.debug(f'Indexing to URL "{vespa_url}"')
+        try:
+            res = await http_client.post(
+                vespa_url, headers=json_header, json={"fields": vespa_document_fields}
+            )
+            res.raise_for_status()
+            return
+        except httpx.HTTPStatusError as e:
+            # 507 means Vespa has run out of memory / disk, retrying won't help and
+            # other 4xx errors mean the request itself is bad
+            if (
+                attempt == _ASYNC_FEED_MAX_TRIES
+                or e.response.status_code not in _ASYNC_FEED_RETRYABLE_STATUSES
+            ):
+                _log_vespa_feed_failure(chunk.source_document.id, e, e.response.text)
+                raise
+        except httpx.TransportError as e:
+            if attempt == _ASYNC_FEED_MAX_TRIES:
+                _log_vespa_feed_failure(chunk.source_document.id, e, "")
+                raise
+
+        # backing off here also holds this chunk's in flight slot, which slows down
+        # the whole feed while Vespa is throttling
+        await asyncio.sleep(delay)
+        delay *= 2
+
+
+async def _async_batch_index_vespa_chunks(
+    chunks: list[DocMetadataAwareIndexChunk],
+    index_name: str,
+    multitenant: bool,
+    max_in_flight: int,
+    document_fields_by_id: dict[str, dict[str, Any]],
+) -> None:
+    max_in_flight = max(1, max_in_flight)
+    failures: list[BaseException] = []
+
+    async def _feed_chunk(
+        chunk: DocMetadataAwareIndexChunk,
+        http_client: httpx.AsyncClient,
+        free_slots: asyncio.Queue[httpx.AsyncClient],
+    ) -> None:
+        try:
+            await _async_index_vespa_chunk(
+                chunk,
+                index_name,
+                http_client,
+                multitenant,
+                document_fields_by_id[chunk.source_document.id],
+            )
+        except Exception as e:
+            failures.append(e)
+            raise
+        finally:
+            free_slots.put_nowait(http_client)
+
+    # httpcore's async pool scans all of its connections every time it hands one
+    # out, which makes a single pool with many connections CPU bound. The requests
+    # are spread over several small pools instead: every in flight slot is a
+    # connection of one of the clients
+    num_clients = math.ceil(max_in_flight / _ASYNC_FEED_CONNECTIONS_PER_CLIENT)
+    async with contextlib.AsyncExitStack() as exit_stack:
+        free_slots: asyncio.Queue[httpx.AsyncClient] = asyncio.Queue()
+        for i in range(num_clients):
+            num_connections = min(
+                _ASYNC_FEED_CONNECTIONS_PER_CLIENT,
+                max_in_flight - i * _ASYNC_FEED_CONNECTIONS_PER_CLIENT,
+            )
+            http_client = await exit_stack.enter_async_context(
+                get_vespa_async_http_client(max_connections=num_connections)
+            )
+            for _ in range(num_connections):
+                free_slots.put_nowait(http_client)
+
+        tasks: list[asyncio.Task] = []
+        try:
+            for chunk in chunks:
+                # don't build the next request until a slot frees up
+                http_client = await free_slots.get()
+                if failures:
+                    break
+
+                tasks.append(
+                    asyncio.create_task(_feed_chunk(chunk, http_client, free_slots))
+                )
+
+            # Will raise exception if any indexing raised an exception
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    if failures:
+        raise failures[0]
+
+
+def async_batch_index_vespa_chunks(
+    chunks: list[DocMetadataAwareIndexChunk],
+    index_name: str,
+    multitenant: bool,
+    max_in_flight: int = VESPA_ASYNC_FEED_MAX_IN_FLIGHT,
+    document_fields_by_id: dict[str, dict[str, Any]] | None = None,
+) -> None:
+    """Alternative to batch_index_vespa_chunks that feeds the chunks from a single
+    event loop with up to max_in_flight concurrent requests instead of one request
+    per thread. Must not be called from within a running event loop."""
+    if document_fields_by_id is None:
+        document_fields_by_id = build_vespa_document_fields_by_id(chunks)
+
+    asyncio.run(
+        _async_batch_index_vespa_chunks(
+            chunks, index_name, multitenant, max_in_flight, document_fields_by_id
+        )
+    )
+
+
 def clean_chunk_id_copy(
     chunk: DocMetadataAwareIndexChunk,
 ) -> DocMetadataAwareIndexChunk:
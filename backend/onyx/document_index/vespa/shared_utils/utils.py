@@ -7,8 +7,12 @@ import httpx
 from onyx.configs.app_configs import MANAGED_VESPA
 from onyx.configs.app_configs import VESPA_CLOUD_CERT_PATH
 from onyx.configs.app_configs import VESPA_CLOUD_KEY_PATH
+from onyx.configs.app_configs import VESPA_QUERY_KEEPALIVE_EXPIRY
+from onyx.configs.app_configs import VESPA_QUERY_MAX_CONNECTIONS
+from onyx.configs.app_configs import VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS
 from onyx.configs.app_configs import VESPA_REQUEST_TIMEOUT
 from onyx.document_index.vespa_constants import VESPA_APP_CONTAINER_URL
+from onyx.httpx.httpx_pool import HttpxPool
 from onyx.utils.logger import setup_logger
 
 logger = setup_logger()
@@ -53,13 +57,16 @@ def replace_invalid_doc_id_characters(text: str) -> str:
     return text.replace("'", "_")
 
 
+# compiled once at import, this runs on every string field of every indexed chunk
+_ILLEGAL_XML_CHARS_RE: re.Pattern = re.compile(
+    "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufdd0-\ufdef\ufffe\uffff]"
+)
+
+
 def remove_invalid_unicode_chars(text: str) -> str:
     """Vespa does not take in unicode chars that aren't valid for XML.
     This removes them."""
-    _illegal_xml_chars_RE: re.Pattern = re.compile(
-        "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufdd0-\ufdef\ufffe\uffff]"
-    )
-    return _illegal_xml_chars_RE.sub("", text)
+    return _ILLEGAL_XML_CHARS_RE.sub("", text)
 
 
 def get_vespa_http_client(no_timeout: bool = False, http2: bool = True) -> httpx.Client:
@@ -80,6 +87,56 @@ def get_vespa_http_client(no_timeout: bool = False, http2: bool = True) -> httpx
     )
 
 
+def get_vespa_async_http_client(
+    no_timeout: bool = False, max_connections: int | None = None
+) -> httpx.AsyncClient:
+    """
+    Configure and return an async HTTP client for communicating with Vespa,
+    including authentication if needed. HTTP/2 is only negotiated over TLS (managed
+    Vespa), plain http Vespa gets one HTTP/1.1 connection per concurrent request.
+    """
+
+    return httpx.AsyncClient(
+        cert=(
+            cast(tuple[str, str], (VESPA_CLOUD_CERT_PATH, VESPA_CLOUD_KEY_PATH))
+            if MANAGED_VESPA
+            else None
+        ),
+        verify=False if not MANAGED_VESPA else True,
+        timeout=None if no_timeout else VESPA_REQUEST_TIMEOUT,
+        http2=True,
+        limits=httpx.Limits(max_connections=max_connections),
+    )
+
+
+VESPA_QUERY_HTTPX_POOL_NAME = "vespa_query"
+
+
+def get_vespa_query_http_client() -> httpx.Client:
+    """
+    Return the process-wide pooled HTTP client used for querying Vespa.
+    Unlike get_vespa_http_client, connections are reused across searches, so callers
+    must NOT close the returned client (e.g. by using it as a context manager).
+    """
+    HttpxPool.init_client(
+        name=VESPA_QUERY_HTTPX_POOL_NAME,
+        cert=(
+            cast(tuple[str, str], (VESPA_CLOUD_CERT_PATH, VESPA_CLOUD_KEY_PATH))
+            if MANAGED_VESPA
+            else None
+        ),
+        verify=False if not MANAGED_VESPA else True,
+        timeout=VESPA_REQUEST_TIMEOUT,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=VESPA_QUERY_MAX_CONNECTIONS,
+            max_keepalive_connections=VESPA_QUERY_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=VESPA_QUERY_KEEPALIVE_EXPIRY,
+        ),
+    )
+    return HttpxPool.get(VESPA_QUERY_HTTPX_POOL_NAME)
+
+
 def wait_for_vespa_with_timeout(wait_interval: int = 5, wait_limit: int = 60) -> bool:
     """Waits for Vespa to become ready subject to a timeout.
     Returns True if Vespa is ready, False otherwise."""
@@ -1,12 +1,16 @@
 import json
+import tempfile
 from abc import ABC
 from abc import abstractmethod
+from collections.abc import Iterator
 from enum import Enum
-from io import StringIO
+from typing import IO
 from typing import List
 from typing import Optional
 from typing import TypeAlias
 
+import msgpack  # type: ignore
+import zstandard
 from pydantic import BaseModel
 
 from onyx.configs.constants import FileOrigin
@@ -19,6 +23,18 @@ from onyx.utils.logger import setup_logger
 
 logger = setup_logger()
 
+# Batches are stored as a zstd compressed stream of msgpack encoded documents, one
+# msgpack object per document, so both ends can work through a batch one document
+# at a time. Batches written before this format existed are JSON arrays.
+BATCH_FILE_EXTENSION = "msgpack.zst"
+BATCH_FILE_TYPE = "application/zstd"
+LEGACY_BATCH_FILE_EXTENSION = "json"
+LEGACY_BATCH_FILE_TYPE = "application/json"
+
+_BATCH_COMPRESSION_LEVEL = 3
+# batches are spooled to disk while being written once they get larger than this
+_BATCH_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+
 
 class DocumentBatchStorageStateType(str, Enum):
     EXTRACTION = "extraction"
@@ -55,6 +71,10 @@ class DocumentBatchStorage(ABC):
     def get_batch(self, batch_num: int) -> Optional[List[Document]]:
         """Retrieve a batch of documents."""
 
+    @abstractmethod
+    def iter_batch(self, batch_num: int) -> Optional[Iterator[Document]]:
+        """Retrieve a batch of documents one document at a time."""
+
     @abstractmethod
     def delete_batch_by_name(self, batch_file_name: str) -> None:
         """Delete a specific batch."""
@@ -83,13 +103,25 @@ class DocumentBatchStorage(ABC):
     def extract_path_info(self, path: str) -> BatchStoragePathInfo | None:
         """Extract path info from a path."""
 
-    def _serialize_documents(self, documents: list[Document]) -> str:
-        """Serialize documents to JSON string."""
-        # Use mode='json' to properly serialize datetime and other complex types
-        return json.dumps([doc.model_dump(mode="json") for doc in documents], indent=2)
-
-    def _deserialize_documents(self, data: str) -> list[Document]:
-        """Deserialize documents from JSON string."""
+    def _serialize_documents(self, documents: list[Document], out: IO[bytes]) -> None:
+        """Serialize documents to a compressed msgpack stream, one document at a time."""
+        packer = msgpack.Packer()
+        compressor = zstandard.ZstdCompressor(level=_BATCH_COMPRESSION_LEVEL)
+        with compressor.stream_writer(out, closefd=False) as writer:
+            for doc in documents:
+                # Use mode='json' to properly serialize datetime and other complex types
+                writer.write(packer.pack(doc.model_dump(mode="json")))
+
+    def _deserialize_documents(self, data: IO[bytes]) -> Iterator[Document]:
+        """Deserialize documents from a compressed msgpack stream."""
+        with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+            # max_buffer_size=0 lifts the default 100MiB limit on a single document
+            unpacker = msgpack.Unpacker(reader, raw=False, max_buffer_size=0)
+            for doc_dict in unpacker:
+                yield Document.model_validate(doc_dict)
+
+    def _deserialize_legacy_documents(self, data: str) -> list[Document]:
+        """Deserialize documents from a JSON string."""
         doc_dicts = json.loads(data)
         return [Document.model_validate(doc_dict) for doc_dict in doc_dicts]
 
@@ -105,28 +137,33 @@ class FileStoreDocumentBatchStorage(DocumentBatchStorage):
         super().__init__(cc_pair_id, index_attempt_id)
         self.file_store = file_store
 
-    def _get_batch_file_name(self, batch_num: int) -> str:
+    def _get_batch_file_name(
+        self, batch_num: int, extension: str = BATCH_FILE_EXTENSION
+    ) -> str:
         """Generate file name for a document batch."""
-        return f"{self.base_path}/{batch_num}.json"
+        return f"{self.base_path}/{batch_num}.{extension}"
 
     def store_batch(self, batch_num: int, documents: list[Document]) -> None:
         """Store a batch of documents using FileStore."""
         file_name = self._get_batch_file_name(batch_num)
         try:
-            data = self._serialize_documents(documents)
-            content = StringIO(data)
-
-            self.file_store.save_file(
-                file_id=file_name,
-                content=content,
-                display_name=f"Document Batch {batch_num}",
-                file_origin=FileOrigin.OTHER,
-                file_type="application/json",
-                file_metadata={
-                    "batch_num": batch_num,
-                    "document_count": str(len(documents)),
-                },
-            )
+            with tempfile.SpooledTemporaryFile(
+                max_size=_BATCH_SPOOL_MAX_SIZE
+            ) as content:
+                self._serialize_documents(documents, content)
+                content.seek(0)
+
+                self.file_store.save_file(
+                    file_id=file_name,
+                    content=content,
+                    display_name=f"Document Batch {batch_num}",
+                    file_origin=FileOrigin.OTHER,
+                    file_type=BATCH_FILE_TYPE,
+                    file_metadata={
+                        "batch_num": batch_num,
+                        "document_count": str(len(documents)),
+                    },
+                )
 
             logger.debug(
                 f"Stored batch {batch_num} with {len(documents)} documents to FileStore as {file_name}"
@@ -137,31 +174,55 @@ class FileStoreDocumentBatchStorage(DocumentBatchStorage):
 
     def get_batch(self, batch_num: int) -> list[Document] | None:
         """Retrieve a batch of documents from FileStore."""
+        documents_iter = self.iter_batch(batch_num)
+        if documents_iter is None:
+            return None
+
+        try:
+            documents = list(documents_iter)
+        except Exception as e:
+            logger.error(f"Failed to retrieve batch {batch_num}: {e}")
+            raise
+
+        logger.debug(
+            f"Retrieved batch {batch_num} with {len(documents)} documents from FileStore"
+        )
+        return documents
+
+    def iter_batch(self, batch_num: int) -> Iterator[Document] | None:
+        """Retrieve a batch of documents from FileStore, decoding the documents
+        one at a time as they are iterated over."""
         file_name = self._get_batch_file_name(batch_num)
+        legacy_file_name = self._get_batch_file_name(
+            batch_num, LEGACY_BATCH_FILE_EXTENSION
+        )
         try:
-            # Check if file exists
-            if not self.file_store.has_file(
+            if self.file_store.has_file(
                 file_id=file_name,
                 file_origin=FileOrigin.OTHER,
-                file_type="application/json",
+                file_type=BATCH_FILE_TYPE,
             ):
-                logger.warning(
-                    f"Batch {batch_num} not found in FileStore with name {file_name}"
-                )
-                return None
-
-            content_io = self.file_store.read_file(file_name)
-            data = content_io.read().decode("utf-8")
+                content_io = self.file_store.read_file(file_name)
+                return self._deserialize_documents(content_io)
 
-            documents = self._deserialize_documents(data)
-            logger.debug(
-                f"Retrieved batch {batch_num} with {len(documents)} documents from FileStore"
-            )
-            return documents
+            # batches written by an older docfetching worker
+            if self.file_store.has_file(
+                file_id=legacy_file_name,
+                file_origin=FileOrigin.OTHER,
+                file_type=LEGACY_BATCH_FILE_TYPE,
+            ):
+                content_io = self.file_store.read_file(legacy_file_name)
+                data = content_io.read().decode("utf-8")
+                return iter(self._deserialize_legacy_documents(data))
         except Exception as e:
             logger.error(f"Failed to retrieve batch {batch_num}: {e}")
             raise
 
+        logger.warning(
+            f"Batch {batch_num} not found in FileStore with name {file_name}"
+        )
+        return None
+
     def delete_batch_by_name(self, batch_file_name: str) -> None:
         """Delete a specific batch from FileStore."""
         self.file_store.delete_file(batch_file_name)
@@ -170,6 +231,14 @@ class FileStoreDocumentBatchStorage(DocumentBatchStorage):
     def delete_batch_by_num(self, batch_num: int) -> None:
         """Delete a specific batch from FileStore."""
         batch_file_name = self._get_batch_file_name(batch_num)
+        if not self.file_store.has_file(
+            file_id=batch_file_name,
+            file_origin=FileOrigin.OTHER,
+            file_type=BATCH_FILE_TYPE,
+        ):
+            batch_file_name = self._get_batch_file_name(
+                batch_num, LEGACY_BATCH_FILE_EXTENSION
+            )
         self.delete_batch_by_name(batch_file_name)
         logger.debug(f"Deleted batch num {batch_num} {batch_file_name} from FileStore")
 
@@ -197,7 +266,11 @@ class FileStoreDocumentBatchStorage(DocumentBatchStorage):
             path_info = self.extract_path_info(batch_file_name)
             if path_info is None:
                 continue
-            new_batch_file_name = self._get_batch_file_name(path_info.batch_num)
+            # keep the extension, the batch keeps its format
+            extension = batch_file_name.split("/")[-1].split(".", 1)[1]
+            new_batch_file_name = self._get_batch_file_name(
+                path_info.batch_num, extension
+            )
             self.file_store.change_file_id(batch_file_name, new_batch_file_name)
 
     def extract_path_info(self, path: str) -> BatchStoragePathInfo | None:
@@ -211,7 +284,7 @@ class FileStoreDocumentBatchStorage(DocumentBatchStorage):
             return BatchStoragePathInfo(
                 cc_pair_id=int(cc_pair_id),
                 index_attempt_id=int(index_attempt_id),
-                batch_num=int(batch_num.split(".")[0]),  # remove .json
+                batch_num=int(batch_num.split(".")[0]),  # remove the extension
             )
         except Exception as e:
             logger.error(f"Failed to extract path info from {path}: {e}")
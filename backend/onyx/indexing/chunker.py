@@ -157,9 +157,10 @@ class Chunker:
         self.max_context = 0
         self.prompt_tokens = 0
 
-        # Create a token counter function that returns the count instead of the tokens
-        def token_counter(text: str) -> int:
-            return len(tokenizer.encode(text))
+        # The splitters count tokens sentence by sentence. The counts are memoized by the
+        # tokenizer, so the sentences of a chunk are not tokenized again when extracting
+        # its blurb / mini chunks
+        token_counter = tokenizer.count_tokens
 
         self.blurb_splitter = SentenceChunker(
             tokenizer_or_token_counter=token_counter,
@@ -274,9 +275,26 @@ class Chunker:
         link_offsets: dict[int, str] = {}
         chunk_text = ""
 
+        # tokenize all the text sections of the document at once
+        section_texts = [clean_text(str(section.text or "")) for section in sections]
+        text_section_inds = [
+            section_idx
+            for section_idx, section in enumerate(sections)
+            if section_texts[section_idx] and not section.image_file_id
+        ]
+        section_token_counts = dict(
+            zip(
+                text_section_inds,
+                self.tokenizer.count_tokens_batch(
+                    [section_texts[section_idx] for section_idx in text_section_inds]
+                ),
+            )
+        )
+        section_separator_token_count = self.tokenizer.count_tokens(SECTION_SEPARATOR)
+
         for section_idx, section in enumerate(sections):
             # Get section text and other attributes
-            section_text = clean_text(str(section.text or ""))
+            section_text = section_texts[section_idx]
             section_link_text = section.link or ""
             image_url = section.image_file_id
 
@@ -321,7 +339,7 @@ class Chunker:
                 continue
 
             # CASE 2: Normal text section
-            section_token_count = len(self.tokenizer.encode(section_text))
+            section_token_count = section_token_counts.get(section_idx, 0)
 
             # If the section is large on its own, split it separately
             if section_token_count > content_token_limit:
@@ -345,7 +363,8 @@ class Chunker:
                     # If even the split_text is bigger than strict limit, further split
                     if (
                         STRICT_CHUNK_TOKEN_LIMIT
-                        and len(self.tokenizer.encode(split_text)) > content_token_limit
+                        and self.tokenizer.count_tokens(split_text)
+                        > content_token_limit
                     ):
                         smaller_chunks = self._split_oversized_chunk(
                             split_text, content_token_limit
@@ -375,11 +394,9 @@ class Chunker:
                 continue
 
             # If we can still fit this section into the current chunk, do so
-            current_token_count = len(self.tokenizer.encode(chunk_text))
+            current_token_count = self.tokenizer.count_tokens(chunk_text)
             current_offset = len(shared_precompare_cleanup(chunk_text))
-            next_section_tokens = (
-                len(self.tokenizer.encode(SECTION_SEPARATOR)) + section_token_count
-            )
+            next_section_tokens = section_separator_token_count + section_token_count
 
             if next_section_tokens + current_token_count <= content_token_limit:
                 if chunk_text:
@@ -426,7 +443,7 @@ class Chunker:
         # Title prep
         title = self._extract_blurb(document.get_title_for_document_index() or "")
         title_prefix = title + RETURN_SEPARATOR if title else ""
-        title_tokens = len(self.tokenizer.encode(title_prefix))
+        title_tokens = self.tokenizer.count_tokens(title_prefix)
 
         # Metadata prep
         metadata_suffix_semantic = ""
@@ -439,7 +456,7 @@ class Chunker:
             ) = _get_metadata_suffix_for_document_index(
                 document.metadata, include_separator=True
             )
-            metadata_tokens = len(self.tokenizer.encode(metadata_suffix_semantic))
+            metadata_tokens = self.tokenizer.count_tokens(metadata_suffix_semantic)
 
         # If metadata is too large, skip it in the semantic content
         if metadata_tokens >= self.chunk_token_limit * MAX_METADATA_PERCENTAGE:
@@ -450,8 +467,7 @@ class Chunker:
         doc_token_count = 0
         if self.enable_contextual_rag:
             doc_content = document.get_text_content()
-            tokenized_doc = self.tokenizer.tokenize(doc_content)
-            doc_token_count = len(tokenized_doc)
+            doc_token_count = self.tokenizer.count_tokens(doc_content)
 
             # check if doc + title + metadata fits in a single chunk. If so, no need for contextual RAG
             single_chunk_fits = (
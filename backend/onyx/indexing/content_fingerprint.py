@@ -0,0 +1,85 @@
+import hashlib
+import json
+
+from onyx.configs.app_configs import BLURB_SIZE
+from onyx.configs.app_configs import MINI_CHUNK_SIZE
+from onyx.configs.app_configs import USE_CHUNK_SUMMARY
+from onyx.configs.app_configs import USE_DOCUMENT_SUMMARY
+from onyx.configs.model_configs import USE_INFORMATION_CONTENT_CLASSIFICATION
+from onyx.connectors.models import Document
+from onyx.indexing.chunker import CHUNK_OVERLAP
+from onyx.indexing.chunker import Chunker
+from onyx.indexing.embedder import IndexingEmbedder
+from onyx.llm.interfaces import LLM
+
+# bump this whenever the chunking / embedding logic changes in a way that should
+# cause all documents to be re-indexed
+CONTENT_FINGERPRINT_VERSION = 1
+
+
+def build_indexing_config_fingerprint(
+    chunker: Chunker,
+    embedder: IndexingEmbedder,
+    llm: LLM | None,
+) -> str:
+    """Everything outside of the document itself that changes what ends up in the
+    document index for it."""
+    return json.dumps(
+        {
+            "version": CONTENT_FINGERPRINT_VERSION,
+            "include_metadata": chunker.include_metadata,
+            "chunk_token_limit": chunker.chunk_token_limit,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "blurb_size": BLURB_SIZE,
+            "mini_chunk_size": MINI_CHUNK_SIZE,
+            "enable_multipass": chunker.enable_multipass,
+            "enable_large_chunks": chunker.enable_large_chunks,
+            "enable_contextual_rag": chunker.enable_contextual_rag,
+            "contextual_rag_llm": (
+                llm.config.model_name if chunker.enable_contextual_rag and llm else None
+            ),
+            "use_chunk_summary": USE_CHUNK_SUMMARY,
+            "use_document_summary": USE_DOCUMENT_SUMMARY,
+            "content_classification": USE_INFORMATION_CONTENT_CLASSIFICATION,
+            "provider_type": embedder.provider_type,
+            "model_name": embedder.model_name,
+            "normalize": embedder.normalize,
+            "passage_prefix": embedder.passage_prefix,
+        },
+        sort_keys=True,
+        default=str,
+    )
+
+
+def compute_content_fingerprint(document: Document, indexing_config: str) -> str:
+    """Hash of everything that goes into the chunks / embeddings of a document. Access
+    related fields (external access, document sets, boost, ...) are left out on
+    purpose since they are updated without re-indexing, via the metadata sync.
+
+    doc_updated_at is also left out, some connectors (e.g. file) use the time of
+    the fetch when the source doesn't provide one. It's assigned to the chunks of
+    the unchanged documents with a partial update instead."""
+    hasher = hashlib.sha256()
+    hasher.update(indexing_config.encode("utf-8"))
+    hasher.update(
+        json.dumps(
+            document.model_dump(
+                mode="json",
+                include={
+                    "id",
+                    "source",
+                    "semantic_identifier",
+                    "title",
+                    "metadata",
+                    "primary_owners",
+                    "secondary_owners",
+                },
+            ),
+            sort_keys=True,
+        ).encode("utf-8")
+    )
+    for section in document.sections:
+        hasher.update(
+            json.dumps(section.model_dump(mode="json"), sort_keys=True).encode("utf-8")
+        )
+    return hasher.hexdigest()
@@ -11,6 +11,7 @@ from onyx.indexing.indexing_heartbeat import IndexingHeartbeatInterface
 from onyx.indexing.models import ChunkEmbedding
 from onyx.indexing.models import DocAwareChunk
 from onyx.indexing.models import IndexChunk
+from onyx.natural_language_processing.embedding_cache import get_embedding_cache
 from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
 from onyx.utils.logger import setup_logger
 from onyx.utils.timing import log_function_time
@@ -68,6 +69,7 @@ class IndexingEmbedder(ABC):
             server_port=INDEXING_MODEL_SERVER_PORT,
             retrim_content=True,
             callback=callback,
+            embedding_cache=get_embedding_cache(),
         )
 
     @abstractmethod
@@ -36,6 +36,7 @@ from onyx.db.document import get_documents_by_ids
 from onyx.db.document import mark_document_as_indexed_for_cc_pair__no_commit
 from onyx.db.document import prepare_to_modify_documents
 from onyx.db.document import update_docs_chunk_count__no_commit
+from onyx.db.document import update_docs_content_fingerprint__no_commit
 from onyx.db.document import update_docs_last_modified__no_commit
 from onyx.db.document import update_docs_updated_at__no_commit
 from onyx.db.document import upsert_document_by_connector_credential_pair
@@ -55,10 +56,14 @@ from onyx.document_index.document_index_utils import (
 from onyx.document_index.interfaces import DocumentIndex
 from onyx.document_index.interfaces import DocumentMetadata
 from onyx.document_index.interfaces import IndexBatchParams
+from onyx.document_index.interfaces import MinimalDocumentIndexingInfo
+from onyx.document_index.interfaces import UpdateRequest
 from onyx.file_processing.image_summarization import summarize_image_with_error_handling
 from onyx.file_store.file_store import get_default_file_store
 from onyx.file_store.utils import store_user_file_plaintext
 from onyx.indexing.chunker import Chunker
+from onyx.indexing.content_fingerprint import build_indexing_config_fingerprint
+from onyx.indexing.content_fingerprint import compute_content_fingerprint
 from onyx.indexing.embedder import embed_chunks_with_failure_handling
 from onyx.indexing.embedder import IndexingEmbedder
 from onyx.indexing.models import DocAwareChunk
@@ -260,6 +265,55 @@ def get_doc_ids_to_update(
     return updatable_docs
 
 
+def _update_unchanged_documents__no_commit(
+    unchanged_docs: list[Document], db_session: Session
+) -> None:
+    """The chunks of these documents are already up to date in the document index.
+    Marking them as modified lets the metadata sync pick up any change to their
+    access / document sets / boost, same as for the re-indexed documents."""
+    if not unchanged_docs:
+        return
+
+    update_docs_updated_at__no_commit(
+        ids_to_new_updated_at={
+            doc.id: doc.doc_updated_at for doc in unchanged_docs if doc.doc_updated_at
+        },
+        db_session=db_session,
+    )
+    update_docs_last_modified__no_commit(
+        document_ids=[doc.id for doc in unchanged_docs], db_session=db_session
+    )
+
+
+def _update_unchanged_documents_in_index(
+    unchanged_docs: list[Document],
+    id_to_db_doc_map: dict[str, DBDocument],
+    document_index: DocumentIndex,
+    tenant_id: str,
+) -> set[str]:
+    """doc_updated_at is not part of the content fingerprint, so it's assigned to
+    the chunks of the unchanged documents directly to keep the time based search
+    filters / decay right. Returns the IDs of the documents that failed to update."""
+    update_requests = [
+        UpdateRequest(
+            minimal_document_indexing_info=[
+                MinimalDocumentIndexingInfo(
+                    doc_id=doc.id,
+                    chunk_start_index=id_to_db_doc_map[doc.id].chunk_count or 0,
+                )
+            ],
+            doc_updated_at=doc.doc_updated_at,
+        )
+        for doc in unchanged_docs
+        if doc.doc_updated_at
+        and doc.doc_updated_at != id_to_db_doc_map[doc.id].doc_updated_at
+    ]
+    if not update_requests:
+        return set()
+
+    return document_index.update(update_requests, tenant_id=tenant_id)
+
+
 def index_doc_batch_with_handler(
     *,
     chunker: Chunker,
@@ -271,6 +325,8 @@ def index_doc_batch_with_handler(
     db_session: Session,
     tenant_id: str,
     ignore_time_skip: bool = False,
+    ignore_content_fingerprint: bool = False,
+    track_content_fingerprint: bool = True,
     enable_contextual_rag: bool = False,
     llm: LLM | None = None,
 ) -> IndexingPipelineResult:
@@ -284,6 +340,8 @@ def index_doc_batch_with_handler(
             index_attempt_metadata=index_attempt_metadata,
             db_session=db_session,
             ignore_time_skip=ignore_time_skip,
+            ignore_content_fingerprint=ignore_content_fingerprint,
+            track_content_fingerprint=track_content_fingerprint,
             tenant_id=tenant_id,
             enable_contextual_rag=enable_contextual_rag,
             llm=llm,
@@ -699,12 +757,20 @@ def index_doc_batch(
     enable_contextual_rag: bool = False,
     llm: LLM | None = None,
     ignore_time_skip: bool = False,
+    ignore_content_fingerprint: bool = False,
+    track_content_fingerprint: bool = True,
     filter_fnc: Callable[[list[Document]], list[Document]] = filter_documents,
 ) -> IndexingPipelineResult:
     """Takes different pieces of the indexing pipeline and applies it to a batch of documents
     Note that the documents should already be batched at this point so that it does not inflate the
     memory requirements
 
+    Documents whose content fingerprint matches the one they were last indexed with are
+    not chunked / embedded / written again, only their metadata is synced. Pass
+    ignore_content_fingerprint to force re-indexing them. With
+    track_content_fingerprint=False (e.g. for an index that's being built), the
+    fingerprints are neither checked nor updated.
+
     Returns a tuple where the first element is the number of new docs and the
     second element is the number of chunks."""
 
@@ -742,6 +808,70 @@ def index_doc_batch(
             failures=[],
         )
 
+    indexing_config = build_indexing_config_fingerprint(
+        chunker=chunker, embedder=embedder, llm=llm
+    )
+    doc_id_to_content_fingerprint = {
+        doc.id: compute_content_fingerprint(doc, indexing_config)
+        for doc in ctx.updatable_docs
+    }
+    unchanged_docs: list[Document] = []
+    if track_content_fingerprint and not ignore_content_fingerprint:
+        unchanged_docs = [
+            doc
+            for doc in ctx.updatable_docs
+            if doc.id in ctx.id_to_db_doc_map
+            and ctx.id_to_db_doc_map[doc.id].chunk_count is not None
+            and ctx.id_to_db_doc_map[doc.id].content_fingerprint
+            == doc_id_to_content_fingerprint[doc.id]
+        ]
+    if unchanged_docs:
+        failed_update_doc_ids = _update_unchanged_documents_in_index(
+            unchanged_docs=unchanged_docs,
+            id_to_db_doc_map=ctx.id_to_db_doc_map,
+            document_index=document_index,
+            tenant_id=tenant_id,
+        )
+        if failed_update_doc_ids:
+            logger.warning(
+                f"Failed to update {len(failed_update_doc_ids)} unchanged documents, "
+                f"re-indexing them instead. Doc IDs: {failed_update_doc_ids}"
+            )
+            unchanged_docs = [
+                doc for doc in unchanged_docs if doc.id not in failed_update_doc_ids
+            ]
+
+    if unchanged_docs:
+        unchanged_doc_ids = {doc.id for doc in unchanged_docs}
+        logger.info(
+            f"Skipping chunking and embedding of {len(unchanged_docs)} documents "
+            f"with unchanged content. Skipped doc IDs: {unchanged_doc_ids}"
+        )
+        ctx.updatable_docs = [
+            doc for doc in ctx.updatable_docs if doc.id not in unchanged_doc_ids
+        ]
+
+    if not ctx.updatable_docs:
+        with prepare_to_modify_documents(
+            db_session=db_session, document_ids=[doc.id for doc in unchanged_docs]
+        ):
+            _update_unchanged_documents__no_commit(
+                unchanged_docs=unchanged_docs, db_session=db_session
+            )
+            mark_document_as_indexed_for_cc_pair__no_commit(
+                connector_id=index_attempt_metadata.connector_id,
+                credential_id=index_attempt_metadata.credential_id,
+                document_ids=[doc.id for doc in filtered_documents],
+                db_session=db_session,
+            )
+            db_session.commit()
+        return IndexingPipelineResult(
+            new_docs=0,
+            total_docs=len(filtered_documents),
+            total_chunks=0,
+            failures=[],
+        )
+
     # Convert documents to IndexingDocument objects with processed section
     # logger.debug("Processing image sections")
     ctx.indexable_docs = process_image_sections(ctx.updatable_docs)
@@ -811,7 +941,10 @@ def index_doc_batch(
     # Acquires a lock on the documents so that no other process can modify them
     # NOTE: don't need to acquire till here, since this is when the actual race condition
     # with Vespa can occur.
-    with prepare_to_modify_documents(db_session=db_session, document_ids=updatable_ids):
+    with prepare_to_modify_documents(
+        db_session=db_session,
+        document_ids=updatable_ids + [doc.id for doc in unchanged_docs],
+    ):
         doc_id_to_access_info = get_access_for_documents(
             document_ids=updatable_ids, db_session=db_session
         )
@@ -1000,6 +1133,29 @@ def index_doc_batch(
             db_session=db_session,
         )
 
+        # documents that failed to be embedded / written are always retried
+        failed_doc_ids = {
+            failure.failed_document.document_id
+            for failure in vector_db_write_failures + embedding_failures
+            if failure.failed_document
+        }
+        if track_content_fingerprint:
+            update_docs_content_fingerprint__no_commit(
+                doc_id_to_content_fingerprint={
+                    document_id: (
+                        doc_id_to_content_fingerprint[document_id]
+                        if document_id not in failed_doc_ids
+                        else None
+                    )
+                    for document_id in updatable_ids
+                },
+                db_session=db_session,
+            )
+
+        _update_unchanged_documents__no_commit(
+            unchanged_docs=unchanged_docs, db_session=db_session
+        )
+
         update_user_file_token_count__no_commit(
             user_file_id_to_token_count=user_file_id_to_token_count,
             db_session=db_session,
@@ -1048,6 +1204,7 @@ def run_indexing_pipeline(
     tenant_id: str,
     chunker: Chunker | None = None,
     ignore_time_skip: bool = False,
+    ignore_content_fingerprint: bool = False,
 ) -> IndexingPipelineResult:
     """Builds a pipeline which takes in a list (batch) of docs and indexes them."""
     all_search_settings = get_active_search_settings(db_session)
@@ -1061,6 +1218,12 @@ def run_indexing_pipeline(
 
     multipass_config = get_multipass_config(search_settings)
 
+    # the content fingerprints stored with the documents are those of the primary
+    # index, a secondary index that's being built always gets all the documents
+    track_content_fingerprint = (
+        document_index.index_name == all_search_settings.primary.index_name
+    )
+
     enable_contextual_rag = (
         search_settings.enable_contextual_rag or ENABLE_CONTEXTUAL_RAG
     )
@@ -1088,6 +1251,8 @@ def run_indexing_pipeline(
         document_batch=document_batch,
         index_attempt_metadata=index_attempt_metadata,
         ignore_time_skip=ignore_time_skip,
+        ignore_content_fingerprint=ignore_content_fingerprint,
+        track_content_fingerprint=track_content_fingerprint,
         db_session=db_session,
         tenant_id=tenant_id,
         enable_contextual_rag=enable_contextual_rag,
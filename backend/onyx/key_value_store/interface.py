@@ -18,6 +18,11 @@ class KeyValueStore:
     def load(self, key: str, refresh_cache: bool = False) -> JSON_ro:
         raise NotImplementedError
 
+    @abc.abstractmethod
+    def load_many(self, keys: list[str]) -> dict[str, JSON_ro]:
+        """Keys that don't exist are left out of the result"""
+        raise NotImplementedError
+
     @abc.abstractmethod
     def delete(self, key: str) -> None:
         raise NotImplementedError
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from onyx.configs.app_configs import KV_STORE_LOCAL_CACHE_MAX_ENTRIES
+from onyx.configs.app_configs import KV_STORE_LOCAL_CACHE_TTL
+from onyx.redis.redis_pool import get_raw_redis_client
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+_INVALIDATION_CHANNEL = "onyx_kv_store_invalidation"
+_LISTENER_POLL_TIMEOUT = 5.0
+_LISTENER_RETRY_INTERVAL = 5.0
+
+
+class KVLocalCache:
+    """Per process LRU cache of the serialized values of the key value store.
+
+    A cached value of None means that the key doesn't exist. Values are only served
+    while the process is subscribed to the invalidations broadcast by the other
+    processes, if the subscription drops everything is cleared."""
+
+    def __init__(self, ttl: float, max_entries: int) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple[str, str], tuple[float, str | None]] = (
+            OrderedDict()
+        )
+        # bumped on every invalidation, values fetched before an invalidation came in
+        # may be outdated and are not cached
+        self._generation = 0
+        self._subscribed = False
+        self._listener_pid: int | None = None
+        self._origin = uuid.uuid4().hex
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, tenant_id: str, key: str) -> tuple[bool, str | None]:
+        """Returns whether the key was cached and its cached value."""
+        if not self._is_active():
+            return False, None
+
+        with self._lock:
+            entry = self._entries.get((tenant_id, key))
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[(tenant_id, key)]
+                return False, None
+            self._entries.move_to_end((tenant_id, key))
+            return True, value
+
+    def set(self, tenant_id: str, key: str, value: str | None, generation: int) -> None:
+        if not self._is_active():
+            return
+
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[(tenant_id, key)] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end((tenant_id, key))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: str, key: str) -> None:
+        """Drops the key from the cache of every process."""
+        if self.ttl <= 0:
+            return
+
+        self._drop(tenant_id, key)
+        try:
+            get_raw_redis_client().publish(
+                _INVALIDATION_CHANNEL,
+                json.dumps(
+                    {"tenant_id": tenant_id, "key": key, "origin": self._origin}
+                ),
+            )
+        except Exception:
+            logger.exception(f"Failed to broadcast the invalidation of key '{key}'")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def _drop(self, tenant_id: str, key: str) -> None:
+        with self._lock:
+            self._entries.pop((tenant_id, key), None)
+            self._generation += 1
+
+    def _is_active(self) -> bool:
+        if self.ttl <= 0:
+            return False
+        self._ensure_listener()
+        return self._subscribed
+
+    def _ensure_listener(self) -> None:
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            # the listener thread doesn't survive a fork, and the entries of the parent
+            # process stop being invalidated as soon as the fork happened
+            self._entries.clear()
+            self._subscribed = False
+            self._origin = uuid.uuid4().hex
+            self._listener_pid = pid
+
+        threading.Thread(
+            target=self._listen, name="kv_store_cache_invalidation", daemon=True
+        ).start()
+
+    def _listen(self) -> None:
+        while True:
+            try:
+                pubsub = get_raw_redis_client().pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(_INVALIDATION_CHANNEL)
+                    self._subscribed = True
+                    while True:
+                        message = pubsub.get_message(timeout=_LISTENER_POLL_TIMEOUT)
+                        if message is not None:
+                            self._handle_message(message["data"])
+                finally:
+                    self._subscribed = False
+                    self.clear()
+                    pubsub.close()
+            except Exception:
+                logger.exception(
+                    "Key value store cache invalidation listener failed, retrying"
+                )
+            time.sleep(_LISTENER_RETRY_INTERVAL)
+
+    def _handle_message(self, data: bytes | str) -> None:
+        invalidation = json.loads(data)
+        if invalidation["origin"] == self._origin:
+            # already dropped when the value was stored / deleted by this process
+            return
+        self._drop(invalidation["tenant_id"], invalidation["key"])
+
+
+kv_local_cache = KVLocalCache(
+    ttl=KV_STORE_LOCAL_CACHE_TTL, max_entries=KV_STORE_LOCAL_CACHE_MAX_ENTRIES
+)
@@ -7,9 +7,12 @@ from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.models import KVStore
 from onyx.key_value_store.interface import KeyValueStore
 from onyx.key_value_store.interface import KvKeyNotFoundError
+from onyx.key_value_store.local_cache import kv_local_cache
 from onyx.redis.redis_pool import get_redis_client
+from onyx.redis.redis_pool import TenantRedis
 from onyx.utils.logger import setup_logger
 from onyx.utils.special_types import JSON_ro
+from shared_configs.contextvars import get_current_tenant_id
 
 
 logger = setup_logger()
@@ -21,11 +24,18 @@ KV_REDIS_KEY_EXPIRATION = 60 * 60 * 24  # 1 Day
 
 class PgRedisKVStore(KeyValueStore):
     def __init__(self, redis_client: Redis | None = None) -> None:
+        self.tenant_id = get_current_tenant_id()
         # If no redis_client is provided, fall back to the context var
         if redis_client is not None:
             self.redis_client = redis_client
         else:
-            self.redis_client = get_redis_client()
+            self.redis_client = get_redis_client(tenant_id=self.tenant_id)
+
+    def _unprefixed_redis_key(self, key: str) -> str:
+        # mget and pipelines don't automatically add the tenant_id prefix
+        if isinstance(self.redis_client, TenantRedis):
+            return f"{self.redis_client.tenant_id}:{REDIS_KEY_PREFIX}{key}"
+        return REDIS_KEY_PREFIX + key
 
     def store(self, key: str, val: JSON_ro, encrypt: bool = False) -> None:
         # Not encrypted in Redis, but encrypted in Postgres
@@ -52,7 +62,20 @@ class PgRedisKVStore(KeyValueStore):
                 db_session.add(obj)
             db_session.commit()
 
+        kv_local_cache.invalidate(self.tenant_id, key)
+        kv_local_cache.set(
+            self.tenant_id, key, json.dumps(val), kv_local_cache.generation
+        )
+
     def load(self, key: str, refresh_cache: bool = False) -> JSON_ro:
+        if not refresh_cache:
+            is_cached, cached_value = kv_local_cache.get(self.tenant_id, key)
+            if is_cached:
+                if cached_value is None:
+                    raise KvKeyNotFoundError
+                return json.loads(cached_value)
+
+        generation = kv_local_cache.generation
         if not refresh_cache:
             try:
                 redis_value = self.redis_client.get(REDIS_KEY_PREFIX + key)
@@ -61,7 +84,11 @@ class PgRedisKVStore(KeyValueStore):
                         raise ValueError(
                             f"Redis value for key '{key}' is not a bytes object"
                         )
-                    return json.loads(redis_value.decode("utf-8"))
+                    serialized_value = redis_value.decode("utf-8")
+                    kv_local_cache.set(
+                        self.tenant_id, key, serialized_value, generation
+                    )
+                    return json.loads(serialized_value)
             except Exception as e:
                 logger.error(
                     f"Failed to get value from Redis for key '{key}': {str(e)}"
@@ -70,22 +97,81 @@ class PgRedisKVStore(KeyValueStore):
         with get_session_with_current_tenant() as db_session:
             obj = db_session.query(KVStore).filter_by(key=key).first()
             if not obj:
+                kv_local_cache.set(self.tenant_id, key, None, generation)
                 raise KvKeyNotFoundError
 
-            if obj.value is not None:
-                value = obj.value
-            elif obj.encrypted_value is not None:
-                value = obj.encrypted_value
-            else:
-                value = None
-
+            value = _get_value(obj)
+            serialized_value = json.dumps(value)
             try:
-                self.redis_client.set(REDIS_KEY_PREFIX + key, json.dumps(value))
+                self.redis_client.set(REDIS_KEY_PREFIX + key, serialized_value)
             except Exception as e:
                 logger.error(f"Failed to set value in Redis for key '{key}': {str(e)}")
+            kv_local_cache.set(self.tenant_id, key, serialized_value, generation)
 
             return cast(JSON_ro, value)
 
+    def load_many(self, keys: list[str]) -> dict[str, JSON_ro]:
+        values: dict[str, JSON_ro] = {}
+        uncached_keys: list[str] = []
+        for key in keys:
+            is_cached, cached_value = kv_local_cache.get(self.tenant_id, key)
+            if not is_cached:
+                uncached_keys.append(key)
+            elif cached_value is not None:
+                values[key] = json.loads(cached_value)
+        if not uncached_keys:
+            return values
+
+        generation = kv_local_cache.generation
+        missing_keys: list[str] = []
+        try:
+            redis_values = cast(
+                list[bytes | None],
+                self.redis_client.mget(
+                    [self._unprefixed_redis_key(key) for key in uncached_keys]
+                ),
+            )
+            for key, redis_value in zip(uncached_keys, redis_values):
+                if not redis_value:
+                    missing_keys.append(key)
+                    continue
+                serialized_value = redis_value.decode("utf-8")
+                kv_local_cache.set(self.tenant_id, key, serialized_value, generation)
+                values[key] = json.loads(serialized_value)
+        except Exception as e:
+            logger.error(f"Failed to get values from Redis for keys {keys}: {str(e)}")
+            missing_keys = [key for key in uncached_keys if key not in values]
+
+        if not missing_keys:
+            return values
+
+        with get_session_with_current_tenant() as db_session:
+            objs = db_session.query(KVStore).filter(KVStore.key.in_(missing_keys)).all()
+
+        serialized_values: dict[str, str] = {}
+        for obj in objs:
+            value = _get_value(obj)
+            values[obj.key] = cast(JSON_ro, value)
+            serialized_values[obj.key] = json.dumps(value)
+
+        if serialized_values:
+            try:
+                pipe = self.redis_client.pipeline(transaction=False)
+                for key, serialized_value in serialized_values.items():
+                    pipe.set(self._unprefixed_redis_key(key), serialized_value)
+                pipe.execute()
+            except Exception as e:
+                logger.error(
+                    f"Failed to set values in Redis for keys {list(serialized_values)}: "
+                    f"{str(e)}"
+                )
+        for key in missing_keys:
+            kv_local_cache.set(
+                self.tenant_id, key, serialized_values.get(key), generation
+            )
+
+        return values
+
     def delete(self, key: str) -> None:
         try:
             self.redis_client.delete(REDIS_KEY_PREFIX + key)
@@ -97,3 +183,13 @@ class PgRedisKVStore(KeyValueStore):
             if result == 0:
                 raise KvKeyNotFoundError
             db_session.commit()
+
+        kv_local_cache.invalidate(self.tenant_id, key)
+
+
+def _get_value(obj: KVStore) -> JSON_ro | None:
+    if obj.value is not None:
+        return obj.value
+    if obj.encrypted_value is not None:
+        return obj.encrypted_value
+    return None
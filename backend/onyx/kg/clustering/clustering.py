@@ -1,40 +1,54 @@
 import time
+import uuid
+from collections import defaultdict
 from collections.abc import Generator
 from typing import cast
+from typing import NamedTuple
 
 from rapidfuzz.fuzz import ratio
+from rapidfuzz.process import cdist
+from rapidfuzz.process import cpdist
 from redis.lock import Lock as RedisLock
-from sqlalchemy import func
-from sqlalchemy import text
+from sqlalchemy import select
+from sqlalchemy import tuple_
+from sqlalchemy import update
 
 from onyx.background.celery.tasks.kg_processing.utils import extend_lock
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
+from onyx.configs.kg_configs import KG_CLUSTERING_BATCH_SIZE
 from onyx.configs.kg_configs import KG_CLUSTERING_RETRIEVE_THRESHOLD
 from onyx.configs.kg_configs import KG_CLUSTERING_THRESHOLD
+from onyx.db.document import update_documents_kg_info
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
+from onyx.db.entities import get_entity_clustering_candidates
 from onyx.db.entities import KGEntity
 from onyx.db.entities import KGEntityExtractionStaging
-from onyx.db.entities import merge_entities
-from onyx.db.entities import transfer_entity
+from onyx.db.entities import set_staging_entities_transferred
+from onyx.db.entities import transfer_entities
+from onyx.db.entities import update_clustered_entities
 from onyx.db.kg_config import get_kg_config_settings
 from onyx.db.kg_config import validate_kg_settings
 from onyx.db.models import Document
 from onyx.db.models import KGEntityType
 from onyx.db.models import KGRelationshipExtractionStaging
 from onyx.db.models import KGRelationshipTypeExtractionStaging
-from onyx.db.relationships import transfer_relationship
-from onyx.db.relationships import transfer_relationship_type
-from onyx.db.relationships import upsert_relationship
-from onyx.db.relationships import upsert_relationship_type
+from onyx.db.relationships import transfer_relationship_types
+from onyx.db.relationships import transfer_relationships
+from onyx.db.relationships import upsert_relationship_types
+from onyx.db.relationships import upsert_relationships
 from onyx.document_index.vespa.kg_interactions import (
     get_kg_vespa_info_update_requests_for_document,
 )
 from onyx.document_index.vespa.kg_interactions import update_kg_chunks_vespa_info
+from onyx.kg.clustering.entity_index import bump_kg_entity_index_version
+from onyx.kg.clustering.entity_index import get_name_trigrams
+from onyx.kg.models import KGClusteredEntity
 from onyx.kg.models import KGGroundingType
+from onyx.kg.models import KGStage
+from onyx.kg.utils.formatting_utils import make_entity_id
 from onyx.kg.utils.formatting_utils import make_relationship_id
 from onyx.utils.logger import setup_logger
 from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
-from shared_configs.configs import POSTGRES_DEFAULT_SCHEMA
 
 logger = setup_logger()
 
@@ -82,17 +96,33 @@ def _get_batch_untransferred_relationship_types(
 def _get_batch_untransferred_relationships(
     batch_size: int,
 ) -> Generator[list[KGRelationshipExtractionStaging], None, None]:
+    # paginated by key, as relationships with untransferred entities are left behind
+    last_key: tuple[str, str | None] | None = None
     while True:
         with get_session_with_current_tenant() as db_session:
+            query = db_session.query(KGRelationshipExtractionStaging).filter(
+                KGRelationshipExtractionStaging.transferred.is_(False)
+            )
+            if last_key is not None:
+                query = query.filter(
+                    tuple_(
+                        KGRelationshipExtractionStaging.id_name,
+                        KGRelationshipExtractionStaging.source_document,
+                    )
+                    > last_key
+                )
             batch = (
-                db_session.query(KGRelationshipExtractionStaging)
-                .filter(KGRelationshipExtractionStaging.transferred.is_(False))
+                query.order_by(
+                    KGRelationshipExtractionStaging.id_name,
+                    KGRelationshipExtractionStaging.source_document,
+                )
                 .limit(batch_size)
                 .all()
             )
             if not batch:
                 break
             yield batch
+            last_key = (batch[-1].id_name, batch[-1].source_document)
 
 
 def _get_batch_entities_with_parent(
@@ -144,151 +174,375 @@ def _get_batch_kg_processed_documents(
             offset += batch_size
 
 
-def _cluster_one_grounded_entity(
-    entity: KGEntityExtractionStaging,
-) -> tuple[KGEntity, bool]:
+def _has_digits(name: str) -> bool:
+    # entities with numbers aren't clustered so we don't cluster version1 and version2, etc.
+    return any(char.isdigit() for char in name)
+
+
+def _trigram_similarity(trigrams: set[str], other_trigrams: set[str]) -> float:
+    # pg_trgm's similarity
+    if not trigrams or not other_trigrams:
+        return 0.0
+    return len(trigrams & other_trigrams) / len(trigrams | other_trigrams)
+
+
+def _to_clustered_entity(entity: KGEntity) -> KGClusteredEntity:
+    return KGClusteredEntity(
+        id_name=entity.id_name,
+        name=entity.name,
+        entity_type_id_name=entity.entity_type_id_name,
+        document_id=entity.document_id,
+        alternative_names=entity.alternative_names or [],
+        occurrences=entity.occurrences,
+        attributes=entity.attributes or {},
+        entity_key=entity.entity_key,
+        parent_key=entity.parent_key,
+        event_time=entity.event_time,
+    )
+
+
+def _merge_into(parent: KGClusteredEntity, child: KGEntityExtractionStaging) -> None:
+    """In-memory equivalent of merge_entities."""
+    if parent.document_id is None and child.document_id is not None:
+        parent.document_id = child.document_id
+    alternative_names = set(parent.alternative_names)
+    alternative_names.update(child.alternative_names or [])
+    alternative_names.add(child.name.lower())
+    alternative_names.discard(parent.name)
+    parent.alternative_names = sorted(alternative_names)
+    parent.occurrences += child.occurrences
+    parent.attributes = parent.attributes | child.attributes
+    parent.entity_key = parent.entity_key or child.entity_key
+    parent.parent_key = parent.parent_key or child.parent_key
+
+
+class _ClusteringResult(NamedTuple):
+    # existing entities that staging entities were merged into
+    merged_entities: list[KGClusteredEntity]
+    # entities to create
+    new_entities: list[KGClusteredEntity]
+    # staging entity id_name -> id_name of the entity it was transferred to
+    transferred_id_names: dict[str, str]
+    # documents whose entity was transferred
+    normalized_document_ids: set[str]
+
+
+def _cluster_entities(
+    entities: list[KGEntityExtractionStaging],
+    entity_names: list[str],
+    candidates: list[tuple[int, KGEntity]],
+) -> _ClusteringResult:
     """
-    Cluster a single grounded entity.
+    Clusters a batch of grounded staging entities in memory, as if they were
+    clustered one after the other: each entity is merged into the most similar
+    existing entity (or entity created earlier in the batch) of the same type, or
+    becomes a new entity.
+
+    The entities are matched by entity_names (the semantic id of their document for
+    document entities), but new entities keep their own name. The candidates are the
+    (index of the staging entity, existing entity) pairs with a similar name, as
+    found by the trigram index.
     """
-    with get_session_with_current_tenant() as db_session:
-        # get entity name and filtering conditions
+    existing_entities: dict[str, KGClusteredEntity] = {}
+    candidate_pairs: list[tuple[int, str]] = []
+    for i, candidate in candidates:
+        if _has_digits(candidate.name):
+            continue
+        if candidate.id_name not in existing_entities:
+            existing_entities[candidate.id_name] = _to_clustered_entity(candidate)
+        candidate_pairs.append((i, candidate.id_name))
+
+    # score all candidates at once
+    min_score = KG_CLUSTERING_THRESHOLD * 100
+    candidate_matches: dict[int, list[tuple[float, str]]] = defaultdict(list)
+    if candidate_pairs:
+        scores = cpdist(
+            [entity_names[i] for i, _ in candidate_pairs],
+            [existing_entities[id_name].name for _, id_name in candidate_pairs],
+            scorer=ratio,
+            workers=-1,
+        )
+        for (i, id_name), score in zip(candidate_pairs, scores):
+            if score >= min_score:
+                candidate_matches[i].append((float(score), id_name))
+
+    merged_id_names: set[str] = set()
+    new_entities: dict[str, KGClusteredEntity] = {}
+    # new entities are matched by the same name as the staging entities (the
+    # semantic id for document entities), not by the name they're stored with
+    new_entity_names: dict[str, str] = {}
+    new_entity_trigrams: dict[str, set[str]] = {}
+    new_entities_by_type: dict[str, list[KGClusteredEntity]] = defaultdict(list)
+    new_document_entities: dict[tuple[str, str], KGClusteredEntity] = {}
+    transferred_id_names: dict[str, str] = {}
+    normalized_document_ids: set[str] = set()
+
+    for i, (entity, entity_name) in enumerate(zip(entities, entity_names)):
+        best_score = -1.0
+        best_entity: KGClusteredEntity | None = None
+
+        if not _has_digits(entity_name):
+            for score, id_name in candidate_matches.get(i, []):
+                existing_entity = existing_entities[id_name]
+                # the document of an entity may have been set by an earlier merge
+                if entity.document_id is not None and existing_entity.document_id:
+                    continue
+                if score > best_score:
+                    best_score = score
+                    best_entity = existing_entity
+
+            # the entities created earlier in the batch aren't in the index yet
+            new_candidates = [
+                new_entity
+                for new_entity in new_entities_by_type[entity.entity_type_id_name]
+                if not (entity.document_id is not None and new_entity.document_id)
+                and not _has_digits(new_entity_names[new_entity.id_name])
+            ]
+            if new_candidates:
+                entity_trigrams = get_name_trigrams(entity_name)
+                new_scores = cdist(
+                    [entity_name],
+                    [
+                        new_entity_names[new_entity.id_name]
+                        for new_entity in new_candidates
+                    ],
+                    scorer=ratio,
+                    score_cutoff=min_score,
+                )[0]
+                for new_entity, score in zip(new_candidates, new_scores):
+                    if (
+                        score >= min_score
+                        and score > best_score
+                        and _trigram_similarity(
+                            entity_trigrams, new_entity_trigrams[new_entity.id_name]
+                        )
+                        >= KG_CLUSTERING_RETRIEVE_THRESHOLD
+                    ):
+                        best_score = float(score)
+                        best_entity = new_entity
+
+        if best_entity is not None:
+            logger.debug(f"Merged {entity.name} with {best_entity.name}")
+            if best_entity.document_id is None and entity.document_id is not None:
+                normalized_document_ids.add(entity.document_id)
+            _merge_into(best_entity, entity)
+            if best_entity.id_name in existing_entities:
+                merged_id_names.add(best_entity.id_name)
+            transferred_id_names[entity.id_name] = best_entity.id_name
+            continue
+
         if entity.document_id is not None:
-            entity_name = cast(
-                str,
-                db_session.query(Document.semantic_id)
-                .filter(Document.id == entity.document_id)
-                .scalar(),
-            ).lower()
-            filtering = [KGEntity.document_id.is_(None)]
-        else:
-            entity_name = entity.name.lower()
-            filtering = []
-
-        # skip those with numbers so we don't cluster version1 and version2, etc.
-        similar_entities: list[KGEntity] = []
-        if not any(char.isdigit() for char in entity_name):
-            # find similar entities, uses GIN index, very efficient
-            db_session.execute(
-                text(
-                    "SET pg_trgm.similarity_threshold = "
-                    + str(KG_CLUSTERING_RETRIEVE_THRESHOLD)
-                )
+            normalized_document_ids.add(entity.document_id)
+            document_entity = new_document_entities.get(
+                (entity.entity_type_id_name, entity.document_id)
             )
-            similar_entities = (
-                db_session.query(KGEntity)
-                .filter(
-                    # find entities of the same type with a similar name
-                    *filtering,
-                    KGEntity.entity_type_id_name == entity.entity_type_id_name,
-                    getattr(func, POSTGRES_DEFAULT_SCHEMA).similarity_op(
-                        KGEntity.name, entity_name
-                    ),
+            if document_entity is not None:
+                # same as the conflict resolution of transfer_entity
+                document_entity.occurrences += entity.occurrences
+                document_entity.attributes = (
+                    document_entity.attributes | entity.attributes
                 )
-                .all()
+                document_entity.entity_key = (
+                    document_entity.entity_key or entity.entity_key
+                )
+                document_entity.parent_key = (
+                    document_entity.parent_key or entity.parent_key
+                )
+                document_entity.event_time = entity.event_time
+                transferred_id_names[entity.id_name] = document_entity.id_name
+                continue
+
+        new_entity = KGClusteredEntity(
+            id_name=make_entity_id(entity.entity_type_id_name, uuid.uuid4().hex[:20]),
+            name=entity.name.casefold(),
+            entity_type_id_name=entity.entity_type_id_name,
+            document_id=entity.document_id,
+            alternative_names=entity.alternative_names or [],
+            occurrences=entity.occurrences,
+            attributes=entity.attributes,
+            entity_key=entity.entity_key,
+            parent_key=entity.parent_key,
+            event_time=entity.event_time,
+        )
+        new_entities[new_entity.id_name] = new_entity
+        new_entity_names[new_entity.id_name] = entity_name
+        new_entity_trigrams[new_entity.id_name] = get_name_trigrams(entity_name)
+        new_entities_by_type[entity.entity_type_id_name].append(new_entity)
+        if entity.document_id is not None:
+            new_document_entities[(entity.entity_type_id_name, entity.document_id)] = (
+                new_entity
             )
+        transferred_id_names[entity.id_name] = new_entity.id_name
+
+    return _ClusteringResult(
+        merged_entities=[existing_entities[id_name] for id_name in merged_id_names],
+        new_entities=list(new_entities.values()),
+        transferred_id_names=transferred_id_names,
+        normalized_document_ids=normalized_document_ids,
+    )
 
-    # find best match
-    best_score = -1.0
-    best_entity = None
-    for similar in similar_entities:
-        # skip those with numbers so we don't cluster version1 and version2, etc.
-        if any(char.isdigit() for char in similar.name):
-            continue
-        score = ratio(similar.name, entity_name)
-        if score >= KG_CLUSTERING_THRESHOLD * 100 and score > best_score:
-            best_score = score
-            best_entity = similar
 
-    # if there is a match, update the entity, otherwise create a new one
+def _cluster_grounded_entity_batch(entities: list[KGEntityExtractionStaging]) -> None:
+    """
+    Clusters a batch of grounded entities and transfers them in a single transaction.
+    """
     with get_session_with_current_tenant() as db_session:
-        if best_entity:
-            logger.debug(f"Merged {entity.name} with {best_entity.name}")
-            update_vespa = (
-                best_entity.document_id is None and entity.document_id is not None
+        # document entities are named after their document
+        document_names: dict[str, str] = {
+            document_id: semantic_id
+            for document_id, semantic_id in db_session.execute(
+                select(Document.id, Document.semantic_id).where(
+                    Document.id.in_(
+                        [
+                            entity.document_id
+                            for entity in entities
+                            if entity.document_id is not None
+                        ]
+                    )
+                )
             )
-            transferred_entity = merge_entities(
-                db_session=db_session, parent=best_entity, child=entity
+        }
+        entity_names = [
+            (
+                document_names.get(entity.document_id) or entity.name
+                if entity.document_id is not None
+                else entity.name
+            ).lower()
+            for entity in entities
+        ]
+
+        # find similar entities, uses GIN index, very efficient
+        query_indices = [
+            i
+            for i, entity_name in enumerate(entity_names)
+            if not _has_digits(entity_name)
+        ]
+        candidates = [
+            (query_indices[query_index], candidate)
+            for query_index, candidate in get_entity_clustering_candidates(
+                db_session,
+                [
+                    (
+                        entity_names[i],
+                        entities[i].entity_type_id_name,
+                        entities[i].document_id is not None,
+                    )
+                    for i in query_indices
+                ],
+                similarity_threshold=KG_CLUSTERING_RETRIEVE_THRESHOLD,
             )
-        else:
-            update_vespa = entity.document_id is not None
-            transferred_entity = transfer_entity(db_session=db_session, entity=entity)
-
+        ]
+
+        result = _cluster_entities(entities, entity_names, candidates)
+
+        # the merges are written first, so that the conflicts of the new entities
+        # add up to the merged values
+        update_clustered_entities(db_session, result.merged_entities)
+        merged_id_names = transfer_entities(db_session, result.new_entities)
+        set_staging_entities_transferred(
+            db_session,
+            {
+                id_name: merged_id_names.get(transferred_id_name, transferred_id_name)
+                for id_name, transferred_id_name in result.transferred_id_names.items()
+            },
+        )
+        update_documents_kg_info(
+            db_session, sorted(result.normalized_document_ids), KGStage.NORMALIZED
+        )
         db_session.commit()
 
-    return transferred_entity, update_vespa
-
 
-def _create_one_parent_child_relationship(entity: KGEntityExtractionStaging) -> None:
+def _create_parent_child_relationship_batch(
+    entities: list[KGEntityExtractionStaging],
+) -> None:
     """
-    Creates a relationship between the entity and its parent, if it exists.
-    Then, updates the entity's parent to the next ancestor.
+    Creates the relationships between the entities and their parents, if they exist.
+    Then, updates the entities' parents to the next ancestors.
     """
     with get_session_with_current_tenant() as db_session:
-        # find the next ancestor
-        parent = (
-            db_session.query(KGEntity)
-            .filter(KGEntity.entity_key == entity.parent_key)
-            .first()
-        )
+        # find the next ancestors
+        parents: dict[str, KGEntity] = {}
+        for ancestor in db_session.scalars(
+            select(KGEntity)
+            .where(KGEntity.entity_key.in_([entity.parent_key for entity in entities]))
+            .order_by(KGEntity.id_name)
+        ):
+            parents.setdefault(ancestor.entity_key, ancestor)
+
+        relationship_types: list[tuple[str, str, str]] = []
+        relationships: list[tuple[str, str | None, int]] = []
+        next_ancestors: dict[str, str] = {}
+        for entity in entities:
+            parent = parents.get(cast(str, entity.parent_key))
+            if parent is None or entity.transferred_id_name is None:
+                # if there is no parent or next ancestor, set to "" to differentiate from None
+                # None will mess up the pagination in _get_batch_entities_with_parent
+                next_ancestors[entity.id_name] = ""
+                continue
 
-        if parent is not None:
             # create parent child relationship and relationship type
-            upsert_relationship_type(
-                db_session=db_session,
-                source_entity_type=parent.entity_type_id_name,
-                relationship_type="has_subcomponent",
-                target_entity_type=entity.entity_type_id_name,
-            )
-            relationship_id_name = make_relationship_id(
-                parent.id_name,
-                "has_subcomponent",
-                cast(str, entity.transferred_id_name),
+            relationship_types.append(
+                (
+                    parent.entity_type_id_name,
+                    "has_subcomponent",
+                    entity.entity_type_id_name,
+                )
             )
-            upsert_relationship(
-                db_session=db_session,
-                relationship_id_name=relationship_id_name,
-                source_document_id=entity.document_id,
+            relationships.append(
+                (
+                    make_relationship_id(
+                        parent.id_name, "has_subcomponent", entity.transferred_id_name
+                    ),
+                    entity.document_id,
+                    1,
+                )
             )
+            next_ancestors[entity.id_name] = parent.parent_key or ""
 
-            next_ancestor = parent.parent_key or ""
-        else:
-            next_ancestor = ""
+        upsert_relationship_types(db_session, relationship_types)
+        upsert_relationships(db_session, relationships)
 
-        # set the staging entity's parent to the next ancestor
-        # if there is no parent or next ancestor, set to "" to differentiate from None
-        # None will mess up the pagination in _get_batch_entities_with_parent
-        db_session.query(KGEntityExtractionStaging).filter(
-            KGEntityExtractionStaging.id_name == entity.id_name
-        ).update({"parent_key": next_ancestor})
+        # set the staging entities' parents to the next ancestors
+        if next_ancestors:
+            db_session.execute(
+                update(KGEntityExtractionStaging),
+                [
+                    {"id_name": id_name, "parent_key": next_ancestor}
+                    for id_name, next_ancestor in next_ancestors.items()
+                ],
+            )
         db_session.commit()
 
 
-def _transfer_one_relationship(
-    relationship: KGRelationshipExtractionStaging,
+def _transfer_relationship_batch(
+    relationships: list[KGRelationshipExtractionStaging],
 ) -> None:
     with get_session_with_current_tenant() as db_session:
         # get the translations
         staging_entity_id_names = {
-            relationship.source_node,
-            relationship.target_node,
-        }
+            relationship.source_node for relationship in relationships
+        } | {relationship.target_node for relationship in relationships}
         entity_translations: dict[str, str] = {
-            entity.id_name: entity.transferred_id_name
-            for entity in db_session.query(KGEntityExtractionStaging)
-            .filter(KGEntityExtractionStaging.id_name.in_(staging_entity_id_names))
-            .all()
-            if entity.transferred_id_name is not None
+            id_name: transferred_id_name
+            for id_name, transferred_id_name in db_session.execute(
+                select(
+                    KGEntityExtractionStaging.id_name,
+                    KGEntityExtractionStaging.transferred_id_name,
+                ).where(
+                    KGEntityExtractionStaging.id_name.in_(staging_entity_id_names),
+                    KGEntityExtractionStaging.transferred_id_name.is_not(None),
+                )
+            )
         }
         if len(entity_translations) != len(staging_entity_id_names):
             logger.error(
                 f"Missing entity translations for {staging_entity_id_names - entity_translations.keys()}"
             )
-            return
 
-        # transfer the relationship
-        transfer_relationship(
+        # transfer the relationships
+        transfer_relationships(
             db_session=db_session,
-            relationship=relationship,
+            relationships=relationships,
             entity_translations=entity_translations,
         )
         db_session.commit()
@@ -319,82 +573,67 @@ def kg_clustering(
 
     last_lock_time = time.monotonic()
 
-    # Cluster and transfer grounded entities sequentially
+    # Cluster and transfer grounded entities, batch by batch as the entities of a batch
+    # can be merged into the entities created by the previous ones
     start_time = time.monotonic()
-    i_batch = 0
-    for i_batch, untransferred_grounded_entities in enumerate(
-        _get_batch_untransferred_grounded_entities(
-            batch_size=processing_chunk_batch_size
-        )
+    num_entities = 0
+    for untransferred_grounded_entities in _get_batch_untransferred_grounded_entities(
+        batch_size=KG_CLUSTERING_BATCH_SIZE
     ):
-        for entity in untransferred_grounded_entities:
-            _cluster_one_grounded_entity(entity)
+        _cluster_grounded_entity_batch(untransferred_grounded_entities)
+        num_entities += len(untransferred_grounded_entities)
         last_lock_time = extend_lock(
             lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
         )
-        # logger.debug(f"Transferred entities batch {i}")
     # NOTE: we assume every entity is transferred, as we currently only have grounded entities
     time_delta = time.monotonic() - start_time
-    logger.info(
-        f"Finished transferring {i_batch+1} entity batches in {time_delta:.2f}s"
-    )
+    logger.info(f"Finished transferring {num_entities} entities in {time_delta:.2f}s")
+    # let the entity normalization pick up the new entities
+    bump_kg_entity_index_version(tenant_id=tenant_id)
 
-    # Create parent-child relationships in parallel
+    # Create parent-child relationships
     for _ in range(kg_config_settings.KG_MAX_PARENT_RECURSION_DEPTH):
         for root_entities in _get_batch_entities_with_parent(
-            batch_size=processing_chunk_batch_size
+            batch_size=KG_CLUSTERING_BATCH_SIZE
         ):
-            run_functions_tuples_in_parallel(
-                [
-                    (_create_one_parent_child_relationship, (root_entity,))
-                    for root_entity in root_entities
-                ]
-            )
+            _create_parent_child_relationship_batch(root_entities)
             last_lock_time = extend_lock(
                 lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
             )
     logger.info("Finished creating all parent-child relationships")
 
-    # Transfer the relationship types (no need to do in parallel as there's only a few)
+    # Transfer the relationship types
     start_time = time.monotonic()
-    i_batch = 0
-    for i_batch, relationship_types in enumerate(
-        _get_batch_untransferred_relationship_types(
-            batch_size=processing_chunk_batch_size
-        )
+    num_relationship_types = 0
+    for relationship_types in _get_batch_untransferred_relationship_types(
+        batch_size=KG_CLUSTERING_BATCH_SIZE
     ):
         with get_session_with_current_tenant() as db_session:
-            for relationship_type in relationship_types:
-                transfer_relationship_type(db_session, relationship_type)
+            transfer_relationship_types(db_session, relationship_types)
             db_session.commit()
+        num_relationship_types += len(relationship_types)
         last_lock_time = extend_lock(
             lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
         )
-        # logger.debug(f"Transferred relationship types batch {i}")
     time_delta = time.monotonic() - start_time
     logger.info(
-        f"Finished transferring {i_batch+1} relationship type batches in {time_delta:.2f}s"
+        f"Finished transferring {num_relationship_types} relationship types in {time_delta:.2f}s"
     )
 
-    # Transfer the relationships in parallel
+    # Transfer the relationships
     start_time = time.monotonic()
-    i_batch = 0
-    for i_batch, relationships in enumerate(
-        _get_batch_untransferred_relationships(batch_size=processing_chunk_batch_size)
+    num_relationships = 0
+    for relationships in _get_batch_untransferred_relationships(
+        batch_size=KG_CLUSTERING_BATCH_SIZE
     ):
-        run_functions_tuples_in_parallel(
-            [
-                (_transfer_one_relationship, (relationship,))
-                for relationship in relationships
-            ]
-        )
+        _transfer_relationship_batch(relationships)
+        num_relationships += len(relationships)
         last_lock_time = extend_lock(
             lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
         )
-        # logger.debug(f"Transferred relationships batch {i}")
     time_delta = time.monotonic() - start_time
     logger.info(
-        f"Finished transferring {i_batch+1} relationship batches in {time_delta:.2f}s"
+        f"Finished transferring {num_relationships} relationships in {time_delta:.2f}s"
     )
 
     # Update vespa for each document
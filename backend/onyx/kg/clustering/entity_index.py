@@ -0,0 +1,296 @@
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import cast
+from typing import NamedTuple
+from uuid import uuid4
+
+from redis import Redis
+from sqlalchemy import func
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from onyx.configs.kg_configs import KG_NORMALIZATION_INDEX_MAX_AGE
+from onyx.db.engine.sql_engine import get_session_with_current_tenant
+from onyx.db.models import KGEntity
+from onyx.redis.redis_pool import get_redis_client
+from onyx.utils.logger import setup_logger
+from onyx.utils.threadpool_concurrency import run_in_background
+from shared_configs.contextvars import get_current_tenant_id
+
+logger = setup_logger()
+
+_KG_ENTITY_INDEX_VERSION_KEY = "kg_entity_index_version"
+
+# time_updated is set when the transaction starts, so entities committed after a
+# refresh may have been updated "before" the last refresh
+_REFRESH_OVERLAP = timedelta(minutes=5)
+
+_LOAD_BATCH_SIZE = 10000
+
+# pg_trgm only considers alphanumeric characters
+_word_regex = re.compile(r"[^\W_]+")
+
+
+def get_name_trigrams(cleaned_name: str) -> set[str]:
+    """
+    Python equivalent of pg_trgm's show_trgm, used to compute the trigrams of the
+    queried entities the same way as the stored KGEntity.name_trigrams.
+    Trigrams with non-ascii characters are hashed by pg_trgm, they can't match the
+    trigrams of the (ascii only) cleaned entity names either way.
+    """
+    trigrams: set[str] = set()
+    for word in _word_regex.findall(cleaned_name.lower()):
+        padded_word = f"  {word} "
+        trigrams.update(padded_word[i : i + 3] for i in range(len(padded_word) - 2))
+    return trigrams
+
+
+class IndexedEntity(NamedTuple):
+    id_name: str
+    name: str
+    document_id: str | None
+    subtype: Any
+    trigrams: frozenset[str]
+
+
+class _EntityTypeIndex:
+    """Inverted index from trigrams to the entities of one entity type."""
+
+    def __init__(self) -> None:
+        self.entities: dict[str, IndexedEntity] = {}
+        self.postings: dict[str, set[str]] = defaultdict(set)
+
+    def upsert(self, entity: IndexedEntity) -> None:
+        self.remove(entity.id_name)
+        self.entities[entity.id_name] = entity
+        for trigram in entity.trigrams:
+            self.postings[trigram].add(entity.id_name)
+
+    def remove(self, id_name: str) -> None:
+        entity = self.entities.pop(id_name, None)
+        if entity is None:
+            return
+        for trigram in entity.trigrams:
+            id_names = self.postings[trigram]
+            id_names.discard(id_name)
+            if not id_names:
+                del self.postings[trigram]
+
+    def search(
+        self, trigrams: set[str], subtype: str | None
+    ) -> list[tuple[IndexedEntity, float]]:
+        overlaps: dict[str, int] = defaultdict(int)
+        for trigram in trigrams:
+            for id_name in self.postings.get(trigram, ()):
+                overlaps[id_name] += 1
+
+        candidates: list[tuple[IndexedEntity, float]] = []
+        for id_name, overlap in overlaps.items():
+            entity = self.entities[id_name]
+            if subtype is not None and entity.subtype != subtype:
+                continue
+            # score = | Q ∩ E | / min(|Q|, |E|)
+            candidates.append(
+                (entity, overlap / min(len(trigrams), len(entity.trigrams)))
+            )
+        candidates.sort(key=lambda candidate: candidate[1], reverse=True)
+        return candidates
+
+
+class KGEntityIndex:
+    """
+    In-memory trigram index of the kg entities of a tenant, one per entity type.
+    Mirrors the trigram query against KGEntity.name_trigrams, so that entities can be
+    normalized without a round trip to postgres per entity.
+    """
+
+    def __init__(self) -> None:
+        self.version: str | None = None
+        self.built_at = time.monotonic()
+
+        self._lock = threading.Lock()
+        self._type_indices: dict[str, _EntityTypeIndex] = defaultdict(_EntityTypeIndex)
+        self._entity_types: dict[str, str] = {}
+        self._last_time_updated: datetime | None = None
+
+    def __len__(self) -> int:
+        return len(self._entity_types)
+
+    def search(
+        self, entity_type: str, trigrams: set[str], subtype: str | None = None
+    ) -> list[tuple[IndexedEntity, float]]:
+        """
+        Returns all entities of the given type sharing at least one trigram with the
+        query, sorted by their trigram score.
+        """
+        if not trigrams:
+            return []
+        with self._lock:
+            type_index = self._type_indices.get(entity_type)
+            if type_index is None:
+                return []
+            return type_index.search(trigrams, subtype)
+
+    def refresh(self, db_session: Session, version: str) -> None:
+        """
+        Loads the entities updated since the last refresh and drops the deleted ones.
+        """
+        with self._lock:
+            if self.version == version:
+                # already refreshed by another thread
+                return
+
+            entity_filters = []
+            if self._last_time_updated is not None:
+                entity_filters.append(
+                    KGEntity.time_updated >= self._last_time_updated - _REFRESH_OVERLAP
+                )
+            for row in db_session.execute(
+                select(
+                    KGEntity.id_name,
+                    KGEntity.name,
+                    KGEntity.entity_type_id_name,
+                    KGEntity.document_id,
+                    KGEntity.attributes,
+                    KGEntity.name_trigrams,
+                    KGEntity.time_updated,
+                )
+                .where(*entity_filters)
+                .execution_options(yield_per=_LOAD_BATCH_SIZE)
+            ):
+                self._upsert(
+                    entity_type=row.entity_type_id_name,
+                    entity=IndexedEntity(
+                        id_name=row.id_name,
+                        name=row.name,
+                        document_id=row.document_id,
+                        subtype=(row.attributes or {}).get("subtype"),
+                        trigrams=frozenset(row.name_trigrams or ()),
+                    ),
+                )
+                if (
+                    self._last_time_updated is None
+                    or row.time_updated > self._last_time_updated
+                ):
+                    self._last_time_updated = row.time_updated
+
+            # entities are only ever deleted in bulk (resets, document deletions)
+            num_entities = cast(
+                int, db_session.scalar(select(func.count()).select_from(KGEntity))
+            )
+            if num_entities != len(self._entity_types):
+                existing_id_names = set(db_session.scalars(select(KGEntity.id_name)))
+                for id_name in list(self._entity_types):
+                    if id_name not in existing_id_names:
+                        self._remove(id_name)
+
+            self.version = version
+
+    def _upsert(self, entity_type: str, entity: IndexedEntity) -> None:
+        previous_entity_type = self._entity_types.get(entity.id_name)
+        if previous_entity_type is not None and previous_entity_type != entity_type:
+            self._remove(entity.id_name)
+        self._type_indices[entity_type].upsert(entity)
+        self._entity_types[entity.id_name] = entity_type
+
+    def _remove(self, id_name: str) -> None:
+        entity_type = self._entity_types.pop(id_name, None)
+        if entity_type is not None:
+            self._type_indices[entity_type].remove(id_name)
+
+
+# tenant id -> kg entity index
+_kg_entity_indices: dict[str, KGEntityIndex] = {}
+_building_tenant_ids: set[str] = set()
+_kg_entity_indices_lock = threading.Lock()
+
+
+def _get_kg_entity_index_version(redis_client: Redis) -> str:
+    version = redis_client.get(_KG_ENTITY_INDEX_VERSION_KEY)
+    if version is None:
+        # never bumped or evicted, start a new version rather than assuming that
+        # nothing changed since the index was built
+        redis_client.set(_KG_ENTITY_INDEX_VERSION_KEY, uuid4().hex, nx=True)
+        version = redis_client.get(_KG_ENTITY_INDEX_VERSION_KEY)
+    return cast(bytes, version).decode()
+
+
+def bump_kg_entity_index_version(tenant_id: str | None = None) -> None:
+    """
+    Tells every process to refresh its kg entity index of the tenant.
+    Must be called after committing changes to the kg entities.
+    """
+    try:
+        get_redis_client(tenant_id=tenant_id).set(
+            _KG_ENTITY_INDEX_VERSION_KEY, uuid4().hex
+        )
+    except Exception:
+        logger.exception("Failed to bump the kg entity index version")
+
+
+def _build_kg_entity_index(tenant_id: str, version: str) -> None:
+    try:
+        start_time = time.monotonic()
+        entity_index = KGEntityIndex()
+        with get_session_with_current_tenant() as db_session:
+            entity_index.refresh(db_session, version)
+        with _kg_entity_indices_lock:
+            _kg_entity_indices[tenant_id] = entity_index
+        logger.info(
+            f"Built the kg entity index of {len(entity_index)} entities for tenant "
+            f"{tenant_id} in {time.monotonic() - start_time:.2f}s"
+        )
+    except Exception:
+        logger.exception(f"Failed to build the kg entity index for tenant {tenant_id}")
+    finally:
+        with _kg_entity_indices_lock:
+            _building_tenant_ids.discard(tenant_id)
+
+
+def _start_building_kg_entity_index(tenant_id: str, version: str) -> None:
+    with _kg_entity_indices_lock:
+        if tenant_id in _building_tenant_ids:
+            return
+        _building_tenant_ids.add(tenant_id)
+    run_in_background(_build_kg_entity_index, tenant_id, version)
+
+
+def get_kg_entity_index() -> KGEntityIndex | None:
+    """
+    Returns the up to date kg entity index of the current tenant, or None if it
+    isn't built yet. In that case it's built in the background and the caller should
+    fall back to querying postgres.
+    """
+    tenant_id = get_current_tenant_id()
+    try:
+        version = _get_kg_entity_index_version(get_redis_client())
+    except Exception:
+        logger.exception(
+            "Failed to get the kg entity index version, skipping the index"
+        )
+        return None
+
+    entity_index = _kg_entity_indices.get(tenant_id)
+    if entity_index is None:
+        _start_building_kg_entity_index(tenant_id, version)
+        return None
+
+    if time.monotonic() - entity_index.built_at > KG_NORMALIZATION_INDEX_MAX_AGE:
+        # renames through the document trigger don't update time_updated, so the
+        # index is rebuilt from time to time. Keep using the current one until then
+        _start_building_kg_entity_index(tenant_id, version)
+
+    if entity_index.version != version:
+        try:
+            with get_session_with_current_tenant() as db_session:
+                entity_index.refresh(db_session, version)
+        except Exception:
+            logger.exception("Failed to refresh the kg entity index")
+            return None
+
+    return entity_index
@@ -5,15 +5,17 @@ from typing import cast
 import numpy as np
 from nltk import ngrams  # type: ignore
 from rapidfuzz.distance.DamerauLevenshtein import normalized_similarity
+from sqlalchemy import column
 from sqlalchemy import desc
 from sqlalchemy import Float
 from sqlalchemy import func
-from sqlalchemy import MetaData
 from sqlalchemy import select
 from sqlalchemy import String
-from sqlalchemy import Table
+from sqlalchemy import table
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql.expression import TableClause
 
+from onyx.configs.kg_configs import KG_NORMALIZATION_INDEX_ENABLED
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_LEVENSHTEIN_WEIGHT
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_NGRAM_WEIGHTS
 from onyx.configs.kg_configs import KG_NORMALIZATION_RERANK_THRESHOLD
@@ -21,6 +23,10 @@ from onyx.configs.kg_configs import KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.models import KGEntity
 from onyx.db.relationships import get_relationships_for_entity_type_pairs
+from onyx.kg.clustering.entity_index import get_kg_entity_index
+from onyx.kg.clustering.entity_index import get_name_trigrams
+from onyx.kg.clustering.entity_index import IndexedEntity
+from onyx.kg.clustering.entity_index import KGEntityIndex
 from onyx.kg.models import NormalizedEntities
 from onyx.kg.models import NormalizedRelationships
 from onyx.kg.utils.embeddings import encode_string_batch
@@ -54,13 +60,21 @@ def _clean_name(entity_name: str) -> str:
     )
 
 
+def _get_allowed_docs_temp_view(allowed_docs_temp_view_name: str) -> TableClause:
+    # the temp view only lives in the tenant's schema, no need to reflect it
+    return table(
+        allowed_docs_temp_view_name.split(".")[-1], column("allowed_doc_id", String)
+    )
+
+
 def _normalize_one_entity(
     entity: str,
     attributes: dict[str, str],
-    allowed_docs_temp_view_name: str | None = None,
+    allowed_docs_temp_view_name: str,
 ) -> str | None:
     """
     Matches a single entity to the best matching entity of the same type.
+    Used while the in-memory entity index of the tenant isn't available.
     """
     entity_type, entity_name = split_entity_id(entity)
     if entity_name == "*":
@@ -77,20 +91,8 @@ def _normalize_one_entity(
 
     # step 1: find entities containing the entity_name or something similar
     with get_session_with_current_tenant() as db_session:
-
-        # get allowed documents
-        metadata = MetaData()
-        if allowed_docs_temp_view_name is None:
-            raise ValueError("allowed_docs_temp_view_name is not available")
-
-        effective_schema_allowed_docs_temp_view_name = (
-            allowed_docs_temp_view_name.split(".")[-1]
-        )
-
-        allowed_docs_temp_view = Table(
-            effective_schema_allowed_docs_temp_view_name,
-            metadata,
-            autoload_with=db_session.get_bind(),
+        allowed_docs_temp_view = _get_allowed_docs_temp_view(
+            allowed_docs_temp_view_name
         )
 
         # generate trigrams of the queried entity Q
@@ -144,10 +146,22 @@ def _normalize_one_entity(
             .limit(KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT)
             .all(),
         )
+
+    # step 2: rerank
+    return _rerank_candidates(cleaned_entity, candidates)
+
+
+def _rerank_candidates(
+    cleaned_entity: str, candidates: list[tuple[str, str, float]]
+) -> str | None:
+    """
+    Reranks the (id_name, name, trigram score) candidates of an entity and returns the
+    id_name of the best one, if it's good enough.
+    """
     if not candidates:
         return None
 
-    # step 2: do a weighted ngram analysis and damerau levenshtein distance to rerank
+    # do a weighted ngram analysis and damerau levenshtein distance to rerank
     n1, n2, n3 = (
         set(ngrams(cleaned_entity, 1)),
         set(ngrams(cleaned_entity, 2)),
@@ -191,6 +205,78 @@ def _normalize_one_entity(
     return candidates[0][0]
 
 
+def _normalize_entities_with_index(
+    entity_index: KGEntityIndex,
+    raw_entities: list[str],
+    entity_attributes: list[dict[str, str]],
+    allowed_docs_temp_view_name: str,
+) -> list[str | None]:
+    """
+    Same as _normalize_one_entity for every entity, but the candidates are retrieved
+    from the in-memory entity index. Only the access to the candidates' documents is
+    checked against postgres, in as few queries as possible.
+    """
+    mapping: list[str | None] = [None] * len(raw_entities)
+    cleaned_entities: dict[int, str] = {}
+    ranked_candidates: dict[int, list[tuple[IndexedEntity, float]]] = {}
+    for i, (entity, attributes) in enumerate(zip(raw_entities, entity_attributes)):
+        entity_type, entity_name = split_entity_id(entity)
+        if entity_name == "*":
+            mapping[i] = entity
+            continue
+
+        cleaned_entities[i] = _clean_name(entity_name)
+        ranked_candidates[i] = entity_index.search(
+            entity_type,
+            get_name_trigrams(cleaned_entities[i]),
+            subtype=attributes.get("subtype"),
+        )
+
+    # find the allowed documents among the best candidates, assuming unchecked
+    # documents are allowed until there are enough candidates for every entity
+    allowed_docs_temp_view = _get_allowed_docs_temp_view(allowed_docs_temp_view_name)
+    allowed_doc_ids: set[str] = set()
+    checked_doc_ids: set[str] = set()
+
+    def _is_allowed(candidate: IndexedEntity) -> bool:
+        return candidate.document_id is None or candidate.document_id in allowed_doc_ids
+
+    with get_session_with_current_tenant() as db_session:
+        while True:
+            unchecked_doc_ids: set[str] = set()
+            for candidates in ranked_candidates.values():
+                num_candidates = 0
+                for candidate, _ in candidates:
+                    if _is_allowed(candidate):
+                        num_candidates += 1
+                    elif candidate.document_id not in checked_doc_ids:
+                        unchecked_doc_ids.add(cast(str, candidate.document_id))
+                        num_candidates += 1
+                    if num_candidates >= KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT:
+                        break
+            if not unchecked_doc_ids:
+                break
+
+            allowed_doc_ids.update(
+                db_session.scalars(
+                    select(allowed_docs_temp_view.c.allowed_doc_id).where(
+                        allowed_docs_temp_view.c.allowed_doc_id.in_(unchecked_doc_ids)
+                    )
+                )
+            )
+            checked_doc_ids.update(unchecked_doc_ids)
+
+    for i, candidates in ranked_candidates.items():
+        allowed_candidates = [
+            (candidate.id_name, candidate.name, score)
+            for candidate, score in candidates
+            if _is_allowed(candidate)
+        ][:KG_NORMALIZATION_RETRIEVE_ENTITIES_LIMIT]
+        mapping[i] = _rerank_candidates(cleaned_entities[i], allowed_candidates)
+
+    return mapping
+
+
 def _get_existing_normalized_relationships(
     raw_relationships: list[str],
 ) -> dict[str, dict[str, list[str]]]:
@@ -248,12 +334,25 @@ def normalize_entities(
         get_attributes(attr_entity) for attr_entity in raw_entities_w_attributes
     ]
 
-    mapping: list[str | None] = run_functions_tuples_in_parallel(
-        [
-            (_normalize_one_entity, (entity, attributes, allowed_docs_temp_view_name))
-            for entity, attributes in zip(raw_entities, entity_attributes)
-        ]
-    )
+    if allowed_docs_temp_view_name is None:
+        raise ValueError("allowed_docs_temp_view_name is not available")
+
+    entity_index = get_kg_entity_index() if KG_NORMALIZATION_INDEX_ENABLED else None
+    mapping: list[str | None]
+    if entity_index is not None:
+        mapping = _normalize_entities_with_index(
+            entity_index, raw_entities, entity_attributes, allowed_docs_temp_view_name
+        )
+    else:
+        mapping = run_functions_tuples_in_parallel(
+            [
+                (
+                    _normalize_one_entity,
+                    (entity, attributes, allowed_docs_temp_view_name),
+                )
+                for entity, attributes in zip(raw_entities, entity_attributes)
+            ]
+        )
     for entity, attributes, normalized_entity in zip(
         raw_entities, entity_attributes, mapping
     ):
@@ -1,18 +1,25 @@
+import contextvars
 import time
+from collections import deque
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from typing import Any
+from typing import NamedTuple
 
 from redis.lock import Lock as RedisLock
 
 from onyx.background.celery.tasks.kg_processing.utils import extend_lock
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
+from onyx.configs.kg_configs import KG_EXTRACTION_MAX_PARALLEL_DOCUMENTS
 from onyx.db.connector import get_kg_enabled_connectors
-from onyx.db.document import get_document_updated_at
 from onyx.db.document import get_skipped_kg_documents
 from onyx.db.document import get_unprocessed_kg_document_batch_for_connector
-from onyx.db.document import update_document_kg_info
+from onyx.db.document import update_documents_kg_info
 from onyx.db.document import update_document_kg_stage
 from onyx.db.engine.sql_engine import get_session_with_current_tenant
 from onyx.db.entities import delete_from_kg_entities__no_commit
+from onyx.db.entities import upsert_staging_entities
 from onyx.db.entities import upsert_staging_entity
 from onyx.db.entity_type import get_entity_types
 from onyx.db.kg_config import get_kg_config_settings
@@ -22,26 +29,31 @@ from onyx.db.models import KGStage
 from onyx.db.relationships import delete_from_kg_relationships__no_commit
 from onyx.db.relationships import upsert_staging_relationship
 from onyx.db.relationships import upsert_staging_relationship_type
+from onyx.db.relationships import upsert_staging_relationship_types
+from onyx.db.relationships import upsert_staging_relationships
+from onyx.kg.models import KGAttributeProperty
 from onyx.kg.models import KGClassificationInstructions
+from onyx.kg.models import KGConfigSettings
 from onyx.kg.models import KGDocumentDeepExtractionResults
 from onyx.kg.models import KGEnhancedDocumentMetadata
 from onyx.kg.models import KGEntityTypeInstructions
 from onyx.kg.models import KGExtractionInstructions
 from onyx.kg.models import KGImpliedExtractionResults
+from onyx.kg.models import KGStagingEntity
 from onyx.kg.utils.extraction_utils import EntityTypeMetadataTracker
 from onyx.kg.utils.extraction_utils import (
     get_batch_documents_metadata,
 )
+from onyx.kg.utils.extraction_utils import get_entity_types_str
+from onyx.kg.utils.extraction_utils import get_relationship_types_str
 from onyx.kg.utils.extraction_utils import kg_deep_extraction
 from onyx.kg.utils.extraction_utils import (
     kg_implied_extraction,
 )
-from onyx.kg.utils.formatting_utils import extract_relationship_type_id
 from onyx.kg.utils.formatting_utils import get_entity_type
 from onyx.kg.utils.formatting_utils import split_entity_id
 from onyx.kg.utils.formatting_utils import split_relationship_id
 from onyx.utils.logger import setup_logger
-from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
 
 logger = setup_logger()
 
@@ -200,6 +212,371 @@ def _get_batch_documents_enhanced_metadata(
     return kg_document_meta_data_dict
 
 
+class _PreparedDocumentBatch(NamedTuple):
+    documents: list[Document]
+    metadata: dict[str, KGEnhancedDocumentMetadata]
+    # only for the documents that are extracted
+    implied_extractions: dict[str, KGImpliedExtractionResults]
+
+
+def _prepare_document_batch(
+    unprocessed_document_batch: list[Document],
+    source_type_classification_extraction_instructions: dict[
+        str, KGEntityTypeInstructions
+    ],
+    connector_source: str,
+    active_entity_types: set[str],
+    kg_config_settings: KGConfigSettings,
+) -> _PreparedDocumentBatch:
+    """
+    Classifies the documents, marks them as SKIPPED or EXTRACTING and performs the
+    (implicit) extraction of the documents to extract.
+    """
+    batch_metadata = _get_batch_documents_enhanced_metadata(
+        unprocessed_document_batch,
+        source_type_classification_extraction_instructions,
+        connector_source,
+    )
+
+    skipped_document_ids: list[str] = []
+    extracting_documents: list[Document] = []
+    for unprocessed_document in unprocessed_document_batch:
+        if batch_metadata[unprocessed_document.id].entity_type is None:
+            # info for after the connector has been processed
+            logger.debug(
+                f"Document {unprocessed_document.id} is not of any entity type"
+            )
+            skipped_document_ids.append(unprocessed_document.id)
+        elif batch_metadata[unprocessed_document.id].skip:
+            # info for after the connector has been processed. But no message as there may be many
+            # purposefully skipped documents
+            skipped_document_ids.append(unprocessed_document.id)
+        else:
+            extracting_documents.append(unprocessed_document)
+
+    # the processing time is set right away, so that the documents still in the
+    # pipeline aren't picked up again by the next batches
+    extracting_document_ids = [document.id for document in extracting_documents]
+    with get_session_with_current_tenant() as db_session:
+        update_documents_kg_info(db_session, skipped_document_ids, KGStage.SKIPPED)
+        update_documents_kg_info(
+            db_session, extracting_document_ids, KGStage.EXTRACTING
+        )
+        if extracting_document_ids:
+            delete_from_kg_relationships__no_commit(db_session, extracting_document_ids)
+            delete_from_kg_entities__no_commit(db_session, extracting_document_ids)
+        db_session.commit()
+
+    # perform (implicit) KG 'extractions' on the documents that should be processed
+    # This is really about assigning document meta-data to KG entities/relationships or KG entity attributes
+    # General approach:
+    #    - vendor emails to Employee-type entities + relationship to current primary grounded entity
+    #    - external account emails to Account-type entities + relationship to current primary grounded entity
+    #    - non-email owners to KG current entity's attributes, no relationships
+    # We also collect email addresses of vendors and external accounts to inform chunk processing
+    implied_extractions = {
+        document.id: kg_implied_extraction(
+            document,
+            batch_metadata[document.id],
+            active_entity_types,
+            kg_config_settings,
+        )
+        for document in extracting_documents
+    }
+
+    return _PreparedDocumentBatch(
+        documents=unprocessed_document_batch,
+        metadata=batch_metadata,
+        implied_extractions=implied_extractions,
+    )
+
+
+def _deep_extract_document(
+    document_id: str,
+    metadata: KGEnhancedDocumentMetadata,
+    implied_extraction: KGImpliedExtractionResults,
+    tenant_id: str,
+    index_name: str,
+    kg_config_settings: KGConfigSettings,
+    entity_types_str: str,
+    relationship_types_str: str,
+) -> KGDocumentDeepExtractionResults | None:
+    try:
+        return kg_deep_extraction(
+            document_id,
+            metadata,
+            implied_extraction,
+            tenant_id,
+            index_name,
+            kg_config_settings,
+            entity_types_str=entity_types_str,
+            relationship_types_str=relationship_types_str,
+        )
+    except Exception:
+        # the implied extraction of the document is kept
+        logger.exception(f"Failed to deep extract document {document_id}")
+        return None
+
+
+def _upsert_staging_one_by_one(
+    staging_entities: list[KGStagingEntity],
+    relationship_types: list[tuple[str, str, str]],
+    relationships: list[tuple[str, str | None]],
+) -> list[tuple[str, dict[str, Any]]]:
+    """
+    Fallback for when a bulk upsert fails, so that only the faulty rows are lost.
+    Returns the entity type and attributes of the upserted entities.
+    """
+    upserted_entities: list[tuple[str, dict[str, Any]]] = []
+    for staging_entity in staging_entities:
+        try:
+            with get_session_with_current_tenant() as db_session:
+                upserted_entity = upsert_staging_entity(
+                    db_session=db_session,
+                    name=staging_entity.name,
+                    entity_type=staging_entity.entity_type,
+                    document_id=staging_entity.document_id,
+                    occurrences=staging_entity.occurrences,
+                    attributes=staging_entity.attributes,
+                    event_time=staging_entity.event_time,
+                )
+                upserted_entities.append(
+                    (upserted_entity.entity_type_id_name, upserted_entity.attributes)
+                )
+                db_session.commit()
+        except Exception as e:
+            logger.error(
+                f"Error adding entity {staging_entity.entity_type}::"
+                f"{staging_entity.name}. Error message: {e}"
+            )
+
+    for source_entity_type, relationship_type, target_entity_type in relationship_types:
+        try:
+            with get_session_with_current_tenant() as db_session:
+                upsert_staging_relationship_type(
+                    db_session=db_session,
+                    source_entity_type=source_entity_type,
+                    relationship_type=relationship_type,
+                    target_entity_type=target_entity_type,
+                    definition=False,
+                    extraction_count=1,
+                )
+                db_session.commit()
+        except Exception as e:
+            logger.error(
+                f"Error adding relationship type {relationship_type} to the database: {e}"
+            )
+
+    for relationship, document_id in relationships:
+        try:
+            with get_session_with_current_tenant() as db_session:
+                upsert_staging_relationship(
+                    db_session=db_session,
+                    relationship_id_name=relationship,
+                    source_document_id=document_id,
+                    occurrences=1,
+                )
+                db_session.commit()
+        except Exception as e:
+            logger.error(
+                f"Error adding relationship {relationship} to the database: {e}"
+            )
+
+    return upserted_entities
+
+
+def _stage_document_batch(
+    batch: _PreparedDocumentBatch,
+    deep_extraction_futures: dict[str, Future[KGDocumentDeepExtractionResults | None]],
+    active_entity_types: set[str],
+    entity_metadata_conversion_instructions: dict[str, dict[str, KGAttributeProperty]],
+    metadata_tracker: EntityTypeMetadataTracker,
+) -> int:
+    """
+    Waits for the deep extractions of the batch, then writes all the extracted
+    entities and relationships to the staging tables at once.
+    Returns the number of processed documents.
+    """
+    batch_deep_extractions: dict[str, KGDocumentDeepExtractionResults] = {}
+    for document_id, deep_extraction_future in deep_extraction_futures.items():
+        deep_extraction_result = deep_extraction_future.result()
+        if deep_extraction_result is not None:
+            batch_deep_extractions[document_id] = deep_extraction_result
+
+    # Collect entities and relationships to upsert
+    batch_entities: list[tuple[str | None, str]] = []
+    batch_relationships: list[tuple[str, str]] = []
+    entity_classification: dict[str, str] = {}
+
+    for document_id, implied_metadata in batch.implied_extractions.items():
+        batch_entities += [
+            (None, entity) for entity in implied_metadata.implied_entities
+        ]
+        batch_entities.append((document_id, implied_metadata.document_entity))
+        batch_relationships += [
+            (document_id, relationship)
+            for relationship in implied_metadata.implied_relationships
+        ]
+
+    for document_id, deep_extraction_result in batch_deep_extractions.items():
+        batch_entities += [
+            (None, entity) for entity in deep_extraction_result.deep_extracted_entities
+        ]
+        for relationship in deep_extraction_result.deep_extracted_relationships:
+            source_entity, _, target_entity = split_relationship_id(relationship)
+            if (
+                get_entity_type(source_entity) in active_entity_types
+                and get_entity_type(target_entity) in active_entity_types
+            ):
+                batch_relationships += [(document_id, relationship)]
+
+        classification_result = deep_extraction_result.classification_result
+        if not classification_result:
+            continue
+        entity_classification[classification_result.document_entity] = (
+            classification_result.classification_class
+        )
+
+    document_updated_at = {
+        document.id: document.doc_updated_at for document in batch.documents
+    }
+
+    staging_entities: list[KGStagingEntity] = []
+    for potential_document_id, entity in batch_entities:
+        # verify the entity is valid
+        parts = split_entity_id(entity)
+        if len(parts) != 2:
+            logger.error(
+                f"Invalid entity {entity} in aggregated_kg_extractions.entities"
+            )
+            continue
+
+        entity_type, entity_name = parts
+        entity_type = entity_type.upper()
+        entity_name = entity_name.capitalize()
+
+        if entity_type not in active_entity_types:
+            continue
+
+        entity_attributes: dict[str, Any] = {}
+        if potential_document_id:
+            entity_attributes = (
+                batch.metadata[potential_document_id].document_metadata or {}
+            )
+
+        # only keep selected attributes (and translate the attribute names)
+        metadata_attributes = entity_metadata_conversion_instructions[entity_type]
+        keep_attributes = {
+            metadata_attributes[attr_name].name: attr_val
+            for attr_name, attr_val in entity_attributes.items()
+            if (
+                attr_name in metadata_attributes and metadata_attributes[attr_name].keep
+            )
+        }
+
+        # add the classification result to the attributes
+        if entity in entity_classification:
+            keep_attributes["classification"] = entity_classification[entity]
+
+        staging_entities.append(
+            KGStagingEntity(
+                name=entity_name,
+                entity_type=entity_type,
+                document_id=potential_document_id,
+                attributes=keep_attributes,
+                event_time=(
+                    document_updated_at.get(potential_document_id)
+                    if potential_document_id
+                    else None
+                ),
+            )
+        )
+
+    relationship_types: list[tuple[str, str, str]] = []
+    relationships: list[tuple[str, str | None]] = []
+    for document_id, relationship in batch_relationships:
+        relationship_split = split_relationship_id(relationship)
+
+        if len(relationship_split) != 3:
+            logger.error(
+                f"Invalid relationship {relationship} in aggregated_kg_extractions.relationships"
+            )
+            continue
+
+        source_entity, relationship_type, target_entity = relationship_split
+
+        source_entity_type = get_entity_type(source_entity)
+        target_entity_type = get_entity_type(target_entity)
+
+        if (
+            source_entity_type not in active_entity_types
+            or target_entity_type not in active_entity_types
+        ):
+            continue
+
+        relationship_types.append(
+            (source_entity_type.upper(), relationship_type, target_entity_type.upper())
+        )
+        relationships.append((relationship, document_id))
+
+    # Populate the KG database with the extracted entities and relationships, and
+    # the Documents table with the kg information for the documents
+    document_ids = [document.id for document in batch.documents]
+    upserted_entities: list[tuple[str, dict[str, Any]]] | None = None
+    with get_session_with_current_tenant() as db_session:
+        try:
+            upserted_entities = [
+                (upserted_entity.entity_type_id_name, upserted_entity.attributes)
+                for upserted_entity in upsert_staging_entities(
+                    db_session, staging_entities
+                )
+            ]
+            upsert_staging_relationship_types(db_session, relationship_types)
+            upsert_staging_relationships(db_session, relationships)
+            update_documents_kg_info(db_session, document_ids, KGStage.EXTRACTED)
+            db_session.commit()
+        except Exception:
+            logger.exception(
+                "Failed to bulk upsert the extracted entities and relationships, "
+                "upserting them one by one"
+            )
+            db_session.rollback()
+            upserted_entities = None
+
+    if upserted_entities is None:
+        upserted_entities = _upsert_staging_one_by_one(
+            staging_entities, relationship_types, relationships
+        )
+        with get_session_with_current_tenant() as db_session:
+            update_documents_kg_info(db_session, document_ids, KGStage.EXTRACTED)
+            db_session.commit()
+
+    for entity_type, attributes in upserted_entities:
+        metadata_tracker.track_metadata(entity_type, attributes)
+
+    return len(batch.documents)
+
+
+def _wait_for_staged_batch(
+    staging_future: Future[int], lock: RedisLock, last_lock_time: float
+) -> tuple[int, float]:
+    """
+    Waits for a batch to be written to the staging tables, keeping the lock alive.
+    Returns the number of processed documents and the last lock extension time.
+    """
+    while True:
+        done, _ = wait([staging_future], timeout=CELERY_GENERIC_BEAT_LOCK_TIMEOUT / 8)
+        last_lock_time = extend_lock(
+            lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
+        )
+        if done:
+            return staging_future.result(), last_lock_time
+
+
+def _docs_per_minute(num_documents: int, elapsed: float) -> float:
+    return num_documents * 60 / elapsed if elapsed > 0 else 0.0
+
+
 def kg_extraction(
     tenant_id: str,
     index_name: str,
@@ -219,6 +596,11 @@ def kg_extraction(
             - Update chunks in Vespa
             - Update temporary KG extraction tables
             - Update document table to set kg_extracted = True
+
+    The batches are pipelined: while the main thread prepares the next batches, the
+    chunks of the previous ones are fetched from Vespa and extracted by the LLM in
+    parallel (within the kg llm budget), and the extracted batches are bulk written
+    to the staging tables by a separate thread.
     """
 
     logger.info(f"Starting kg extraction for tenant {tenant_id}")
@@ -248,343 +630,151 @@ def kg_extraction(
             for entity_type in all_entity_types
         }
 
+    # the same for all documents, so only looked up once
+    entity_types_str = get_entity_types_str(active=True)
+    relationship_types_str = get_relationship_types_str(active=True)
+
     # Track which metadata attributes are possible for each entity type
     metadata_tracker = EntityTypeMetadataTracker()
     metadata_tracker.import_typeinfo()
 
     last_lock_time = time.monotonic()
+    extraction_start_time = time.monotonic()
+    total_num_documents = 0
 
-    # Iterate over connectors that are enabled for KG extraction
-    for kg_enabled_connector in kg_enabled_connectors:
-        connector_id = kg_enabled_connector.id
-        connector_coverage_days = kg_enabled_connector.kg_coverage_days
-        connector_source = kg_enabled_connector.source
-
-        document_batch_counter = 0
-
-        # iterate over un-kg-processed documents in connector
-        while True:
-            # get a batch of unprocessed documents
-            with get_session_with_current_tenant() as db_session:
-                unprocessed_document_batch = (
-                    get_unprocessed_kg_document_batch_for_connector(
-                        db_session,
-                        connector_id,
-                        kg_coverage_start=kg_config_settings.KG_COVERAGE_START_DATE,
-                        kg_max_coverage_days=connector_coverage_days
-                        or kg_config_settings.KG_MAX_COVERAGE_DAYS,
-                        batch_size=processing_chunk_batch_size,
-                    )
-                )
-
-            if len(unprocessed_document_batch) == 0:
-                logger.info(
-                    f"No unprocessed documents found for connector {connector_id}. "
-                    f"Processed {document_batch_counter} batches."
-                )
-                break
-
-            document_batch_counter += 1
-            last_lock_time = extend_lock(
-                lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
-            )
-            logger.info(f"Processing document batch {document_batch_counter}")
-
-            # Get the document attributes and entity types
-            batch_metadata = _get_batch_documents_enhanced_metadata(
-                unprocessed_document_batch,
-                document_classification_extraction_instructions.get(
-                    connector_source, {}
-                ),
-                connector_source,
-            )
-
-            # mark docs in unprocessed_document_batch as EXTRACTING
-            for unprocessed_document in unprocessed_document_batch:
-                if batch_metadata[unprocessed_document.id].entity_type is None:
-                    # info for after the connector has been processed
-                    kg_stage = KGStage.SKIPPED
-                    logger.debug(
-                        f"Document {unprocessed_document.id} is not of any entity type"
-                    )
-                elif batch_metadata[unprocessed_document.id].skip:
-                    # info for after the connector has been processed. But no message as there may be many
-                    # purposefully skipped documents
-                    kg_stage = KGStage.SKIPPED
-                else:
-                    kg_stage = KGStage.EXTRACTING
+    # enough batches in flight to keep the extraction threads busy
+    max_batches_in_flight = (
+        -(-KG_EXTRACTION_MAX_PARALLEL_DOCUMENTS // processing_chunk_batch_size) + 1
+    )
 
+    with (
+        ThreadPoolExecutor(
+            max_workers=KG_EXTRACTION_MAX_PARALLEL_DOCUMENTS,
+            thread_name_prefix="kg_extraction",
+        ) as extraction_executor,
+        # a single writer, the batches are staged in order
+        ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="kg_extraction_staging"
+        ) as staging_executor,
+    ):
+        # Iterate over connectors that are enabled for KG extraction
+        for kg_enabled_connector in kg_enabled_connectors:
+            connector_id = kg_enabled_connector.id
+            connector_coverage_days = kg_enabled_connector.kg_coverage_days
+            connector_source = kg_enabled_connector.source
+
+            document_batch_counter = 0
+            connector_start_time = time.monotonic()
+            connector_num_documents = 0
+            staging_futures: deque[Future[int]] = deque()
+
+            # iterate over un-kg-processed documents in connector
+            while True:
+                # get a batch of unprocessed documents
                 with get_session_with_current_tenant() as db_session:
-                    update_document_kg_stage(
-                        db_session,
-                        unprocessed_document.id,
-                        kg_stage,
-                    )
-
-                    if kg_stage == KGStage.EXTRACTING:
-                        delete_from_kg_relationships__no_commit(
-                            db_session, [unprocessed_document.id]
-                        )
-                        delete_from_kg_entities__no_commit(
-                            db_session, [unprocessed_document.id]
-                        )
-                    db_session.commit()
-
-            # Iterate over batches of unprocessed documents
-            # For each document:
-            #   - extract implied entities and relationships
-            #   - if deep extraction is enabled, extract entities and relationships with LLM
-            #   - if deep extraction and classification are enabled, classify document
-            #   - update postgres with
-            #     - extracted entities (with classification) and relationships
-            #     - kg_stage of the processed document
-
-            documents_to_process = [x.id for x in unprocessed_document_batch]
-            batch_implied_extraction: dict[str, KGImpliedExtractionResults] = {}
-            batch_deep_extraction_args: list[
-                tuple[str, KGEnhancedDocumentMetadata, KGImpliedExtractionResults]
-            ] = []
-
-            for unprocessed_document in unprocessed_document_batch:
-                if (
-                    unprocessed_document.id not in documents_to_process
-                    or batch_metadata[unprocessed_document.id].entity_type is None
-                    or batch_metadata[unprocessed_document.id].skip
-                ):
-                    with get_session_with_current_tenant() as db_session:
-                        update_document_kg_stage(
+                    unprocessed_document_batch = (
+                        get_unprocessed_kg_document_batch_for_connector(
                             db_session,
-                            unprocessed_document.id,
-                            KGStage.SKIPPED,
+                            connector_id,
+                            kg_coverage_start=kg_config_settings.KG_COVERAGE_START_DATE,
+                            kg_max_coverage_days=connector_coverage_days
+                            or kg_config_settings.KG_MAX_COVERAGE_DAYS,
+                            batch_size=processing_chunk_batch_size,
                         )
-                        db_session.commit()
-                    continue
-
-                # 1. perform (implicit) KG 'extractions' on the documents that should be processed
-                # This is really about assigning document meta-data to KG entities/relationships or KG entity attributes
-                # General approach:
-                #    - vendor emails to Employee-type entities + relationship to current primary grounded entity
-                #    - external account emails to Account-type entities + relationship to current primary grounded entity
-                #    - non-email owners to KG current entity's attributes, no relationships
-                # We also collect email addresses of vendors and external accounts to inform chunk processing
-                batch_implied_extraction[unprocessed_document.id] = (
-                    kg_implied_extraction(
-                        unprocessed_document,
-                        batch_metadata[unprocessed_document.id],
-                        active_entity_types,
-                        kg_config_settings,
                     )
-                )
 
-                # 2. prepare inputs for deep extraction and classification
-                if batch_metadata[unprocessed_document.id].deep_extraction:
-                    batch_deep_extraction_args.append(
-                        (
-                            unprocessed_document.id,
-                            batch_metadata[unprocessed_document.id],
-                            batch_implied_extraction[unprocessed_document.id],
-                        )
+                if len(unprocessed_document_batch) == 0:
+                    logger.info(
+                        f"No unprocessed documents found for connector {connector_id}. "
+                        f"Processed {document_batch_counter} batches."
                     )
+                    break
+
+                document_batch_counter += 1
+                last_lock_time = extend_lock(
+                    lock, CELERY_GENERIC_BEAT_LOCK_TIMEOUT, last_lock_time
+                )
+                logger.info(f"Processing document batch {document_batch_counter}")
+
+                # 1. get the document attributes and entity types, and perform the
+                # implied extraction
+                batch = _prepare_document_batch(
+                    unprocessed_document_batch,
+                    document_classification_extraction_instructions.get(
+                        connector_source, {}
+                    ),
+                    connector_source,
+                    active_entity_types,
+                    kg_config_settings,
+                )
 
-            # 2. perform deep extraction and classification in parallel
-            batch_deep_extraction_func_calls = [
-                (
-                    kg_deep_extraction,
-                    (
-                        *arg,
+                # 2. perform deep extraction and classification in the background
+                deep_extraction_futures = {
+                    document_id: extraction_executor.submit(
+                        contextvars.copy_context().run,
+                        _deep_extract_document,
+                        document_id,
+                        batch.metadata[document_id],
+                        implied_extraction,
                         tenant_id,
                         index_name,
                         kg_config_settings,
-                    ),
-                )
-                for arg in batch_deep_extraction_args
-            ]
-            batch_deep_extractions: dict[str, KGDocumentDeepExtractionResults] = {
-                document_id: result
-                for document_id, result in zip(
-                    documents_to_process,
-                    run_functions_tuples_in_parallel(batch_deep_extraction_func_calls),
-                )
-            }
-
-            # Collect entities and relationships to upsert
-            batch_entities: list[tuple[str | None, str]] = []
-            batch_relationships: list[tuple[str, str]] = []
-            entity_classification: dict[str, str] = {}
-
-            for document_id, implied_metadata in batch_implied_extraction.items():
-                batch_entities += [
-                    (None, entity) for entity in implied_metadata.implied_entities
-                ]
-                batch_entities.append((document_id, implied_metadata.document_entity))
-                batch_relationships += [
-                    (document_id, relationship)
-                    for relationship in implied_metadata.implied_relationships
-                ]
-
-            for document_id, deep_extraction_result in batch_deep_extractions.items():
-                batch_entities += [
-                    (None, entity)
-                    for entity in deep_extraction_result.deep_extracted_entities
-                ]
-                for relationship in deep_extraction_result.deep_extracted_relationships:
-                    source_entity, _, target_entity = split_relationship_id(
-                        relationship
+                        entity_types_str,
+                        relationship_types_str,
                     )
-                    if (
-                        source_entity in active_entity_types
-                        and target_entity in active_entity_types
-                    ):
-                        batch_relationships += [(document_id, relationship)]
-
-                classification_result = deep_extraction_result.classification_result
-                if not classification_result:
-                    continue
-                entity_classification[classification_result.document_entity] = (
-                    classification_result.classification_class
-                )
-
-            # Populate the KG database with the extracted entities, relationships, and terms
-            for potential_document_id, entity in batch_entities:
-                # verify the entity is valid
-                parts = split_entity_id(entity)
-                if len(parts) != 2:
-                    logger.error(
-                        f"Invalid entity {entity} in aggregated_kg_extractions.entities"
+                    for document_id, implied_extraction in batch.implied_extractions.items()
+                    if batch.metadata[document_id].deep_extraction
+                }
+
+                # 3. write the batch to the staging tables once it's extracted
+                staging_futures.append(
+                    staging_executor.submit(
+                        contextvars.copy_context().run,
+                        _stage_document_batch,
+                        batch,
+                        deep_extraction_futures,
+                        active_entity_types,
+                        entity_metadata_conversion_instructions,
+                        metadata_tracker,
                     )
-                    continue
-
-                entity_type, entity_name = parts
-                entity_type = entity_type.upper()
-                entity_name = entity_name.capitalize()
-
-                if entity_type not in active_entity_types:
-                    continue
-
-                try:
-                    with get_session_with_current_tenant() as db_session:
-                        entity_attributes: dict[str, Any] = {}
-
-                        if potential_document_id:
-                            entity_attributes = (
-                                batch_metadata[potential_document_id].document_metadata
-                                or {}
-                            )
-
-                        # only keep selected attributes (and translate the attribute names)
-                        metadata_attributes = entity_metadata_conversion_instructions[
-                            entity_type
-                        ]
-                        keep_attributes = {
-                            metadata_attributes[attr_name].name: attr_val
-                            for attr_name, attr_val in entity_attributes.items()
-                            if (
-                                attr_name in metadata_attributes
-                                and metadata_attributes[attr_name].keep
-                            )
-                        }
-
-                        # add the classification result to the attributes
-                        if entity in entity_classification:
-                            keep_attributes["classification"] = entity_classification[
-                                entity
-                            ]
-
-                        event_time = None
-                        if potential_document_id:
-                            event_time = get_document_updated_at(
-                                potential_document_id, db_session
-                            )
-
-                        upserted_entity = upsert_staging_entity(
-                            db_session=db_session,
-                            name=entity_name,
-                            entity_type=entity_type,
-                            document_id=potential_document_id,
-                            occurrences=1,
-                            attributes=keep_attributes,
-                            event_time=event_time,
-                        )
-                        metadata_tracker.track_metadata(
-                            entity_type, upserted_entity.attributes
-                        )
-
-                        db_session.commit()
-                except Exception as e:
-                    logger.error(f"Error adding entity {entity}. Error message: {e}")
-
-            for document_id, relationship in batch_relationships:
-                relationship_split = split_relationship_id(relationship)
+                )
 
-                if len(relationship_split) != 3:
-                    logger.error(
-                        f"Invalid relationship {relationship} in aggregated_kg_extractions.relationships"
+                while len(staging_futures) >= max_batches_in_flight:
+                    num_documents, last_lock_time = _wait_for_staged_batch(
+                        staging_futures.popleft(), lock, last_lock_time
                     )
-                    continue
-
-                source_entity, relationship_type, target_entity = relationship_split
+                    connector_num_documents += num_documents
 
-                source_entity_type = get_entity_type(source_entity)
-                target_entity_type = get_entity_type(target_entity)
-
-                if (
-                    source_entity_type not in active_entity_types
-                    or target_entity_type not in active_entity_types
-                ):
-                    continue
-
-                relationship_type_id_name = extract_relationship_type_id(relationship)
-
-                with get_session_with_current_tenant() as db_session:
-                    try:
-                        upsert_staging_relationship_type(
-                            db_session=db_session,
-                            source_entity_type=source_entity_type.upper(),
-                            relationship_type=relationship_type,
-                            target_entity_type=target_entity_type.upper(),
-                            definition=False,
-                            extraction_count=1,
-                        )
-                        db_session.commit()
-                    except Exception as e:
-                        logger.error(
-                            f"Error adding relationship type {relationship_type_id_name} to the database: {e}"
-                        )
+            while staging_futures:
+                num_documents, last_lock_time = _wait_for_staged_batch(
+                    staging_futures.popleft(), lock, last_lock_time
+                )
+                connector_num_documents += num_documents
+
+            total_num_documents += connector_num_documents
+            connector_elapsed = time.monotonic() - connector_start_time
+            logger.info(
+                f"Extracted {connector_num_documents} documents of connector "
+                f"{connector_id} in {connector_elapsed:.1f}s "
+                f"({_docs_per_minute(connector_num_documents, connector_elapsed):.1f} docs/min)"
+            )
 
-                    with get_session_with_current_tenant() as db_session:
-                        try:
-                            upsert_staging_relationship(
-                                db_session=db_session,
-                                relationship_id_name=relationship,
-                                source_document_id=document_id,
-                                occurrences=1,
-                            )
-                            db_session.commit()
-                        except Exception as e:
-                            logger.error(
-                                f"Error adding relationship {relationship} to the database: {e}"
-                            )
-
-            # Populate the Documents table with the kg information for the documents
-
-            for processed_document in documents_to_process:
-                with get_session_with_current_tenant() as db_session:
-                    update_document_kg_info(
+            # Update the the Skipped Docs back to Not Started
+            with get_session_with_current_tenant() as db_session:
+                skipped_documents = get_skipped_kg_documents(db_session)
+                for document_id in skipped_documents:
+                    update_document_kg_stage(
                         db_session,
-                        processed_document,
-                        KGStage.EXTRACTED,
+                        document_id,
+                        KGStage.NOT_STARTED,
                     )
                     db_session.commit()
 
-        # Update the the Skipped Docs back to Not Started
-        with get_session_with_current_tenant() as db_session:
-            skipped_documents = get_skipped_kg_documents(db_session)
-            for document_id in skipped_documents:
-                update_document_kg_stage(
-                    db_session,
-                    document_id,
-                    KGStage.NOT_STARTED,
-                )
-                db_session.commit()
-
     metadata_tracker.export_typeinfo()
+
+    extraction_elapsed = time.monotonic() - extraction_start_time
+    logger.info(
+        f"Finished kg extraction for tenant {tenant_id}: {total_num_documents} "
+        f"documents in {extraction_elapsed:.1f}s "
+        f"({_docs_per_minute(total_num_documents, extraction_elapsed):.1f} docs/min)"
+    )
@@ -186,5 +186,29 @@ class KGDocumentDeepExtractionResults(BaseModel):
     deep_extracted_relationships: set[str]
 
 
+class KGStagingEntity(BaseModel):
+    name: str
+    entity_type: str
+    document_id: str | None = None
+    occurrences: int = 1
+    attributes: dict[str, Any] = {}
+    event_time: datetime | None = None
+
+
+class KGClusteredEntity(BaseModel):
+    """A kg entity, as it is once a clustering batch is written."""
+
+    id_name: str
+    name: str
+    entity_type_id_name: str
+    document_id: str | None = None
+    alternative_names: list[str] = []
+    occurrences: int = 1
+    attributes: dict[str, Any] = {}
+    entity_key: str | None = None
+    parent_key: str | None = None
+    event_time: datetime | None = None
+
+
 class KGException(Exception):
     pass
@@ -9,6 +9,7 @@ from onyx.db.models import KGRelationship
 from onyx.db.models import KGRelationshipExtractionStaging
 from onyx.db.models import KGRelationshipType
 from onyx.db.models import KGRelationshipTypeExtractionStaging
+from onyx.kg.clustering.entity_index import bump_kg_entity_index_version
 
 
 def reset_full_kg_index__commit(db_session: Session) -> None:
@@ -33,3 +34,4 @@ def reset_full_kg_index__commit(db_session: Session) -> None:
     reset_all_document_kg_stages(db_session)
 
     db_session.commit()
+    bump_kg_entity_index_version()
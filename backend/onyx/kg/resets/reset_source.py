@@ -14,6 +14,7 @@ from onyx.db.models import KGRelationshipExtractionStaging
 from onyx.db.models import KGRelationshipType
 from onyx.db.models import KGRelationshipTypeExtractionStaging
 from onyx.db.models import KGStage
+from onyx.kg.clustering.entity_index import bump_kg_entity_index_version
 from onyx.kg.resets.reset_index import reset_full_kg_index__commit
 from onyx.kg.resets.reset_vespa import reset_vespa_kg_index
 
@@ -77,6 +78,7 @@ def reset_source_kg_index(
                 )
             ).delete()
         db_session.commit()
+    bump_kg_entity_index_version(tenant_id=tenant_id)
 
     with get_session_with_current_tenant() as db_session:
         # get all the documents for the given source
@@ -29,6 +29,7 @@ from onyx.kg.utils.formatting_utils import kg_email_processing
 from onyx.kg.utils.formatting_utils import make_entity_id
 from onyx.kg.utils.formatting_utils import make_relationship_id
 from onyx.kg.utils.formatting_utils import make_relationship_type_id
+from onyx.kg.utils.llm_budget import get_kg_llm_budget
 from onyx.kg.vespa.vespa_interactions import get_document_vespa_contents
 from onyx.llm.factory import get_default_llms
 from onyx.llm.utils import message_to_string
@@ -330,9 +331,13 @@ def kg_deep_extraction(
     tenant_id: str,
     index_name: str,
     kg_config_settings: KGConfigSettings,
+    entity_types_str: str | None = None,
+    relationship_types_str: str | None = None,
 ) -> KGDocumentDeepExtractionResults:
     """
     Perform deep extraction and classification on the document.
+    The entity and relationship type descriptions can be passed in when extracting
+    many documents, they're looked up otherwise.
     """
     result = KGDocumentDeepExtractionResults(
         classification_result=None,
@@ -340,8 +345,10 @@ def kg_deep_extraction(
         deep_extracted_relationships=set(),
     )
 
-    entity_types_str = get_entity_types_str(active=True)
-    relationship_types_str = get_relationship_types_str(active=True)
+    if entity_types_str is None:
+        entity_types_str = get_entity_types_str(active=True)
+    if relationship_types_str is None:
+        relationship_types_str = get_relationship_types_str(active=True)
 
     for i, chunk_batch in enumerate(
         get_document_vespa_contents(document_id, index_name, tenant_id)
@@ -419,8 +426,11 @@ def kg_classify_document(
     # classify with LLM
     primary_llm, _ = get_default_llms()
     msg = [HumanMessage(content=prompt)]
+    llm_budget = get_kg_llm_budget()
     try:
-        raw_classification_result = primary_llm.invoke(msg)
+        with llm_budget.reserve(prompt):
+            raw_classification_result = primary_llm.invoke(msg)
+        llm_budget.record_output(message_to_string(raw_classification_result))
         classification_result = (
             message_to_string(raw_classification_result)
             .replace("```json", "")
@@ -487,8 +497,11 @@ def kg_deep_extract_chunks(
     # extract with LLM
     _, fast_llm = get_default_llms()
     msg = [HumanMessage(content=prompt)]
+    llm_budget = get_kg_llm_budget()
     try:
-        raw_extraction_result = fast_llm.invoke(msg)
+        with llm_budget.reserve(prompt):
+            raw_extraction_result = fast_llm.invoke(msg)
+        llm_budget.record_output(message_to_string(raw_extraction_result))
         cleaned_response = (
             message_to_string(raw_extraction_result)
             .replace("{{", "{")
@@ -0,0 +1,84 @@
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from onyx.configs.kg_configs import KG_EXTRACTION_LLM_TOKENS_PER_MINUTE
+from onyx.configs.kg_configs import KG_EXTRACTION_MAX_PARALLEL_LLM_CALLS
+from onyx.llm.utils import check_number_of_tokens
+
+
+class KGLLMBudget:
+    """
+    Caps the number of concurrent kg extraction llm calls and, optionally, the number of
+    tokens sent to and received from the llm per minute (token bucket refilled
+    continuously). Shared by all the threads of the extraction.
+    """
+
+    def __init__(
+        self,
+        max_parallel_calls: int,
+        tokens_per_minute: int = 0,
+        count_tokens: Callable[[str], int] = check_number_of_tokens,
+    ) -> None:
+        self.tokens_per_minute = tokens_per_minute
+
+        self._count_tokens = count_tokens
+        self._semaphore = threading.BoundedSemaphore(max(1, max_parallel_calls))
+        self._lock = threading.Lock()
+        self._available_tokens = float(tokens_per_minute)
+        self._last_refill = time.monotonic()
+
+    @contextmanager
+    def reserve(self, prompt: str) -> Iterator[None]:
+        """
+        Waits until the prompt fits in the budget and a call slot is free.
+        """
+        if self.tokens_per_minute > 0:
+            self._take_tokens(self._count_tokens(prompt), wait=True)
+        with self._semaphore:
+            yield
+
+    def record_output(self, output: str) -> None:
+        """
+        Charges the tokens of a response. These aren't known upfront, so they can
+        overdraw the budget, which then delays the next calls.
+        """
+        if self.tokens_per_minute > 0:
+            self._take_tokens(self._count_tokens(output), wait=False)
+
+    def _take_tokens(self, num_tokens: int, wait: bool) -> None:
+        # a prompt larger than the whole budget goes through once the bucket is full
+        num_tokens = min(num_tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._available_tokens = min(
+                    float(self.tokens_per_minute),
+                    self._available_tokens
+                    + (now - self._last_refill) * self.tokens_per_minute / 60,
+                )
+                self._last_refill = now
+                if not wait or self._available_tokens >= num_tokens:
+                    self._available_tokens -= num_tokens
+                    return
+                wait_time = (
+                    (num_tokens - self._available_tokens) * 60 / self.tokens_per_minute
+                )
+            time.sleep(wait_time)
+
+
+_kg_llm_budget: KGLLMBudget | None = None
+_kg_llm_budget_lock = threading.Lock()
+
+
+def get_kg_llm_budget() -> KGLLMBudget:
+    global _kg_llm_budget
+    with _kg_llm_budget_lock:
+        if _kg_llm_budget is None:
+            _kg_llm_budget = KGLLMBudget(
+                max_parallel_calls=KG_EXTRACTION_MAX_PARALLEL_LLM_CALLS,
+                tokens_per_minute=KG_EXTRACTION_LLM_TOKENS_PER_MINUTE,
+            )
+        return _kg_llm_budget
@@ -0,0 +1,333 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from abc import ABC
+from abc import abstractmethod
+from array import array
+from typing import cast
+
+from redis import Redis
+
+from onyx.configs.app_configs import EMBEDDING_CACHE_BACKEND
+from onyx.configs.app_configs import EMBEDDING_CACHE_DISK_PATH
+from onyx.configs.app_configs import EMBEDDING_CACHE_MAX_ENTRIES
+from onyx.configs.app_configs import EMBEDDING_CACHE_TTL
+from onyx.redis.redis_pool import get_redis_client
+from onyx.redis.redis_pool import TenantRedis
+from onyx.utils.logger import setup_logger
+from shared_configs.enums import EmbedTextType
+from shared_configs.model_server_models import Embedding
+
+logger = setup_logger()
+
+EMBEDDING_CACHE_BACKEND_REDIS = "redis"
+EMBEDDING_CACHE_BACKEND_DISK = "disk"
+
+
+def build_embedding_cache_key(
+    namespace: str, text_type: EmbedTextType, max_seq_length: int, text: str
+) -> str:
+    """Texts differing only by unicode normalization form or surrounding whitespace
+    share the same embedding."""
+    normalized_text = unicodedata.normalize("NFC", text).strip()
+    text_hash = hashlib.sha256(normalized_text.encode("utf-8")).hexdigest()
+    return f"{namespace}:{text_type.value}:{max_seq_length}:{text_hash}"
+
+
+def _serialize_embedding(embedding: Embedding) -> bytes:
+    # float32, the same precision the embeddings are stored with in Vespa
+    return array("f", embedding).tobytes()
+
+
+def _deserialize_embedding(data: bytes) -> Embedding:
+    embedding = array("f")
+    embedding.frombytes(data)
+    return embedding.tolist()
+
+
+class EmbeddingCache(ABC):
+    """Maps cache keys (see build_embedding_cache_key) to embeddings. Implementations
+    are bounded in size and evict the least recently used entries first.
+
+    Failures of the backend are never raised, the embeddings are simply treated
+    as cache misses / not cached."""
+
+    @abstractmethod
+    def get_many(
+        self, namespace: str, keys: list[str], tenant_id: str | None = None
+    ) -> list[Embedding | None]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_many(
+        self,
+        namespace: str,
+        entries: dict[str, Embedding],
+        tenant_id: str | None = None,
+    ) -> None:
+        raise NotImplementedError
+
+
+class RedisEmbeddingCache(EmbeddingCache):
+    """Embeddings are stored as plain keys (with a TTL) in the tenant's Redis
+    namespace. A sorted set per cache namespace keeps track of when each key was last
+    used so that the least recently used entries can be deleted once there are more
+    than max_entries."""
+
+    def __init__(
+        self,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        ttl: int = EMBEDDING_CACHE_TTL,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+
+    @staticmethod
+    def _tenant_prefix(r: Redis) -> str:
+        # mget, zadd, pipelines and all but the first key of a command don't
+        # automatically get the tenant_id prefix
+        return f"{r.tenant_id}:" if isinstance(r, TenantRedis) else ""
+
+    @staticmethod
+    def _lru_key(tenant_prefix: str, namespace: str) -> str:
+        return f"{tenant_prefix}embedding_cache_lru:{namespace}"
+
+    @staticmethod
+    def _entry_key(tenant_prefix: str, key: str) -> str:
+        return f"{tenant_prefix}embedding_cache:{key}"
+
+    def get_many(
+        self, namespace: str, keys: list[str], tenant_id: str | None = None
+    ) -> list[Embedding | None]:
+        if not keys:
+            return []
+
+        try:
+            r = get_redis_client(tenant_id=tenant_id)
+            tenant_prefix = self._tenant_prefix(r)
+            values = cast(
+                list[bytes | None],
+                r.mget([self._entry_key(tenant_prefix, key) for key in keys]),
+            )
+
+            hits = {key: time.time() for key, value in zip(keys, values) if value}
+            if hits:
+                r.zadd(self._lru_key(tenant_prefix, namespace), hits)
+        except Exception:
+            logger.exception("Failed to read from the embedding cache")
+            return [None] * len(keys)
+
+        return [_deserialize_embedding(value) if value else None for value in values]
+
+    def set_many(
+        self,
+        namespace: str,
+        entries: dict[str, Embedding],
+        tenant_id: str | None = None,
+    ) -> None:
+        if not entries:
+            return
+
+        now = time.time()
+        try:
+            r = get_redis_client(tenant_id=tenant_id)
+            tenant_prefix = self._tenant_prefix(r)
+            lru_key = self._lru_key(tenant_prefix, namespace)
+
+            pipe = r.pipeline(transaction=False)
+            for key, embedding in entries.items():
+                pipe.set(
+                    self._entry_key(tenant_prefix, key),
+                    _serialize_embedding(embedding),
+                    ex=self.ttl,
+                )
+            pipe.zadd(lru_key, {key: now for key in entries})
+            # entries expiring via the TTL are never more recent than this
+            pipe.zremrangebyscore(lru_key, "-inf", now - self.ttl)
+            # everything but the max_entries most recently used entries is evicted
+            pipe.zrange(lru_key, 0, -self.max_entries - 1)
+            pipe.zremrangebyrank(lru_key, 0, -self.max_entries - 1)
+            pipe.expire(lru_key, self.ttl)
+            evicted = cast(list[bytes], pipe.execute()[-3])
+
+            if evicted:
+                pipe = r.pipeline(transaction=False)
+                pipe.delete(
+                    *[self._entry_key(tenant_prefix, key.decode()) for key in evicted]
+                )
+                pipe.execute()
+        except Exception:
+            logger.exception("Failed to write to the embedding cache")
+
+
+class DiskEmbeddingCache(EmbeddingCache):
+    """SQLite backed cache, for deployments without a shared Redis or for local
+    development. The file is shared by all processes on the host.
+
+    Counting the entries scans the whole table, so the count is only refreshed once
+    the rows written by this process may have filled the cache (or every
+    max_entries / 10 rows, to account for the other processes). Every count evicts
+    down to 90% of max_entries, so a full cache isn't counted on every write."""
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_DISK_PATH,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        # number of entries as of the last count, and rows written since then
+        self._num_entries: int | None = None
+        self._num_written = 0
+
+    def _get_conn(self) -> sqlite3.Connection:
+        if self._conn is not None:
+            return self._conn
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=60.0, check_same_thread=False)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embedding_cache (
+                    key TEXT PRIMARY KEY,
+                    embedding BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used "
+                "ON embedding_cache (last_used)"
+            )
+        self._conn = conn
+        return conn
+
+    @staticmethod
+    def _row_key(key: str, tenant_id: str | None) -> str:
+        return f"{tenant_id or ''}:{key}"
+
+    def get_many(
+        self, namespace: str, keys: list[str], tenant_id: str | None = None
+    ) -> list[Embedding | None]:
+        if not keys:
+            return []
+
+        row_keys = [self._row_key(key, tenant_id) for key in keys]
+        found: dict[str, bytes] = {}
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                # stay well below the SQLite limit on the number of parameters
+                for start in range(0, len(row_keys), 500):
+                    batch = row_keys[start : start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    found.update(
+                        conn.execute(
+                            "SELECT key, embedding FROM embedding_cache "
+                            f"WHERE key IN ({placeholders})",
+                            batch,
+                        ).fetchall()
+                    )
+                if found:
+                    with conn:
+                        now = time.time()
+                        conn.executemany(
+                            "UPDATE embedding_cache SET last_used = ? WHERE key = ?",
+                            [(now, row_key) for row_key in found],
+                        )
+        except Exception:
+            logger.exception("Failed to read from the embedding cache")
+            return [None] * len(keys)
+
+        return [
+            _deserialize_embedding(found[row_key]) if row_key in found else None
+            for row_key in row_keys
+        ]
+
+    def set_many(
+        self,
+        namespace: str,
+        entries: dict[str, Embedding],
+        tenant_id: str | None = None,
+    ) -> None:
+        if not entries:
+            return
+
+        now = time.time()
+        try:
+            with self._lock:
+                conn = self._get_conn()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embedding_cache "
+                        "(key, embedding, last_used) VALUES (?, ?, ?)",
+                        [
+                            (
+                                self._row_key(key, tenant_id),
+                                _serialize_embedding(embedding),
+                                now,
+                            )
+                            for key, embedding in entries.items()
+                        ],
+                    )
+                    self._num_written += len(entries)
+                    if (
+                        self._num_entries is None
+                        or self._num_entries + self._num_written > self.max_entries
+                        or self._num_written >= self.max_entries // 10
+                    ):
+                        self._evict(conn)
+        except Exception:
+            # the count may be off after a failed transaction
+            self._num_entries = None
+            logger.exception("Failed to write to the embedding cache")
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        num_entries = conn.execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+        num_to_evict = num_entries - (self.max_entries - self.max_entries // 10)
+        if num_to_evict > 0:
+            conn.execute(
+                "DELETE FROM embedding_cache WHERE key IN ("
+                "SELECT key FROM embedding_cache "
+                "ORDER BY last_used LIMIT ?)",
+                (num_to_evict,),
+            )
+            num_entries -= num_to_evict
+        self._num_entries = num_entries
+        self._num_written = 0
+
+
+_embedding_cache: EmbeddingCache | None = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Returns the process wide embedding cache configured via
+    EMBEDDING_CACHE_BACKEND, or None if caching is disabled."""
+    global _embedding_cache
+
+    if not EMBEDDING_CACHE_BACKEND:
+        return None
+
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            if EMBEDDING_CACHE_BACKEND == EMBEDDING_CACHE_BACKEND_REDIS:
+                _embedding_cache = RedisEmbeddingCache()
+            elif EMBEDDING_CACHE_BACKEND == EMBEDDING_CACHE_BACKEND_DISK:
+                _embedding_cache = DiskEmbeddingCache()
+            else:
+                logger.error(
+                    f"Unknown EMBEDDING_CACHE_BACKEND={EMBEDDING_CACHE_BACKEND}, "
+                    "embeddings will not be cached"
+                )
+                return None
+
+    return _embedding_cache
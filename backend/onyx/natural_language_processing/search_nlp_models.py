@@ -1,3 +1,4 @@
+import hashlib
 import threading
 import time
 from collections.abc import Callable
@@ -6,6 +7,7 @@ from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from functools import wraps
 from typing import Any
+from typing import cast
 
 import requests
 from httpx import HTTPError
@@ -25,6 +27,11 @@ from onyx.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from onyx.connectors.models import ConnectorStopSignal
 from onyx.db.models import SearchSettings
 from onyx.indexing.indexing_heartbeat import IndexingHeartbeatInterface
+from onyx.natural_language_processing.embedding_cache import (
+    build_embedding_cache_key,
+)
+from onyx.natural_language_processing.embedding_cache import EmbeddingCache
+from onyx.natural_language_processing.embedding_cache import get_embedding_cache
 from onyx.natural_language_processing.exceptions import (
     ModelServerRateLimitError,
 )
@@ -96,6 +103,7 @@ class EmbeddingModel:
         api_version: str | None = None,
         deployment_name: str | None = None,
         reduced_dimension: int | None = None,
+        embedding_cache: EmbeddingCache | None = None,
     ) -> None:
         self.api_key = api_key
         self.provider_type = provider_type
@@ -113,6 +121,25 @@ class EmbeddingModel:
         )
         self.callback = callback
 
+        # everything in the search settings that changes the produced embeddings
+        self.embedding_cache = embedding_cache
+        self.embedding_cache_namespace = hashlib.sha256(
+            "|".join(
+                str(setting)
+                for setting in (
+                    provider_type.value if provider_type else None,
+                    model_name,
+                    normalize,
+                    query_prefix,
+                    passage_prefix,
+                    api_url,
+                    api_version,
+                    deployment_name,
+                    reduced_dimension,
+                )
+            ).encode("utf-8")
+        ).hexdigest()[:16]
+
         model_server_url = build_model_server_url(server_host, server_port)
         self.embed_server_endpoint = f"{model_server_url}/encoder/bi-encoder-embed"
 
@@ -294,6 +321,7 @@ class EmbeddingModel:
         max_seq_length: int = DOC_EMBEDDING_CONTEXT_SIZE,
         tenant_id: str | None = None,
         request_id: str | None = None,
+        use_cache: bool = True,
     ) -> list[Embedding]:
         if not texts or not all(texts):
             raise ValueError(f"Empty or missing text for embedding: {texts}")
@@ -320,14 +348,66 @@ class EmbeddingModel:
             else local_embedding_batch_size
         )
 
-        return self._batch_encode_texts(
-            texts=texts,
+        embedding_cache = self.embedding_cache if use_cache else None
+        if embedding_cache is None:
+            return self._batch_encode_texts(
+                texts=texts,
+                text_type=text_type,
+                batch_size=batch_size,
+                max_seq_length=max_seq_length,
+                tenant_id=tenant_id,
+                request_id=request_id,
+            )
+
+        cache_keys = [
+            build_embedding_cache_key(
+                self.embedding_cache_namespace, text_type, max_seq_length, text
+            )
+            for text in texts
+        ]
+        embeddings = embedding_cache.get_many(
+            self.embedding_cache_namespace, cache_keys, tenant_id=tenant_id
+        )
+
+        # only send the misses (once each) to the model, then stitch them back
+        miss_ind_by_key: dict[str, int] = {}
+        miss_texts: list[str] = []
+        for text, cache_key, embedding in zip(texts, cache_keys, embeddings):
+            if embedding is None and cache_key not in miss_ind_by_key:
+                miss_ind_by_key[cache_key] = len(miss_texts)
+                miss_texts.append(text)
+
+        logger.debug(
+            f"Embedding cache: {len(texts) - len(miss_texts)}/{len(texts)} hits"
+        )
+        if not miss_texts:
+            return cast(list[Embedding], embeddings)
+
+        miss_embeddings = self._batch_encode_texts(
+            texts=miss_texts,
             text_type=text_type,
             batch_size=batch_size,
             max_seq_length=max_seq_length,
             tenant_id=tenant_id,
             request_id=request_id,
         )
+        embedding_cache.set_many(
+            self.embedding_cache_namespace,
+            {
+                cache_key: miss_embeddings[miss_ind]
+                for cache_key, miss_ind in miss_ind_by_key.items()
+            },
+            tenant_id=tenant_id,
+        )
+
+        return [
+            (
+                embedding
+                if embedding is not None
+                else miss_embeddings[miss_ind_by_key[cache_key]]
+            )
+            for cache_key, embedding in zip(cache_keys, embeddings)
+        ]
 
     @classmethod
     def from_db_model(
@@ -351,6 +431,7 @@ class EmbeddingModel:
             api_version=search_settings.api_version,
             deployment_name=search_settings.deployment_name,
             reduced_dimension=search_settings.reduced_dimension,
+            embedding_cache=get_embedding_cache(),
         )
 
 
@@ -521,7 +602,9 @@ def warm_up_bi_encoder(
 
     def _warm_up() -> None:
         try:
-            embedding_model.encode(texts=[warm_up_str], text_type=EmbedTextType.QUERY)
+            embedding_model.encode(
+                texts=[warm_up_str], text_type=EmbedTextType.QUERY, use_cache=False
+            )
             logger.debug(
                 f"Warm-up complete for encoder model: {embedding_model.model_name}"
             )
@@ -537,7 +620,9 @@ def warm_up_bi_encoder(
         )
     else:
         retry_encode = warm_up_retry(embedding_model.encode)
-        retry_encode(texts=[warm_up_str], text_type=EmbedTextType.QUERY)
+        retry_encode(
+            texts=[warm_up_str], text_type=EmbedTextType.QUERY, use_cache=False
+        )
 
 
 def warm_up_cross_encoder(
@@ -1,7 +1,10 @@
 import os
+import threading
 from abc import ABC
 from abc import abstractmethod
+from collections import OrderedDict
 from copy import copy
+from typing import cast
 
 from tokenizers import Encoding  # type: ignore
 from tokenizers import Tokenizer  # type: ignore
@@ -9,6 +12,7 @@ from transformers import logging as transformer_logging  # type:ignore
 
 from onyx.configs.model_configs import DOC_EMBEDDING_CONTEXT_SIZE
 from onyx.configs.model_configs import DOCUMENT_ENCODER_MODEL
+from onyx.configs.model_configs import TOKEN_COUNT_CACHE_SIZE
 from onyx.context.search.models import InferenceChunk
 from onyx.utils.logger import setup_logger
 from shared_configs.enums import EmbeddingProvider
@@ -22,6 +26,34 @@ os.environ["HF_HUB_DISABLE_TELEMETRY"] = "1"
 os.environ["TRANSFORMERS_NO_ADVISORY_WARNINGS"] = "1"
 
 
+class _TokenCountCache:
+    """LRU cache of token counts. Keyed by (length, hash) of the string rather than
+    the string itself so that long texts (e.g. whole sections) are not kept alive."""
+
+    def __init__(self, max_size: int = TOKEN_COUNT_CACHE_SIZE) -> None:
+        self.max_size = max_size
+        self._counts: OrderedDict[tuple[int, int], int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(string: str) -> tuple[int, int]:
+        return len(string), hash(string)
+
+    def get(self, key: tuple[int, int]) -> int | None:
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+            return count
+
+    def put(self, key: tuple[int, int], count: int) -> None:
+        with self._lock:
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.max_size:
+                self._counts.popitem(last=False)
+
+
 class BaseTokenizer(ABC):
     @abstractmethod
     def encode(self, string: str) -> list[int]:
@@ -35,6 +67,45 @@ class BaseTokenizer(ABC):
     def decode(self, tokens: list[int]) -> str:
         pass
 
+    def encode_batch(self, strings: list[str]) -> list[list[int]]:
+        """Same as calling encode on each string, tokenizers that can encode a batch
+        at once (in parallel / without the per call overhead) override this."""
+        return [self.encode(string) for string in strings]
+
+    @property
+    def _token_count_cache(self) -> _TokenCountCache:
+        # tokenizers are shared process wide (see get_tokenizer), and so is this cache
+        cache = self.__dict__.get("_token_count_cache_instance")
+        if cache is None:
+            cache = self.__dict__.setdefault(
+                "_token_count_cache_instance", _TokenCountCache()
+            )
+        return cache
+
+    def count_tokens(self, string: str) -> int:
+        """len(encode(string)), memoized"""
+        key = _TokenCountCache.key(string)
+        count = self._token_count_cache.get(key)
+        if count is None:
+            count = len(self.encode(string))
+            self._token_count_cache.put(key, count)
+        return count
+
+    def count_tokens_batch(self, strings: list[str]) -> list[int]:
+        """count_tokens for many strings, the ones not in the memo are encoded as a
+        single batch"""
+        keys = [_TokenCountCache.key(string) for string in strings]
+        counts = [self._token_count_cache.get(key) for key in keys]
+
+        miss_inds = [ind for ind, count in enumerate(counts) if count is None]
+        if miss_inds:
+            encoded = self.encode_batch([strings[ind] for ind in miss_inds])
+            for ind, tokens in zip(miss_inds, encoded):
+                counts[ind] = len(tokens)
+                self._token_count_cache.put(keys[ind], len(tokens))
+
+        return cast(list[int], counts)
+
 
 class TiktokenTokenizer(BaseTokenizer):
     _instances: dict[str, "TiktokenTokenizer"] = {}
@@ -54,6 +125,9 @@ class TiktokenTokenizer(BaseTokenizer):
         # this ignores special tokens that the model is trained on, see encode_ordinary for details
         return self.encoder.encode_ordinary(string)
 
+    def encode_batch(self, strings: list[str]) -> list[list[int]]:
+        return self.encoder.encode_ordinary_batch(strings)
+
     def tokenize(self, string: str) -> list[str]:
         encoded = self.encode(string)
         decoded = [self.encoder.decode([token]) for token in encoded]
@@ -90,6 +164,22 @@ class HuggingFaceTokenizer(BaseTokenizer):
         # this returns no special tokens
         return self._safer_encode(string).ids
 
+    def encode_batch(self, strings: list[str]) -> list[list[int]]:
+        # batches would be padded to the same length
+        if self.encoder.padding is not None:
+            return super().encode_batch(strings)
+
+        try:
+            return [
+                encoding.ids
+                for encoding in self.encoder.encode_batch(
+                    strings, add_special_tokens=False
+                )
+            ]
+        except Exception:
+            # same fallback as _safer_encode, for the strings that need it
+            return super().encode_batch(strings)
+
     def tokenize(self, string: str) -> list[str]:
         return self._safer_encode(string).tokens
 
@@ -69,3 +69,11 @@ TENANT_HEARTBEAT_EXPIRATION = (
 TENANT_ACQUISITION_INTERVAL = 60  # How often pods attempt to acquire unprocessed tenants and checks for new tokens
 
 MAX_TENANTS_PER_POD = int(os.getenv("MAX_TENANTS_PER_POD", 50))
+
+# Slack events are acknowledged right away and answered by a pool of workers shared by
+# all the tenants of the pod. Each tenant gets a bounded queue (events past it are
+# dropped) and can only occupy part of the workers, so a busy tenant doesn't delay the
+# others
+SLACK_BOT_EVENT_WORKERS = int(os.getenv("SLACK_BOT_EVENT_WORKERS", 16))
+SLACK_BOT_MAX_WORKERS_PER_TENANT = int(os.getenv("SLACK_BOT_MAX_WORKERS_PER_TENANT", 8))
+SLACK_BOT_TENANT_QUEUE_SIZE = int(os.getenv("SLACK_BOT_TENANT_QUEUE_SIZE", 100))
@@ -0,0 +1,214 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+from typing import NamedTuple
+
+from prometheus_client import Counter
+from prometheus_client import Gauge
+from prometheus_client import Histogram
+
+from onyx.configs.app_configs import POD_NAME
+from onyx.configs.app_configs import POD_NAMESPACE
+from onyx.utils.logger import setup_logger
+
+logger = setup_logger()
+
+queued_events_gauge = Gauge(
+    "slack_bot_queued_events",
+    "Number of Slack events waiting for a worker on this pod",
+    ["namespace", "pod"],
+)
+busy_workers_gauge = Gauge(
+    "slack_bot_busy_workers",
+    "Number of Slack event workers processing an event on this pod",
+    ["namespace", "pod"],
+)
+event_queue_time_histogram = Histogram(
+    "slack_bot_event_queue_seconds",
+    "Time Slack events spend waiting for a worker",
+    ["namespace", "pod"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+dropped_events_counter = Counter(
+    "slack_bot_dropped_events",
+    "Number of Slack events dropped because the queue of their tenant was full",
+    ["namespace", "pod"],
+)
+
+
+class _QueuedEvent(NamedTuple):
+    func: Callable[..., Any]
+    args: tuple[Any, ...]
+    context: contextvars.Context
+    enqueued_at: float
+
+
+class SlackEventDispatcher:
+    """
+    Runs the Slack events of all the tenants of the pod on a fixed pool of worker
+    threads, so the socket mode clients only have to acknowledge and enqueue them.
+
+    Every tenant has its own bounded queue, tenants with queued events are served
+    round robin and a tenant never occupies more than max_workers_per_tenant workers
+    at once. When the queue of a tenant is full, its new events are dropped.
+    """
+
+    def __init__(
+        self,
+        num_workers: int,
+        max_workers_per_tenant: int,
+        max_queue_size_per_tenant: int,
+    ) -> None:
+        self.num_workers = max(1, num_workers)
+        self.max_workers_per_tenant = max(1, max_workers_per_tenant)
+        self.max_queue_size_per_tenant = max(1, max_queue_size_per_tenant)
+
+        self._condition = threading.Condition()
+        self._queues: dict[str, deque[_QueuedEvent]] = {}
+        self._busy_workers: dict[str, int] = {}
+        # tenants with queued events and a free worker slot, in serving order
+        self._ready_tenant_ids: deque[str] = deque()
+        self._num_queued_events = 0
+        self._running = True
+
+        self._workers = [
+            threading.Thread(
+                target=self._worker_loop, name=f"slack_event_worker_{i}", daemon=True
+            )
+            for i in range(self.num_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, tenant_id: str, func: Callable[..., Any], *args: Any) -> bool:
+        """
+        Queues func(*args) to run in the current context. Returns False if the event
+        was dropped.
+        """
+        with self._condition:
+            if not self._running:
+                logger.warning(
+                    f"Slack event dispatcher is shutting down, dropping event: {tenant_id=}"
+                )
+                return False
+
+            queue = self._queues.setdefault(tenant_id, deque())
+            if len(queue) >= self.max_queue_size_per_tenant:
+                dropped_events_counter.labels(
+                    namespace=POD_NAMESPACE, pod=POD_NAME
+                ).inc()
+                logger.warning(
+                    f"Slack event queue full, dropping event: {tenant_id=} "
+                    f"queued={len(queue)}"
+                )
+                return False
+
+            queue.append(
+                _QueuedEvent(
+                    func=func,
+                    args=args,
+                    context=contextvars.copy_context(),
+                    enqueued_at=time.monotonic(),
+                )
+            )
+            self._num_queued_events += 1
+            self._mark_ready(tenant_id)
+            self._update_gauges()
+            self._condition.notify()
+        return True
+
+    def num_queued_events(self, tenant_id: str | None = None) -> int:
+        with self._condition:
+            if tenant_id is None:
+                return self._num_queued_events
+            return len(self._queues.get(tenant_id, ()))
+
+    def shutdown(self, timeout: float | None = None) -> None:
+        """
+        Stops accepting events and waits for the queued ones to be processed.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(
+                timeout=(
+                    None if deadline is None else max(0, deadline - time.monotonic())
+                )
+            )
+
+        with self._condition:
+            if self._num_queued_events:
+                logger.warning(
+                    f"Slack event dispatcher stopped with {self._num_queued_events} "
+                    "unprocessed events"
+                )
+
+    def _mark_ready(self, tenant_id: str) -> None:
+        if (
+            self._queues.get(tenant_id)
+            and self._busy_workers.get(tenant_id, 0) < self.max_workers_per_tenant
+            and tenant_id not in self._ready_tenant_ids
+        ):
+            self._ready_tenant_ids.append(tenant_id)
+
+    def _update_gauges(self) -> None:
+        queued_events_gauge.labels(namespace=POD_NAMESPACE, pod=POD_NAME).set(
+            self._num_queued_events
+        )
+        busy_workers_gauge.labels(namespace=POD_NAMESPACE, pod=POD_NAME).set(
+            sum(self._busy_workers.values())
+        )
+
+    def _next_event(self) -> tuple[str, _QueuedEvent] | None:
+        with self._condition:
+            while not self._ready_tenant_ids:
+                # drain the queues before stopping, unless all that's left is
+                # waiting on a tenant's busy workers, which will pick it up
+                if not self._running and not self._num_queued_events:
+                    return None
+                self._condition.wait()
+
+            tenant_id = self._ready_tenant_ids.popleft()
+            event = self._queues[tenant_id].popleft()
+            self._num_queued_events -= 1
+            self._busy_workers[tenant_id] = self._busy_workers.get(tenant_id, 0) + 1
+            # back of the line, so the other tenants are served first
+            self._mark_ready(tenant_id)
+            self._update_gauges()
+            return tenant_id, event
+
+    def _done(self, tenant_id: str) -> None:
+        with self._condition:
+            self._busy_workers[tenant_id] -= 1
+            if not self._busy_workers[tenant_id]:
+                del self._busy_workers[tenant_id]
+                if not self._queues[tenant_id]:
+                    del self._queues[tenant_id]
+            self._mark_ready(tenant_id)
+            self._update_gauges()
+            # wakes up the workers waiting on this tenant's slot and, once the
+            # queues are empty, the ones waiting to stop
+            self._condition.notify_all()
+
+    def _worker_loop(self) -> None:
+        while True:
+            next_event = self._next_event()
+            if next_event is None:
+                return
+
+            tenant_id, event = next_event
+            event_queue_time_histogram.labels(
+                namespace=POD_NAMESPACE, pod=POD_NAME
+            ).observe(time.monotonic() - event.enqueued_at)
+            try:
+                event.context.run(event.func, *event.args)
+            except Exception:
+                logger.exception(f"Failed to process Slack event: {tenant_id=}")
+            finally:
+                self._done(tenant_id)
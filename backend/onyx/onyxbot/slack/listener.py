@@ -51,6 +51,9 @@ from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
 from onyx.natural_language_processing.search_nlp_models import warm_up_bi_encoder
 from onyx.onyxbot.slack.config import get_slack_channel_config_for_bot_and_channel
 from onyx.onyxbot.slack.config import MAX_TENANTS_PER_POD
+from onyx.onyxbot.slack.config import SLACK_BOT_EVENT_WORKERS
+from onyx.onyxbot.slack.config import SLACK_BOT_MAX_WORKERS_PER_TENANT
+from onyx.onyxbot.slack.config import SLACK_BOT_TENANT_QUEUE_SIZE
 from onyx.onyxbot.slack.config import TENANT_ACQUISITION_INTERVAL
 from onyx.onyxbot.slack.config import TENANT_HEARTBEAT_EXPIRATION
 from onyx.onyxbot.slack.config import TENANT_HEARTBEAT_INTERVAL
@@ -65,6 +68,7 @@ from onyx.onyxbot.slack.constants import KEEP_TO_YOURSELF_ACTION_ID
 from onyx.onyxbot.slack.constants import LIKE_BLOCK_ACTION_ID
 from onyx.onyxbot.slack.constants import SHOW_EVERYONE_ACTION_ID
 from onyx.onyxbot.slack.constants import VIEW_DOC_FEEDBACK_ID
+from onyx.onyxbot.slack.event_dispatcher import SlackEventDispatcher
 from onyx.onyxbot.slack.handlers.handle_buttons import handle_doc_feedback_button
 from onyx.onyxbot.slack.handlers.handle_buttons import handle_followup_button
 from onyx.onyxbot.slack.handlers.handle_buttons import (
@@ -160,6 +164,13 @@ class SlackbotHandler:
         start_http_server(8000)
         logger.info("Prometheus metrics server started")
 
+        # Events of all the socket clients are processed by a shared pool of workers
+        self.event_dispatcher = SlackEventDispatcher(
+            num_workers=SLACK_BOT_EVENT_WORKERS,
+            max_workers_per_tenant=SLACK_BOT_MAX_WORKERS_PER_TENANT,
+            max_queue_size_per_tenant=SLACK_BOT_TENANT_QUEUE_SIZE,
+        )
+
         # Start background threads
         logger.info("Starting background threads")
         self.acquire_thread = threading.Thread(
@@ -259,7 +270,7 @@ class SlackbotHandler:
                 self.socket_clients[tenant_bot_pair].close()
 
             socket_client = self.start_socket_client(
-                bot.id, tenant_id, slack_bot_tokens
+                bot.id, tenant_id, slack_bot_tokens, self.event_dispatcher
             )
             if socket_client:
                 # Ensure tenant is tracked as active
@@ -460,7 +471,10 @@ class SlackbotHandler:
 
     @staticmethod
     def start_socket_client(
-        slack_bot_id: int, tenant_id: str, slack_bot_tokens: SlackBotTokens
+        slack_bot_id: int,
+        tenant_id: str,
+        slack_bot_tokens: SlackBotTokens,
+        event_dispatcher: SlackEventDispatcher | None = None,
     ) -> TenantSocketModeClient | None:
         """Returns the socket client if this succeeds"""
         socket_client: TenantSocketModeClient = _get_socket_client(
@@ -503,7 +517,7 @@ class SlackbotHandler:
             )
 
         # Append the event handler
-        process_slack_event = create_process_slack_event()
+        process_slack_event = create_process_slack_event(event_dispatcher)
         socket_client.socket_mode_request_listeners.append(process_slack_event)  # type: ignore
 
         # Establish a WebSocket connection to the Socket Mode servers
@@ -549,6 +563,12 @@ class SlackbotHandler:
         logger.info(f"Stopping {len(self.socket_clients)} socket clients")
         SlackbotHandler.stop_socket_clients(self.pod_id, self.socket_clients)
 
+        # Finish the events that were already acknowledged
+        logger.info(
+            f"Waiting for {self.event_dispatcher.num_queued_events()} queued Slack events"
+        )
+        self.event_dispatcher.shutdown(timeout=60.0)
+
         # Release locks for all tenants we currently hold
         logger.info(f"Releasing locks for {len(self.tenant_ids)} tenants")
         for tenant_id in list(self.tenant_ids):
@@ -1029,9 +1049,22 @@ def view_routing(req: SocketModeRequest, client: TenantSocketModeClient) -> None
             return process_feedback(req, client)
 
 
-def create_process_slack_event() -> (
-    Callable[[TenantSocketModeClient, SocketModeRequest], None]
-):
+def event_routing(req: SocketModeRequest, client: TenantSocketModeClient) -> None:
+    try:
+        if req.type == "interactive":
+            if req.payload.get("type") == "block_actions":
+                return action_routing(req, client)
+            elif req.payload.get("type") == "view_submission":
+                return view_routing(req, client)
+        elif req.type == "events_api" or req.type == "slash_commands":
+            return process_message(req, client)
+    except Exception:
+        logger.exception("Failed to process slack event")
+
+
+def create_process_slack_event(
+    event_dispatcher: SlackEventDispatcher | None = None,
+) -> Callable[[TenantSocketModeClient, SocketModeRequest], None]:
     def process_slack_event(
         client: TenantSocketModeClient, req: SocketModeRequest
     ) -> None:
@@ -1039,16 +1072,18 @@ def create_process_slack_event() -> (
         # it will assume the Bot is DEAD!!! :(
         acknowledge_message(req, client)
 
-        try:
-            if req.type == "interactive":
-                if req.payload.get("type") == "block_actions":
-                    return action_routing(req, client)
-                elif req.payload.get("type") == "view_submission":
-                    return view_routing(req, client)
-            elif req.type == "events_api" or req.type == "slash_commands":
-                return process_message(req, client)
-        except Exception:
-            logger.exception("Failed to process slack event")
+        if event_dispatcher is None:
+            return event_routing(req, client)
+
+        # the answer is generated by the dispatcher's workers, so slow answers
+        # don't hold up the socket client (and the events of other tenants)
+        if not event_dispatcher.submit(
+            get_current_tenant_id(), event_routing, req, client
+        ):
+            logger.warning(
+                f"Dropped Slack event: {req.type=} {req.envelope_id=} "
+                f"{client.slack_bot_id=}"
+            )
 
     return process_slack_event
 
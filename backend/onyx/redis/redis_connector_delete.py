@@ -10,6 +10,7 @@ from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
 from onyx.configs.app_configs import DB_YIELD_PER_DEFAULT
+from onyx.configs.app_configs import DOCUMENT_CLEANUP_BATCH_SIZE
 from onyx.configs.constants import CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import OnyxCeleryPriority
 from onyx.configs.constants import OnyxCeleryQueues
@@ -17,6 +18,7 @@ from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
 from onyx.db.document import construct_document_id_select_for_connector_credential_pair
+from onyx.utils.batching import batch_generator
 
 
 class RedisConnectorDeletePayload(BaseModel):
@@ -104,9 +106,10 @@ class RedisConnectorDelete:
         celery_app: Celery,
         db_session: Session,
         lock: RedisLock,
-    ) -> int | None:
+    ) -> tuple[int, int] | None:
         """Returns None if the cc_pair doesn't exist.
-        Otherwise, returns an int with the number of generated tasks."""
+        Otherwise, returns a tuple with the number of generated tasks and the number
+        of documents they cover. Each task cleans up a batch of documents."""
         last_lock_time = time.monotonic()
 
         cc_pair = get_connector_credential_pair_from_id(
@@ -117,12 +120,13 @@ class RedisConnectorDelete:
             return None
 
         num_tasks_sent = 0
+        num_docs = 0
 
         stmt = construct_document_id_select_for_connector_credential_pair(
             cc_pair.connector_id, cc_pair.credential_id
         )
-        for doc_id in db_session.scalars(stmt).yield_per(DB_YIELD_PER_DEFAULT):
-            doc_id = cast(str, doc_id)
+        doc_ids = db_session.scalars(stmt).yield_per(DB_YIELD_PER_DEFAULT)
+        for doc_id_batch in batch_generator(doc_ids, DOCUMENT_CLEANUP_BATCH_SIZE):
             current_time = time.monotonic()
             if current_time - last_lock_time >= (
                 CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT / 4
@@ -138,9 +142,9 @@ class RedisConnectorDelete:
 
             # Priority on sync's triggered by new indexing should be medium
             celery_app.send_task(
-                OnyxCeleryTask.DOCUMENT_BY_CC_PAIR_CLEANUP_TASK,
+                OnyxCeleryTask.DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_TASK,
                 kwargs=dict(
-                    document_id=doc_id,
+                    document_ids=cast(list[str], doc_id_batch),
                     connector_id=cc_pair.connector_id,
                     credential_id=cc_pair.credential_id,
                     tenant_id=self.tenant_id,
@@ -152,8 +156,9 @@ class RedisConnectorDelete:
             )
 
             num_tasks_sent += 1
+            num_docs += len(doc_id_batch)
 
-        return num_tasks_sent
+        return num_tasks_sent, num_docs
 
     def reset(self) -> None:
         self.redis.srem(OnyxRedisConstants.ACTIVE_FENCES, self.fence_key)
@@ -1,4 +1,5 @@
 import time
+from collections.abc import Iterable
 from datetime import datetime
 from typing import cast
 from uuid import uuid4
@@ -9,6 +10,7 @@ from pydantic import BaseModel
 from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
+from onyx.configs.app_configs import DOCUMENT_CLEANUP_BATCH_SIZE
 from onyx.configs.constants import CELERY_GENERIC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import CELERY_PRUNING_LOCK_TIMEOUT
 from onyx.configs.constants import OnyxCeleryPriority
@@ -17,6 +19,7 @@ from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
 from onyx.redis.redis_pool import SCAN_ITER_COUNT_DEFAULT
+from onyx.utils.batching import batch_generator
 
 
 class RedisConnectorPrunePayload(BaseModel):
@@ -152,14 +155,18 @@ class RedisConnectorPrune:
 
     def generate_tasks(
         self,
-        documents_to_prune: set[str],
+        documents_to_prune: Iterable[str],
         celery_app: Celery,
         db_session: Session,
         lock: RedisLock | None,
-    ) -> int | None:
+    ) -> tuple[int, int] | None:
+        """Returns None if the cc_pair doesn't exist.
+        Otherwise, returns a tuple with the number of generated tasks and the number
+        of documents they cover. Each task cleans up a batch of documents."""
         last_lock_time = time.monotonic()
 
-        async_results = []
+        num_tasks_sent = 0
+        num_docs = 0
         cc_pair = get_connector_credential_pair_from_id(
             db_session=db_session,
             cc_pair_id=int(self.id),
@@ -167,7 +174,9 @@ class RedisConnectorPrune:
         if not cc_pair:
             return None
 
-        for doc_id in documents_to_prune:
+        for doc_id_batch in batch_generator(
+            documents_to_prune, DOCUMENT_CLEANUP_BATCH_SIZE
+        ):
             current_time = time.monotonic()
             if lock and current_time - last_lock_time >= (
                 CELERY_GENERIC_BEAT_LOCK_TIMEOUT / 4
@@ -185,10 +194,10 @@ class RedisConnectorPrune:
             self.redis.sadd(self.taskset_key, custom_task_id)
 
             # Priority on sync's triggered by new indexing should be medium
-            result = celery_app.send_task(
-                OnyxCeleryTask.DOCUMENT_BY_CC_PAIR_CLEANUP_TASK,
+            celery_app.send_task(
+                OnyxCeleryTask.DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_TASK,
                 kwargs=dict(
-                    document_id=doc_id,
+                    document_ids=doc_id_batch,
                     connector_id=cc_pair.connector_id,
                     credential_id=cc_pair.credential_id,
                     tenant_id=self.tenant_id,
@@ -199,9 +208,10 @@ class RedisConnectorPrune:
                 ignore_result=True,
             )
 
-            async_results.append(result)
+            num_tasks_sent += 1
+            num_docs += len(doc_id_batch)
 
-        return len(async_results)
+        return num_tasks_sent, num_docs
 
     def reset(self) -> None:
         self.redis.srem(OnyxRedisConstants.ACTIVE_FENCES, self.fence_key)
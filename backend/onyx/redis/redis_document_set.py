@@ -9,6 +9,7 @@ from redis.lock import Lock as RedisLock
 from sqlalchemy.orm import Session
 
 from onyx.configs.app_configs import DB_YIELD_PER_DEFAULT
+from onyx.configs.app_configs import VESPA_SYNC_BATCH_SIZE
 from onyx.configs.constants import CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT
 from onyx.configs.constants import OnyxCeleryPriority
 from onyx.configs.constants import OnyxCeleryQueues
@@ -16,6 +17,7 @@ from onyx.configs.constants import OnyxCeleryTask
 from onyx.configs.constants import OnyxRedisConstants
 from onyx.db.document_set import construct_document_id_select_by_docset
 from onyx.redis.redis_object_helper import RedisObjectHelper
+from onyx.utils.batching import batch_generator
 
 
 class RedisDocumentSet(RedisObjectHelper):
@@ -68,8 +70,9 @@ class RedisDocumentSet(RedisObjectHelper):
         num_tasks_sent = 0
 
         stmt = construct_document_id_select_by_docset(int(self._id), current_only=False)
-        for doc_id in db_session.scalars(stmt).yield_per(DB_YIELD_PER_DEFAULT):
-            doc_id = cast(str, doc_id)
+        num_docs = 0
+        doc_ids = db_session.scalars(stmt).yield_per(DB_YIELD_PER_DEFAULT)
+        for doc_id_batch in batch_generator(doc_ids, VESPA_SYNC_BATCH_SIZE):
             current_time = time.monotonic()
             if current_time - last_lock_time >= (
                 CELERY_VESPA_SYNC_BEAT_LOCK_TIMEOUT / 4
@@ -87,16 +90,19 @@ class RedisDocumentSet(RedisObjectHelper):
             redis_client.sadd(self.taskset_key, custom_task_id)
 
             celery_app.send_task(
-                OnyxCeleryTask.VESPA_METADATA_SYNC_TASK,
-                kwargs=dict(document_id=doc_id, tenant_id=tenant_id),
+                OnyxCeleryTask.VESPA_METADATA_SYNC_BATCH_TASK,
+                kwargs=dict(
+                    document_ids=cast(list[str], doc_id_batch), tenant_id=tenant_id
+                ),
                 queue=OnyxCeleryQueues.VESPA_METADATA_SYNC,
                 task_id=custom_task_id,
                 priority=OnyxCeleryPriority.MEDIUM,
             )
 
             num_tasks_sent += 1
+            num_docs += len(doc_id_batch)
 
-        return num_tasks_sent, num_tasks_sent
+        return num_tasks_sent, num_docs
 
     def reset(self) -> None:
         self.redis.srem(OnyxRedisConstants.ACTIVE_FENCES, self.fence_key)
@@ -9,6 +9,7 @@ from onyx.auth.users import current_admin_user
 from onyx.auth.users import current_user
 from onyx.auth.users import is_user_admin
 from onyx.configs.constants import KV_REINDEX_KEY
+from onyx.configs.constants import KV_SETTINGS_KEY
 from onyx.configs.constants import NotificationType
 from onyx.db.engine.sql_engine import get_session
 from onyx.db.models import User
@@ -45,15 +46,14 @@ def fetch_settings(
 ) -> UserSettings:
     """Settings and notifications are stuffed into this single endpoint to reduce number of
     Postgres calls"""
+    # fetched together, load_settings and get_settings_notifications then get them from
+    # the in memory cache of the kv store
+    kv_values = get_kv_store().load_many([KV_SETTINGS_KEY, KV_REINDEX_KEY])
+    needs_reindexing = cast(bool, kv_values.get(KV_REINDEX_KEY, False))
+
     general_settings = load_settings()
     settings_notifications = get_settings_notifications(user, db_session)
 
-    try:
-        kv_store = get_kv_store()
-        needs_reindexing = cast(bool, kv_store.load(KV_REINDEX_KEY))
-    except KvKeyNotFoundError:
-        needs_reindexing = False
-
     return UserSettings(
         **general_settings.model_dump(),
         notifications=settings_notifications,
@@ -0,0 +1,224 @@
+"""
+Benchmark for the scheduling pass of check_for_indexing against a local Postgres.
+Seeds cc pairs (each with its own connector) and a history of index attempts, then
+compares:
+- checking every cc pair one by one, like check_for_indexing used to
+  (is_in_repeated_error_state, the active attempt check and should_index per cc pair)
+- plan_indexing, which does the same with a few set based queries
+
+Everything is seeded in a single transaction that's rolled back at the end, so it's
+safe to run against a dev database. Requires the usual POSTGRES_* env vars and an
+up to date schema (alembic upgrade head).
+
+Usage:
+
+python -m scripts.benchmarks.check_for_indexing_benchmark --cc-pairs 10000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy import insert
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from onyx.background.celery.tasks.docprocessing.utils import (
+    NUM_REPEAT_ERRORS_BEFORE_REPEATED_ERROR_STATE,
+)
+from onyx.background.celery.tasks.docprocessing.utils import plan_indexing
+from onyx.configs.constants import DocumentSource
+from onyx.db.connector_credential_pair import get_connector_credential_pair_from_id
+from onyx.db.engine.sql_engine import get_session_with_current_tenant
+from onyx.db.engine.sql_engine import SqlEngine
+from onyx.db.engine.time_utils import get_db_current_time
+from onyx.db.enums import AccessType
+from onyx.db.enums import ConnectorCredentialPairStatus
+from onyx.db.enums import IndexingStatus
+from onyx.db.index_attempt import get_last_attempt_for_cc_pair
+from onyx.db.index_attempt import get_recent_attempts_for_cc_pair
+from onyx.db.models import Connector
+from onyx.db.models import ConnectorCredentialPair
+from onyx.db.models import Credential
+from onyx.db.models import IndexAttempt
+from onyx.db.search_settings import get_active_search_settings_list
+
+_BENCHMARK_NAME_PREFIX = "check_for_indexing_benchmark"
+
+
+def _seed(
+    db_session: Session,
+    num_cc_pairs: int,
+    attempts_per_cc_pair: int,
+    search_settings_id: int,
+    rng: random.Random,
+) -> list[int]:
+    credential = Credential(
+        credential_json={}, source=DocumentSource.WEB, name=_BENCHMARK_NAME_PREFIX
+    )
+    db_session.add(credential)
+    db_session.flush()
+
+    connector_ids = db_session.scalars(
+        insert(Connector).returning(Connector.id),
+        [
+            {
+                "name": f"{_BENCHMARK_NAME_PREFIX}_{i}",
+                "source": DocumentSource.WEB,
+                "input_type": None,
+                "connector_specific_config": {},
+                "refresh_freq": rng.choice([None, 60 * 60, 24 * 60 * 60]),
+            }
+            for i in range(num_cc_pairs)
+        ],
+    ).all()
+    cc_pair_ids = db_session.scalars(
+        insert(ConnectorCredentialPair).returning(ConnectorCredentialPair.id),
+        [
+            {
+                "name": f"{_BENCHMARK_NAME_PREFIX}_{connector_id}",
+                "connector_id": connector_id,
+                "credential_id": credential.id,
+                "status": ConnectorCredentialPairStatus.ACTIVE,
+                "access_type": AccessType.PUBLIC,
+                "in_repeated_error_state": False,
+                "is_user_file": False,
+            }
+            for connector_id in connector_ids
+        ],
+    ).all()
+
+    now = datetime.now(timezone.utc)
+    attempts: list[dict[str, Any]] = []
+    for cc_pair_id in cc_pair_ids:
+        # a tenth of the cc pairs keep failing, a few have an attempt in flight
+        failure_rate = 0.9 if rng.random() < 0.1 else 0.05
+        for i in range(attempts_per_cc_pair):
+            status = (
+                IndexingStatus.FAILED
+                if rng.random() < failure_rate
+                else IndexingStatus.SUCCESS
+            )
+            if i == 0 and rng.random() < 0.02:
+                status = IndexingStatus.IN_PROGRESS
+            time_updated = now - timedelta(hours=i * 6 + rng.random() * 6)
+            attempts.append(
+                {
+                    "connector_credential_pair_id": cc_pair_id,
+                    "search_settings_id": search_settings_id,
+                    "from_beginning": False,
+                    "status": status,
+                    "time_created": time_updated,
+                    "time_updated": time_updated,
+                }
+            )
+    db_session.execute(insert(IndexAttempt), attempts)
+    db_session.flush()
+    return list(cc_pair_ids)
+
+
+def _plan_per_cc_pair(
+    cc_pair_ids: list[int], search_settings_id: int, db_session: Session
+) -> None:
+    """The queries check_for_indexing used to issue for every cc pair."""
+    for cc_pair_id in cc_pair_ids:
+        for _ in range(2):
+            # is_in_repeated_error_state, on its own and as part of should_index
+            cc_pair = get_connector_credential_pair_from_id(
+                db_session=db_session, cc_pair_id=cc_pair_id
+            )
+            assert cc_pair is not None
+            get_recent_attempts_for_cc_pair(
+                cc_pair_id=cc_pair_id,
+                search_settings_id=search_settings_id,
+                limit=(
+                    NUM_REPEAT_ERRORS_BEFORE_REPEATED_ERROR_STATE
+                    if cc_pair.connector.refresh_freq is not None
+                    else 1
+                ),
+                db_session=db_session,
+            )
+
+        db_session.execute(
+            select(IndexAttempt).where(
+                IndexAttempt.connector_credential_pair_id == cc_pair_id,
+                IndexAttempt.search_settings_id == search_settings_id,
+                IndexAttempt.status.in_(
+                    [IndexingStatus.NOT_STARTED, IndexingStatus.IN_PROGRESS]
+                ),
+            )
+        ).scalars().all()
+        get_last_attempt_for_cc_pair(
+            cc_pair_id=cc_pair_id,
+            search_settings_id=search_settings_id,
+            db_session=db_session,
+        )
+        get_db_current_time(db_session)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark the scheduling pass of check_for_indexing"
+    )
+    parser.add_argument("--cc-pairs", type=int, default=10000)
+    parser.add_argument("--attempts-per-cc-pair", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    SqlEngine.init_engine(pool_size=2, max_overflow=0)
+    num_queries = 0
+
+    def _count_query(*_: Any) -> None:
+        nonlocal num_queries
+        num_queries += 1
+
+    event.listen(SqlEngine.get_engine(), "before_cursor_execute", _count_query)
+
+    with get_session_with_current_tenant() as db_session:
+        search_settings_list = get_active_search_settings_list(db_session)
+        current_search_settings = next(
+            search_settings
+            for search_settings in search_settings_list
+            if search_settings.status.is_current()
+        )
+
+        start = time.monotonic()
+        cc_pair_ids = _seed(
+            db_session,
+            args.cc_pairs,
+            args.attempts_per_cc_pair,
+            current_search_settings.id,
+            random.Random(args.seed),
+        )
+        print(
+            f"Seeded {len(cc_pair_ids)} cc pairs with {args.attempts_per_cc_pair} "
+            f"attempts each in {time.monotonic() - start:.1f}s"
+        )
+
+        try:
+            num_queries = 0
+            start = time.monotonic()
+            _plan_per_cc_pair(cc_pair_ids, current_search_settings.id, db_session)
+            print(
+                f"per cc pair: {time.monotonic() - start:.2f}s, {num_queries} queries"
+            )
+
+            num_queries = 0
+            start = time.monotonic()
+            plan = plan_indexing(cc_pair_ids, search_settings_list, db_session)
+            print(
+                f"plan_indexing: {time.monotonic() - start:.2f}s, {num_queries} queries, "
+                f"{len(plan.to_index)} to index, "
+                f"{len(plan.repeated_error_cc_pair_ids)} in repeated error state"
+            )
+        finally:
+            db_session.rollback()
+
+
+if __name__ == "__main__":
+    main()
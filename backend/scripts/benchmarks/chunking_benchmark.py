@@ -0,0 +1,98 @@
+"""
+Chunks a synthetic corpus (10k documents by default) with the Chunker and reports the
+throughput, with the memoized / batched token counting of the tokenizer and without
+it (every count being a separate encode call, the previous behavior).
+
+Usage:
+
+python -m scripts.benchmarks.chunking_benchmark --num-docs 10000
+"""
+
+import argparse
+import random
+import time
+
+from onyx.connectors.models import IndexingDocument
+from onyx.indexing.chunker import Chunker
+from onyx.indexing.indexing_pipeline import process_image_sections
+from onyx.natural_language_processing.utils import BaseTokenizer
+from onyx.natural_language_processing.utils import get_tokenizer
+from scripts.benchmarks.synthetic_chunks import make_document
+
+
+class _UncachedTokenizer(BaseTokenizer):
+    def __init__(self, tokenizer: BaseTokenizer) -> None:
+        self.tokenizer = tokenizer
+
+    def encode(self, string: str) -> list[int]:
+        return self.tokenizer.encode(string)
+
+    def tokenize(self, string: str) -> list[str]:
+        return self.tokenizer.tokenize(string)
+
+    def decode(self, tokens: list[int]) -> str:
+        return self.tokenizer.decode(tokens)
+
+    def count_tokens(self, string: str) -> int:
+        return len(self.encode(string))
+
+    def count_tokens_batch(self, strings: list[str]) -> list[int]:
+        return [self.count_tokens(string) for string in strings]
+
+
+def _run(
+    name: str,
+    tokenizer: BaseTokenizer,
+    documents: list[IndexingDocument],
+    batch_size: int,
+    enable_multipass: bool,
+) -> None:
+    # a new chunker per batch, same as the indexing pipeline
+    start = time.monotonic()
+    num_chunks = 0
+    for batch_start in range(0, len(documents), batch_size):
+        chunker = Chunker(tokenizer=tokenizer, enable_multipass=enable_multipass)
+        num_chunks += len(
+            chunker.chunk(documents[batch_start : batch_start + batch_size])
+        )
+    elapsed = time.monotonic() - start
+
+    print(
+        f"{name}: {elapsed:.2f}s for {len(documents)} docs / {num_chunks} chunks "
+        f"({len(documents) / elapsed:.0f} docs/s)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Chunker")
+    parser.add_argument("--num-docs", type=int, default=10_000)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument(
+        "--model-name",
+        type=str,
+        default=None,
+        help="Embedding model whose tokenizer is used, defaults to the default model",
+    )
+    parser.add_argument("--multipass", action="store_true")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    documents = process_image_sections(
+        [make_document(ind, rng.randint(1, 20), rng) for ind in range(args.num_docs)]
+    )
+    tokenizer = get_tokenizer(model_name=args.model_name, provider_type=None)
+
+    _run(
+        "encode per count",
+        _UncachedTokenizer(tokenizer),
+        documents,
+        args.batch_size,
+        args.multipass,
+    )
+    _run(
+        "memoized / batched counts",
+        tokenizer,
+        documents,
+        args.batch_size,
+        args.multipass,
+    )
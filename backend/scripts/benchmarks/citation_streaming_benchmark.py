@@ -0,0 +1,114 @@
+"""
+Replays LLM token streams through the CitationProcessor and reports the time spent
+per token. With the incremental code block / citation tracking the per token cost
+should stay flat as the answer grows.
+
+Recorded streams can be passed in as a JSON file containing a list of streams, each
+stream being a list of tokens (as sent by the LLM). Without a file, code heavy
+synthetic answers of increasing length are generated.
+
+Usage:
+
+python -m scripts.benchmarks.citation_streaming_benchmark
+python -m scripts.benchmarks.citation_streaming_benchmark --streams-file streams.json
+"""
+
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+
+from onyx.chat.models import LlmDoc
+from onyx.chat.stream_processing.citation_processing import CitationProcessor
+from onyx.chat.stream_processing.utils import DocumentIdOrderMapping
+from onyx.configs.constants import DocumentSource
+from scripts.benchmarks.synthetic_chunks import random_text
+
+_NUM_DOCS = 20
+
+_DOCS = [
+    LlmDoc(
+        document_id=f"doc_{ind}",
+        content="content",
+        blurb="blurb",
+        semantic_identifier=f"Doc {ind}",
+        source_type=DocumentSource.WEB,
+        metadata={},
+        updated_at=datetime.now(),
+        link=f"https://{ind}.com",
+        source_links=None,
+        match_highlights=[],
+    )
+    for ind in range(_NUM_DOCS)
+]
+
+
+def _synthetic_stream(num_tokens: int, rng: random.Random) -> list[str]:
+    """Answer alternating between prose with citations and fenced code blocks,
+    split into tokens of a few characters like an LLM would send them"""
+    text = ""
+    while len(text) < num_tokens * 4:
+        text += random_text(rng.randint(20, 80), rng)
+        text += f" [{rng.randint(1, _NUM_DOCS)}]. "
+        if rng.random() < 0.5:
+            text += "\n```\n" + "x = arr[0] + `y`\n" * rng.randint(2, 10) + "```\n"
+
+    tokens: list[str] = []
+    pos = 0
+    while pos < len(text):
+        token_len = rng.randint(1, 6)
+        tokens.append(text[pos : pos + token_len])
+        pos += token_len
+    return tokens
+
+
+def _replay(tokens: list[str]) -> float:
+    doc_mapping = DocumentIdOrderMapping(
+        order_mapping={doc.document_id: ind + 1 for ind, doc in enumerate(_DOCS)}
+    )
+    processor = CitationProcessor(
+        context_docs=_DOCS,
+        final_doc_id_to_rank_map=doc_mapping,
+        display_doc_id_to_rank_map=doc_mapping,
+        stop_stream=None,
+    )
+
+    start = time.monotonic()
+    for token in tokens:
+        for _ in processor.process_token(token):
+            pass
+    for _ in processor.process_token(None):
+        pass
+    return time.monotonic() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the CitationProcessor on streamed answers"
+    )
+    parser.add_argument(
+        "--streams-file",
+        type=str,
+        default=None,
+        help="JSON file with a list of recorded token streams",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.streams_file:
+        with open(args.streams_file) as f:
+            streams: list[list[str]] = json.load(f)
+    else:
+        rng = random.Random(0)
+        streams = [
+            _synthetic_stream(num_tokens, rng)
+            for num_tokens in (500, 1000, 2000, 4000, 8000, 16000)
+        ]
+
+    for tokens in streams:
+        best = min(_replay(tokens) for _ in range(args.repeat))
+        print(
+            f"{len(tokens)} tokens ({sum(len(token) for token in tokens)} chars): "
+            f"{best * 1000:.2f}ms total, {best / len(tokens) * 1e6:.2f}us / token"
+        )
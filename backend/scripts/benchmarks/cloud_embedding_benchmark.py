@@ -0,0 +1,155 @@
+"""
+Sends many small concurrent embedding requests through the model server embedding code
+to a local stub provider (an OpenAI style /embeddings endpoint, used through the LiteLLM
+proxy provider) and reports the throughput and the number of provider calls with:
+- a new client per request (the previous behavior)
+- the shared, pooled client
+- the shared client + request coalescing
+
+The stub adds a fixed latency per call and a small latency per text, similar to hosted
+providers. It serves plain HTTP so the saved TLS handshakes are not part of the numbers.
+
+Usage:
+
+python -m scripts.benchmarks.cloud_embedding_benchmark --num-requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from typing import Any
+
+import uvicorn
+from fastapi import FastAPI
+
+from model_server import encoders
+from model_server.embedding_coalescer import EmbeddingRequestCoalescer
+from model_server.encoders import CloudEmbedding
+from model_server.encoders import close_cloud_embedding_clients
+from model_server.encoders import embed_text
+from shared_configs.enums import EmbeddingProvider
+from shared_configs.enums import EmbedTextType
+
+_EMBEDDING_DIM = 768
+
+
+class _StubProvider:
+    def __init__(self, call_latency: float, text_latency: float) -> None:
+        self.call_latency = call_latency
+        self.text_latency = text_latency
+        self.num_calls = 0
+
+        self.app = FastAPI()
+        self.app.post("/embeddings")(self.embeddings)
+
+    async def embeddings(self, body: dict[str, Any]) -> dict[str, Any]:
+        self.num_calls += 1
+        texts = body["input"]
+        await asyncio.sleep(self.call_latency + self.text_latency * len(texts))
+        return {
+            "data": [
+                {"embedding": [float(len(text))] * _EMBEDDING_DIM} for text in texts
+            ]
+        }
+
+
+def _start_stub_server(stub: _StubProvider) -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(
+        uvicorn.Config(stub.app, host="127.0.0.1", port=port, log_level="warning")
+    )
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}/embeddings"
+
+
+async def _embed_with_new_client(texts: list[str], api_url: str) -> None:
+    async with CloudEmbedding(
+        api_key="fake-key", provider=EmbeddingProvider.LITELLM, api_url=api_url
+    ) as cloud_model:
+        await cloud_model.embed(
+            texts=texts, text_type=EmbedTextType.PASSAGE, model_name="stub-model"
+        )
+
+
+async def _embed_with_shared_client(texts: list[str], api_url: str) -> None:
+    await embed_text(
+        texts=texts,
+        text_type=EmbedTextType.PASSAGE,
+        model_name="stub-model",
+        deployment_name=None,
+        max_context_length=512,
+        normalize_embeddings=False,
+        api_key="fake-key",
+        provider_type=EmbeddingProvider.LITELLM,
+        prefix=None,
+        api_url=api_url,
+        api_version=None,
+        reduced_dimension=None,
+    )
+
+
+async def _run(
+    name: str,
+    stub: _StubProvider,
+    api_url: str,
+    new_client_per_request: bool,
+    num_requests: int,
+    texts_per_request: int,
+    concurrency: int,
+) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _request(ind: int) -> None:
+        texts = [f"text {ind} {text_ind}" for text_ind in range(texts_per_request)]
+        async with semaphore:
+            if new_client_per_request:
+                await _embed_with_new_client(texts, api_url)
+            else:
+                await _embed_with_shared_client(texts, api_url)
+
+    stub.num_calls = 0
+    start = time.monotonic()
+    await asyncio.gather(*(_request(ind) for ind in range(num_requests)))
+    elapsed = time.monotonic() - start
+    await close_cloud_embedding_clients()
+
+    print(
+        f"{name}: {elapsed:.2f}s for {num_requests} requests "
+        f"({num_requests / elapsed:.0f} requests/s, {stub.num_calls} provider calls)"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark cloud embedding requests")
+    parser.add_argument("--num-requests", type=int, default=2000)
+    parser.add_argument("--texts-per-request", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--call-latency-ms", type=float, default=50)
+    parser.add_argument("--text-latency-ms", type=float, default=0.5)
+    parser.add_argument("--coalesce-wait-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    stub = _StubProvider(args.call_latency_ms / 1000, args.text_latency_ms / 1000)
+    api_url = _start_stub_server(stub)
+    run_args = (args.num_requests, args.texts_per_request, args.concurrency)
+
+    await _run("client per request", stub, api_url, True, *run_args)
+
+    encoders._CLOUD_EMBEDDING_COALESCER = None
+    await _run("shared client", stub, api_url, False, *run_args)
+
+    encoders._CLOUD_EMBEDDING_COALESCER = EmbeddingRequestCoalescer(
+        max_wait=args.coalesce_wait_ms / 1000
+    )
+    await _run("shared client + coalescing", stub, api_url, False, *run_args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Benchmark for the serialization of the document batches handed from the docfetching
+to the docprocessing workers. Compares the size and the (de)serialization time of:
+- the previous format, one indented JSON array per batch
+- the current format, a zstd compressed stream of msgpack encoded documents
+
+Usage:
+
+python -m scripts.benchmarks.document_batch_serialization_benchmark --num-docs 1000
+"""
+
+import argparse
+import gc
+import json
+import random
+import time
+import tracemalloc
+from collections.abc import Callable
+from io import BytesIO
+from typing import Any
+
+from onyx.connectors.models import Document
+from onyx.file_store.document_batch_storage import FileStoreDocumentBatchStorage
+from scripts.benchmarks.synthetic_chunks import make_document
+
+
+def _serialize_json(documents: list[Document]) -> bytes:
+    """The previous implementation"""
+    return json.dumps(
+        [doc.model_dump(mode="json") for doc in documents], indent=2
+    ).encode("utf-8")
+
+
+def _deserialize_json(data: bytes) -> list[Document]:
+    """The previous implementation"""
+    doc_dicts = json.loads(data.decode("utf-8"))
+    return [Document.model_validate(doc_dict) for doc_dict in doc_dicts]
+
+
+def _time(name: str, fn: Callable[[], Any], num_docs: int, repeats: int = 3) -> Any:
+    # best of a few runs, the timings are noisy because of the garbage collector
+    elapsed = float("inf")
+    result: Any = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.monotonic()
+        result = fn()
+        elapsed = min(elapsed, time.monotonic() - start)
+
+    # measured in a separate run since tracing allocations slows everything down
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{name}: {elapsed * 1000:.1f}ms ({elapsed / num_docs * 1e6:.1f}us / doc), "
+        f"peak memory {peak / 1024 / 1024:.1f}MiB"
+    )
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark document batch serialization"
+    )
+    parser.add_argument("--num-docs", type=int, default=1000)
+    parser.add_argument("--sections-per-doc", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    documents = [
+        make_document(doc_ind, args.sections_per_doc, rng)
+        for doc_ind in range(args.num_docs)
+    ]
+    # the storage is only used for its (de)serialization methods
+    storage = FileStoreDocumentBatchStorage(0, 0, None)  # type: ignore
+
+    json_data = _time(
+        "serialize, json", lambda: _serialize_json(documents), args.num_docs
+    )
+
+    def _serialize_msgpack() -> bytes:
+        out = BytesIO()
+        storage._serialize_documents(documents, out)
+        return out.getvalue()
+
+    msgpack_data = _time("serialize, msgpack + zstd", _serialize_msgpack, args.num_docs)
+
+    json_documents = _time(
+        "deserialize, json", lambda: _deserialize_json(json_data), args.num_docs
+    )
+    msgpack_documents = _time(
+        "deserialize, msgpack + zstd",
+        lambda: list(storage._deserialize_documents(BytesIO(msgpack_data))),
+        args.num_docs,
+    )
+    assert json_documents == msgpack_documents == documents
+
+    print(f"json size: {len(json_data) / 1024:.1f}KiB")
+    print(
+        f"msgpack + zstd size: {len(msgpack_data) / 1024:.1f}KiB "
+        f"({len(msgpack_data) / len(json_data):.1%} of json)"
+    )
@@ -0,0 +1,151 @@
+"""
+Load test for local models on a running model server. Simulates query time traffic:
+many concurrent clients each sending small embedding requests (one to a few texts of
+varied length) and optionally rerank requests, and reports the throughput and latency
+percentiles.
+
+Compare a model server started normally with one started with the batching scheduler
+enabled, e.g. LOCAL_MODEL_BATCH_WAIT_MS=5 LOCAL_MODEL_INFERENCE_THREADS=2.
+
+Usage:
+
+python -m scripts.benchmarks.model_server_load_test --concurrency 32 --duration 60
+python -m scripts.benchmarks.model_server_load_test --rerank-model mixedbread-ai/mxbai-rerank-xsmall-v1
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import httpx
+
+from onyx.configs.model_configs import DOCUMENT_ENCODER_MODEL
+from shared_configs.configs import MODEL_SERVER_HOST
+from shared_configs.configs import MODEL_SERVER_PORT
+from shared_configs.enums import EmbedTextType
+from shared_configs.model_server_models import EmbedRequest
+from shared_configs.model_server_models import RerankRequest
+
+_WORDS = (
+    "how do I reset my password for the vpn and what is the policy on travel "
+    "expenses who owns the billing service deployment pipeline incident report"
+).split()
+
+
+def _random_text(rng: random.Random, min_words: int, max_words: int) -> str:
+    return " ".join(rng.choices(_WORDS, k=rng.randint(min_words, max_words)))
+
+
+def _percentile(latencies: list[float], percentile: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+
+async def _rerank(
+    client: httpx.AsyncClient, args: argparse.Namespace, rng: random.Random
+) -> float:
+    request = RerankRequest(
+        query=_random_text(rng, 3, 15),
+        documents=[_random_text(rng, 20, 200) for _ in range(args.rerank_docs)],
+        model_name=args.rerank_model,
+    )
+    start = time.monotonic()
+    response = await client.post(
+        "/encoder/cross-encoder-scores", json=request.model_dump()
+    )
+    response.raise_for_status()
+    return time.monotonic() - start
+
+
+async def _embed(
+    client: httpx.AsyncClient, args: argparse.Namespace, rng: random.Random
+) -> float:
+    request = EmbedRequest(
+        texts=[
+            _random_text(rng, 3, args.max_words)
+            for _ in range(rng.randint(1, args.max_texts))
+        ],
+        model_name=args.model_name,
+        max_context_length=512,
+        normalize_embeddings=True,
+        text_type=EmbedTextType.QUERY,
+    )
+    start = time.monotonic()
+    response = await client.post("/encoder/bi-encoder-embed", json=request.model_dump())
+    response.raise_for_status()
+    return time.monotonic() - start
+
+
+async def _client(
+    client: httpx.AsyncClient,
+    args: argparse.Namespace,
+    rng: random.Random,
+    deadline: float,
+    embed_latencies: list[float],
+    rerank_latencies: list[float],
+) -> None:
+    while time.monotonic() < deadline:
+        if args.rerank_model and rng.random() < args.rerank_fraction:
+            rerank_latencies.append(await _rerank(client, args, rng))
+        else:
+            embed_latencies.append(await _embed(client, args, rng))
+
+
+def _report(name: str, latencies: list[float], elapsed: float) -> None:
+    if not latencies:
+        return
+    print(
+        f"{name}: {len(latencies)} requests, {len(latencies) / elapsed:.1f} requests/s, "
+        f"p50={_percentile(latencies, 0.5) * 1000:.0f}ms "
+        f"p95={_percentile(latencies, 0.95) * 1000:.0f}ms "
+        f"p99={_percentile(latencies, 0.99) * 1000:.0f}ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Load test the model server")
+    parser.add_argument(
+        "--url", type=str, default=f"http://{MODEL_SERVER_HOST}:{MODEL_SERVER_PORT}"
+    )
+    parser.add_argument("--model-name", type=str, default=DOCUMENT_ENCODER_MODEL)
+    parser.add_argument("--rerank-model", type=str, default=None)
+    parser.add_argument("--rerank-fraction", type=float, default=0.1)
+    parser.add_argument("--rerank-docs", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--max-texts", type=int, default=3)
+    parser.add_argument("--max-words", type=int, default=60)
+    args = parser.parse_args()
+
+    embed_latencies: list[float] = []
+    rerank_latencies: list[float] = []
+    async with httpx.AsyncClient(base_url=args.url, timeout=600) as client:
+        # warm up, loads the models
+        await _embed(client, args, random.Random(-1))
+        if args.rerank_model:
+            await _rerank(client, args, random.Random(-1))
+
+        start = time.monotonic()
+        deadline = start + args.duration
+        await asyncio.gather(
+            *(
+                _client(
+                    client,
+                    args,
+                    random.Random(ind),
+                    deadline,
+                    embed_latencies,
+                    rerank_latencies,
+                )
+                for ind in range(args.concurrency)
+            )
+        )
+        elapsed = time.monotonic() - start
+
+    _report("embed", embed_latencies, elapsed)
+    _report("rerank", rerank_latencies, elapsed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,193 @@
+"""
+Benchmark for the document index round trips of SearchPipeline._get_sections, with a fake
+document index that adds a fixed latency to each call. Compares:
+- fetching the chunks referenced by the retrieved large chunks, then fetching the chunks
+  above and below the retrieved chunks in another call
+- fetching both in a single call (SEARCH_PREFETCH_SURROUNDING_CHUNKS)
+
+Usage:
+
+python -m scripts.benchmarks.section_expansion_benchmark --latency-ms 30
+"""
+
+import argparse
+import random
+import time
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from onyx.configs.constants import DocumentSource
+from onyx.context.search.enums import LLMEvaluationType
+from onyx.context.search.enums import SearchType
+from onyx.context.search.models import IndexFilters
+from onyx.context.search.models import InferenceChunkUncleaned
+from onyx.context.search.models import InferenceSection
+from onyx.context.search.models import SearchQuery
+from onyx.context.search.models import SearchRequest
+from onyx.context.search.pipeline import SearchPipeline
+from onyx.document_index.interfaces import VespaChunkRequest
+
+_CHUNKS_PER_DOC = 40
+_CHUNKS_PER_LARGE_CHUNK = 4
+
+
+def _chunk(
+    document_id: str, chunk_id: int, large_chunk_reference_ids: list[int] | None = None
+) -> InferenceChunkUncleaned:
+    return InferenceChunkUncleaned(
+        chunk_id=chunk_id,
+        document_id=document_id,
+        semantic_identifier=document_id,
+        title=None,
+        blurb="",
+        content=f"{document_id} chunk {chunk_id}",
+        source_links={0: "fake_link"},
+        section_continuation=chunk_id > 0,
+        source_type=DocumentSource.WEB,
+        boost=0,
+        recency_bias=1.0,
+        score=None,
+        hidden=False,
+        metadata={},
+        match_highlights=[],
+        updated_at=None,
+        image_file_id=None,
+        doc_summary="",
+        chunk_context="",
+        metadata_suffix=None,
+        large_chunk_reference_ids=large_chunk_reference_ids or [],
+    )
+
+
+class FakeDocumentIndex:
+    """Returns a mix of normal and large chunks, each call takes latency seconds."""
+
+    def __init__(self, num_hits: int, latency: float, seed: int = 0) -> None:
+        self.latency = latency
+        self.num_calls = 0
+
+        rng = random.Random(seed)
+        self.hits: list[InferenceChunkUncleaned] = []
+        for hit_ind in range(num_hits):
+            document_id = f"doc_{hit_ind % (num_hits // 3 + 1)}"
+            if rng.random() < 0.5:
+                first = rng.randrange(0, _CHUNKS_PER_DOC, _CHUNKS_PER_LARGE_CHUNK)
+                hit = _chunk(
+                    document_id,
+                    10_000 + first,
+                    list(range(first, first + _CHUNKS_PER_LARGE_CHUNK)),
+                )
+            else:
+                hit = _chunk(document_id, rng.randrange(_CHUNKS_PER_DOC))
+            hit.score = 1 - hit_ind / num_hits
+            self.hits.append(hit)
+
+    def hybrid_retrieval(
+        self, *args: Any, **kwargs: Any
+    ) -> list[InferenceChunkUncleaned]:
+        self.num_calls += 1
+        time.sleep(self.latency)
+        return [hit.model_copy() for hit in self.hits]
+
+    def id_based_retrieval(
+        self,
+        chunk_requests: list[VespaChunkRequest],
+        filters: IndexFilters,
+        batch_retrieval: bool = False,
+    ) -> list[InferenceChunkUncleaned]:
+        self.num_calls += 1
+        time.sleep(self.latency)
+        return [
+            _chunk(request.document_id, chunk_id)
+            for request in chunk_requests
+            for chunk_id in range(
+                request.min_chunk_ind or 0,
+                min((request.max_chunk_ind or 0) + 1, _CHUNKS_PER_DOC),
+            )
+        ]
+
+
+def get_sections(
+    document_index: FakeDocumentIndex,
+    prefetch: bool,
+    chunks_above: int = 1,
+    chunks_below: int = 1,
+) -> list[InferenceSection]:
+    search_query = SearchQuery(
+        query="query",
+        processed_keywords=["query"],
+        search_type=SearchType.SEMANTIC,
+        evaluation_type=LLMEvaluationType.SKIP,
+        filters=IndexFilters(access_control_list=None),
+        chunks_above=chunks_above,
+        chunks_below=chunks_below,
+        rerank_settings=None,
+        hybrid_alpha=0.5,
+        recency_bias_multiplier=1.0,
+        max_llm_filter_sections=0,
+        precomputed_query_embedding=[0.0],
+        original_query=None,
+    )
+    with (
+        patch(
+            "onyx.context.search.pipeline.SEARCH_PREFETCH_SURROUNDING_CHUNKS",
+            prefetch,
+        ),
+        patch("onyx.context.search.pipeline.get_current_search_settings"),
+        patch(
+            "onyx.context.search.pipeline.get_default_document_index",
+            return_value=document_index,
+        ),
+        patch(
+            "onyx.context.search.pipeline.retrieval_preprocessing",
+            return_value=search_query,
+        ),
+        patch(
+            "onyx.context.search.retrieval.search_runner.get_multilingual_expansion",
+            return_value=[],
+        ),
+        patch(
+            "onyx.context.search.retrieval.search_runner.get_federated_retrieval_functions",
+            return_value=[],
+        ),
+    ):
+        pipeline = SearchPipeline(
+            search_request=SearchRequest(query="query"),
+            user=None,
+            llm=MagicMock(),
+            fast_llm=MagicMock(),
+            skip_query_analysis=True,
+            db_session=MagicMock(),
+        )
+        return pipeline.retrieved_sections
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark section expansion")
+    parser.add_argument("--num-hits", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=30)
+    parser.add_argument("--num-queries", type=int, default=20)
+    args = parser.parse_args()
+
+    results: dict[bool, list[list[str]]] = {}
+    for prefetch in (False, True):
+        num_calls = 0
+        start = time.monotonic()
+        for query_ind in range(args.num_queries):
+            document_index = FakeDocumentIndex(
+                args.num_hits, args.latency_ms / 1000, seed=query_ind
+            )
+            sections = get_sections(document_index, prefetch)
+            num_calls += document_index.num_calls
+            results.setdefault(prefetch, []).append(
+                [section.combined_content for section in sections]
+            )
+        elapsed = time.monotonic() - start
+        print(
+            f"prefetch={prefetch}: "
+            f"{elapsed / args.num_queries * 1000:.1f}ms / query, "
+            f"{num_calls / args.num_queries:.2f} document index calls / query"
+        )
+
+    assert results[False] == results[True]
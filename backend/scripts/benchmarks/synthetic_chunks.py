@@ -0,0 +1,102 @@
+"""Helpers to build realistic looking indexing payloads for the benchmarks in
+this directory without needing a connector, an embedding model or Postgres."""
+
+import random
+from datetime import datetime
+from datetime import timezone
+
+from onyx.access.models import DocumentAccess
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import TextSection
+from onyx.indexing.models import ChunkEmbedding
+from onyx.indexing.models import DocMetadataAwareIndexChunk
+
+_WORDS = (
+    "the quarterly roadmap covers onboarding latency search relevance connector "
+    "permissions indexing pipeline retention policy incident review customer "
+    "escalation dashboard migration rollout budget headcount vendor contract "
+    "deadline owner status blocked shipped"
+).split()
+
+
+def random_text(num_words: int, rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(num_words))
+
+
+def make_document(doc_ind: int, num_sections: int, rng: random.Random) -> Document:
+    return Document(
+        id=f"https://wiki.example.com/pages/{doc_ind}",
+        source=DocumentSource.CONFLUENCE,
+        semantic_identifier=f"Team page {doc_ind}: {random_text(6, rng)}",
+        title=f"Team page {doc_ind}",
+        metadata={
+            "labels": [random_text(1, rng) for _ in range(3)],
+            "space": random_text(2, rng),
+            "author": f"user_{doc_ind % 50}@example.com",
+        },
+        doc_updated_at=datetime.now(timezone.utc),
+        sections=[
+            TextSection(
+                text=random_text(rng.randint(50, 400), rng),
+                link=f"https://wiki.example.com/pages/{doc_ind}#section-{section_ind}",
+            )
+            for section_ind in range(num_sections)
+        ],
+    )
+
+
+def make_chunks(
+    num_docs: int,
+    chunks_per_doc: int,
+    embedding_dim: int = 768,
+    seed: int = 0,
+) -> list[DocMetadataAwareIndexChunk]:
+    rng = random.Random(seed)
+    access = DocumentAccess.build(
+        user_emails=[f"user_{i}@example.com" for i in range(5)],
+        user_groups=["engineering"],
+        external_user_emails=[],
+        external_user_group_ids=[],
+        is_public=False,
+    )
+
+    chunks: list[DocMetadataAwareIndexChunk] = []
+    for doc_ind in range(num_docs):
+        document = make_document(doc_ind, chunks_per_doc, rng)
+        for chunk_ind in range(chunks_per_doc):
+            content = random_text(rng.randint(200, 400), rng)
+            chunks.append(
+                DocMetadataAwareIndexChunk(
+                    chunk_id=chunk_ind,
+                    blurb=content[:200],
+                    content=content,
+                    source_links={0: document.sections[chunk_ind].link or ""},
+                    image_file_id=None,
+                    section_continuation=chunk_ind > 0,
+                    source_document=document,
+                    title_prefix=f"{document.title}\n\r\n",
+                    metadata_suffix_semantic="",
+                    metadata_suffix_keyword=" ".join(
+                        str(value) for value in document.metadata.values()
+                    ),
+                    contextual_rag_reserved_tokens=0,
+                    doc_summary="",
+                    chunk_context="",
+                    mini_chunk_texts=None,
+                    large_chunk_id=None,
+                    embeddings=ChunkEmbedding(
+                        full_embedding=[rng.random() for _ in range(embedding_dim)],
+                        mini_chunk_embeddings=[],
+                    ),
+                    title_embedding=[rng.random() for _ in range(embedding_dim)],
+                    tenant_id="public",
+                    access=access,
+                    document_sets={"Engineering"},
+                    user_file=None,
+                    user_folder=None,
+                    boost=0,
+                    aggregated_chunk_boost_factor=1.0,
+                )
+            )
+    return chunks
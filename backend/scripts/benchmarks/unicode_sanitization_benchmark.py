@@ -0,0 +1,90 @@
+"""
+Micro-benchmark for the invalid unicode sanitization done when building the Vespa
+fields of each chunk. Compares:
+- sanitizing every field of every chunk, including the document level ones
+- sanitizing the document level fields once per document and reusing them
+
+Usage:
+
+python -m scripts.benchmarks.unicode_sanitization_benchmark --num-docs 500
+"""
+
+import argparse
+import random
+import re
+import time
+from collections.abc import Callable
+
+from onyx.document_index.vespa.indexing_utils import _build_vespa_chunk_url_and_fields
+from onyx.document_index.vespa.indexing_utils import (
+    build_vespa_document_fields_by_id,
+)
+from onyx.document_index.vespa.shared_utils.utils import remove_invalid_unicode_chars
+from scripts.benchmarks.synthetic_chunks import make_chunks
+from scripts.benchmarks.synthetic_chunks import random_text
+
+
+def _remove_invalid_unicode_chars_recompiled(text: str) -> str:
+    """The previous implementation, which built the pattern on every call"""
+    _illegal_xml_chars_RE: re.Pattern = re.compile(
+        "[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufdd0-\ufdef\ufffe\uffff]"
+    )
+    return _illegal_xml_chars_RE.sub("", text)
+
+
+def _time(name: str, fn: Callable[[], object], num_items: int) -> None:
+    start = time.monotonic()
+    fn()
+    elapsed = time.monotonic() - start
+    print(f"{name}: {elapsed * 1000:.1f}ms ({elapsed / num_items * 1e6:.1f}us / item)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chunk field sanitization")
+    parser.add_argument("--num-docs", type=int, default=500)
+    parser.add_argument("--chunks-per-doc", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    texts = [random_text(rng.randint(5, 400), rng) for _ in range(50_000)]
+    # sprinkle some invalid characters in, like the ones seen in Confluence exports
+    texts = [
+        text + "\x0b\ufddb" if ind % 10 == 0 else text for ind, text in enumerate(texts)
+    ]
+
+    _time(
+        "sanitize strings, pattern compiled per call",
+        lambda: [_remove_invalid_unicode_chars_recompiled(text) for text in texts],
+        len(texts),
+    )
+    _time(
+        "sanitize strings, precompiled pattern",
+        lambda: [remove_invalid_unicode_chars(text) for text in texts],
+        len(texts),
+    )
+
+    chunks = make_chunks(args.num_docs, args.chunks_per_doc, embedding_dim=8)
+    _time(
+        "build chunk fields, document fields per chunk",
+        lambda: [
+            _build_vespa_chunk_url_and_fields(chunk, "danswer_chunk", False)
+            for chunk in chunks
+        ],
+        len(chunks),
+    )
+
+    def _build_with_shared_document_fields() -> None:
+        document_fields_by_id = build_vespa_document_fields_by_id(chunks)
+        for chunk in chunks:
+            _build_vespa_chunk_url_and_fields(
+                chunk,
+                "danswer_chunk",
+                False,
+                document_fields_by_id[chunk.source_document.id],
+            )
+
+    _time(
+        "build chunk fields, document fields per document",
+        _build_with_shared_document_fields,
+        len(chunks),
+    )
@@ -0,0 +1,109 @@
+"""
+Compares chunks/sec of the threaded Vespa feed (batch_index_vespa_chunks) and the
+async feed (async_batch_index_vespa_chunks) against a local mock of the Vespa
+document API that answers every request after a fixed delay.
+
+Usage:
+
+python -m scripts.benchmarks.vespa_feed_benchmark --num-docs 200 --latency-ms 20
+
+Pass --status 507 to check that the async feed fails fast when Vespa is full.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import time
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi import Response
+
+_MOCK_HOST = "127.0.0.1"
+
+
+def _get_free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((_MOCK_HOST, 0))
+        return sock.getsockname()[1]
+
+
+def _run_mock_vespa(port: int, latency: float, status_code: int) -> None:
+    app = FastAPI()
+
+    @app.post("/document/v1/default/{index_name}/docid/{chunk_id}")
+    async def feed(index_name: str, chunk_id: str) -> Response:
+        await asyncio.sleep(latency)
+        return Response(status_code=status_code, content="{}")
+
+    uvicorn.run(app, host=_MOCK_HOST, port=port, log_level="warning")
+
+
+def _start_mock_vespa(port: int, latency: float, status_code: int) -> None:
+    # in its own process, so the mock doesn't compete with the feed for the GIL
+    multiprocessing.Process(
+        target=_run_mock_vespa, args=(port, latency, status_code), daemon=True
+    ).start()
+    while True:
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            if sock.connect_ex((_MOCK_HOST, port)) == 0:
+                return
+        time.sleep(0.05)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the Vespa feed engines")
+    parser.add_argument("--num-docs", type=int, default=200)
+    parser.add_argument("--chunks-per-doc", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--status", type=int, default=200)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    args = parser.parse_args()
+
+    port = _get_free_port()
+    # must be set before onyx is imported, the Vespa endpoints are built at import time
+    os.environ["VESPA_HOST"] = _MOCK_HOST
+    os.environ["VESPA_PORT"] = str(port)
+
+    from onyx.document_index.vespa.indexing_utils import (
+        async_batch_index_vespa_chunks,
+    )
+    from onyx.document_index.vespa.indexing_utils import batch_index_vespa_chunks
+    from onyx.document_index.vespa.shared_utils.utils import get_vespa_http_client
+    from onyx.document_index.vespa_constants import BATCH_SIZE
+    from onyx.utils.batching import batch_generator
+    from scripts.benchmarks.synthetic_chunks import make_chunks
+
+    _start_mock_vespa(port, args.latency_ms / 1000, args.status)
+    chunks = make_chunks(args.num_docs, args.chunks_per_doc)
+    print(f"Feeding {len(chunks)} chunks, mock latency={args.latency_ms}ms")
+
+    start = time.monotonic()
+    try:
+        with get_vespa_http_client() as http_client:
+            for chunk_batch in batch_generator(chunks, BATCH_SIZE):
+                batch_index_vespa_chunks(
+                    chunks=chunk_batch,
+                    index_name="danswer_chunk",
+                    http_client=http_client,
+                    multitenant=False,
+                )
+    except Exception as e:
+        print(f"threaded feed failed: {e!r}")
+    elapsed = time.monotonic() - start
+    print(f"threaded: {elapsed:.2f}s {len(chunks) / elapsed:.1f} chunks/sec")
+
+    start = time.monotonic()
+    try:
+        async_batch_index_vespa_chunks(
+            chunks=chunks,
+            index_name="danswer_chunk",
+            multitenant=False,
+            max_in_flight=args.max_in_flight,
+        )
+    except Exception as e:
+        print(f"async feed failed: {e!r}")
+    elapsed = time.monotonic() - start
+    print(f"async: {elapsed:.2f}s {len(chunks) / elapsed:.1f} chunks/sec")
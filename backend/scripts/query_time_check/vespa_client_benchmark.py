@@ -0,0 +1,83 @@
+"""
+Compares Vespa query latency when a brand new httpx client is created for every
+search (the old behavior of the query path) against the pooled, long-lived client
+returned by get_vespa_query_http_client.
+
+Requires a running Vespa with an index. Usage:
+
+python -m scripts.query_time_check.vespa_client_benchmark --num-queries 500
+
+Use --parallel 3 to mimic the expanded queries of a single chat search.
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+import httpx
+
+from onyx.document_index.vespa.shared_utils.utils import get_vespa_http_client
+from onyx.document_index.vespa.shared_utils.utils import (
+    get_vespa_query_http_client,
+)
+from onyx.document_index.vespa_constants import SEARCH_ENDPOINT
+from onyx.utils.threadpool_concurrency import run_functions_tuples_in_parallel
+
+_QUERY_PARAMS = {
+    "yql": "select documentid from sources * where true",
+    "hits": 10,
+}
+
+
+def _percentile(results: list[float], percentile: float) -> float:
+    return sorted(results)[min(int(percentile * len(results)), len(results) - 1)]
+
+
+def _query_with_new_client() -> None:
+    with get_vespa_http_client() as http_client:
+        http_client.post(SEARCH_ENDPOINT, json=_QUERY_PARAMS).raise_for_status()
+
+
+def _query_with_pooled_client() -> None:
+    http_client: httpx.Client = get_vespa_query_http_client()
+    http_client.post(SEARCH_ENDPOINT, json=_QUERY_PARAMS).raise_for_status()
+
+
+def _run(
+    name: str, query_fn: Callable[[], None], num_queries: int, parallel: int
+) -> None:
+    # warm up so that the pooled client has an open connection, same as a
+    # long running api server would
+    query_fn()
+
+    results: list[float] = []
+    for _ in range(num_queries):
+        start = time.monotonic()
+        run_functions_tuples_in_parallel([(query_fn, ()) for _ in range(parallel)])
+        results.append(time.monotonic() - start)
+
+    print(
+        f"{name}: "
+        f"p50={_percentile(results, 0.5) * 1000:.2f}ms "
+        f"p99={_percentile(results, 0.99) * 1000:.2f}ms "
+        f"max={max(results) * 1000:.2f}ms"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark Vespa query latency with and without a pooled client"
+    )
+    parser.add_argument("--num-queries", type=int, default=500)
+    parser.add_argument(
+        "--parallel",
+        type=int,
+        default=1,
+        help="Number of searches issued concurrently per iteration",
+    )
+    args = parser.parse_args()
+
+    _run(
+        "new client per query", _query_with_new_client, args.num_queries, args.parallel
+    )
+    _run("pooled client", _query_with_pooled_client, args.num_queries, args.parallel)
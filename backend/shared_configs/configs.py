@@ -50,6 +50,21 @@ DISABLE_RERANK_FOR_STREAMING = (
 # model. If torch finds more threads on its own, this value is not used.
 MIN_THREADS_ML_MODELS = int(os.environ.get("MIN_THREADS_ML_MODELS") or 1)
 
+# If set, texts sent to local embedding / reranking models are queued and run in batches
+# formed across concurrent requests, grouped by length. A batch is run once it is full
+# or the oldest queued text has waited this many milliseconds. Disabled by default.
+LOCAL_MODEL_BATCH_WAIT_MS = int(os.environ.get("LOCAL_MODEL_BATCH_WAIT_MS") or 0)
+# Max number of texts (or query / document pairs for reranking) in a batch
+LOCAL_MODEL_MAX_BATCH_SIZE = int(os.environ.get("LOCAL_MODEL_MAX_BATCH_SIZE") or 32)
+# Number of threads running batches for each local model
+LOCAL_MODEL_INFERENCE_THREADS = int(
+    os.environ.get("LOCAL_MODEL_INFERENCE_THREADS") or 1
+)
+# CPUs the inference threads are pinned to, e.g. "0-3,8". Empty means no pinning
+LOCAL_MODEL_INFERENCE_CPU_AFFINITY = (
+    os.environ.get("LOCAL_MODEL_INFERENCE_CPU_AFFINITY") or ""
+)
+
 # Model server that has indexing only set will throw exception if used for reranking
 # or intent classification
 INDEXING_ONLY = os.environ.get("INDEXING_ONLY", "").lower() == "true"
@@ -80,6 +95,21 @@ OPENAI_EMBEDDING_TIMEOUT = int(
     os.environ.get("OPENAI_EMBEDDING_TIMEOUT", API_BASED_EMBEDDING_TIMEOUT)
 )
 
+# Clients for API-based embedding models are kept around by the model server and reused
+# across requests (per provider / API key / API URL). Clients which have not been used
+# for this many seconds are closed.
+CLOUD_EMBEDDING_CLIENT_IDLE_TIMEOUT = int(
+    os.environ.get("CLOUD_EMBEDDING_CLIENT_IDLE_TIMEOUT", "300")
+)
+
+# If set, concurrent embedding requests to the same API-based model that arrive within
+# this many milliseconds of each other are merged into a single provider call (up to the
+# max batch size of the provider). Disabled by default since it adds this much latency
+# to requests which are not merged.
+CLOUD_EMBEDDING_COALESCE_WAIT_MS = int(
+    os.environ.get("CLOUD_EMBEDDING_COALESCE_WAIT_MS", "0")
+)
+
 # Whether or not to strictly enforce token limit for chunking.
 STRICT_CHUNK_TOKEN_LIMIT = (
     os.environ.get("STRICT_CHUNK_TOKEN_LIMIT", "").lower() == "true"
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import patch
+
+from ee.onyx.access.access import _get_access_for_documents
+from ee.onyx.access.access import bump_user_group_version
+from onyx.configs.constants import DocumentSource
+from onyx.db.enums import AccessType
+from onyx.db.enums import ConnectorCredentialPairStatus
+
+_MODULE = "ee.onyx.access.access"
+
+_ACTIVE = ConnectorCredentialPairStatus.ACTIVE
+_DELETING = ConnectorCredentialPairStatus.DELETING
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    def set(self, key: str, value: str, nx: bool = False) -> None:
+        if not nx or key not in self.values:
+            self.values[key] = value.encode()
+
+
+class FakeGroupStore:
+    def __init__(self, cc_pair_id_to_group_names: dict[int, list[str]]) -> None:
+        self.cc_pair_id_to_group_names = cc_pair_id_to_group_names
+        self.calls: list[list[int]] = []
+
+    def fetch(self, db_session: Any, cc_pair_ids: list[int]) -> dict[int, list[str]]:
+        self.calls.append(cc_pair_ids)
+        return {
+            cc_pair_id: self.cc_pair_id_to_group_names.get(cc_pair_id, [])
+            for cc_pair_id in cc_pair_ids
+        }
+
+
+_ROWS = [
+    # (doc id, cc pair id, access type, status, creator email, source)
+    ("doc_1", 1, AccessType.PRIVATE, _ACTIVE, "a@test.com", DocumentSource.WEB),
+    ("doc_1", 2, AccessType.PUBLIC, _ACTIVE, None, DocumentSource.WEB),
+    ("doc_2", 1, AccessType.PRIVATE, _ACTIVE, "a@test.com", DocumentSource.WEB),
+    ("doc_2", 3, AccessType.SYNC, _ACTIVE, None, DocumentSource.WEB),
+    ("doc_3", 4, AccessType.PUBLIC, _DELETING, "b@test.com", DocumentSource.WEB),
+]
+
+
+def _document(doc_id: str, external_user_group_ids: list[str] | None = None) -> Any:
+    return SimpleNamespace(
+        id=doc_id,
+        is_public=False,
+        external_user_emails=None,
+        external_user_group_ids=external_user_group_ids,
+    )
+
+
+def _get_access(
+    group_store: FakeGroupStore, redis_client: FakeRedis, document_ids: list[str]
+) -> dict[str, Any]:
+    with (
+        patch(f"{_MODULE}.get_cc_pair_access_info_for_documents", return_value=_ROWS),
+        patch(
+            f"{_MODULE}.get_documents_by_ids",
+            return_value=[
+                _document("doc_1"),
+                _document("doc_2", ["ext_group"]),
+                _document("doc_3"),
+            ],
+        ),
+        patch(f"{_MODULE}.fetch_public_external_group_ids", return_value=[]),
+        patch(f"{_MODULE}.fetch_user_group_names_for_cc_pairs", group_store.fetch),
+        patch(f"{_MODULE}.get_redis_client", return_value=redis_client),
+        patch(f"{_MODULE}.get_current_tenant_id", return_value="tenant"),
+    ):
+        return _get_access_for_documents(document_ids, None)  # type: ignore
+
+
+def test_access_is_assembled_from_cc_pairs() -> None:
+    group_store = FakeGroupStore({1: ["eng"], 2: ["sales"], 3: ["synced"], 4: ["x"]})
+
+    access = _get_access(
+        group_store, FakeRedis(), ["doc_1", "doc_2", "doc_3", "missing"]
+    )
+
+    assert set(access) == {"doc_1", "doc_2", "doc_3"}
+    assert access["doc_1"].user_emails == {"a@test.com"}
+    assert access["doc_1"].user_groups == {"eng", "sales"}
+    assert access["doc_1"].is_public
+    # groups are not given access to the documents of SYNC cc pairs
+    assert access["doc_2"].user_groups == {"eng"}
+    assert access["doc_2"].external_user_group_ids == {"ext_group"}
+    assert not access["doc_2"].is_public
+    # cc pairs being deleted don't give any access
+    assert access["doc_3"].user_emails == set()
+    assert access["doc_3"].user_groups == set()
+    assert not access["doc_3"].is_public
+
+
+def test_user_groups_are_cached_until_the_version_is_bumped() -> None:
+    group_store = FakeGroupStore({1: ["eng"], 2: ["sales"]})
+    redis_client = FakeRedis()
+
+    _get_access(group_store, redis_client, ["doc_1"])
+    _get_access(group_store, redis_client, ["doc_1", "doc_2"])
+    assert group_store.calls == [[1, 2]]
+
+    group_store.cc_pair_id_to_group_names[1] = ["eng", "support"]
+    with patch(f"{_MODULE}.get_redis_client", return_value=redis_client):
+        bump_user_group_version()
+
+    access = _get_access(group_store, redis_client, ["doc_1"])
+    assert group_store.calls == [[1, 2], [1, 2]]
+    assert access["doc_1"].user_groups == {"eng", "support", "sales"}
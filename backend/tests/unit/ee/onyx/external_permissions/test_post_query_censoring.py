@@ -0,0 +1,147 @@
+import time
+from datetime import datetime
+from typing import Any
+from unittest.mock import patch
+
+from ee.onyx.external_permissions.post_query_censoring import (
+    _post_query_chunk_censoring,
+)
+from ee.onyx.external_permissions.sync_params import CensoringConfig
+from ee.onyx.external_permissions.sync_params import SyncConfig
+from onyx.configs.constants import DocumentSource
+from onyx.context.search.models import InferenceChunk
+from onyx.db.models import User
+
+_MODULE = "ee.onyx.external_permissions.post_query_censoring"
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+
+    def get(self, key: str) -> bytes | None:
+        return self.values.get(key)
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key: str, value: str, ex: int | None = None) -> None:
+        self.values[key] = value.encode()
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def execute(self) -> None:
+        pass
+
+
+def _make_chunk(doc_id: str, source: DocumentSource) -> InferenceChunk:
+    return InferenceChunk(
+        document_id=doc_id,
+        chunk_id=0,
+        blurb=doc_id,
+        content=f"{doc_id} content",
+        source_links={0: f"https://example.com/{doc_id}"},
+        section_continuation=False,
+        source_type=source,
+        semantic_identifier=doc_id,
+        title=doc_id,
+        boost=1,
+        recency_bias=1.0,
+        score=None,
+        hidden=False,
+        metadata={},
+        match_highlights=[],
+        updated_at=datetime.now(),
+        image_file_id=None,
+        doc_summary="",
+        chunk_context="",
+    )
+
+
+class FakeCensoring:
+    def __init__(self, allowed_doc_ids: set[str], delay: float) -> None:
+        self.allowed_doc_ids = allowed_doc_ids
+        self.delay = delay
+        self.censored_doc_ids: list[str] = []
+
+    def censor(self, chunks: list[InferenceChunk], user_email: str) -> Any:
+        time.sleep(self.delay)
+        self.censored_doc_ids.extend(chunk.document_id for chunk in chunks)
+        return [chunk for chunk in chunks if chunk.document_id in self.allowed_doc_ids]
+
+
+def test_sources_are_censored_in_parallel_and_decisions_cached() -> None:
+    user = User(id=1, email="test@example.com")
+    salesforce = FakeCensoring(allowed_doc_ids={"sf_allowed"}, delay=0.3)
+    slack = FakeCensoring(allowed_doc_ids={"slack_allowed"}, delay=0.3)
+    sync_configs = {
+        DocumentSource.SALESFORCE: SyncConfig(
+            censoring_config=CensoringConfig(chunk_censoring_func=salesforce.censor)
+        ),
+        DocumentSource.SLACK: SyncConfig(
+            censoring_config=CensoringConfig(chunk_censoring_func=slack.censor)
+        ),
+    }
+    chunks = [
+        _make_chunk("sf_allowed", DocumentSource.SALESFORCE),
+        _make_chunk("web", DocumentSource.WEB),
+        _make_chunk("slack_denied", DocumentSource.SLACK),
+        _make_chunk("sf_denied", DocumentSource.SALESFORCE),
+        _make_chunk("slack_allowed", DocumentSource.SLACK),
+    ]
+
+    with (
+        patch(
+            f"{_MODULE}._get_all_censoring_enabled_sources",
+            return_value={DocumentSource.SALESFORCE, DocumentSource.SLACK},
+        ),
+        patch(f"{_MODULE}.get_source_perm_sync_config", side_effect=sync_configs.get),
+        patch(f"{_MODULE}.get_redis_client", return_value=FakeRedis()),
+    ):
+        start = time.monotonic()
+        result = _post_query_chunk_censoring(chunks, user)
+        assert time.monotonic() - start < 0.55
+
+        assert [chunk.document_id for chunk in result] == [
+            "sf_allowed",
+            "web",
+            "slack_allowed",
+        ]
+
+        # the second search doesn't go to the sources again
+        assert _post_query_chunk_censoring(chunks + [chunks[0]], user) == result + [
+            chunks[0]
+        ]
+        assert sorted(salesforce.censored_doc_ids) == ["sf_allowed", "sf_denied"]
+        assert sorted(slack.censored_doc_ids) == ["slack_allowed", "slack_denied"]
+
+
+def test_slow_source_is_thrown_out() -> None:
+    user = User(id=1, email="test@example.com")
+    salesforce = FakeCensoring(allowed_doc_ids={"sf_allowed"}, delay=0.5)
+    chunks = [
+        _make_chunk("sf_allowed", DocumentSource.SALESFORCE),
+        _make_chunk("web", DocumentSource.WEB),
+    ]
+    redis_client = FakeRedis()
+
+    with (
+        patch(
+            f"{_MODULE}._get_all_censoring_enabled_sources",
+            return_value={DocumentSource.SALESFORCE},
+        ),
+        patch(
+            f"{_MODULE}.get_source_perm_sync_config",
+            return_value=SyncConfig(
+                censoring_config=CensoringConfig(chunk_censoring_func=salesforce.censor)
+            ),
+        ),
+        patch(f"{_MODULE}.get_redis_client", return_value=redis_client),
+        patch(f"{_MODULE}.POST_QUERY_CENSORING_TIMEOUT", 0.1),
+    ):
+        result = _post_query_chunk_censoring(chunks, user)
+
+    assert [chunk.document_id for chunk in result] == ["web"]
+    # nothing is cached for sources that didn't finish
+    assert redis_client.values == {}
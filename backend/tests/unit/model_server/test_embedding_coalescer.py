@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from model_server.embedding_coalescer import EmbeddingRequestCoalescer
+from shared_configs.model_server_models import Embedding
+
+
+class FakeProvider:
+    def __init__(self, fail_on: str | None = None) -> None:
+        self.calls: list[list[str]] = []
+        self.fail_on = fail_on
+
+    async def embed(self, texts: list[str]) -> list[Embedding]:
+        self.calls.append(texts)
+        await asyncio.sleep(0)
+        if self.fail_on in texts:
+            raise RuntimeError("provider error")
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_merged() -> None:
+    coalescer = EmbeddingRequestCoalescer(max_wait=0.05)
+    provider = FakeProvider()
+
+    results = await asyncio.gather(
+        coalescer.embed("model", ["a", "bb"], provider.embed, max_batch_size=4),
+        coalescer.embed("model", ["ccc"], provider.embed, max_batch_size=4),
+        # doesn't fit in the pending batch anymore
+        coalescer.embed("model", ["dd", "e"], provider.embed, max_batch_size=4),
+        # different key, never merged with the others
+        coalescer.embed("other", ["ffff"], provider.embed, max_batch_size=4),
+        # already a full batch
+        coalescer.embed("model", ["g"] * 4, provider.embed, max_batch_size=4),
+    )
+
+    assert list(results) == [
+        [[1.0], [2.0]],
+        [[3.0]],
+        [[2.0], [1.0]],
+        [[4.0]],
+        [[1.0]] * 4,
+    ]
+    assert sorted(provider.calls) == sorted(
+        [["a", "bb", "ccc"], ["dd", "e"], ["ffff"], ["g"] * 4]
+    )
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_only_fails_its_requests() -> None:
+    coalescer = EmbeddingRequestCoalescer(max_wait=0.05)
+    provider = FakeProvider(fail_on="bad")
+
+    results = await asyncio.gather(
+        coalescer.embed("model", ["a"], provider.embed, max_batch_size=2),
+        coalescer.embed("model", ["bad"], provider.embed, max_batch_size=2),
+        coalescer.embed("model", ["c"], provider.embed, max_batch_size=2),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[0], RuntimeError)
+    assert isinstance(results[1], RuntimeError)
+    assert results[2] == [[1.0]]
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from model_server.inference_scheduler import LocalInferenceScheduler
+from model_server.inference_scheduler import parse_cpu_affinity
+
+
+class FakeModel:
+    def __init__(self) -> None:
+        self.batches: list[list[str]] = []
+
+    def infer(self, texts: list[str]) -> list[int]:
+        self.batches.append(texts)
+        if "bad" in texts:
+            raise RuntimeError("inference error")
+        return [len(text) for text in texts]
+
+
+def _make_scheduler(model: FakeModel) -> LocalInferenceScheduler[str, int]:
+    return LocalInferenceScheduler(
+        name="test",
+        infer_func=model.infer,
+        length_func=len,
+        max_batch_size=4,
+        max_wait=0.05,
+    )
+
+
+@pytest.mark.asyncio
+async def test_requests_are_batched_by_length() -> None:
+    model = FakeModel()
+    scheduler = _make_scheduler(model)
+
+    short_texts = ["a", "bb", "c", "dd"]
+    long_texts = ["e" * 100, "f" * 120, "g" * 110]
+    results = await asyncio.gather(
+        scheduler.submit([short_texts[0], long_texts[0]]),
+        scheduler.submit([short_texts[1]]),
+        scheduler.submit([long_texts[1], short_texts[2]]),
+        scheduler.submit([short_texts[3], long_texts[2]]),
+        scheduler.submit([]),
+    )
+    scheduler.shutdown()
+
+    assert list(results) == [[1, 100], [2], [120, 1], [2, 110], []]
+    assert sorted(sorted(batch) for batch in model.batches) == [
+        sorted(short_texts),
+        sorted(long_texts),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_only_fails_its_requests() -> None:
+    model = FakeModel()
+    scheduler = _make_scheduler(model)
+
+    first = await asyncio.gather(scheduler.submit(["bad", "a"]), return_exceptions=True)
+    second = await scheduler.submit(["b"])
+    scheduler.shutdown()
+
+    assert isinstance(first[0], RuntimeError)
+    assert second == [1]
+
+
+def test_parse_cpu_affinity() -> None:
+    assert parse_cpu_affinity("") == set()
+    assert parse_cpu_affinity("0-3, 8") == {0, 1, 2, 3, 8}
+
+
+@pytest.mark.asyncio
+async def test_failed_loop_fails_queued_requests_and_restarts() -> None:
+    model = FakeModel()
+    scheduler = _make_scheduler(model)
+
+    take_batch = scheduler._take_batch
+
+    def _failing_take_batch() -> list:
+        raise RuntimeError("scheduling error")
+
+    scheduler._take_batch = _failing_take_batch  # type: ignore[method-assign]
+    first = await asyncio.wait_for(
+        asyncio.gather(scheduler.submit(["a"]), return_exceptions=True), timeout=5
+    )
+    assert isinstance(first[0], RuntimeError)
+
+    scheduler._take_batch = take_batch  # type: ignore[method-assign]
+    second = await asyncio.wait_for(scheduler.submit(["bb"]), timeout=5)
+    scheduler.shutdown()
+
+    assert second == [2]
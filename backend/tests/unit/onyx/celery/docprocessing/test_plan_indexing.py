@@ -0,0 +1,82 @@
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from onyx.background.celery.tasks.docprocessing.utils import plan_indexing
+from onyx.background.celery.tasks.models import IndexingPlan
+from onyx.configs.constants import DocumentSource
+from onyx.db.enums import ConnectorCredentialPairStatus
+from onyx.db.enums import IndexingStatus
+from onyx.db.enums import IndexModelStatus
+
+_MODULE = "onyx.background.celery.tasks.docprocessing.utils"
+
+_NOW = datetime(2025, 1, 1, 12, tzinfo=timezone.utc)
+_SUCCESS = IndexingStatus.SUCCESS
+_FAILED = IndexingStatus.FAILED
+
+
+def _cc_pair(cc_pair_id: int, in_repeated_error_state: bool = False) -> Any:
+    return SimpleNamespace(
+        id=cc_pair_id,
+        connector_id=cc_pair_id,
+        connector=SimpleNamespace(
+            id=cc_pair_id, source=DocumentSource.WEB, refresh_freq=60 * 60
+        ),
+        status=ConnectorCredentialPairStatus.ACTIVE,
+        indexing_trigger=None,
+        in_repeated_error_state=in_repeated_error_state,
+    )
+
+
+def _attempts(*statuses: IndexingStatus, minutes_ago: int) -> list[Any]:
+    return [(status, _NOW - timedelta(minutes=minutes_ago)) for status in statuses]
+
+
+_RECENT_ATTEMPTS = {
+    # due
+    1: _attempts(_SUCCESS, minutes_ago=120),
+    # indexed recently
+    2: _attempts(_SUCCESS, minutes_ago=10),
+    # failing over and over, and failed recently
+    3: _attempts(*[_FAILED] * 5, minutes_ago=10),
+    # 4 was never indexed, but already has an attempt queued
+    # 5 was never indexed
+}
+
+
+def _plan(cc_pairs: list[Any]) -> tuple[IndexingPlan, MagicMock]:
+    search_settings = SimpleNamespace(
+        id=7, status=IndexModelStatus.PRESENT, background_reindex_enabled=False
+    )
+    get_recent_attempts = MagicMock(return_value=_RECENT_ATTEMPTS)
+    with (
+        patch(f"{_MODULE}.get_connector_credential_pairs", return_value=cc_pairs),
+        patch(f"{_MODULE}.get_db_current_time", return_value=_NOW),
+        patch(
+            f"{_MODULE}.get_recent_attempt_statuses_for_cc_pairs", get_recent_attempts
+        ),
+        patch(f"{_MODULE}.get_cc_pair_ids_with_active_attempts", return_value={4}),
+    ):
+        plan = plan_indexing(
+            [cc_pair.id for cc_pair in cc_pairs], [search_settings], MagicMock()  # type: ignore
+        )
+    return plan, get_recent_attempts
+
+
+def test_plan_indexing() -> None:
+    cc_pairs = [_cc_pair(1), _cc_pair(2), _cc_pair(3), _cc_pair(4), _cc_pair(5)]
+
+    plan, get_recent_attempts = _plan(cc_pairs)
+    assert plan.to_index == [(1, 7), (5, 7)]
+    assert plan.repeated_error_cc_pair_ids == [3]
+    get_recent_attempts.assert_called_once()
+
+    # already marked as in repeated error state
+    cc_pairs[2] = _cc_pair(3, in_repeated_error_state=True)
+    plan, _ = _plan(cc_pairs)
+    assert plan.repeated_error_cc_pair_ids == []
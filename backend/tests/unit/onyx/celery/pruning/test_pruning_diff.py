@@ -0,0 +1,31 @@
+import random
+
+from onyx.background.celery.tasks.pruning.utils import iter_ids_to_prune
+from onyx.background.celery.tasks.pruning.utils import SortedIdSpill
+
+
+def test_sorted_id_spill_merges_runs() -> None:
+    rng = random.Random(0)
+    ids = [f"doc_{rng.randint(0, 500)}" for _ in range(1000)]
+    ids += ["with\nnewline", "ünicode", "Zebra", ""]
+
+    with SortedIdSpill(run_size=50) as spill:
+        for start in range(0, len(ids), 7):
+            spill.add(ids[start : start + 7])
+
+        assert spill.num_runs > 1
+        assert list(spill.iter_sorted()) == sorted(set(ids))
+
+
+def test_iter_ids_to_prune_matches_set_difference() -> None:
+    rng = random.Random(1)
+    indexed_ids = {f"doc_{rng.randint(0, 1000)}" for _ in range(600)}
+    source_ids = {f"doc_{rng.randint(0, 1000)}" for _ in range(600)}
+
+    with SortedIdSpill(run_size=64) as spill:
+        spill.add(source_ids)
+        to_prune = list(iter_ids_to_prune(sorted(indexed_ids), spill.iter_sorted()))
+
+    assert to_prune == sorted(indexed_ids - source_ids)
+    assert list(iter_ids_to_prune(["a", "b"], [])) == ["a", "b"]
+    assert list(iter_ids_to_prune([], ["a"])) == []
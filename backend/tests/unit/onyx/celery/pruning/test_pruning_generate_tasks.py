@@ -0,0 +1,34 @@
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from onyx.configs.constants import OnyxCeleryTask
+from onyx.redis.redis_connector_prune import RedisConnectorPrune
+
+
+def test_generate_tasks_sends_one_task_per_batch() -> None:
+    redis_client = MagicMock()
+    celery_app = MagicMock()
+    prune = RedisConnectorPrune("tenant", 1, redis_client)
+    doc_ids = [f"doc_{i}" for i in range(25)]
+
+    with (
+        patch(
+            "onyx.redis.redis_connector_prune.get_connector_credential_pair_from_id",
+            return_value=MagicMock(connector_id=2, credential_id=3),
+        ),
+        patch("onyx.redis.redis_connector_prune.DOCUMENT_CLEANUP_BATCH_SIZE", 10),
+    ):
+        result = prune.generate_tasks(iter(doc_ids), celery_app, MagicMock(), None)
+
+    assert result == (3, 25)
+    assert redis_client.sadd.call_count == 3
+
+    sent_doc_ids: list[str] = []
+    for call in celery_app.send_task.call_args_list:
+        assert call.args[0] == OnyxCeleryTask.DOCUMENT_BY_CC_PAIR_CLEANUP_BATCH_TASK
+        kwargs = call.kwargs["kwargs"]
+        assert kwargs["connector_id"] == 2
+        assert kwargs["credential_id"] == 3
+        assert len(kwargs["document_ids"]) <= 10
+        sent_doc_ids.extend(kwargs["document_ids"])
+    assert sent_doc_ids == doc_ids
@@ -0,0 +1,144 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import httpx
+import pytest
+from celery.exceptions import Retry
+
+from onyx.background.celery.tasks.shared.tasks import (
+    document_by_cc_pair_cleanup_batch_task,
+)
+
+_MODULE = "onyx.background.celery.tasks.shared.tasks"
+
+
+def _vespa_error(status_code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("DELETE", "http://vespa")
+    return httpx.HTTPStatusError(
+        "error",
+        request=request,
+        response=httpx.Response(status_code, request=request),
+    )
+
+
+@contextmanager
+def _patched_task(
+    doc_id_to_count: dict[str, int],
+    doc_id_to_error: dict[str, Exception],
+    retries: int = 0,
+) -> Iterator[dict[str, MagicMock]]:
+    retry_index = MagicMock()
+
+    def _delete_single(doc_id: str, **kwargs: Any) -> int:
+        if doc_id in doc_id_to_error:
+            raise doc_id_to_error[doc_id]
+        return 2
+
+    retry_index.delete_single.side_effect = _delete_single
+    retry_index.update_single.side_effect = _delete_single
+
+    mocks: dict[str, MagicMock] = {}
+    with (
+        patch(f"{_MODULE}.get_session_with_current_tenant"),
+        patch(f"{_MODULE}.get_active_search_settings"),
+        patch(f"{_MODULE}.get_default_document_index"),
+        patch(f"{_MODULE}.HttpxPool"),
+        patch(f"{_MODULE}.RetryDocumentIndex", return_value=retry_index),
+        patch(
+            f"{_MODULE}.get_document_connector_counts",
+            return_value=list(doc_id_to_count.items()),
+        ),
+        patch(
+            f"{_MODULE}.get_documents_by_ids",
+            side_effect=lambda _, doc_ids: [
+                MagicMock(id=doc_id, chunk_count=2, boost=0, hidden=False)
+                for doc_id in doc_ids
+            ],
+        ),
+        patch(f"{_MODULE}.fetch_document_sets_for_documents", return_value=[]),
+        patch(
+            f"{_MODULE}.get_access_for_documents",
+            side_effect=lambda document_ids, db_session: {
+                doc_id: MagicMock() for doc_id in document_ids
+            },
+        ),
+        patch(f"{_MODULE}.delete_documents_complete__no_commit") as delete_complete,
+        patch(
+            f"{_MODULE}.delete_documents_by_connector_credential_pair__no_commit"
+        ) as delete_cc_pair,
+        patch(f"{_MODULE}.mark_documents_as_synced") as mark_synced,
+        patch(f"{_MODULE}.mark_documents_as_modified") as mark_modified,
+        patch.object(
+            document_by_cc_pair_cleanup_batch_task, "retry", side_effect=Retry()
+        ) as retry,
+    ):
+        mocks.update(
+            delete_complete=delete_complete,
+            delete_cc_pair=delete_cc_pair,
+            mark_synced=mark_synced,
+            mark_modified=mark_modified,
+            retry=retry,
+        )
+        document_by_cc_pair_cleanup_batch_task.push_request(retries=retries)  # type: ignore[call-arg]
+        try:
+            yield mocks
+        finally:
+            document_by_cc_pair_cleanup_batch_task.pop_request()
+
+
+def _run_task(doc_ids: list[str]) -> bool:
+    return document_by_cc_pair_cleanup_batch_task.run(
+        document_ids=doc_ids, connector_id=1, credential_id=2, tenant_id="tenant"
+    )
+
+
+def test_partial_vespa_failure_retries_only_the_failed_docs() -> None:
+    with _patched_task(
+        doc_id_to_count={"doc_1": 1, "doc_2": 1, "doc_3": 2, "doc_4": 2},
+        doc_id_to_error={"doc_2": httpx.ReadTimeout("timeout"), "doc_4": OSError()},
+    ) as mocks:
+        with pytest.raises(Retry):
+            _run_task(["doc_1", "doc_2", "doc_3", "doc_4"])
+
+    # the docs that succeeded in Vespa are cleaned up in the db
+    assert mocks["delete_complete"].call_args.kwargs["document_ids"] == ["doc_1"]
+    assert mocks["delete_cc_pair"].call_args.kwargs["document_ids"] == ["doc_3"]
+    mocks["mark_synced"].assert_called_once()
+    assert mocks["mark_synced"].call_args.args[0] == ["doc_3"]
+
+    retry_kwargs = mocks["retry"].call_args.kwargs["kwargs"]
+    assert sorted(retry_kwargs["document_ids"]) == ["doc_2", "doc_4"]
+    assert retry_kwargs["connector_id"] == 1
+    assert retry_kwargs["credential_id"] == 2
+    mocks["mark_modified"].assert_not_called()
+
+
+def test_vespa_bad_request_is_not_retried() -> None:
+    with _patched_task(
+        doc_id_to_count={"doc_1": 1, "doc_2": 1},
+        doc_id_to_error={"doc_2": _vespa_error(400)},
+    ) as mocks:
+        assert _run_task(["doc_1", "doc_2"]) is False
+
+    assert mocks["delete_complete"].call_args.kwargs["document_ids"] == ["doc_1"]
+    mocks["retry"].assert_not_called()
+    mocks["mark_modified"].assert_not_called()
+
+
+def test_last_retry_marks_the_failed_docs_as_modified() -> None:
+    with _patched_task(
+        doc_id_to_count={"doc_1": 1, "doc_2": 2, "doc_3": 2},
+        doc_id_to_error={
+            "doc_2": httpx.ReadTimeout("timeout"),
+            "doc_3": _vespa_error(400),
+        },
+        retries=document_by_cc_pair_cleanup_batch_task.max_retries or 0,
+    ) as mocks:
+        assert _run_task(["doc_1", "doc_2", "doc_3"]) is False
+
+    mocks["retry"].assert_not_called()
+    assert mocks["delete_cc_pair"].call_args.kwargs["document_ids"] == ["doc_2"]
+    assert mocks["mark_modified"].call_args.args[0] == ["doc_2"]
@@ -0,0 +1,132 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+from celery.exceptions import Retry
+
+from onyx.background.celery.tasks.vespa.tasks import vespa_metadata_sync_batch_task
+from onyx.document_index.interfaces import UpdateRequest
+
+_MODULE = "onyx.background.celery.tasks.vespa.tasks"
+
+
+@contextmanager
+def _patched_task(
+    failed_doc_ids: set[str],
+    doc_id_to_chunk_count: dict[str, int | None],
+    retries: int = 0,
+) -> Iterator[dict[str, MagicMock]]:
+    retry_index = MagicMock()
+
+    def _update(update_requests: list[UpdateRequest], **kwargs: Any) -> set[str]:
+        doc_ids = {
+            doc_info.doc_id
+            for update_request in update_requests
+            for doc_info in update_request.minimal_document_indexing_info
+        }
+        return doc_ids & failed_doc_ids
+
+    def _update_single(doc_id: str, **kwargs: Any) -> int:
+        if doc_id in failed_doc_ids:
+            raise RuntimeError("update failed")
+        return 2
+
+    retry_index.update.side_effect = _update
+    retry_index.update_single.side_effect = _update_single
+
+    with (
+        patch(f"{_MODULE}.get_session_with_current_tenant"),
+        patch(f"{_MODULE}.get_active_search_settings"),
+        patch(f"{_MODULE}.get_default_document_index"),
+        patch(f"{_MODULE}.HttpxPool"),
+        patch(f"{_MODULE}.RetryDocumentIndex", return_value=retry_index),
+        patch(
+            f"{_MODULE}.get_documents_by_ids",
+            side_effect=lambda _, doc_ids: [
+                MagicMock(
+                    id=doc_id,
+                    chunk_count=doc_id_to_chunk_count[doc_id],
+                    boost=0,
+                    hidden=False,
+                )
+                for doc_id in doc_ids
+            ],
+        ),
+        patch(f"{_MODULE}.fetch_document_sets_for_documents", return_value=[]),
+        patch(
+            f"{_MODULE}.get_access_for_documents",
+            side_effect=lambda document_ids, db_session: {
+                doc_id: MagicMock() for doc_id in document_ids
+            },
+        ),
+        patch(f"{_MODULE}.mark_documents_as_synced") as mark_synced,
+        patch.object(
+            vespa_metadata_sync_batch_task, "retry", side_effect=Retry()
+        ) as retry,
+    ):
+        vespa_metadata_sync_batch_task.push_request(retries=retries)  # type: ignore[call-arg]
+        try:
+            yield dict(retry_index=retry_index, mark_synced=mark_synced, retry=retry)
+        finally:
+            vespa_metadata_sync_batch_task.pop_request()
+
+
+def _run_task(doc_ids: list[str]) -> bool:
+    return vespa_metadata_sync_batch_task.run(document_ids=doc_ids, tenant_id="tenant")
+
+
+def test_all_docs_synced_in_a_single_update() -> None:
+    with _patched_task(
+        failed_doc_ids=set(), doc_id_to_chunk_count={"doc_1": 1, "doc_2": 3}
+    ) as mocks:
+        assert _run_task(["doc_1", "doc_2"]) is True
+
+    mocks["retry_index"].update.assert_called_once()
+    mocks["retry_index"].update_single.assert_not_called()
+    assert mocks["mark_synced"].call_args.args[0] == ["doc_1", "doc_2"]
+    mocks["retry"].assert_not_called()
+
+
+def test_partial_failure_requeues_only_the_failed_docs() -> None:
+    with _patched_task(
+        failed_doc_ids={"doc_2", "doc_4"},
+        doc_id_to_chunk_count={"doc_1": 1, "doc_2": 1, "doc_3": None, "doc_4": None},
+    ) as mocks:
+        with pytest.raises(Retry):
+            _run_task(["doc_1", "doc_2", "doc_3", "doc_4"])
+
+    # documents without a chunk count go through update_single
+    assert mocks["retry_index"].update_single.call_count == 2
+    assert mocks["mark_synced"].call_args.args[0] == ["doc_1", "doc_3"]
+
+    retry_kwargs = mocks["retry"].call_args.kwargs["kwargs"]
+    assert sorted(retry_kwargs["document_ids"]) == ["doc_2", "doc_4"]
+    assert retry_kwargs["tenant_id"] == "tenant"
+
+
+def test_unexpected_error_requeues_the_whole_batch() -> None:
+    with _patched_task(
+        failed_doc_ids=set(), doc_id_to_chunk_count={"doc_1": 1, "doc_2": 1}
+    ) as mocks:
+        mocks["retry_index"].update.side_effect = RuntimeError("vespa is down")
+        with pytest.raises(Retry):
+            _run_task(["doc_1", "doc_2"])
+
+    mocks["mark_synced"].assert_not_called()
+    retry_kwargs = mocks["retry"].call_args.kwargs["kwargs"]
+    assert sorted(retry_kwargs["document_ids"]) == ["doc_1", "doc_2"]
+
+
+def test_last_retry_leaves_the_failed_docs_for_the_next_sync_pass() -> None:
+    with _patched_task(
+        failed_doc_ids={"doc_2"},
+        doc_id_to_chunk_count={"doc_1": 1, "doc_2": 1},
+        retries=vespa_metadata_sync_batch_task.max_retries or 0,
+    ) as mocks:
+        assert _run_task(["doc_1", "doc_2"]) is False
+
+    mocks["retry"].assert_not_called()
+    assert mocks["mark_synced"].call_args.args[0] == ["doc_1"]
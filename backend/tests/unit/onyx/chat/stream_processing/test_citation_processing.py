@@ -322,6 +322,18 @@ def process_text(
             "Here's a code block:\n```plaintext\ndef example():\n    pass\n```\nEnd of code.",
             [],
         ),
+        (
+            "Code block fences split across tokens",
+            [
+                "Code:\n`",
+                "`",
+                "`\nx = arr[1]\n``",
+                "`\nSee [",
+                "1]",
+            ],
+            "Code:\n```\nx = arr[1]\n```\nSee [[1]](https://0.com)",
+            ["doc_0"],
+        ),
         (
             "Code block with language specification",
             [
@@ -0,0 +1,94 @@
+from unittest import mock
+
+from onyx.connectors.confluence.onyx_confluence import (
+    extract_text_from_confluence_html,
+)
+from onyx.connectors.confluence.onyx_confluence import get_user_mentions
+from onyx.connectors.confluence.onyx_confluence import OnyxConfluence
+from onyx.connectors.interfaces import CredentialsProviderInterface
+
+_PAGE = {
+    "body": {
+        "storage": {
+            "value": (
+                '<p>Hi <ac:link><ri:user ri:account-id="alice" /></ac:link> and '
+                '<ac:link><ri:user ri:account-id="bob" /></ac:link>, '
+                'cc <ac:link><ri:user ri:account-id="alice" /></ac:link></p>'
+            )
+        }
+    }
+}
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def set(self, key: str, value: str, ex: int) -> None:
+        self.values[key] = value.encode()
+
+    def execute(self) -> None:
+        pass
+
+
+def _client(redis_client: FakeRedis) -> OnyxConfluence:
+    provider = mock.Mock(spec=CredentialsProviderInterface)
+    provider.is_dynamic.return_value = False
+    provider.get_credentials.return_value = {"confluence_access_token": "token"}
+    provider.get_tenant_id.return_value = "test_tenant"
+    provider.__enter__ = mock.Mock(return_value=None)
+    provider.__exit__ = mock.Mock(return_value=None)
+    with mock.patch(
+        "onyx.connectors.confluence.user_cache.get_redis_client",
+        return_value=redis_client,
+    ):
+        client = OnyxConfluence(
+            is_cloud=True,
+            url="https://test.atlassian.net/wiki",
+            credentials_provider=provider,
+        )
+        client.user_cache._get_redis_client()
+
+    client._confluence = mock.Mock()
+    # only alice is returned by the bulk lookup, bob is looked up on his own
+    client.get = mock.Mock(  # type: ignore
+        return_value={"results": [{"accountId": "alice", "displayName": "Alice"}]}
+    )
+    client._confluence.get_user_details_by_userkey.side_effect = Exception("not found")
+    client._confluence.get_user_details_by_accountid.return_value = {
+        "displayName": "Bob"
+    }
+    return client
+
+
+def test_mentioned_users_are_prefetched_and_shared() -> None:
+    redis_client = FakeRedis()
+    client = _client(redis_client)
+
+    assert get_user_mentions([_PAGE]) == ["alice", "bob"]
+    client.prefetch_users(get_user_mentions([_PAGE]))
+    client.get.assert_called_once_with(  # type: ignore
+        "rest/api/user/bulk", params={"accountId": ["alice", "bob"]}
+    )
+
+    text = extract_text_from_confluence_html(client, _PAGE, set())
+    assert "@Alice" in text
+    assert "@Bob" in text
+    assert client._confluence.get_user_details_by_accountid.call_count == 1
+    assert (client.user_cache.hits, client.user_cache.misses) == (2, 1)
+
+    # e.g. another docfetching worker
+    other_client = _client(redis_client)
+    other_client.prefetch_users(get_user_mentions([_PAGE]))
+    text = extract_text_from_confluence_html(other_client, _PAGE, set())
+    assert "@Alice" in text
+    assert "@Bob" in text
+    other_client.get.assert_not_called()  # type: ignore
+    other_client._confluence.get_user_details_by_accountid.assert_not_called()
+    assert (other_client.user_cache.hits, other_client.user_cache.misses) == (3, 0)
@@ -0,0 +1,279 @@
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from onyx.connectors.models import Document
+from onyx.connectors.web.connector import page_needs_javascript
+from onyx.connectors.web.connector import WEB_CONNECTOR_VALID_SETTINGS
+from onyx.connectors.web.connector import WebConnector
+from onyx.connectors.web.crawler import CrawlFrontier
+from onyx.connectors.web.crawler import CrawlState
+from onyx.connectors.web.crawler import HostRateLimiter
+from tests.unit.onyx.redis_utils import InMemoryTenantRedis
+
+_MODULE = "onyx.connectors.web.connector"
+_BASE_URL = "https://docs.example.com/"
+
+
+class FakeSite:
+    """Static pages with ETags, answers conditional requests."""
+
+    def __init__(self) -> None:
+        self.pages = {
+            "": ["a", "b"],
+            "a": ["c"],
+            "b": [],
+            "c": [],
+        }
+        self.versions = {path: 1 for path in self.pages}
+        self.redirects: dict[str, str] = {}
+        self.requests: list[tuple[str, int]] = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.lstrip("/")
+        if path in self.redirects:
+            return httpx.Response(
+                301, headers={"Location": f"{_BASE_URL}{self.redirects[path]}"}
+            )
+
+        etag = f'"{path}-{self.versions[path]}"'
+        if request.headers.get("If-None-Match") == etag:
+            self.requests.append((path, 304))
+            return httpx.Response(304, headers={"ETag": etag})
+
+        self.requests.append((path, 200))
+        links = "".join(
+            f'<a href="{_BASE_URL}{link}">{link}</a>' for link in self.pages[path]
+        )
+        html = (
+            f"<html><head><title>page {path}</title></head><body>"
+            f"<p>version {self.versions[path]} of page {path}</p>{links}</body></html>"
+        )
+        return httpx.Response(
+            200,
+            headers={"ETag": etag, "Content-Type": "text/html"},
+            text=html,
+        )
+
+
+def _crawl(
+    site: FakeSite,
+    redis_client: InMemoryTenantRedis,
+    poll: tuple[float, float] | None,
+    search_settings_id: int = 1,
+    from_beginning: bool = False,
+) -> list[Document]:
+    connector = WebConnector(
+        base_url=_BASE_URL,
+        web_connector_type=WEB_CONNECTOR_VALID_SETTINGS.RECURSIVE.value,
+        batch_size=2,
+    )
+    connector.set_index_attempt_scope(
+        cc_pair_id=1,
+        search_settings_id=search_settings_id,
+        from_beginning=from_beginning,
+    )
+    with (
+        patch(f"{_MODULE}.check_internet_connection"),
+        patch(f"{_MODULE}.get_redis_client", return_value=redis_client),
+        patch(
+            f"{_MODULE}.build_http_client",
+            side_effect=lambda: httpx.Client(
+                transport=httpx.MockTransport(site.handle), follow_redirects=True
+            ),
+        ),
+        patch(f"{_MODULE}.WEB_CONNECTOR_HOST_REQUEST_INTERVAL", 0),
+        # poll windows overlap by a minute
+        patch(f"{_MODULE}.POLL_CONNECTOR_OFFSET", 1),
+    ):
+        batches = connector.poll_source(*poll) if poll else connector.load_from_state()
+        return [doc for batch in batches for doc in batch]
+
+
+def test_recrawl_skips_unchanged_pages() -> None:
+    site = FakeSite()
+    redis_client = InMemoryTenantRedis()
+
+    docs = _crawl(site, redis_client, (0, 100))
+    assert sorted(doc.id for doc in docs) == [
+        _BASE_URL,
+        f"{_BASE_URL}a",
+        f"{_BASE_URL}b",
+        f"{_BASE_URL}c",
+    ]
+
+    # c is only linked from a, which is unchanged
+    site.versions["b"] = 2
+    site.requests = []
+    docs = _crawl(site, redis_client, (40, 200))
+    assert [doc.id for doc in docs] == [f"{_BASE_URL}b"]
+    assert sorted(site.requests) == [("", 304), ("a", 304), ("b", 200), ("c", 304)]
+
+    # the crawl ending at 200 succeeded
+    site.requests = []
+    assert _crawl(site, redis_client, (140, 300)) == []
+    assert sorted(site.requests) == [("", 304), ("a", 304), ("b", 304), ("c", 304)]
+
+    # validators of crawls before the last successful one aren't trusted
+    site.requests = []
+    docs = _crawl(site, redis_client, (500, 600))
+    assert len(docs) == 4
+
+    # full loads (e.g. for pruning) always come across every page
+    docs = _crawl(site, redis_client, None)
+    assert len(docs) == 4
+
+
+def test_failed_attempt_pages_are_fetched_again() -> None:
+    site = FakeSite()
+    redis_client = InMemoryTenantRedis()
+    _crawl(site, redis_client, (0, 100))
+
+    site.versions["b"] = 2
+    assert [doc.id for doc in _crawl(site, redis_client, (40, 200))] == [
+        f"{_BASE_URL}b"
+    ]
+
+    # the attempt failed, so the next one reuses its window and b, which may not
+    # have been indexed, isn't skipped as unchanged
+    assert [doc.id for doc in _crawl(site, redis_client, (40, 200))] == [
+        f"{_BASE_URL}b"
+    ]
+
+
+def test_reindex_from_beginning_fetches_every_page() -> None:
+    site = FakeSite()
+    redis_client = InMemoryTenantRedis()
+    _crawl(site, redis_client, (0, 100))
+    _crawl(site, redis_client, (40, 200))
+
+    # the window of a from beginning attempt starts at the connector's indexing
+    # start when it has one
+    site.requests = []
+    docs = _crawl(site, redis_client, (140, 300), from_beginning=True)
+    assert len(docs) == 4
+    assert all(status == 200 for _, status in site.requests)
+
+
+def test_crawl_state_is_kept_per_search_settings() -> None:
+    site = FakeSite()
+    redis_client = InMemoryTenantRedis()
+    _crawl(site, redis_client, (0, 100))
+    _crawl(site, redis_client, (40, 200))
+
+    # e.g. a secondary index being built doesn't use the validators of the primary
+    site.requests = []
+    docs = _crawl(site, redis_client, (40, 200), search_settings_id=2)
+    assert len(docs) == 4
+    assert all(status == 200 for _, status in site.requests)
+
+
+def test_redirected_page_keeps_its_url() -> None:
+    site = FakeSite()
+    site.pages[""] = ["moved"]
+    site.redirects["moved"] = "c"
+
+    docs = _crawl(site, InMemoryTenantRedis(), None)
+
+    assert sorted(doc.id for doc in docs) == [_BASE_URL, f"{_BASE_URL}moved"]
+
+
+def _frontier(redis_client: InMemoryTenantRedis) -> CrawlFrontier:
+    return CrawlFrontier(CrawlState(redis_client, "key", ttl=60))
+
+
+def test_frontier_resumes_pending_urls() -> None:
+    redis_client = InMemoryTenantRedis()
+
+    frontier = _frontier(redis_client)
+    assert not frontier.resume()
+    assert frontier.add(["a", "b", "a"]) == ["a", "b"]
+    first = frontier.pop()
+    second = frontier.pop()
+    assert first is not None and second is not None
+    frontier.complete([first])
+    frontier.add(["c"])
+
+    resumed = _frontier(redis_client)
+    assert resumed.resume()
+    # the popped but not completed URL is crawled again
+    assert sorted(url for url in iter(resumed.pop, None)) == sorted([second, "c"])
+    assert resumed.add([first, "d"]) == ["d"]
+
+    resumed.clear()
+    assert not _frontier(redis_client).resume()
+
+
+def test_crawl_state_keys_are_tenant_scoped() -> None:
+    redis_client = InMemoryTenantRedis("tenant1")
+    site = FakeSite()
+    site.versions["b"] = 2
+
+    frontier = _frontier(redis_client)
+    frontier.add(["a", "b"])
+    frontier.complete(["a"])
+    _crawl(site, redis_client, (0, 100))
+
+    # direct commands, pipelines and hscan_iter all use the same keys
+    assert redis_client.data
+    assert all(key.startswith(b"tenant1:") for key in redis_client.data)
+    assert _frontier(redis_client).resume()
+
+    _frontier(redis_client).clear()
+    assert not _frontier(redis_client).resume()
+    assert not any(
+        key.endswith((b":seen", b":pending")) and value
+        for key, value in redis_client.data.items()
+    )
+
+
+def test_host_rate_limiter() -> None:
+    limiter = HostRateLimiter(max_concurrent_per_host=2, min_interval=0.05)
+    lock = threading.Lock()
+    active: dict[str, int] = {}
+    max_active: dict[str, int] = {}
+    start_times: list[float] = []
+
+    def fetch(url: str) -> None:
+        host = url.split("/")[2]
+        with limiter.limit(url):
+            with lock:
+                active[host] = active.get(host, 0) + 1
+                max_active[host] = max(max_active.get(host, 0), active[host])
+                if host == "a.com":
+                    start_times.append(time.monotonic())
+            time.sleep(0.05)
+            with lock:
+                active[host] -= 1
+
+    threads = [
+        threading.Thread(target=fetch, args=(f"https://{host}/{i}",))
+        for i in range(6)
+        for host in ("a.com", "b.com")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert max_active == {"a.com": 2, "b.com": 2}
+    start_times.sort()
+    assert all(
+        later - earlier >= 0.045 for earlier, later in zip(start_times, start_times[1:])
+    )
+
+
+@pytest.mark.parametrize(
+    "has_scripts,text,expected",
+    [
+        (True, "", True),
+        (False, "", False),
+        (True, "x" * 300, False),
+        (False, "You have JavaScript disabled in your browser", True),
+    ],
+)
+def test_page_needs_javascript(has_scripts: bool, text: str, expected: bool) -> None:
+    assert page_needs_javascript(has_scripts, text, 200) == expected
@@ -0,0 +1,121 @@
+from unittest.mock import patch
+
+import pytest
+
+from onyx.configs.constants import DocumentSource
+from onyx.context.search.models import InferenceChunk
+from onyx.context.search.models import RerankingDetails
+from onyx.context.search.postprocessing.postprocessing import semantic_reranking
+
+_MODULE = "onyx.context.search.postprocessing.postprocessing"
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.values: dict[str, bytes] = {}
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def execute(self) -> None:
+        pass
+
+    def set(self, key: str, value: str, ex: int) -> None:
+        self.values[key] = value.encode()
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        return [self.values.get(key) for key in keys]
+
+
+class FakeRerankingModel:
+    def __init__(self, scores_by_content: dict[str, float]) -> None:
+        self.scores_by_content = scores_by_content
+        self.calls: list[list[str]] = []
+
+    def predict(self, query: str, passages: list[str]) -> list[float]:
+        contents = [passage.split("\n", 1)[1] for passage in passages]
+        self.calls.append(contents)
+        return [self.scores_by_content[content] for content in contents]
+
+
+def _chunk(content: str) -> InferenceChunk:
+    return InferenceChunk(
+        chunk_id=0,
+        document_id=content,
+        semantic_identifier=content,
+        title=None,
+        blurb=content,
+        content=content,
+        source_links={0: "fake_link"},
+        section_continuation=False,
+        source_type=DocumentSource.WEB,
+        boost=0,
+        recency_bias=1.0,
+        score=None,
+        hidden=False,
+        metadata={},
+        match_highlights=[],
+        updated_at=None,
+        image_file_id=None,
+        doc_summary="",
+        chunk_context="",
+    )
+
+
+def _rerank(
+    model: FakeRerankingModel,
+    redis_client: FakeRedis,
+    query: str,
+    contents: list[str],
+    num_rerank: int,
+) -> list[str]:
+    with (
+        patch(f"{_MODULE}.RerankingModel", return_value=model),
+        patch(f"{_MODULE}.get_redis_client", return_value=redis_client),
+    ):
+        ranked_chunks, _ = semantic_reranking(
+            query_str=query,
+            rerank_settings=RerankingDetails(
+                rerank_model_name="model",
+                rerank_api_url=None,
+                rerank_provider_type=None,
+                num_rerank=num_rerank,
+            ),
+            chunks=[_chunk(content) for content in contents],
+        )
+    return [chunk.content for chunk in ranked_chunks]
+
+
+def test_only_uncached_chunks_are_reranked() -> None:
+    model = FakeRerankingModel({"a": 0.1, "b": 0.9, "c": 0.5, "d": 0.3})
+    redis_client = FakeRedis()
+
+    assert _rerank(model, redis_client, "q", ["a", "b", "c"], 3) == ["b", "c", "a"]
+    assert _rerank(model, redis_client, "q", ["c", "d", "b"], 3) == ["b", "c", "d"]
+    assert model.calls == [["a", "b", "c"], ["d"]]
+
+    # scores are per query
+    _rerank(model, redis_client, "other q", ["a"], 3)
+    assert model.calls[-1] == ["a"]
+
+
+@pytest.mark.parametrize(
+    "scores,expected_calls",
+    [
+        # the first 2 scores clearly tell the chunks apart
+        ([0.9, 0.1, 0.5, 0.5, 0.5], [["0", "1"]]),
+        # flat scores, more and more chunks are reranked
+        ([0.5, 0.5, 0.5, 0.5, 0.9], [["0", "1"], ["2", "3"], ["4"]]),
+    ],
+)
+def test_adaptive_reranking(
+    scores: list[float], expected_calls: list[list[str]]
+) -> None:
+    model = FakeRerankingModel({str(ind): score for ind, score in enumerate(scores)})
+    with patch(f"{_MODULE}.RERANK_ADAPTIVE_INITIAL_COUNT", 2):
+        ranked = _rerank(model, FakeRedis(), "q", ["0", "1", "2", "3", "4", "5"], 5)
+
+    assert model.calls == expected_calls
+    num_reranked = sum(len(call) for call in expected_calls)
+    assert len(ranked) == num_reranked
+    assert ranked[0] == str(scores.index(max(scores[:num_reranked])))
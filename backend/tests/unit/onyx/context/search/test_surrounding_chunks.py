@@ -0,0 +1,144 @@
+from typing import Any
+from unittest.mock import MagicMock
+
+from onyx.configs.constants import DocumentSource
+from onyx.context.search.enums import LLMEvaluationType
+from onyx.context.search.enums import SearchType
+from onyx.context.search.models import IndexFilters
+from onyx.context.search.models import InferenceChunkUncleaned
+from onyx.context.search.models import SearchQuery
+from onyx.context.search.retrieval.search_runner import doc_index_retrieval
+from onyx.context.search.retrieval.search_runner import SurroundingChunks
+from onyx.document_index.interfaces import VespaChunkRequest
+
+_CHUNKS_PER_DOC = 10
+
+
+def _chunk(
+    document_id: str,
+    chunk_id: int,
+    score: float | None = None,
+    large_chunk_reference_ids: list[int] | None = None,
+) -> InferenceChunkUncleaned:
+    return InferenceChunkUncleaned(
+        chunk_id=chunk_id,
+        document_id=document_id,
+        semantic_identifier=document_id,
+        title="title",
+        blurb="",
+        content=f"title\n{document_id} chunk {chunk_id}",
+        source_links={0: "fake_link"},
+        section_continuation=False,
+        source_type=DocumentSource.WEB,
+        boost=0,
+        recency_bias=1.0,
+        score=score,
+        hidden=False,
+        metadata={},
+        match_highlights=[],
+        updated_at=None,
+        image_file_id=None,
+        doc_summary="",
+        chunk_context="",
+        metadata_suffix=None,
+        large_chunk_reference_ids=large_chunk_reference_ids or [],
+    )
+
+
+class FakeDocumentIndex:
+    def __init__(self, hits: list[InferenceChunkUncleaned]) -> None:
+        self.hits = hits
+        self.chunk_requests: list[list[VespaChunkRequest]] = []
+
+    def hybrid_retrieval(
+        self, *args: Any, **kwargs: Any
+    ) -> list[InferenceChunkUncleaned]:
+        return self.hits
+
+    def id_based_retrieval(
+        self,
+        chunk_requests: list[VespaChunkRequest],
+        filters: IndexFilters,
+        batch_retrieval: bool = False,
+    ) -> list[InferenceChunkUncleaned]:
+        self.chunk_requests.append(chunk_requests)
+        return [
+            _chunk(request.document_id, chunk_id)
+            for request in chunk_requests
+            for chunk_id in range(
+                request.min_chunk_ind or 0,
+                min((request.max_chunk_ind or 0) + 1, _CHUNKS_PER_DOC),
+            )
+        ]
+
+
+def _query() -> SearchQuery:
+    return SearchQuery(
+        query="query",
+        processed_keywords=["query"],
+        search_type=SearchType.SEMANTIC,
+        evaluation_type=LLMEvaluationType.SKIP,
+        filters=IndexFilters(access_control_list=None),
+        chunks_above=1,
+        chunks_below=1,
+        rerank_settings=None,
+        hybrid_alpha=0.5,
+        recency_bias_multiplier=1.0,
+        max_llm_filter_sections=0,
+        precomputed_query_embedding=[0.0],
+        original_query=None,
+    )
+
+
+def test_surrounding_chunks_are_fetched_with_large_chunk_references() -> None:
+    document_index = FakeDocumentIndex(
+        [
+            _chunk("a", 100, score=0.9, large_chunk_reference_ids=[4, 5, 6, 7]),
+            _chunk("a", 1, score=0.8),
+            _chunk("b", 9, score=0.7),
+        ]
+    )
+    surrounding_chunks = SurroundingChunks()
+
+    chunks = doc_index_retrieval(
+        _query(), document_index, MagicMock(), surrounding_chunks  # type: ignore
+    )
+
+    # only the retrieved chunks and the ones referenced by the large chunk
+    assert [(chunk.document_id, chunk.chunk_id) for chunk in chunks] == [
+        ("a", 4),
+        ("a", 5),
+        ("a", 6),
+        ("a", 7),
+        ("a", 1),
+        ("b", 9),
+    ]
+    assert chunks[0].score == 0.9
+    assert chunks[0].content == "a chunk 4"
+
+    # a single call for both the references and the surrounding chunks
+    assert [
+        (request.document_id, request.min_chunk_ind, request.max_chunk_ind)
+        for request in document_index.chunk_requests[0]
+    ] == [("a", 0, 8), ("b", 8, 10)]
+    assert len(document_index.chunk_requests) == 1
+
+    assert surrounding_chunks.covers("a", 0, 2)
+    assert surrounding_chunks.covers("a", 4, 6)
+    assert surrounding_chunks.covers("b", 8, 10)
+    assert not surrounding_chunks.covers("a", 8, 10)
+    assert surrounding_chunks.chunks[("a", 8)].content == "a chunk 8"
+    assert ("b", 10) not in surrounding_chunks.chunks
+
+
+def test_no_extra_call_without_large_chunks() -> None:
+    document_index = FakeDocumentIndex([_chunk("a", 1, score=0.8)])
+    surrounding_chunks = SurroundingChunks()
+
+    chunks = doc_index_retrieval(
+        _query(), document_index, MagicMock(), surrounding_chunks  # type: ignore
+    )
+
+    assert [chunk.chunk_id for chunk in chunks] == [1]
+    assert not document_index.chunk_requests
+    assert not surrounding_chunks.covers("a", 0, 2)
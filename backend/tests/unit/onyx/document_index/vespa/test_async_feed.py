@@ -0,0 +1,196 @@
+import asyncio
+import json
+from collections import Counter
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterator
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from onyx.access.models import DocumentAccess
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import TextSection
+from onyx.document_index.vespa.indexing_utils import async_batch_index_vespa_chunks
+from onyx.document_index.vespa_constants import DOCUMENT_ID
+from onyx.indexing.models import ChunkEmbedding
+from onyx.indexing.models import DocMetadataAwareIndexChunk
+
+_MODULE = "onyx.document_index.vespa.indexing_utils"
+
+_Handler = Callable[[str, httpx.Request], Awaitable[httpx.Response]]
+
+
+def _make_chunks(num_docs: int) -> list[DocMetadataAwareIndexChunk]:
+    chunks = []
+    for i in range(num_docs):
+        document = Document(
+            id=f"doc_{i}",
+            source=DocumentSource.WEB,
+            semantic_identifier=f"doc {i}",
+            metadata={},
+            sections=[TextSection(text="text", link="link")],
+        )
+        chunks.append(
+            DocMetadataAwareIndexChunk(
+                chunk_id=0,
+                blurb="blurb",
+                content="content",
+                source_links={0: "link"},
+                image_file_id=None,
+                section_continuation=False,
+                source_document=document,
+                title_prefix="",
+                metadata_suffix_semantic="",
+                metadata_suffix_keyword="",
+                contextual_rag_reserved_tokens=0,
+                doc_summary="",
+                chunk_context="",
+                mini_chunk_texts=None,
+                large_chunk_id=None,
+                embeddings=ChunkEmbedding(
+                    full_embedding=[0.1, 0.2], mini_chunk_embeddings=[]
+                ),
+                title_embedding=None,
+                tenant_id="public",
+                access=DocumentAccess.build(
+                    user_emails=[],
+                    user_groups=[],
+                    external_user_emails=[],
+                    external_user_group_ids=[],
+                    is_public=True,
+                ),
+                document_sets=set(),
+                user_file=None,
+                user_folder=None,
+                boost=0,
+                aggregated_chunk_boost_factor=1.0,
+            )
+        )
+    return chunks
+
+
+class _MockVespa:
+    """Hands out AsyncClients backed by a mock transport and tracks how many
+    requests are in flight, in total and per client."""
+
+    def __init__(self, handler: _Handler) -> None:
+        self.handler = handler
+        self.client_max_connections: list[int | None] = []
+        self.calls: Counter[str] = Counter()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.client_in_flight: Counter[int] = Counter()
+        self.client_peak_in_flight: Counter[int] = Counter()
+
+    def get_client(
+        self, no_timeout: bool = False, max_connections: int | None = None
+    ) -> httpx.AsyncClient:
+        client_index = len(self.client_max_connections)
+        self.client_max_connections.append(max_connections)
+
+        async def _handle(request: httpx.Request) -> httpx.Response:
+            doc_id = json.loads(request.content)["fields"][DOCUMENT_ID]
+            self.calls[doc_id] += 1
+            self.in_flight += 1
+            self.client_in_flight[client_index] += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            self.client_peak_in_flight[client_index] = max(
+                self.client_peak_in_flight[client_index],
+                self.client_in_flight[client_index],
+            )
+            try:
+                return await self.handler(doc_id, request)
+            finally:
+                self.in_flight -= 1
+                self.client_in_flight[client_index] -= 1
+
+        return httpx.AsyncClient(transport=httpx.MockTransport(_handle))
+
+
+@contextmanager
+def _mock_vespa(handler: _Handler) -> Iterator[_MockVespa]:
+    mock_vespa = _MockVespa(handler)
+    with (
+        patch(f"{_MODULE}.get_vespa_async_http_client", mock_vespa.get_client),
+        patch(f"{_MODULE}._ASYNC_FEED_INITIAL_DELAY", 0),
+    ):
+        yield mock_vespa
+
+
+def _feed(num_docs: int, max_in_flight: int) -> None:
+    async_batch_index_vespa_chunks(
+        _make_chunks(num_docs),
+        index_name="test_index",
+        multitenant=False,
+        max_in_flight=max_in_flight,
+    )
+
+
+async def _ok(doc_id: str, request: httpx.Request) -> httpx.Response:
+    # yield to the event loop so the other requests in flight get to start
+    await asyncio.sleep(0.001)
+    return httpx.Response(200, json={})
+
+
+def test_transient_errors_are_retried() -> None:
+    async def _handler(doc_id: str, request: httpx.Request) -> httpx.Response:
+        if doc_id == "doc_1" and mock_vespa.calls[doc_id] <= 2:
+            return httpx.Response(429 if mock_vespa.calls[doc_id] == 1 else 503)
+        if doc_id == "doc_2" and mock_vespa.calls[doc_id] == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return await _ok(doc_id, request)
+
+    with _mock_vespa(_handler) as mock_vespa:
+        _feed(num_docs=3, max_in_flight=4)
+
+    assert mock_vespa.calls == {"doc_0": 1, "doc_1": 3, "doc_2": 2}
+
+
+def test_gives_up_after_max_tries() -> None:
+    async def _handler(doc_id: str, request: httpx.Request) -> httpx.Response:
+        return httpx.Response(503)
+
+    with _mock_vespa(_handler) as mock_vespa:
+        with pytest.raises(httpx.HTTPStatusError):
+            _feed(num_docs=1, max_in_flight=4)
+
+    assert mock_vespa.calls == {"doc_0": 5}
+
+
+@pytest.mark.parametrize("status_code", [400, 507])
+def test_non_retryable_status_fails_the_feed(status_code: int) -> None:
+    async def _handler(doc_id: str, request: httpx.Request) -> httpx.Response:
+        if doc_id == "doc_0":
+            return httpx.Response(status_code)
+        return await _ok(doc_id, request)
+
+    with _mock_vespa(_handler) as mock_vespa:
+        with pytest.raises(httpx.HTTPStatusError) as exc_info:
+            _feed(num_docs=10, max_in_flight=1)
+
+    assert exc_info.value.response.status_code == status_code
+    # the failing request is not retried and no new requests are started after it
+    assert mock_vespa.calls == {"doc_0": 1}
+
+
+def test_in_flight_requests_are_capped() -> None:
+    with _mock_vespa(_ok) as mock_vespa:
+        _feed(num_docs=50, max_in_flight=10)
+
+    assert sum(mock_vespa.calls.values()) == 50
+    assert mock_vespa.peak_in_flight == 10
+
+
+def test_requests_are_spread_over_several_pools() -> None:
+    with _mock_vespa(_ok) as mock_vespa:
+        _feed(num_docs=50, max_in_flight=20)
+
+    # 8 connections per client
+    assert mock_vespa.client_max_connections == [8, 8, 4]
+    assert mock_vespa.peak_in_flight == 20
+    for client_index, max_connections in enumerate(mock_vespa.client_max_connections):
+        assert mock_vespa.client_peak_in_flight[client_index] == max_connections
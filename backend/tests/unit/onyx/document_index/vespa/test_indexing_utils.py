@@ -0,0 +1,87 @@
+from onyx.access.models import DocumentAccess
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import TextSection
+from onyx.document_index.vespa.indexing_utils import _build_vespa_chunk_url_and_fields
+from onyx.document_index.vespa.indexing_utils import (
+    build_vespa_document_fields_by_id,
+)
+from onyx.document_index.vespa_constants import BLURB
+from onyx.document_index.vespa_constants import CONTENT
+from onyx.document_index.vespa_constants import CONTENT_SUMMARY
+from onyx.document_index.vespa_constants import METADATA
+from onyx.document_index.vespa_constants import METADATA_LIST
+from onyx.document_index.vespa_constants import METADATA_SUFFIX
+from onyx.document_index.vespa_constants import SEMANTIC_IDENTIFIER
+from onyx.document_index.vespa_constants import TITLE
+from onyx.indexing.models import ChunkEmbedding
+from onyx.indexing.models import DocMetadataAwareIndexChunk
+
+
+def _make_chunk(document: Document, chunk_id: int) -> DocMetadataAwareIndexChunk:
+    return DocMetadataAwareIndexChunk(
+        chunk_id=chunk_id,
+        blurb="blurb\x00 text",
+        content="chunk\ufddb content",
+        source_links={0: "link"},
+        image_file_id=None,
+        section_continuation=False,
+        source_document=document,
+        title_prefix="title\x0b prefix\n",
+        metadata_suffix_semantic="",
+        metadata_suffix_keyword="\nkeyword\ufffe suffix",
+        contextual_rag_reserved_tokens=0,
+        doc_summary="",
+        chunk_context="",
+        mini_chunk_texts=None,
+        large_chunk_id=None,
+        embeddings=ChunkEmbedding(full_embedding=[0.1, 0.2], mini_chunk_embeddings=[]),
+        title_embedding=None,
+        tenant_id="public",
+        access=DocumentAccess.build(
+            user_emails=[],
+            user_groups=[],
+            external_user_emails=[],
+            external_user_group_ids=[],
+            is_public=True,
+        ),
+        document_sets=set(),
+        user_file=None,
+        user_folder=None,
+        boost=0,
+        aggregated_chunk_boost_factor=1.0,
+    )
+
+
+def test_build_vespa_chunk_fields_removes_invalid_unicode() -> None:
+    document = Document(
+        id="doc",
+        source=DocumentSource.WEB,
+        semantic_identifier="semantic\x00 identifier",
+        title="doc\ufdd0 title",
+        metadata={"key\x01": ["value\x02", "other"], "single": "value\ufffe"},
+        sections=[TextSection(text="text", link="link")],
+    )
+    chunks = [_make_chunk(document, 0), _make_chunk(document, 1)]
+
+    document_fields_by_id = build_vespa_document_fields_by_id(chunks)
+    assert list(document_fields_by_id.keys()) == ["doc"]
+
+    for chunk in chunks:
+        _, fields = _build_vespa_chunk_url_and_fields(
+            chunk, "danswer_chunk", False, document_fields_by_id["doc"]
+        )
+        # building the document fields inline gives the same result
+        _, inline_fields = _build_vespa_chunk_url_and_fields(
+            chunk, "danswer_chunk", False
+        )
+        assert fields == inline_fields
+
+        assert fields[TITLE] == "doc title"
+        assert fields[SEMANTIC_IDENTIFIER] == "semantic identifier"
+        assert fields[METADATA] == '{"key": ["value", "other"], "single": "value"}'
+        assert all("\x02" not in item for item in fields[METADATA_LIST])
+        assert fields[BLURB] == "blurb text"
+        assert fields[CONTENT_SUMMARY] == "chunk content"
+        assert fields[METADATA_SUFFIX] == "\nkeyword suffix"
+        assert fields[CONTENT] == "title prefix\nchunk content\nkeyword suffix"
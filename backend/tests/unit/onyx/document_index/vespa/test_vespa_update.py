@@ -0,0 +1,75 @@
+import json
+from collections import Counter
+from unittest.mock import patch
+
+import httpx
+
+from onyx.document_index.interfaces import MinimalDocumentIndexingInfo
+from onyx.document_index.interfaces import UpdateRequest
+from onyx.document_index.vespa.index import VespaIndex
+
+# the boost of each document decides how the mocked Vespa answers its chunk updates
+_OK = 0
+_BAD_REQUEST = 1
+_UNAVAILABLE_ONCE = 2
+_UNAVAILABLE = 3
+_CONNECT_ERROR_ONCE = 4
+
+
+def _update_request(doc_id: str, boost: int) -> UpdateRequest:
+    return UpdateRequest(
+        minimal_document_indexing_info=[
+            MinimalDocumentIndexingInfo(doc_id=doc_id, chunk_start_index=2)
+        ],
+        boost=boost,
+    )
+
+
+def test_update_returns_failed_docs_and_only_retries_transient_errors() -> None:
+    calls: Counter[str] = Counter()
+    calls_by_boost: Counter[int] = Counter()
+
+    def _handler(request: httpx.Request) -> httpx.Response:
+        url = str(request.url)
+        boost = json.loads(request.content)["fields"]["boost"]["assign"]
+        calls[url] += 1
+        calls_by_boost[boost] += 1
+
+        if boost == _BAD_REQUEST:
+            return httpx.Response(400, json={"message": "bad request"})
+        if boost == _UNAVAILABLE or (boost == _UNAVAILABLE_ONCE and calls[url] == 1):
+            return httpx.Response(503)
+        if boost == _CONNECT_ERROR_ONCE and calls[url] == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={})
+
+    index = VespaIndex(
+        index_name="test_index",
+        secondary_index_name=None,
+        large_chunks_enabled=False,
+        secondary_large_chunks_enabled=None,
+        httpx_client=httpx.Client(transport=httpx.MockTransport(_handler)),
+    )
+
+    with patch("retry.api.time.sleep"):
+        failed_doc_ids = index.update(
+            [
+                _update_request("doc_1", _OK),
+                _update_request("doc'2", _BAD_REQUEST),
+                _update_request("doc_3", _UNAVAILABLE_ONCE),
+                _update_request("doc_4", _UNAVAILABLE),
+                _update_request("doc_5", _CONNECT_ERROR_ONCE),
+            ],
+            tenant_id="public",
+        )
+
+    # failed docs are reported with their original, uncleaned ids
+    assert failed_doc_ids == {"doc'2", "doc_4"}
+
+    # every document has 2 chunks
+    assert calls_by_boost[_OK] == 2
+    # a bad request is not retried
+    assert calls_by_boost[_BAD_REQUEST] == 2
+    assert calls_by_boost[_UNAVAILABLE_ONCE] == 4
+    assert calls_by_boost[_UNAVAILABLE] == 2 * 3
+    assert calls_by_boost[_CONNECT_ERROR_ONCE] == 4
@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+from datetime import timezone
+from io import BytesIO
+from types import SimpleNamespace
+from typing import Any
+from typing import IO
+
+from onyx.configs.constants import DocumentSource
+from onyx.configs.constants import FileOrigin
+from onyx.connectors.models import Document
+from onyx.connectors.models import ImageSection
+from onyx.connectors.models import TextSection
+from onyx.file_store.document_batch_storage import FileStoreDocumentBatchStorage
+
+
+class InMemoryFileStore:
+    def __init__(self) -> None:
+        self.files: dict[str, tuple[bytes, str]] = {}
+
+    def save_file(
+        self,
+        content: IO,
+        display_name: str | None,
+        file_origin: FileOrigin,
+        file_type: str,
+        file_metadata: dict[str, Any] | None = None,
+        file_id: str | None = None,
+    ) -> str:
+        assert file_id is not None
+        self.files[file_id] = (content.read(), file_type)
+        return file_id
+
+    def has_file(self, file_id: str, file_origin: FileOrigin, file_type: str) -> bool:
+        return file_id in self.files and self.files[file_id][1] == file_type
+
+    def read_file(self, file_id: str) -> IO[bytes]:
+        return BytesIO(self.files[file_id][0])
+
+    def delete_file(self, file_id: str) -> None:
+        del self.files[file_id]
+
+    def change_file_id(self, old_file_id: str, new_file_id: str) -> None:
+        self.files[new_file_id] = self.files.pop(old_file_id)
+
+    def list_files_by_prefix(self, prefix: str) -> list[SimpleNamespace]:
+        return [
+            SimpleNamespace(file_id=file_id)
+            for file_id in self.files
+            if file_id.startswith(prefix)
+        ]
+
+
+def _storage(
+    file_store: InMemoryFileStore, index_attempt_id: int = 10
+) -> FileStoreDocumentBatchStorage:
+    return FileStoreDocumentBatchStorage(1, index_attempt_id, file_store)  # type: ignore
+
+
+def _document(ind: int) -> Document:
+    return Document(
+        id=f"doc_{ind}",
+        source=DocumentSource.CONFLUENCE,
+        semantic_identifier=f"Page {ind}",
+        metadata={"labels": ["a", "b"], "space": "eng"},
+        doc_updated_at=datetime(2025, 1, ind + 1, tzinfo=timezone.utc),
+        sections=[
+            TextSection(text="some text " * 100 + "\u00e9\u6f22", link=f"link_{ind}"),
+            ImageSection(image_file_id=f"image_{ind}"),
+        ],
+    )
+
+
+def test_store_and_get_batch_round_trip() -> None:
+    file_store = InMemoryFileStore()
+    storage = _storage(file_store)
+    documents = [_document(ind) for ind in range(20)]
+
+    storage.store_batch(3, documents)
+    assert list(file_store.files) == ["iab/1/10/3.msgpack.zst"]
+    assert storage.get_batch(3) == documents
+
+    documents_iter = storage.iter_batch(3)
+    assert documents_iter is not None
+    assert next(documents_iter) == documents[0]
+
+    assert storage.get_batch(4) is None
+    storage.delete_batch_by_num(3)
+    assert not file_store.files
+
+
+def test_legacy_json_batches_are_still_read() -> None:
+    file_store = InMemoryFileStore()
+    documents = [_document(ind) for ind in range(3)]
+    file_store.files["iab/1/9/0.json"] = (
+        json.dumps([doc.model_dump(mode="json") for doc in documents]).encode(),
+        "application/json",
+    )
+
+    # batches left over from a previous attempt keep their format when moved over
+    storage = _storage(file_store)
+    storage.update_old_batches_to_new_index_attempt(
+        storage.get_all_batches_for_cc_pair()
+    )
+    assert list(file_store.files) == ["iab/1/10/0.json"]
+    assert storage.get_batch(0) == documents
+
+    storage.delete_batch_by_num(0)
+    assert not file_store.files
@@ -0,0 +1,106 @@
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from unittest.mock import MagicMock
+
+from onyx.access.models import ExternalAccess
+from onyx.configs.constants import DocumentSource
+from onyx.connectors.models import Document
+from onyx.connectors.models import TextSection
+from onyx.db.models import Document as DBDocument
+from onyx.indexing.content_fingerprint import compute_content_fingerprint
+from onyx.indexing.indexing_pipeline import _update_unchanged_documents_in_index
+
+
+def _make_document(**kwargs: object) -> Document:
+    fields: dict = dict(
+        id="doc_1",
+        source=DocumentSource.WEB,
+        semantic_identifier="Doc 1",
+        title="Doc 1",
+        metadata={"tags": ["a", "b"]},
+        sections=[TextSection(text="Some text", link="https://onyx.app")],
+    )
+    fields.update(kwargs)
+    return Document(**fields)
+
+
+def test_content_fingerprint_changes_with_content() -> None:
+    fingerprint = compute_content_fingerprint(_make_document(), "config")
+
+    assert fingerprint == compute_content_fingerprint(_make_document(), "config")
+    assert fingerprint != compute_content_fingerprint(_make_document(), "config_2")
+    assert fingerprint != compute_content_fingerprint(
+        _make_document(sections=[TextSection(text="Other", link="https://onyx.app")]),
+        "config",
+    )
+    assert fingerprint != compute_content_fingerprint(
+        _make_document(metadata={"tags": ["a"]}), "config"
+    )
+    assert fingerprint != compute_content_fingerprint(
+        _make_document(title="Doc 2"), "config"
+    )
+
+
+def test_content_fingerprint_ignores_access_and_fetch_time() -> None:
+    fingerprint = compute_content_fingerprint(_make_document(), "config")
+
+    assert fingerprint == compute_content_fingerprint(
+        _make_document(
+            doc_updated_at=datetime.now(timezone.utc),
+            external_access=ExternalAccess(
+                external_user_emails={"user@onyx.app"},
+                external_user_group_ids=set(),
+                is_public=False,
+            ),
+        ),
+        "config",
+    )
+
+
+def test_unchanged_documents_get_their_update_time_in_the_index() -> None:
+    indexed_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    updated_at = indexed_at + timedelta(days=1)
+    unchanged_docs = [
+        _make_document(id="doc_1", doc_updated_at=updated_at),
+        _make_document(id="doc_2", doc_updated_at=indexed_at),
+        _make_document(id="doc_3"),
+    ]
+    id_to_db_doc_map = {
+        doc.id: DBDocument(id=doc.id, chunk_count=3, doc_updated_at=indexed_at)
+        for doc in unchanged_docs
+    }
+    document_index = MagicMock()
+    document_index.update.return_value = {"doc_1"}
+
+    failed_doc_ids = _update_unchanged_documents_in_index(
+        unchanged_docs=unchanged_docs,
+        id_to_db_doc_map=id_to_db_doc_map,
+        document_index=document_index,
+        tenant_id="tenant",
+    )
+
+    assert failed_doc_ids == {"doc_1"}
+    (update_requests,), kwargs = document_index.update.call_args
+    assert kwargs == {"tenant_id": "tenant"}
+    # only the document whose update time actually changed
+    assert len(update_requests) == 1
+    assert update_requests[0].doc_updated_at == updated_at
+    assert update_requests[0].access is None
+    [doc_info] = update_requests[0].minimal_document_indexing_info
+    assert (doc_info.doc_id, doc_info.chunk_start_index) == ("doc_1", 3)
+
+
+def test_unchanged_documents_with_same_update_time_skip_the_index() -> None:
+    document_index = MagicMock()
+
+    assert (
+        _update_unchanged_documents_in_index(
+            unchanged_docs=[_make_document()],
+            id_to_db_doc_map={"doc_1": DBDocument(id="doc_1", chunk_count=3)},
+            document_index=document_index,
+            tenant_id="tenant",
+        )
+        == set()
+    )
+    document_index.update.assert_not_called()
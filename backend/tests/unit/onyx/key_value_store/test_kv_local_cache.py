@@ -0,0 +1,135 @@
+import json
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+import pytest
+
+from onyx.db.models import KVStore
+from onyx.key_value_store.interface import KvKeyNotFoundError
+from onyx.key_value_store.local_cache import KVLocalCache
+from onyx.key_value_store.store import PgRedisKVStore
+from onyx.key_value_store.store import REDIS_KEY_PREFIX
+
+_MODULE = "onyx.key_value_store.store"
+
+
+class FakeRedis:
+    def __init__(self, values: dict[str, Any]) -> None:
+        self.values = {
+            REDIS_KEY_PREFIX + key: json.dumps(value).encode()
+            for key, value in values.items()
+        }
+        self.calls: list[str] = []
+
+    def get(self, key: str) -> bytes | None:
+        self.calls.append("get")
+        return self.values.get(key)
+
+    def mget(self, keys: list[str]) -> list[bytes | None]:
+        self.calls.append("mget")
+        return [self.values.get(key) for key in keys]
+
+    def set(self, key: str, value: str) -> None:
+        self.values[key] = value.encode()
+
+    def pipeline(self, transaction: bool = True) -> "FakeRedis":
+        return self
+
+    def execute(self) -> None:
+        pass
+
+
+def _local_cache(max_entries: int = 100) -> KVLocalCache:
+    cache = KVLocalCache(ttl=60, max_entries=max_entries)
+    # pretend that the invalidation listener is already running
+    cache._listener_pid = os.getpid()
+    cache._subscribed = True
+    return cache
+
+
+@contextmanager
+def _kv_store(
+    redis_values: dict[str, Any], pg_values: dict[str, Any], cache: KVLocalCache
+) -> Iterator[tuple[PgRedisKVStore, FakeRedis, MagicMock]]:
+    redis_client = FakeRedis(redis_values)
+    db_session = MagicMock()
+    db_session.query.return_value.filter.return_value.all.side_effect = lambda: [
+        KVStore(key=key, value=value) for key, value in pg_values.items()
+    ]
+    db_session.query.return_value.filter_by.return_value.first.return_value = None
+
+    @contextmanager
+    def _get_session() -> Iterator[MagicMock]:
+        yield db_session
+
+    with (
+        patch(f"{_MODULE}.kv_local_cache", cache),
+        patch(f"{_MODULE}.get_session_with_current_tenant", _get_session),
+        patch(f"{_MODULE}.get_current_tenant_id", return_value="tenant"),
+    ):
+        yield PgRedisKVStore(redis_client), redis_client, db_session  # type: ignore
+
+
+def test_load_many_then_load_from_memory() -> None:
+    with _kv_store(
+        redis_values={"a": {"x": 1}}, pg_values={"b": [1, 2]}, cache=_local_cache()
+    ) as (kv_store, redis_client, db_session):
+        assert kv_store.load_many(["a", "b", "c"]) == {"a": {"x": 1}, "b": [1, 2]}
+        assert redis_client.calls == ["mget"]
+        assert db_session.query.call_count == 1
+        # backfilled to redis
+        assert REDIS_KEY_PREFIX + "b" in redis_client.values
+
+        assert kv_store.load("a") == {"x": 1}
+        assert kv_store.load("b") == [1, 2]
+        # missing keys are cached too
+        with pytest.raises(KvKeyNotFoundError):
+            kv_store.load("c")
+        assert redis_client.calls == ["mget"]
+        assert db_session.query.call_count == 1
+
+        # values are deserialized on every load so callers can't modify the cache
+        value = kv_store.load("a")
+        value["x"] = 2  # type: ignore
+        assert kv_store.load("a") == {"x": 1}
+
+        assert kv_store.load_many(["a", "b", "c"]) == {"a": {"x": 1}, "b": [1, 2]}
+        assert redis_client.calls == ["mget"]
+
+
+def test_invalidations_from_other_processes() -> None:
+    cache = _local_cache(max_entries=2)
+
+    cache.set("tenant", "a", "1", cache.generation)
+    cache.set("other_tenant", "a", "2", cache.generation)
+    cache._handle_message(
+        json.dumps({"tenant_id": "tenant", "key": "a", "origin": "other"})
+    )
+    assert cache.get("tenant", "a") == (False, None)
+    assert cache.get("other_tenant", "a") == (True, "2")
+
+    # fetched before the invalidation came in, might be outdated
+    generation = cache.generation
+    cache._handle_message(
+        json.dumps({"tenant_id": "tenant", "key": "b", "origin": "other"})
+    )
+    cache.set("tenant", "a", "1", generation)
+    assert cache.get("tenant", "a") == (False, None)
+
+    # least recently used keys are evicted
+    cache.set("tenant", "a", "1", cache.generation)
+    cache.set("tenant", "b", None, cache.generation)
+    assert cache.get("other_tenant", "a") == (False, None)
+    assert cache.get("tenant", "b") == (True, None)
+
+
+def test_nothing_is_cached_while_not_subscribed() -> None:
+    cache = _local_cache()
+    cache._subscribed = False
+
+    cache.set("tenant", "a", "1", cache.generation)
+    assert cache.get("tenant", "a") == (False, None)
@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+from typing import Any
+
+from onyx.kg.clustering.clustering import _cluster_entities
+
+
+def _staging_entity(
+    id_name: str, name: str, document_id: str | None = None, occurrences: int = 1
+) -> Any:
+    return SimpleNamespace(
+        id_name=id_name,
+        name=name,
+        entity_type_id_name="ACCOUNT",
+        document_id=document_id,
+        alternative_names=[],
+        occurrences=occurrences,
+        attributes={"source": id_name},
+        entity_key=None,
+        parent_key=None,
+        event_time=None,
+    )
+
+
+def _entity(id_name: str, name: str, document_id: str | None = None) -> Any:
+    entity = _staging_entity(id_name, name, document_id)
+    entity.attributes = {}
+    return entity
+
+
+def test_cluster_entities() -> None:
+    entities = [
+        # merged into the existing entity
+        _staging_entity("staging_0", "acme corporation", occurrences=2),
+        # merged into the entity created by staging_2
+        _staging_entity("staging_1", "globex industries"),
+        _staging_entity("staging_2", "globex industries"),
+        # names with digits are never merged
+        _staging_entity("staging_3", "version 1"),
+        _staging_entity("staging_4", "version 1"),
+        # document entities aren't merged into entities that have a document
+        _staging_entity("staging_5", "initech", document_id="doc_1"),
+        # but duplicate document entities end up in the same entity
+        _staging_entity("staging_6", "initech", document_id="doc_1"),
+        # document entities are matched by the semantic id of their document, but
+        # keep their own name
+        _staging_entity("staging_7", "Https://Acme.Com/X", document_id="doc_2"),
+        _staging_entity("staging_8", "acme corp homepage"),
+    ]
+    entity_names = [entity.name for entity in entities]
+    entity_names[7] = "acme corp homepage"
+    candidates = [
+        (0, _entity("ACCOUNT::existing_acme", "acme corporation")),
+        (0, _entity("ACCOUNT::existing_other", "umbrella")),
+        (5, _entity("ACCOUNT::existing_initech", "initech", document_id="doc_0")),
+    ]
+
+    result = _cluster_entities(entities, entity_names, candidates)
+    transferred = result.transferred_id_names
+
+    assert transferred["staging_0"] == "ACCOUNT::existing_acme"
+    [merged_entity] = result.merged_entities
+    assert merged_entity.id_name == "ACCOUNT::existing_acme"
+    assert merged_entity.occurrences == 3
+    assert merged_entity.attributes == {"source": "staging_0"}
+
+    assert transferred["staging_1"] == transferred["staging_2"]
+    assert transferred["staging_3"] != transferred["staging_4"]
+    assert transferred["staging_5"] == transferred["staging_6"]
+    assert transferred["staging_5"] != "ACCOUNT::existing_initech"
+
+    new_entities = {entity.id_name: entity for entity in result.new_entities}
+    assert len(new_entities) == 5
+    assert new_entities[transferred["staging_1"]].occurrences == 2
+    assert new_entities[transferred["staging_5"]].occurrences == 2
+    assert transferred["staging_7"] == transferred["staging_8"]
+    assert new_entities[transferred["staging_7"]].name == "https://acme.com/x"
+    assert new_entities[transferred["staging_7"]].alternative_names == [
+        "acme corp homepage"
+    ]
+    assert result.normalized_document_ids == {"doc_1", "doc_2"}
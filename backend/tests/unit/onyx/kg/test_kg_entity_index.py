@@ -0,0 +1,103 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timezone
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from onyx.kg.clustering.entity_index import get_name_trigrams
+from onyx.kg.clustering.entity_index import KGEntityIndex
+from onyx.kg.clustering.normalizations import _clean_name
+from onyx.kg.clustering.normalizations import _normalize_entities_with_index
+
+_MODULE = "onyx.kg.clustering.normalizations"
+
+
+def _row(
+    id_name: str,
+    name: str,
+    document_id: str | None = None,
+    attributes: dict[str, str] | None = None,
+) -> Any:
+    return SimpleNamespace(
+        id_name=id_name,
+        name=name,
+        entity_type_id_name=id_name.split("::")[0],
+        document_id=document_id,
+        attributes=attributes or {},
+        name_trigrams=sorted(get_name_trigrams(_clean_name(name))),
+        time_updated=datetime(2025, 1, 1, tzinfo=timezone.utc),
+    )
+
+
+def _db_session(rows: list[Any], allowed_doc_ids: list[str] = []) -> MagicMock:
+    db_session = MagicMock()
+    db_session.execute.return_value = rows
+    db_session.scalar.return_value = len(rows)
+    db_session.scalars.side_effect = lambda _: iter(allowed_doc_ids)
+    return db_session
+
+
+def test_name_trigrams_match_pg_trgm() -> None:
+    # SELECT show_trgm('ab'), show_trgm('a b')
+    assert get_name_trigrams("ab") == {"  a", " ab", "ab "}
+    assert get_name_trigrams("a b") == {"  a", " a ", "  b", " b "}
+
+
+def test_normalize_entities_with_index() -> None:
+    entity_index = KGEntityIndex()
+    entity_index.refresh(
+        _db_session(
+            [
+                _row("ACCOUNT::acme", "Acme Corp"),
+                _row("ACCOUNT::acne", "Acne Studios"),
+                _row("ACCOUNT::hidden", "Acme Corporation", document_id="doc_1"),
+                _row("JIRA::ticket", "Acme Corp", attributes={"subtype": "bug"}),
+                _row("JIRA::story", "Acme Corp", attributes={"subtype": "story"}),
+            ]
+        ),
+        version="1",
+    )
+
+    db_session = _db_session([], allowed_doc_ids=[])
+
+    @contextmanager
+    def _get_session() -> Iterator[MagicMock]:
+        yield db_session
+
+    with patch(f"{_MODULE}.get_session_with_current_tenant", _get_session):
+        mapping = _normalize_entities_with_index(
+            entity_index,
+            ["ACCOUNT::acme corp.", "ACCOUNT::acme corporation", "JIRA::acme", "*::*"],
+            [{}, {}, {"subtype": "story"}, {}],
+            "allowed_docs_view",
+        )
+
+    # the entity of the document the user can't access is never matched
+    assert mapping == ["ACCOUNT::acme", "ACCOUNT::acme", "JIRA::story", "*::*"]
+    assert db_session.scalars.call_count == 1
+
+
+def test_incremental_refresh() -> None:
+    entity_index = KGEntityIndex()
+    entity_index.refresh(
+        _db_session([_row("ACCOUNT::acme", "Acme"), _row("ACCOUNT::beta", "Beta")]),
+        version="1",
+    )
+
+    db_session = _db_session([_row("ACCOUNT::acme", "Gamma")])
+    db_session.scalar.return_value = 1
+    db_session.scalars.side_effect = lambda _: iter(["ACCOUNT::acme"])
+    entity_index.refresh(db_session, version="2")
+
+    assert len(entity_index) == 1
+    assert entity_index.search("ACCOUNT", get_name_trigrams("beta")) == []
+    assert entity_index.search("ACCOUNT", get_name_trigrams("acme")) == []
+    [(candidate, score)] = entity_index.search("ACCOUNT", get_name_trigrams("gamma"))
+    assert (candidate.id_name, score) == ("ACCOUNT::acme", 1.0)
+
+    # already up to date
+    entity_index.refresh(db_session, version="2")
+    assert db_session.execute.call_count == 1
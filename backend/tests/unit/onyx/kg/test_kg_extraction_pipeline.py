@@ -0,0 +1,228 @@
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from datetime import timezone
+from types import SimpleNamespace
+from typing import Any
+from unittest.mock import MagicMock
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage
+
+from onyx.kg.extractions.extraction_processing import kg_extraction
+from onyx.kg.models import KGChunkFormat
+from onyx.kg.models import KGEnhancedDocumentMetadata
+from onyx.kg.models import KGImpliedExtractionResults
+from onyx.kg.models import KGStagingEntity
+from onyx.kg.utils.llm_budget import KGLLMBudget
+
+_MODULE = "onyx.kg.extractions.extraction_processing"
+_UTILS_MODULE = "onyx.kg.utils.extraction_utils"
+
+_DOC_UPDATED_AT = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class _FakeLLM:
+    """Extracts the same entity from every chunk batch, tracking the concurrency."""
+
+    def __init__(self) -> None:
+        self.num_calls = 0
+        self.max_parallel_calls = 0
+        self._parallel_calls = 0
+        self._lock = threading.Lock()
+
+    def invoke(self, prompt: Any) -> AIMessage:
+        with self._lock:
+            self.num_calls += 1
+            self._parallel_calls += 1
+            self.max_parallel_calls = max(self.max_parallel_calls, self._parallel_calls)
+        time.sleep(0.01)
+        with self._lock:
+            self._parallel_calls -= 1
+        return AIMessage(
+            content=json.dumps(
+                {
+                    "entities": ["ACCOUNT::acme"],
+                    "relationships": ["ACCOUNT::acme__works_with__ACCOUNT::beta"],
+                }
+            )
+        )
+
+
+class _FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _metadata(deep_extraction: bool) -> KGEnhancedDocumentMetadata:
+    return KGEnhancedDocumentMetadata(
+        entity_type="ACCOUNT",
+        metadata_attribute_conversion=None,
+        document_metadata=None,
+        deep_extraction=deep_extraction,
+        classification_enabled=False,
+        classification_instructions=None,
+        skip=False,
+    )
+
+
+def _implied_extraction(document: Any, *_: Any) -> KGImpliedExtractionResults:
+    return KGImpliedExtractionResults(
+        document_entity=f"ACCOUNT::{document.id}",
+        implied_entities=set(),
+        implied_relationships=set(),
+        company_participant_emails=set(),
+        account_participant_emails=set(),
+    )
+
+
+def _chunk_batches(document_id: str, *_: Any) -> Iterator[list[KGChunkFormat]]:
+    for chunk_id in range(2):
+        yield [
+            KGChunkFormat(
+                document_id=document_id,
+                chunk_id=chunk_id,
+                title=document_id,
+                content="Acme works with Beta",
+                primary_owners=[],
+                secondary_owners=[],
+                source_type="web",
+            )
+        ]
+
+
+def test_kg_extraction_pipeline() -> None:
+    documents = [
+        SimpleNamespace(id=f"doc_{i}", doc_updated_at=_DOC_UPDATED_AT)
+        for i in range(20)
+    ]
+    document_batches = [documents[i : i + 8] for i in range(0, len(documents), 8)]
+    fake_llm = _FakeLLM()
+    staged_entities: list[KGStagingEntity] = []
+    staged_relationships: list[tuple[str, str | None]] = []
+
+    @contextmanager
+    def _get_session() -> Iterator[MagicMock]:
+        yield MagicMock()
+
+    def _get_metadata(document_batch: list[Any], *_: Any) -> dict:
+        # every other document is only extracted from its metadata
+        return {
+            document.id: _metadata(deep_extraction=int(document.id[4:]) % 2 == 0)
+            for document in document_batch
+        }
+
+    def _upsert_entities(_: Any, entities: list[KGStagingEntity]) -> list[Any]:
+        staged_entities.extend(entities)
+        return [
+            SimpleNamespace(entity_type_id_name=entity.entity_type, attributes={})
+            for entity in entities
+        ]
+
+    def _upsert_relationships(_: Any, relationships: list[Any]) -> None:
+        staged_relationships.extend(relationships)
+
+    update_documents_kg_info = MagicMock()
+    with (
+        patch.multiple(
+            _MODULE,
+            get_kg_config_settings=MagicMock(),
+            validate_kg_settings=MagicMock(),
+            get_kg_enabled_connectors=MagicMock(
+                return_value=[
+                    SimpleNamespace(id=1, kg_coverage_days=None, source="web")
+                ]
+            ),
+            _get_classification_extraction_instructions=MagicMock(),
+            get_entity_types=MagicMock(
+                return_value=[
+                    SimpleNamespace(
+                        id_name="ACCOUNT",
+                        parsed_attributes=SimpleNamespace(
+                            metadata_attribute_conversion={}
+                        ),
+                    )
+                ]
+            ),
+            get_entity_types_str=MagicMock(return_value=""),
+            get_relationship_types_str=MagicMock(return_value=""),
+            get_session_with_current_tenant=_get_session,
+            get_unprocessed_kg_document_batch_for_connector=MagicMock(
+                side_effect=document_batches + [[]]
+            ),
+            _get_batch_documents_enhanced_metadata=_get_metadata,
+            kg_implied_extraction=_implied_extraction,
+            update_documents_kg_info=update_documents_kg_info,
+            delete_from_kg_relationships__no_commit=MagicMock(),
+            delete_from_kg_entities__no_commit=MagicMock(),
+            upsert_staging_entities=_upsert_entities,
+            upsert_staging_relationship_types=MagicMock(),
+            upsert_staging_relationships=_upsert_relationships,
+            get_skipped_kg_documents=MagicMock(return_value=[]),
+            EntityTypeMetadataTracker=MagicMock(),
+        ),
+        patch.multiple(
+            _UTILS_MODULE,
+            get_document_vespa_contents=_chunk_batches,
+            get_default_llms=MagicMock(return_value=(None, fake_llm)),
+            get_kg_llm_budget=MagicMock(return_value=KGLLMBudget(max_parallel_calls=3)),
+        ),
+    ):
+        kg_extraction("tenant", "index", MagicMock(), processing_chunk_batch_size=8)
+
+    # one call per chunk batch of the deep extracted documents, within the budget
+    assert fake_llm.num_calls == 10 * 2
+    assert 1 < fake_llm.max_parallel_calls <= 3
+
+    document_entities = {
+        entity.document_id: entity for entity in staged_entities if entity.document_id
+    }
+    assert len(document_entities) == 20
+    assert document_entities["doc_3"].event_time == _DOC_UPDATED_AT
+    assert sum(entity.name == "Acme" for entity in staged_entities) == 10
+    assert {document_id for _, document_id in staged_relationships} == {
+        f"doc_{i}" for i in range(0, 20, 2)
+    }
+
+    extracted_document_ids = [
+        document_id
+        for call in update_documents_kg_info.call_args_list
+        if call.args[2] == "extracted"
+        for document_id in call.args[1]
+    ]
+    assert sorted(extracted_document_ids) == sorted(doc.id for doc in documents)
+
+
+def test_kg_llm_budget_tokens_per_minute() -> None:
+    clock = _FakeClock()
+    with patch("onyx.kg.utils.llm_budget.time", clock):
+        # 10 tokens per second, a token per character
+        llm_budget = KGLLMBudget(
+            max_parallel_calls=1, tokens_per_minute=600, count_tokens=len
+        )
+
+        with llm_budget.reserve("a" * 500):
+            pass
+        assert clock.sleeps == []
+
+        # overdraws the budget
+        llm_budget.record_output("a" * 200)
+        with llm_budget.reserve("a" * 100):
+            pass
+        assert clock.sleeps == [20.0]
+
+        # larger than the whole budget, waits for the bucket to be full
+        with llm_budget.reserve("a" * 1000):
+            pass
+        assert clock.sleeps == [20.0, 60.0]
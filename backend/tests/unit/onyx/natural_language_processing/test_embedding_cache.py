@@ -0,0 +1,167 @@
+from itertools import count
+from pathlib import Path
+from unittest.mock import patch
+
+from onyx.natural_language_processing.embedding_cache import (
+    build_embedding_cache_key,
+)
+from onyx.natural_language_processing.embedding_cache import DiskEmbeddingCache
+from onyx.natural_language_processing.embedding_cache import EmbeddingCache
+from onyx.natural_language_processing.embedding_cache import RedisEmbeddingCache
+from onyx.natural_language_processing.search_nlp_models import EmbeddingModel
+from shared_configs.enums import EmbedTextType
+from shared_configs.model_server_models import Embedding
+from tests.unit.onyx.redis_utils import InMemoryTenantRedis
+
+
+class InMemoryEmbeddingCache(EmbeddingCache):
+    def __init__(self) -> None:
+        self.entries: dict[str, Embedding] = {}
+
+    def get_many(
+        self, namespace: str, keys: list[str], tenant_id: str | None = None
+    ) -> list[Embedding | None]:
+        return [self.entries.get(key) for key in keys]
+
+    def set_many(
+        self,
+        namespace: str,
+        entries: dict[str, Embedding],
+        tenant_id: str | None = None,
+    ) -> None:
+        self.entries.update(entries)
+
+
+def _make_model(
+    cache: EmbeddingCache, model_name: str = "test-model"
+) -> EmbeddingModel:
+    return EmbeddingModel(
+        server_host="localhost",
+        server_port=9000,
+        model_name=model_name,
+        normalize=True,
+        query_prefix=None,
+        passage_prefix=None,
+        api_key=None,
+        api_url=None,
+        provider_type=None,
+        embedding_cache=cache,
+    )
+
+
+def _fake_encode(texts: list[str], **kwargs: object) -> list[Embedding]:
+    return [[float(len(text)), 1.0] for text in texts]
+
+
+def test_encode_only_sends_cache_misses() -> None:
+    cache = InMemoryEmbeddingCache()
+    model = _make_model(cache)
+
+    with patch.object(
+        model, "_batch_encode_texts", side_effect=_fake_encode
+    ) as mock_encode:
+        first = model.encode(["a", "bb", "a"], text_type=EmbedTextType.PASSAGE)
+        assert mock_encode.call_args.kwargs["texts"] == ["a", "bb"]
+
+        second = model.encode(["ccc", "bb", " a "], text_type=EmbedTextType.PASSAGE)
+        assert mock_encode.call_args.kwargs["texts"] == ["ccc"]
+
+        model.encode(["bb", "ccc"], text_type=EmbedTextType.PASSAGE)
+        assert mock_encode.call_count == 2
+
+        # queries are embedded differently from passages
+        model.encode(["bb"], text_type=EmbedTextType.QUERY)
+        assert mock_encode.call_count == 3
+
+        # and so are texts embedded by another model
+        other_model = _make_model(cache, model_name="other-model")
+        with patch.object(
+            other_model, "_batch_encode_texts", side_effect=_fake_encode
+        ) as other_mock_encode:
+            other_model.encode(["bb"], text_type=EmbedTextType.PASSAGE)
+            assert other_mock_encode.call_count == 1
+
+    assert first == [[1.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+    assert second == [[3.0, 1.0], [2.0, 1.0], [1.0, 1.0]]
+
+
+def test_disk_embedding_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = DiskEmbeddingCache(path=str(tmp_path / "cache.db"), max_entries=2)
+    keys = [
+        build_embedding_cache_key("ns", EmbedTextType.PASSAGE, 512, text)
+        for text in ("a", "b", "c")
+    ]
+
+    cache.set_many("ns", {keys[0]: [0.5, 1.0]})
+    cache.set_many("ns", {keys[1]: [1.5, 2.0]})
+    # reading the first entry makes the second one the least recently used
+    assert cache.get_many("ns", [keys[0]]) == [[0.5, 1.0]]
+    cache.set_many("ns", {keys[2]: [2.5, 3.0]})
+
+    assert cache.get_many("ns", keys) == [[0.5, 1.0], None, [2.5, 3.0]]
+    # entries are scoped by tenant
+    assert cache.get_many("ns", keys, tenant_id="other_tenant") == [None] * 3
+
+
+def test_disk_embedding_cache_counts_entries_sparingly(tmp_path: Path) -> None:
+    cache = DiskEmbeddingCache(path=str(tmp_path / "cache.db"), max_entries=100)
+    statements: list[str] = []
+    cache._get_conn().set_trace_callback(statements.append)
+
+    for i in range(200):
+        cache.set_many("ns", {f"key_{i}": [float(i)]})
+
+    num_counts = sum("COUNT(*)" in statement for statement in statements)
+    # once every max_entries / 10 writes, not on every write
+    assert num_counts <= 200 // 10 + 1
+    num_entries = (
+        cache._get_conn().execute("SELECT COUNT(*) FROM embedding_cache").fetchone()[0]
+    )
+    assert 90 <= num_entries <= 100
+    # the most recent entries are kept
+    assert cache.get_many("ns", ["key_199"]) == [[199.0]]
+
+
+def test_redis_embedding_cache_evicts_least_recently_used() -> None:
+    redis_client = InMemoryTenantRedis("tenant1")
+    # tenants share the same redis
+    other_redis_client = InMemoryTenantRedis("tenant2")
+    other_redis_client.data = redis_client.data
+    other_redis_client.ttls = redis_client.ttls
+
+    cache = RedisEmbeddingCache(max_entries=2, ttl=60)
+    keys = [
+        build_embedding_cache_key("ns", EmbedTextType.PASSAGE, 512, text)
+        for text in ("a", "b", "c")
+    ]
+    clock = count(1000)
+    with (
+        patch(
+            "onyx.natural_language_processing.embedding_cache.get_redis_client",
+            side_effect=lambda tenant_id: (
+                other_redis_client if tenant_id == "tenant2" else redis_client
+            ),
+        ),
+        patch(
+            "onyx.natural_language_processing.embedding_cache.time.time",
+            side_effect=lambda: float(next(clock)),
+        ),
+    ):
+        cache.set_many("ns", {keys[0]: [0.5, 1.0]}, tenant_id="tenant1")
+        cache.set_many("ns", {keys[1]: [1.5, 2.0]}, tenant_id="tenant1")
+        # reading the first entry makes the second one the least recently used
+        assert cache.get_many("ns", [keys[0]], tenant_id="tenant1") == [[0.5, 1.0]]
+        cache.set_many("ns", {keys[2]: [2.5, 3.0]}, tenant_id="tenant1")
+
+        assert cache.get_many("ns", keys, tenant_id="tenant1") == [
+            [0.5, 1.0],
+            None,
+            [2.5, 3.0],
+        ]
+        assert cache.get_many("ns", keys, tenant_id="tenant2") == [None] * 3
+
+    # the evicted entry is deleted, not just dropped from the LRU set
+    entry_keys = [key for key in redis_client.data if b":embedding_cache:" in key]
+    assert len(entry_keys) == 2
+    assert all(key.startswith(b"tenant1:") for key in redis_client.data)
+    assert all(redis_client.ttls.get(key) == 60 for key in entry_keys)
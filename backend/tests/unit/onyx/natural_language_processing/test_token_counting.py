@@ -0,0 +1,35 @@
+from onyx.natural_language_processing.utils import BaseTokenizer
+
+
+class WhitespaceTokenizer(BaseTokenizer):
+    def __init__(self) -> None:
+        self.encode_calls = 0
+
+    def encode(self, string: str) -> list[int]:
+        self.encode_calls += 1
+        return [len(word) for word in string.split()]
+
+    def tokenize(self, string: str) -> list[str]:
+        return string.split()
+
+    def decode(self, tokens: list[int]) -> str:
+        return " ".join("x" * token for token in tokens)
+
+
+def test_token_counts_are_memoized() -> None:
+    tokenizer = WhitespaceTokenizer()
+
+    assert tokenizer.count_tokens("one two three") == 3
+    assert tokenizer.count_tokens("one two three") == 3
+    assert tokenizer.encode_calls == 1
+
+    assert tokenizer.count_tokens_batch(["one two three", "four", "", "four"]) == [
+        3,
+        1,
+        0,
+        1,
+    ]
+    # only the strings not seen before are encoded
+    assert tokenizer.encode_calls == 4
+    assert tokenizer.count_tokens("four") == 1
+    assert tokenizer.encode_calls == 4
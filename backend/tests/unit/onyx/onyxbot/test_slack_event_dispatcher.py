@@ -0,0 +1,89 @@
+import threading
+from collections.abc import Callable
+
+from onyx.onyxbot.slack.event_dispatcher import SlackEventDispatcher
+from shared_configs.contextvars import CURRENT_TENANT_ID_CONTEXTVAR
+from shared_configs.contextvars import get_current_tenant_id
+
+
+def _submit(
+    dispatcher: SlackEventDispatcher,
+    tenant_id: str,
+    func: Callable[[str], None],
+    event: str,
+) -> bool:
+    # the socket clients set the tenant before calling their listeners
+    token = CURRENT_TENANT_ID_CONTEXTVAR.set(tenant_id)
+    try:
+        return dispatcher.submit(tenant_id, func, event)
+    finally:
+        CURRENT_TENANT_ID_CONTEXTVAR.reset(token)
+
+
+def test_slack_event_dispatcher_round_robin() -> None:
+    dispatcher = SlackEventDispatcher(
+        num_workers=1, max_workers_per_tenant=1, max_queue_size_per_tenant=10
+    )
+    started = threading.Event()
+    release = threading.Event()
+    processed: list[tuple[str, str]] = []
+
+    def _process(event: str) -> None:
+        if event == "a1":
+            started.set()
+            release.wait()
+        processed.append((get_current_tenant_id(), event))
+
+    _submit(dispatcher, "tenant_a", _process, "a1")
+    assert started.wait(timeout=10)
+    for event in ["a2", "a3", "a4"]:
+        _submit(dispatcher, "tenant_a", _process, event)
+    for event in ["b1", "b2"]:
+        _submit(dispatcher, "tenant_b", _process, event)
+    assert dispatcher.num_queued_events() == 5
+    assert dispatcher.num_queued_events("tenant_b") == 2
+
+    release.set()
+    dispatcher.shutdown(timeout=10)
+
+    assert processed == [
+        ("tenant_a", "a1"),
+        ("tenant_b", "b1"),
+        ("tenant_a", "a2"),
+        ("tenant_b", "b2"),
+        ("tenant_a", "a3"),
+        ("tenant_a", "a4"),
+    ]
+    assert not _submit(dispatcher, "tenant_a", _process, "a5")
+
+
+def test_slack_event_dispatcher_bounded() -> None:
+    dispatcher = SlackEventDispatcher(
+        num_workers=3, max_workers_per_tenant=2, max_queue_size_per_tenant=2
+    )
+    num_started = threading.Semaphore(0)
+    release = threading.Event()
+    processed: list[str] = []
+
+    def _process(event: str) -> None:
+        num_started.release()
+        if event.startswith("a"):
+            release.wait()
+        processed.append(event)
+
+    # tenant_a only gets two of the workers, and two more queued events
+    for event in ["a1", "a2"]:
+        assert _submit(dispatcher, "tenant_a", _process, event)
+    for _ in range(2):
+        assert num_started.acquire(timeout=10)
+    assert [
+        _submit(dispatcher, "tenant_a", _process, event) for event in ["a3", "a4", "a5"]
+    ] == [True, True, False]
+
+    # the last worker is still free for the other tenants
+    assert _submit(dispatcher, "tenant_b", _process, "b1")
+    assert num_started.acquire(timeout=10)
+
+    release.set()
+    dispatcher.shutdown(timeout=10)
+    assert sorted(processed) == ["a1", "a2", "a3", "a4", "b1"]
@@ -0,0 +1,116 @@
+from typing import Any
+
+from redis.client import Pipeline
+
+from onyx.redis.redis_pool import TenantRedis
+
+
+def _to_bytes(value: Any) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, memoryview):
+        return value.tobytes()
+    return str(value).encode()
+
+
+class InMemoryTenantRedis(TenantRedis):
+    """A TenantRedis that runs its commands, direct or pipelined, against an
+    in-memory store instead of a server. The tenant prefixing of TenantRedis is
+    left as is, so tests see the key names a real server would."""
+
+    def __init__(self, tenant_id: str = "tenant1") -> None:
+        super().__init__(tenant_id)
+        self.data: dict[bytes, Any] = {}
+        self.ttls: dict[bytes, int] = {}
+
+    def pipeline(
+        self, transaction: bool = True, shard_hint: str | None = None
+    ) -> "InMemoryPipeline":
+        return InMemoryPipeline(self)
+
+    def execute_command(self, *args: Any, **options: Any) -> Any:
+        command, *rest = args
+        name = _to_bytes(rest[0]) if rest else b""
+        params = rest[1:]
+
+        if command == "SET":
+            self.data[name] = _to_bytes(params[0])
+            self.ttls.pop(name, None)
+            if "EX" in params:
+                self.ttls[name] = int(params[params.index("EX") + 1])
+            return True
+        if command == "GET":
+            return self.data.get(name)
+        if command == "MGET":
+            return [self.data.get(_to_bytes(key)) for key in rest]
+        if command in ("DEL", "UNLINK"):
+            keys = [_to_bytes(key) for key in rest]
+            for key in keys:
+                self.ttls.pop(key, None)
+            return sum(self.data.pop(key, None) is not None for key in keys)
+        if command == "EXPIRE":
+            if name not in self.data:
+                return False
+            self.ttls[name] = int(params[0])
+            return True
+        if command == "SADD":
+            self.data.setdefault(name, set()).update(map(_to_bytes, params))
+            return len(params)
+        if command == "SREM":
+            self.data.get(name, set()).difference_update(map(_to_bytes, params))
+            return len(params)
+        if command == "SMEMBERS":
+            return set(self.data.get(name, set()))
+        if command == "HSET":
+            fields = self.data.setdefault(name, {})
+            for field, value in zip(params[::2], params[1::2]):
+                fields[_to_bytes(field)] = _to_bytes(value)
+            return len(params) // 2
+        if command == "HDEL":
+            fields = self.data.get(name, {})
+            return sum(
+                fields.pop(_to_bytes(field), None) is not None for field in params
+            )
+        if command == "HSCAN":
+            return 0, dict(self.data.get(name, {}))
+        if command == "ZADD":
+            scores = self.data.setdefault(name, {})
+            for score, member in zip(params[::2], params[1::2]):
+                scores[_to_bytes(member)] = float(score)
+            return len(params) // 2
+        if command == "ZCARD":
+            return len(self.data.get(name, {}))
+        if command == "ZREMRANGEBYSCORE":
+            low, high = (float(bound) for bound in params)
+            scores = self.data.get(name, {})
+            removed = [m for m, score in scores.items() if low <= score <= high]
+            for member in removed:
+                del scores[member]
+            return len(removed)
+        if command in ("ZPOPMIN", "ZRANGE", "ZREMRANGEBYRANK"):
+            scores = self.data.get(name, {})
+            by_score = sorted(scores.items(), key=lambda item: (item[1], item[0]))
+            if command == "ZPOPMIN":
+                popped = by_score[: int(params[0]) if params else 1]
+                for member, _ in popped:
+                    del scores[member]
+                return popped
+            start, stop = int(params[0]), int(params[1])
+            selected = by_score[start : (stop + 1) or None]
+            if command == "ZRANGE":
+                return [member for member, _ in selected]
+            for member, _ in selected:
+                del scores[member]
+            return len(selected)
+
+        raise NotImplementedError(command)
+
+
+class InMemoryPipeline(Pipeline):
+    def __init__(self, client: InMemoryTenantRedis) -> None:
+        super().__init__(client.connection_pool, client.response_callbacks, False, None)
+        self.redis_client = client
+
+    def execute(self, raise_on_error: bool = True) -> list[Any]:
+        stack, self.command_stack = self.command_stack, []
+        return [self.redis_client.execute_command(*args) for args, _ in stack]